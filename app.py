@@ -1,12 +1,15 @@
 import falcon
+import mysql.connector
 from falcon_cors import CORS
 from falcon_multipart.middleware import MultipartMiddleware
 from core import energyflowdiagram, privilege, textmessage, distributioncircuit, virtualmeter, \
     costcenter, point, knowledgefile, meter, gsmmodem, tariff, user, storetype, timezone, \
     offlinemeterfile, version, contact, emailserver, combinedequipment, datasource, equipment, tenant, shopfloor, \
     webmessage, distributionsystem, store, emailmessage, tenanttype, wechatmessage, space, gateway, offlinemeter, \
-    rule, energycategory, sensor, energyitem, notification
+    rule, energycategory, sensor, energyitem, notification, reportcache, \
+    session, database
 from reports import advancedreport
+from reports import reportexport
 from reports import distributionsystem as distributionsystemreport
 from reports import energyflowdiagram as energyflowdiagramreport
 from reports import combinedequipmentcost
@@ -89,7 +92,9 @@ cors = CORS(allow_all_origins=True,
             allow_credentials_all_origins=True,
             allow_all_headers=True,
             allow_all_methods=True)
-api = falcon.API(middleware=[cors.middleware, MultipartMiddleware()])
+api = falcon.API(middleware=[cors.middleware, MultipartMiddleware(), session.SessionMiddleware(),
+                             reportcache.ReportCacheMiddleware()])
+api.add_error_handler(mysql.connector.errors.PoolError, database.handle_pool_error)
 
 
 ########################################################################################################################
@@ -230,6 +235,8 @@ api.add_route('/knowledgefiles/{id_}',
               knowledgefile.KnowledgeFileItem())
 api.add_route('/knowledgefiles/{id_}/restore',
               knowledgefile.KnowledgeFileRestore())
+api.add_route('/knowledgefiles/{id_}/file',
+              knowledgefile.KnowledgeFileDownload())
 
 api.add_route('/meters',
               meter.MeterCollection())
@@ -256,6 +263,8 @@ api.add_route('/offlinemeterfiles',
               offlinemeterfile.OfflineMeterFileCollection())
 api.add_route('/offlinemeterfiles/{id_}',
               offlinemeterfile.OfflineMeterFileItem())
+api.add_route('/offlinemeterfiles/{id_}/file',
+              offlinemeterfile.OfflineMeterFileDownload())
 
 api.add_route('/points',
               point.PointCollection())
@@ -475,6 +484,14 @@ api.add_route('/reports/advancedreports',
               advancedreport.AdvancedReportCollection())
 api.add_route('/reports/advancedreports/{id_}',
               advancedreport.AdvancedReportItem())
+api.add_route('/reports/advancedreports/{id_}/file',
+              advancedreport.AdvancedReportFile())
+api.add_route('/reports/exports',
+              reportexport.ReportExportCollection())
+api.add_route('/reports/exports/{id_}',
+              reportexport.ReportExportItem())
+api.add_route('/reports/exports/{id_}/file',
+              reportexport.ReportExportFile())
 api.add_route('/reports/distributionsystem',
               distributionsystemreport.Reporting())
 api.add_route('/reports/energyflowdiagram',
@@ -537,6 +554,8 @@ api.add_route('/reports/meterenergy',
               meterenergy.Reporting())
 api.add_route('/reports/meterrealtime',
               meterrealtime.Reporting())
+api.add_route('/reports/meterrealtime/stream',
+              meterrealtime.ReportingStream())
 api.add_route('/reports/metersubmetersbalance',
               metersubmetersbalance.Reporting())
 api.add_route('/reports/metertrend',
@@ -61,6 +61,36 @@ myems_reporting_db = {
     'database': 'myems_reporting_db',
 }
 
+# indicates how many connections to each database are pooled in each gunicorn worker
+# every pool size must be at least the number of threads of the worker (--threads in gunicorn.service) plus
+# fetch_max_workers and export_max_workers, so that a request never waits for connections held by the other requests
+# connections are opened on demand, and connections to a database are at most workers * pool size,
+# so max_connections of MySQL must be greater than workers * the sum of the pool sizes
+mysql_pool_sizes = {
+    'myems_system_db': 26,
+    'myems_energy_db': 26,
+    'myems_energy_baseline_db': 26,
+    'myems_billing_db': 26,
+    'myems_billing_baseline_db': 26,
+    'myems_historical_db': 26,
+    'myems_user_db': 26,
+    'myems_fdd_db': 26,
+    'myems_reporting_db': 26,
+}
+
+# indicates how many connections are pooled for the databases not in mysql_pool_sizes
+mysql_pool_default_size = 26
+
+# indicates how many seconds to wait for a pooled connection when all connections of the pool are in use
+mysql_pool_timeout_seconds = 30
+
+# indicates how many queries of reports are run concurrently in each gunicorn worker
+# queries to a database are also limited by its pool size in mysql_pool_sizes
+fetch_max_workers = 8
+
+# indicates whether to print the timings of the queries of reports for debugging
+is_fetch_timings_printed = False
+
 # address for Cookie domain
 myems_api_domain = '127.0.0.1'
 
@@ -83,3 +113,100 @@ upload_path = '/var/www/html/admin/upload/'
 
 # main currency unit
 currency_unit = 'CNY'
+
+# indicates whether to use NumPy to bucket hourly data by period for averaging and statistics calculation
+# the results are the same exact Decimals as without NumPy, which is used if NumPy isn't installed or this is False
+is_numpy_enabled = True
+
+# indicates how many compiled tariff schedules are cached in each process and for how many seconds
+tariff_schedule_cache_max_size = 256
+tariff_schedule_cache_ttl_seconds = 3600
+
+# indicates how many valid user sessions are cached in each gunicorn worker and for how many seconds at most
+session_cache_max_size = 1000
+session_cache_ttl_seconds = 60
+
+# indicates the file whose modification time is the generation of the session caches shared by all gunicorn workers
+# the file is touched on logouts and changes of users and privileges, and every worker clears its session cache when
+# the generation changes
+session_generation_file = '/tmp/myems-api-session.generation'
+
+# indicates for how many seconds the index of the hierarchy of spaces is used before it is reloaded
+space_tree_ttl_seconds = 60
+
+# indicates how many resolved privileges are cached in each gunicorn worker and for how many seconds
+privilege_scope_cache_max_size = 256
+privilege_scope_cache_ttl_seconds = 300
+
+# indicates how many compiled energy flow diagrams are cached in each gunicorn worker and for how many seconds
+energy_flow_diagram_cache_max_size = 100
+energy_flow_diagram_cache_ttl_seconds = 300
+
+# indicates how many latest values of points are cached in each gunicorn worker and for how many seconds
+latest_value_cache_max_size = 10000
+latest_value_cache_ttl_seconds = 5
+
+# indicates whether the meter realtime report reads recent trend values of points from the store in memory of each
+# gunicorn worker, which polls myems_historical_db for new values in a background thread, instead of querying it on
+# every request
+is_point_value_store_enabled = True
+
+# indicates for how many minutes values are kept in the store, should be longer than the periods of realtime reports,
+# and the maximum number of values kept per point
+point_value_store_window_minutes = 70
+point_value_store_max_values_per_point = 5000
+
+# indicates how often the store polls new values, and how long points which are not requested are still polled
+point_value_store_poll_seconds = 5
+point_value_store_idle_seconds = 300
+
+# indicates how many seconds late values may be written to myems_historical_db and still be polled by the store
+point_value_store_overlap_seconds = 60
+
+# indicates how many seconds a stream of meter realtime data is kept open before the client reconnects, which must be
+# less than the timeout of gunicorn workers, and how often keepalive comments are sent to detect closed connections
+# streams always read values from the store of points
+meter_realtime_stream_max_seconds = 300
+meter_realtime_stream_keepalive_seconds = 15
+
+# indicates how many streams of meter realtime data are open at most in each gunicorn worker, which must be less than
+# the number of threads of the worker (--threads in gunicorn.service) so that other requests are still served
+meter_realtime_stream_max_count = 8
+
+# indicates whether to cache the results of reports with a reporting period
+is_report_cache_enabled = True
+
+# indicates how many report results are cached in each gunicorn worker
+report_cache_max_size = 200
+
+# indicates for how many seconds to cache report results of periods which ended more than
+# report_cache_settled_minutes ago, and of the other periods whose data may still change
+# cached results are cleared on changes of entities in all gunicorn workers, see report_cache_generation_file
+report_cache_settled_minutes = 120
+report_cache_historical_ttl_seconds = 86400
+report_cache_recent_ttl_seconds = 300
+
+# indicates the SQLite file in which report results are shared by all gunicorn workers
+# for example '/tmp/myems-api-report-cache.db', or None to cache in each gunicorn worker only
+report_cache_sqlite_file = None
+
+# indicates the file whose modification time is the generation of the report caches shared by all gunicorn workers
+# the file is touched on changes of entities and every worker clears its memory cache when the generation changes
+report_cache_generation_file = '/tmp/myems-api-report-cache.generation'
+
+# indicates how many report export jobs are run at a time and at most queued or running in each gunicorn worker
+export_max_workers = 2
+export_max_queued_jobs = 20
+
+# indicates the SQLite file in which the states of report export jobs are shared by all gunicorn workers
+export_job_sqlite_file = '/tmp/myems-api-export-jobs.db'
+
+# indicates in how many seconds a queued or running export job fails if it is not finished,
+# and for how many seconds the states of export jobs are kept
+export_job_timeout_seconds = 3600
+export_job_retention_seconds = 604800
+
+# indicates how often the gunicorn worker of queued and running export jobs renews them, and in how many seconds
+# without renewal they fail because the worker was stopped, so that identical jobs can be submitted again
+export_job_heartbeat_seconds = 10
+export_job_stale_seconds = 60
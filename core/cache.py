@@ -0,0 +1,84 @@
+import collections
+import os
+import threading
+import time
+
+
+########################################################################################################################
+# Size bounded LRU cache with time to live, shared by all threads in the process
+# max_size: the maximum number of entries, the least recently used entry is evicted when exceeded
+# ttl: the default time to live of entries in seconds
+# Note: every gunicorn worker has its own cache, so entries may be stale in other workers until they expire, unless the
+# workers clear their caches on changes of a shared generation, see get_generation
+########################################################################################################################
+class LRUCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def delete_if(self, predicate):
+        with self.lock:
+            for key in [key for key in self.entries.keys() if predicate(key)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+########################################################################################################################
+# Generation of caches shared by all gunicorn workers of the host through the modification time of a file
+# A worker starts a new generation when it changes the data of the caches, and every worker clears its caches when the
+# generation differs from the one its caches were filled in.
+#   path: the file, or None to share no generation
+# Returns: the modification time of the file in nanoseconds, or None if there is no such file
+########################################################################################################################
+def get_generation(path):
+    if path is None:
+        return None
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+########################################################################################################################
+# Start a new generation by touching the file
+# The modification time always increases, even if the clock did not tick since the previous generation
+########################################################################################################################
+def next_generation(path):
+    if path is None:
+        return
+    try:
+        with open(path, 'a'):
+            pass
+        generation = max(time.time_ns(), os.stat(path).st_mtime_ns + 1)
+        os.utime(path, ns=(generation, generation))
+    except OSError as e:
+        print(str(e))
@@ -1,6 +1,6 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 import uuid
 
@@ -16,7 +16,7 @@ class CombinedEquipmentCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid "
@@ -99,7 +99,7 @@ class CombinedEquipmentCollection:
         else:
             description = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -157,7 +157,7 @@ class CombinedEquipmentItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COMBINED_EQUIPMENT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid "
@@ -203,7 +203,7 @@ class CombinedEquipmentItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COMBINED_EQUIPMENT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         # check relation with space
@@ -316,7 +316,7 @@ class CombinedEquipmentItem:
         else:
             description = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -379,7 +379,7 @@ class CombinedEquipmentItem:
 
         new_values = json.loads(raw_json)
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
         cursor.execute(" SELECT name "
                        " FROM tbl_combined_equipments "
@@ -527,7 +527,7 @@ class CombinedEquipmentEquipmentCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COMBINED_EQUIPMENT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -575,7 +575,7 @@ class CombinedEquipmentEquipmentCollection:
                                    description='API.INVALID_EQUIPMENT_ID')
         equipment_id = new_values['data']['equipment_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -637,7 +637,7 @@ class CombinedEquipmentEquipmentItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_EQUIPMENT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -692,7 +692,7 @@ class CombinedEquipmentParameterCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COMBINED_EQUIPMENT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -869,7 +869,7 @@ class CombinedEquipmentParameterCollection:
                     len(str.strip(new_values['data']['denominator_meter_uuid'])) > 0:
                 denominator_meter_uuid = str.strip(new_values['data']['denominator_meter_uuid'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -1009,7 +1009,7 @@ class CombinedEquipmentParameterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COMBINED_EQUIPMENT_PARAMETER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name "
@@ -1125,7 +1125,7 @@ class CombinedEquipmentParameterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COMBINED_EQUIPMENT_PARAMETER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1227,7 +1227,7 @@ class CombinedEquipmentParameterItem:
                     len(str.strip(new_values['data']['denominator_meter_uuid'])) > 0:
                 denominator_meter_uuid = str.strip(new_values['data']['denominator_meter_uuid'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -1376,7 +1376,7 @@ class CombinedEquipmentMeterCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COMBINED_EQUIPMENT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -1445,7 +1445,7 @@ class CombinedEquipmentMeterCollection:
                                    description='API.INVALID_IS_OUTPUT_VALUE')
         is_output = new_values['data']['is_output']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1507,7 +1507,7 @@ class CombinedEquipmentMeterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1562,7 +1562,7 @@ class CombinedEquipmentOfflineMeterCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COMBINED_EQUIPMENT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -1631,7 +1631,7 @@ class CombinedEquipmentOfflineMeterCollection:
                                    description='API.INVALID_IS_OUTPUT_VALUE')
         is_output = new_values['data']['is_output']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1694,7 +1694,7 @@ class CombinedEquipmentOfflineMeterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_OFFLINE_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1749,7 +1749,7 @@ class CombinedEquipmentVirtualMeterCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COMBINED_EQUIPMENT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -1818,7 +1818,7 @@ class CombinedEquipmentVirtualMeterCollection:
                                    description='API.INVALID_IS_OUTPUT_VALUE')
         is_output = new_values['data']['is_output']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1881,7 +1881,7 @@ class CombinedEquipmentVirtualMeterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_VIRTUAL_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
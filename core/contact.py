@@ -1,6 +1,6 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 import uuid
 import re
@@ -17,7 +17,7 @@ class ContactCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, name, uuid, "
@@ -85,7 +85,7 @@ class ContactCollection:
         else:
             description = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -130,7 +130,7 @@ class ContactItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_CONTACT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, name, uuid, email, phone, description "
@@ -159,7 +159,7 @@ class ContactItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_CONTACT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -274,7 +274,7 @@ class ContactItem:
         else:
             description = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
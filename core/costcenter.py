@@ -1,8 +1,9 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 import uuid
+from core import utilities
 
 
 class CostCenterCollection:
@@ -16,7 +17,7 @@ class CostCenterCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, name, uuid, external_id "
@@ -58,7 +59,7 @@ class CostCenterCollection:
         else:
             external_id = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -110,7 +111,7 @@ class CostCenterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COST_CENTER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, name, uuid, external_id "
@@ -134,7 +135,7 @@ class CostCenterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COST_CENTER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -299,7 +300,7 @@ class CostCenterItem:
         else:
             external_id = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -373,7 +374,7 @@ class CostCenterTariffCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COST_CENTER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT t.id, t.name, t.uuid, "
@@ -413,7 +414,7 @@ class CostCenterTariffCollection:
 
         new_values = json.loads(raw_json)
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -453,6 +454,8 @@ class CostCenterTariffCollection:
         cursor.close()
         cnx.disconnect()
 
+        utilities.clear_tariff_schedule_cache()
+
         resp.status = falcon.HTTP_201
         resp.location = '/costcenters/' + str(id_) + '/tariffs/' + str(new_values['data']['tariff_id'])
 
@@ -476,7 +479,7 @@ class CostCenterTariffItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_TARIFF_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -513,4 +516,6 @@ class CostCenterTariffItem:
         cursor.close()
         cnx.disconnect()
 
+        utilities.clear_tariff_schedule_cache()
+
         resp.status = falcon.HTTP_204
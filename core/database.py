@@ -0,0 +1,144 @@
+import collections
+import threading
+import falcon
+import mysql.connector
+import config
+
+
+########################################################################################################################
+# Pool of connections to one database, shared by all threads in the process
+# db_config: one of the database configs in config.py, such as config.myems_system_db
+# pool_size: the maximum number of connections, connections are opened on demand and kept open after use
+########################################################################################################################
+class ConnectionPool:
+    def __init__(self, db_config, pool_size):
+        self.db_config = db_config
+        self.pool_size = pool_size
+        self.semaphore = threading.BoundedSemaphore(pool_size)
+        self.idle_connections = collections.deque()
+        self.lock = threading.Lock()
+
+    def get_connection(self):
+        if not self.semaphore.acquire(timeout=config.mysql_pool_timeout_seconds):
+            raise mysql.connector.errors.PoolError(msg='Failed getting connection to ' +
+                                                       self.db_config['database'] + '; pool exhausted')
+        try:
+            cnx = None
+            with self.lock:
+                if len(self.idle_connections) > 0:
+                    cnx = self.idle_connections.pop()
+
+            if cnx is not None:
+                # health check on checkout, reconnect if the connection has been closed by the server
+                try:
+                    cnx.ping(reconnect=True, attempts=1, delay=0)
+                except Exception as e:
+                    print(str(e))
+                    close_quietly(cnx)
+                    cnx = None
+
+            if cnx is None:
+                cnx = mysql.connector.connect(**self.db_config)
+        except Exception:
+            self.semaphore.release()
+            raise
+
+        return PooledConnection(self, cnx)
+
+    def put_connection(self, cnx):
+        try:
+            # end the transaction, so uncommitted changes are discarded and the next user reads fresh data
+            cnx.rollback()
+            with self.lock:
+                self.idle_connections.append(cnx)
+        except Exception as e:
+            print(str(e))
+            close_quietly(cnx)
+        finally:
+            self.semaphore.release()
+
+
+########################################################################################################################
+# Connection checked out from a pool
+# All methods of MySQLConnection are available, close() and disconnect() return the connection to the pool.
+# It can be used as a context manager, the connection is returned to the pool on exit.
+########################################################################################################################
+class PooledConnection:
+    pool = None
+    cnx = None
+
+    def __init__(self, pool, cnx):
+        self.pool = pool
+        self.cnx = cnx
+
+    def __getattr__(self, name):
+        if self.cnx is None:
+            raise AttributeError(name)
+        return getattr(self.cnx, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        # return the connection if the caller forgot to
+        self.close()
+
+    def close(self):
+        if self.cnx is not None:
+            cnx = self.cnx
+            self.cnx = None
+            self.pool.put_connection(cnx)
+
+    def disconnect(self):
+        self.close()
+
+
+def close_quietly(cnx):
+    try:
+        cnx.disconnect()
+    except Exception as e:
+        print(str(e))
+
+
+pools = dict()
+pools_lock = threading.Lock()
+
+
+########################################################################################################################
+# Get the pool of the database
+# db_config: one of the database configs in config.py, such as config.myems_system_db
+########################################################################################################################
+def get_pool(db_config):
+    key = (db_config.get('host'), db_config.get('port'), db_config.get('user'), db_config.get('database'))
+    with pools_lock:
+        pool = pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_config,
+                                  config.mysql_pool_sizes.get(db_config['database'], config.mysql_pool_default_size))
+            pools[key] = pool
+    return pool
+
+
+########################################################################################################################
+# Get a pooled connection to the database
+# db_config: one of the database configs in config.py, such as config.myems_system_db
+# Returns: PooledConnection, call close() or disconnect() or use it in a with statement to return it to the pool
+# Raises: mysql.connector.errors.PoolError if no connection is available in config.mysql_pool_timeout_seconds
+########################################################################################################################
+def connect(db_config):
+    return get_pool(db_config).get_connection()
+
+
+########################################################################################################################
+# Error handler of the API for mysql.connector.errors.PoolError
+# Requests which get no pooled connection in config.mysql_pool_timeout_seconds fail with 503 Service Unavailable,
+# instead of a report being computed without the data of the database.
+########################################################################################################################
+def handle_pool_error(req, resp, ex, params):
+    print(str(ex))
+    raise falcon.HTTPError(falcon.HTTP_503, title='API.SERVICE_UNAVAILABLE',
+                           description='API.DATABASE_CONNECTIONS_EXHAUSTED',
+                           headers={'Retry-After': str(config.mysql_pool_timeout_seconds)})
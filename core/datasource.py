@@ -1,6 +1,6 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 import uuid
 from datetime import datetime
@@ -17,7 +17,7 @@ class DataSourceCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, name, uuid "
@@ -100,7 +100,7 @@ class DataSourceCollection:
                                    description='API.INVALID_CONNECTION')
         connection = str.strip(new_values['data']['connection'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -152,7 +152,7 @@ class DataSourceItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_DATA_SOURCE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, name, uuid "
@@ -201,7 +201,7 @@ class DataSourceItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_DATA_SOURCE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -279,7 +279,7 @@ class DataSourceItem:
                                    description='API.INVALID_CONNECTION')
         connection = str.strip(new_values['data']['connection'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -331,7 +331,7 @@ class DataSourcePointCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_DATA_SOURCE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
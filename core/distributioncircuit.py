@@ -1,6 +1,6 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 import uuid
 
@@ -16,7 +16,7 @@ class DistributionCircuitCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid "
@@ -123,7 +123,7 @@ class DistributionCircuitCollection:
         else:
             meters = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -183,7 +183,7 @@ class DistributionCircuitItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid "
@@ -230,7 +230,7 @@ class DistributionCircuitItem:
         if not id_.isdigit() or int(id_) <= 0:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_DISTRIBUTION_CIRCUIT_ID')
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -325,7 +325,7 @@ class DistributionCircuitItem:
         else:
             meters = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -384,7 +384,7 @@ class DistributionCircuitPointCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_DISTRIBUTION_CIRCUIT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid "
@@ -443,7 +443,7 @@ class DistributionCircuitPointCollection:
 
         new_values = json.loads(raw_json)
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -505,7 +505,7 @@ class DistributionCircuitPointItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_POINT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
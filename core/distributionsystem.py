@@ -1,6 +1,6 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 import uuid
 
@@ -16,7 +16,7 @@ class DistributionSystemCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid, "
@@ -72,7 +72,7 @@ class DistributionSystemCollection:
         else:
             description = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -115,7 +115,7 @@ class DistributionSystemItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid, "
@@ -144,7 +144,7 @@ class DistributionSystemItem:
         if not id_.isdigit() or int(id_) <= 0:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_DISTRIBUTION_SYSTEM_ID')
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -212,7 +212,7 @@ class DistributionSystemItem:
         else:
             description = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -254,7 +254,7 @@ class DistributionSystemDistributionCircuitCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_DISTRIBUTION_SYSTEM_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -0,0 +1,138 @@
+import os
+import re
+from urllib.parse import quote
+from core import database
+
+
+# indicates how many bytes are read and sent at a time
+chunk_size = 1024 * 1024
+
+
+########################################################################################################################
+# Set a file as the response, which is streamed in chunks
+# Supports If-None-Match with the ETag, and a single byte range in the Range header (optionally with If-Range)
+#   file_name: name of the downloaded file
+#   content_type: such as application/pdf
+#   size: size of the file in bytes
+#   etag: strong ETag of the file, which must change if the content of the file changes
+#   read_chunks: function called with (start, end), returns an iterable of the bytes of the file from offset start
+#                (included) to offset end (excluded), such as a generator reading at most chunk_size bytes at a time
+# Returns: 200 OK, 206 Partial Content, 304 Not Modified or 416 Range Not Satisfiable
+########################################################################################################################
+def set_response(req, resp, file_name, content_type, size, etag, read_chunks):
+    etag = '"' + etag + '"'
+    resp.set_header('ETag', etag)
+    resp.set_header('Accept-Ranges', 'bytes')
+
+    if_none_match = req.get_header('If-None-Match')
+    if if_none_match is not None and \
+            (if_none_match.strip() == '*' or etag in [value.strip() for value in if_none_match.split(',')]):
+        resp.status = '304 Not Modified'
+        return
+
+    start = 0
+    end = size
+    byte_range = get_range(req, size, etag)
+    if byte_range is not None:
+        if byte_range == (None, None):
+            resp.status = '416 Range Not Satisfiable'
+            resp.set_header('Content-Range', 'bytes */' + str(size))
+            return
+        start, end = byte_range
+        resp.status = '206 Partial Content'
+        resp.set_header('Content-Range', 'bytes ' + str(start) + '-' + str(end - 1) + '/' + str(size))
+
+    resp.content_type = content_type
+    ascii_file_name = re.sub(r'[^A-Za-z0-9._-]', '_', file_name)
+    resp.set_header('Content-Disposition',
+                    'attachment; filename="' + ascii_file_name + '"; filename*=UTF-8\'\'' + quote(file_name, safe=''))
+    resp.content_length = end - start
+    resp.stream = read_chunks(start, end)
+
+
+########################################################################################################################
+# Get the byte range of the Range header
+# Returns: (start, end) with end excluded, None to send the whole file if there is no valid single byte range or
+#          If-Range does not match the ETag, or (None, None) if the range is not satisfiable
+########################################################################################################################
+def get_range(req, size, etag):
+    header = req.get_header('Range')
+    if header is None:
+        return None
+
+    if_range = req.get_header('If-Range')
+    if if_range is not None and if_range.strip() != etag:
+        return None
+
+    match = re.fullmatch(r'\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*', header)
+    if match is None or (match.group(1) == '' and match.group(2) == ''):
+        return None
+
+    if match.group(1) == '':
+        # suffix range, the last bytes of the file
+        length = int(match.group(2))
+        if length == 0 or size == 0:
+            return None, None
+        return max(size - length, 0), size
+
+    start = int(match.group(1))
+    if match.group(2) != '' and int(match.group(2)) < start:
+        return None
+    if start >= size:
+        return None, None
+    end = size if match.group(2) == '' else min(int(match.group(2)) + 1, size)
+    return start, end
+
+
+########################################################################################################################
+# Read a file on disk from offset start (included) to offset end (excluded) in chunks
+########################################################################################################################
+def read_file(file_path, start, end):
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        offset = start
+        while offset < end:
+            chunk = f.read(min(chunk_size, end - offset))
+            if len(chunk) == 0:
+                return
+            yield chunk
+            offset += len(chunk)
+
+
+########################################################################################################################
+# Read the file_object BLOB of a row from offset start (included) to offset end (excluded) in chunks
+# The range is read with a single query, and the connection is released before the first chunk is sent, so slow
+# downloads do not hold connections
+#   db_config: such as config.myems_reporting_db
+#   table: table with the columns id and file_object, such as tbl_reports_files
+########################################################################################################################
+def read_blob(db_config, table, id_, start, end):
+    cnx = database.connect(db_config)
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(" SELECT SUBSTRING(file_object, %s, %s) "
+                       " FROM " + table +
+                       " WHERE id = %s ",
+                       (start + 1, end - start, id_))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        cnx.disconnect()
+
+    if row is None or row[0] is None:
+        return
+    data = memoryview(bytes(row[0]))
+    for offset in range(0, len(data), chunk_size):
+        yield bytes(data[offset:offset + chunk_size])
+
+
+########################################################################################################################
+# Read an uploaded file from offset start (included) to offset end (excluded) in chunks
+# The file is read from disk if it is saved in config.upload_path of this host, otherwise from its file_object BLOB
+#   file_path: path of the file in config.upload_path
+#   size: size of file_object in bytes
+########################################################################################################################
+def read_uploaded_file(file_path, size, db_config, table, id_, start, end):
+    if os.path.isfile(file_path) and os.path.getsize(file_path) == size:
+        return read_file(file_path, start, end)
+    return read_blob(db_config, table, id_, start, end)
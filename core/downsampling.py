@@ -0,0 +1,220 @@
+import falcon
+from decimal import Decimal
+
+
+########################################################################################################################
+# Downsampling of point values for trends
+# Rows are (utc_date_time, actual_value) ordered by utc_date_time. The reporting period is split into buckets of
+# equal time, so rows are downsampled while they are streamed, with at most two buckets of rows in memory.
+#   lttb: Largest-Triangle-Three-Buckets, keeps the shape of the trend with at most max_points original rows
+#   minmax: keeps the minimum and maximum rows of every bucket, so peaks are always kept
+#   avg: one row per bucket with the first timestamp and the average value in the bucket
+########################################################################################################################
+methods = ('lttb', 'minmax', 'avg')
+
+
+########################################################################################################################
+# Get downsampling parameters from the query parameters of the report
+# maxpoints: optional, the maximum number of points of each trend, no downsampling if not provided
+# downsample: optional, one of 'lttb', 'minmax' and 'avg', defaults to 'lttb'
+# Returns: (max_points, method), max_points is None if no downsampling
+########################################################################################################################
+def get_parameters(params):
+    max_points = params.get('maxpoints')
+    method = params.get('downsample')
+
+    if max_points is None or len(str.strip(max_points)) == 0:
+        return None, None
+
+    max_points = str.strip(max_points)
+    if not max_points.isdigit() or int(max_points) < 3:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST', description='API.INVALID_MAX_POINTS')
+    max_points = int(max_points)
+
+    if method is None or len(str.strip(method)) == 0:
+        method = 'lttb'
+    else:
+        method = str.strip(method)
+        if method not in methods:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description='API.INVALID_DOWNSAMPLE_METHOD')
+
+    return max_points, method
+
+
+########################################################################################################################
+# Downsample rows
+#   rows: iterator of (utc_date_time, actual_value) ordered by utc_date_time
+#   start_datetime_utc: start datetime in utc of the reporting period
+#   end_datetime_utc: end datetime in utc of the reporting period
+#   max_points: the maximum number of points, rows are passed through if None
+#   method: one of 'lttb', 'minmax' and 'avg'
+# Returns: generator of (utc_date_time, actual_value)
+########################################################################################################################
+def downsample(rows, start_datetime_utc, end_datetime_utc, max_points, method):
+    if max_points is None:
+        return iter(rows)
+
+    start_datetime_utc = start_datetime_utc.replace(tzinfo=None)
+    end_datetime_utc = end_datetime_utc.replace(tzinfo=None)
+    if method == 'minmax':
+        return downsample_minmax(rows, start_datetime_utc, end_datetime_utc, max_points // 2)
+    elif method == 'avg':
+        return downsample_avg(rows, start_datetime_utc, end_datetime_utc, max_points)
+    else:
+        return downsample_lttb(rows, start_datetime_utc, end_datetime_utc, max_points)
+
+
+def get_bucket_index(row, start_datetime_utc, bucket_seconds, bucket_count):
+    index = int((row[0] - start_datetime_utc).total_seconds() // bucket_seconds)
+    return min(max(index, 0), bucket_count - 1)
+
+
+def get_bucket_seconds(start_datetime_utc, end_datetime_utc, bucket_count):
+    return max((end_datetime_utc - start_datetime_utc).total_seconds(), 1.0) / bucket_count
+
+
+def get_point(row, start_datetime_utc):
+    return (row[0] - start_datetime_utc).total_seconds(), float(row[1]) if row[1] is not None else 0.0
+
+
+def select_largest_triangle(previous_point, bucket, next_point, start_datetime_utc):
+    # select the row in bucket making the largest triangle with the previous selected point and the next point
+    ax, ay = previous_point
+    cx, cy = next_point
+    selected_row = None
+    maximum_area = -1.0
+    for row in bucket:
+        bx, by = get_point(row, start_datetime_utc)
+        area = abs((ax - cx) * (by - ay) - (ax - bx) * (cy - ay))
+        if area > maximum_area:
+            maximum_area = area
+            selected_row = row
+    return selected_row
+
+
+def get_average_point(bucket, start_datetime_utc):
+    points = [get_point(row, start_datetime_utc) for row in bucket]
+    return sum(point[0] for point in points) / len(points), sum(point[1] for point in points) / len(points)
+
+
+def downsample_lttb(rows, start_datetime_utc, end_datetime_utc, max_points):
+    rows = iter(rows)
+    first_row = next(rows, None)
+    if first_row is None:
+        return
+    yield first_row
+
+    # the first and the last rows are always kept, the rows between them are selected one per bucket
+    bucket_count = max_points - 2
+    bucket_seconds = get_bucket_seconds(start_datetime_utc, end_datetime_utc, bucket_count)
+    previous_point = get_point(first_row, start_datetime_utc)
+    current_index, current_bucket = None, list()
+    next_index, next_bucket = None, list()
+    last_row = None
+    for row in rows:
+        if last_row is not None:
+            index = get_bucket_index(last_row, start_datetime_utc, bucket_seconds, bucket_count)
+            if current_index is None or index == current_index:
+                current_index = index
+                current_bucket.append(last_row)
+            elif next_index is None or index == next_index:
+                next_index = index
+                next_bucket.append(last_row)
+            else:
+                selected_row = select_largest_triangle(previous_point,
+                                                       current_bucket,
+                                                       get_average_point(next_bucket, start_datetime_utc),
+                                                       start_datetime_utc)
+                yield selected_row
+                previous_point = get_point(selected_row, start_datetime_utc)
+                current_index, current_bucket = next_index, next_bucket
+                next_index, next_bucket = index, [last_row]
+        last_row = row
+
+    if last_row is None:
+        return
+
+    if len(next_bucket) > 0:
+        selected_row = select_largest_triangle(previous_point,
+                                               current_bucket,
+                                               get_average_point(next_bucket, start_datetime_utc),
+                                               start_datetime_utc)
+        yield selected_row
+        previous_point = get_point(selected_row, start_datetime_utc)
+        current_bucket = next_bucket
+
+    if len(current_bucket) > 0:
+        yield select_largest_triangle(previous_point,
+                                      current_bucket,
+                                      get_point(last_row, start_datetime_utc),
+                                      start_datetime_utc)
+    yield last_row
+
+
+def downsample_minmax(rows, start_datetime_utc, end_datetime_utc, bucket_count):
+    bucket_seconds = get_bucket_seconds(start_datetime_utc, end_datetime_utc, bucket_count)
+    current_index = None
+    minimum_row = None
+    maximum_row = None
+    for row in rows:
+        index = get_bucket_index(row, start_datetime_utc, bucket_seconds, bucket_count)
+        if index != current_index:
+            if current_index is not None:
+                yield from get_minmax_rows(minimum_row, maximum_row)
+            current_index = index
+            minimum_row = None
+            maximum_row = None
+        if row[1] is not None:
+            if minimum_row is None or row[1] < minimum_row[1]:
+                minimum_row = row
+            if maximum_row is None or row[1] > maximum_row[1]:
+                maximum_row = row
+
+    if current_index is not None:
+        yield from get_minmax_rows(minimum_row, maximum_row)
+
+
+def get_minmax_rows(minimum_row, maximum_row):
+    if minimum_row is None:
+        return list()
+    elif minimum_row is maximum_row:
+        return [minimum_row]
+    elif minimum_row[0] <= maximum_row[0]:
+        return [minimum_row, maximum_row]
+    else:
+        return [maximum_row, minimum_row]
+
+
+def downsample_avg(rows, start_datetime_utc, end_datetime_utc, bucket_count):
+    bucket_seconds = get_bucket_seconds(start_datetime_utc, end_datetime_utc, bucket_count)
+    current_index = None
+    first_row = None
+    total = None
+    counter = 0
+    for row in rows:
+        if row[1] is None:
+            continue
+        index = get_bucket_index(row, start_datetime_utc, bucket_seconds, bucket_count)
+        if index != current_index:
+            if current_index is not None:
+                yield get_average_row(first_row, total, counter)
+            current_index = index
+            first_row = row
+            total = row[1]
+            counter = 1
+        else:
+            total += row[1]
+            counter += 1
+
+    if current_index is not None:
+        yield get_average_row(first_row, total, counter)
+
+
+def get_average_row(first_row, total, counter):
+    if isinstance(total, Decimal):
+        # keep the decimal places of the values
+        average = (total / counter).quantize(Decimal(1).scaleb(first_row[1].as_tuple().exponent))
+    else:
+        average = total / counter
+    return first_row[0], average
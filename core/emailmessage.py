@@ -1,6 +1,6 @@
 import falcon
 import json
-import mysql.connector
+from core import database
 import config
 from datetime import datetime, timedelta, timezone
 
@@ -46,7 +46,7 @@ class EmailMessageCollection:
                                    description='API.START_DATETIME_SHOULD_BE_EARLY_THAN_END_DATETIME')
 
         try:
-            cnx = mysql.connector.connect(**config.myems_fdd_db)
+            cnx = database.connect(config.myems_fdd_db)
             cursor = cnx.cursor()
         except Exception as e:
             raise falcon.HTTPError(falcon.HTTP_500, title='API.DATABASE_ERROR', description=str(e))
@@ -102,7 +102,7 @@ class EmailMessageItem:
                                    description='API.INVALID_EMAIL_MESSAGE_ID')
 
         try:
-            cnx = mysql.connector.connect(**config.myems_fdd_db)
+            cnx = database.connect(config.myems_fdd_db)
             cursor = cnx.cursor()
         except Exception as e:
             raise falcon.HTTPError(falcon.HTTP_500, title='API.DATABASE_ERROR', description=str(e))
@@ -152,7 +152,7 @@ class EmailMessageItem:
         cnx = None
         cursor = None
         try:
-            cnx = mysql.connector.connect(**config.myems_fdd_db)
+            cnx = database.connect(config.myems_fdd_db)
             cursor = cnx.cursor()
         except Exception as e:
             if cursor:
@@ -1,6 +1,6 @@
 import falcon
 import json
-import mysql.connector
+from core import database
 import config
 import base64
 import re
@@ -17,7 +17,7 @@ class EmailServerCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, host, port, requires_authentication, user_name, password, from_addr "
@@ -105,7 +105,7 @@ class EmailServerCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_FROM_ADDR')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT host "
@@ -149,7 +149,7 @@ class EmailServerItem:
         if not id_.isdigit() or int(id_) <= 0:
             raise falcon.HTTPError(falcon.HTTP_400, '400 Bad Request')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, host, port, requires_authentication, user_name, password, from_addr "
@@ -178,7 +178,7 @@ class EmailServerItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_EMAIL_SERVER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT host "
@@ -264,7 +264,7 @@ class EmailServerItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_FROM_ADDR')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT id "
@@ -1,6 +1,6 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 import uuid
 
@@ -16,7 +16,7 @@ class EnergyCategoryCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, name, uuid, unit_of_measure, kgce, kgco2e "
@@ -76,7 +76,7 @@ class EnergyCategoryCollection:
                                    description='API.INVALID_KGCO2E')
         kgco2e = float(new_values['data']['kgco2e'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -120,7 +120,7 @@ class EnergyCategoryItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_ENERGY_CATEGORY_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, name, uuid, unit_of_measure, kgce, kgco2e "
@@ -148,7 +148,7 @@ class EnergyCategoryItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_ENERGY_CATEGORY_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -265,7 +265,7 @@ class EnergyCategoryItem:
                                    description='API.INVALID_KGCO2E')
         kgco2e = float(new_values['data']['kgco2e'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1,6 +1,7 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
+from core import energyflowtopology
 import config
 import uuid
 
@@ -16,7 +17,7 @@ class EnergyFlowDiagramCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, energy_flow_diagram_id, name "
@@ -135,7 +136,7 @@ class EnergyFlowDiagramCollection:
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_NAME')
         name = str.strip(new_values['data']['name'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -176,7 +177,7 @@ class EnergyFlowDiagramItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, energy_flow_diagram_id, name "
@@ -284,7 +285,7 @@ class EnergyFlowDiagramItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         # delete all associated nodes
@@ -303,6 +304,7 @@ class EnergyFlowDiagramItem:
 
         cursor.close()
         cnx.disconnect()
+        energyflowtopology.invalidate(int(id_))
 
         resp.status = falcon.HTTP_204
 
@@ -326,7 +328,7 @@ class EnergyFlowDiagramItem:
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_NAME')
         name = str.strip(new_values['data']['name'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -356,6 +358,7 @@ class EnergyFlowDiagramItem:
 
         cursor.close()
         cnx.disconnect()
+        energyflowtopology.invalidate(int(id_))
 
         resp.status = falcon.HTTP_200
 
@@ -375,7 +378,7 @@ class EnergyFlowDiagramLinkCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name "
@@ -502,7 +505,7 @@ class EnergyFlowDiagramLinkCollection:
                     len(str.strip(new_values['data']['meter_uuid'])) > 0:
                 meter_uuid = str.strip(new_values['data']['meter_uuid'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -604,6 +607,7 @@ class EnergyFlowDiagramLinkCollection:
         cnx.commit()
         cursor.close()
         cnx.disconnect()
+        energyflowtopology.invalidate(int(id_))
 
         resp.status = falcon.HTTP_201
         resp.location = '/energyflowdiagrams/' + str(id_) + 'links/' + str(new_id)
@@ -628,7 +632,7 @@ class EnergyFlowDiagramLinkItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_LINK_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name "
@@ -718,7 +722,7 @@ class EnergyFlowDiagramLinkItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_LINK_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -751,6 +755,7 @@ class EnergyFlowDiagramLinkItem:
 
         cursor.close()
         cnx.disconnect()
+        energyflowtopology.invalidate(int(id_))
 
         resp.status = falcon.HTTP_204
 
@@ -795,7 +800,7 @@ class EnergyFlowDiagramLinkItem:
                     len(str.strip(new_values['data']['meter_uuid'])) > 0:
                 meter_uuid = str.strip(new_values['data']['meter_uuid'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -909,6 +914,7 @@ class EnergyFlowDiagramLinkItem:
 
         cursor.close()
         cnx.disconnect()
+        energyflowtopology.invalidate(int(id_))
 
         resp.status = falcon.HTTP_200
 
@@ -928,7 +934,7 @@ class EnergyFlowDiagramNodeCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -978,7 +984,7 @@ class EnergyFlowDiagramNodeCollection:
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_NODE_NAME')
         name = str.strip(new_values['data']['name'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -1008,6 +1014,7 @@ class EnergyFlowDiagramNodeCollection:
         cnx.commit()
         cursor.close()
         cnx.disconnect()
+        energyflowtopology.invalidate(int(id_))
 
         resp.status = falcon.HTTP_201
         resp.location = '/energyflowdiagrams/' + str(id_) + 'nodes/' + str(new_id)
@@ -1032,7 +1039,7 @@ class EnergyFlowDiagramNodeItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_NODE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name "
@@ -1062,7 +1069,7 @@ class EnergyFlowDiagramNodeItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_NODE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1095,6 +1102,7 @@ class EnergyFlowDiagramNodeItem:
 
         cursor.close()
         cnx.disconnect()
+        energyflowtopology.invalidate(int(id_))
 
         resp.status = falcon.HTTP_204
 
@@ -1123,7 +1131,7 @@ class EnergyFlowDiagramNodeItem:
                                    description='API.INVALID_ENERGY_FLOW_DIAGRAM_NODE_NAME')
         name = str.strip(new_values['data']['name'])
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -1166,6 +1174,7 @@ class EnergyFlowDiagramNodeItem:
 
         cursor.close()
         cnx.disconnect()
+        energyflowtopology.invalidate(int(id_))
 
         resp.status = falcon.HTTP_200
 
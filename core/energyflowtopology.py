@@ -0,0 +1,161 @@
+import config
+from core import cache
+from core import database
+
+
+########################################################################################################################
+# Compiled topology of energy flow diagrams
+# The nodes and links of a diagram and the meters of the links are queried once and compiled into flat arrays, which
+# are cached in each gunicorn worker by the id of the diagram for config.energy_flow_diagram_cache_ttl_seconds.
+# The cache of the worker is invalidated by the handlers of diagrams, nodes and links, the other workers may use the
+# cached topology until it expires.
+########################################################################################################################
+topology_cache = cache.LRUCache(config.energy_flow_diagram_cache_max_size,
+                                config.energy_flow_diagram_cache_ttl_seconds)
+
+
+class Topology:
+    """Immutable topology of an energy flow diagram"""
+    def __init__(self, diagram_id, name, uuid, nodes, links):
+        # nodes: list of (id, name) in order of id
+        # links: list of (id, source_node_id, target_node_id, meter) in order of id, meter is a dict of type, id, name
+        #        and uuid, or None if not found
+        self.id = diagram_id
+        self.name = name
+        self.uuid = uuid
+
+        self.node_ids = [node[0] for node in nodes]
+        self.node_names = [node[1] for node in nodes]
+        self.node_indexes = {node_id: index for index, node_id in enumerate(self.node_ids)}
+
+        # indexes of the source and target nodes of links, None if the node is not in the diagram
+        self.link_ids = [link[0] for link in links]
+        self.link_sources = [self.node_indexes.get(link[1]) for link in links]
+        self.link_targets = [self.node_indexes.get(link[2]) for link in links]
+        self.link_meters = [link[3] for link in links]
+
+        # indexes of the outgoing and incoming links of nodes
+        self.outgoing = [list() for _ in self.node_ids]
+        self.incoming = [list() for _ in self.node_ids]
+        for index, (source, target) in enumerate(zip(self.link_sources, self.link_targets)):
+            if source is not None:
+                self.outgoing[source].append(index)
+            if target is not None:
+                self.incoming[target].append(index)
+
+        # indexes of nodes in topological order, nodes in cycles are appended in order of id
+        in_degrees = [0] * len(self.node_ids)
+        for source, target in zip(self.link_sources, self.link_targets):
+            if source is not None and target is not None:
+                in_degrees[target] += 1
+        order = [index for index, in_degree in enumerate(in_degrees) if in_degree == 0]
+        position = 0
+        while position < len(order):
+            for link_index in self.outgoing[order[position]]:
+                target = self.link_targets[link_index]
+                if target is not None:
+                    in_degrees[target] -= 1
+                    if in_degrees[target] == 0:
+                        order.append(target)
+            position += 1
+        self.is_acyclic = len(order) == len(self.node_ids)
+        if not self.is_acyclic:
+            ordered = set(order)
+            order.extend(index for index in range(len(self.node_ids)) if index not in ordered)
+        self.order = order
+
+    def get_node_name(self, node_index):
+        return None if node_index is None else self.node_names[node_index]
+
+    ####################################################################################################################
+    # Get the inflow, outflow and loss of nodes in one pass over the links
+    #   link_values: values of the links in the order of link_ids, None if there is no value
+    # Returns: (inflows, outflows, losses), lists in the order of node_ids, None if there is no value
+    #          the loss of a node is its inflow minus its outflow, for nodes with both
+    ####################################################################################################################
+    def get_balance(self, link_values):
+        inflows = [None] * len(self.node_ids)
+        outflows = [None] * len(self.node_ids)
+        for source, target, value in zip(self.link_sources, self.link_targets, link_values):
+            if value is None:
+                continue
+            if source is not None:
+                outflows[source] = value if outflows[source] is None else outflows[source] + value
+            if target is not None:
+                inflows[target] = value if inflows[target] is None else inflows[target] + value
+
+        losses = [inflow - outflow if inflow is not None and outflow is not None else None
+                  for inflow, outflow in zip(inflows, outflows)]
+        return inflows, outflows, losses
+
+
+def load(diagram_id):
+    cnx = database.connect(config.myems_system_db)
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(" SELECT name, uuid "
+                       " FROM tbl_energy_flow_diagrams "
+                       " WHERE id = %s ", (diagram_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        name, uuid = row
+
+        cursor.execute(" SELECT id, name "
+                       " FROM tbl_energy_flow_diagrams_nodes "
+                       " WHERE energy_flow_diagram_id = %s "
+                       " ORDER BY id ", (diagram_id,))
+        nodes = cursor.fetchall()
+
+        cursor.execute(" SELECT id, source_node_id, target_node_id, meter_uuid "
+                       " FROM tbl_energy_flow_diagrams_links "
+                       " WHERE energy_flow_diagram_id = %s "
+                       " ORDER BY id ", (diagram_id,))
+        rows_links = cursor.fetchall()
+
+        # find the meters of the links by uuid, meters take precedence over virtual meters and offline meters
+        meter_dict = dict()
+        meter_uuid_list = list({row[3] for row in rows_links if row[3] is not None})
+        for meter_type, table in (('offline_meter', 'tbl_offline_meters'),
+                                  ('virtual_meter', 'tbl_virtual_meters'),
+                                  ('meter', 'tbl_meters')):
+            if len(meter_uuid_list) == 0:
+                break
+            cursor.execute(" SELECT id, name, uuid "
+                           " FROM " + table +
+                           " WHERE uuid IN ( " + ', '.join(['%s'] * len(meter_uuid_list)) + " ) ",
+                           tuple(meter_uuid_list))
+            for row in cursor.fetchall():
+                meter_dict[row[2]] = {"type": meter_type,
+                                      "id": row[0],
+                                      "name": row[1],
+                                      "uuid": row[2]}
+    finally:
+        cursor.close()
+        cnx.disconnect()
+
+    links = [(row[0], row[1], row[2], meter_dict.get(row[3])) for row in rows_links]
+    return Topology(diagram_id, name, uuid, nodes, links)
+
+
+########################################################################################################################
+# Get the compiled topology of an energy flow diagram
+# Returns: Topology, or None if the diagram is not found
+########################################################################################################################
+def get_topology(diagram_id):
+    topology = topology_cache.get(diagram_id)
+    if topology is None:
+        topology = load(diagram_id)
+        if topology is not None:
+            topology_cache.set(diagram_id, topology)
+    return topology
+
+
+########################################################################################################################
+# Invalidate the cached topology of a diagram in this gunicorn worker, or all cached topologies if diagram_id is None
+########################################################################################################################
+def invalidate(diagram_id=None):
+    if diagram_id is None:
+        topology_cache.clear()
+    else:
+        topology_cache.delete(diagram_id)
@@ -0,0 +1,40 @@
+import falcon
+from urllib.parse import quote
+
+
+content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+########################################################################################################################
+# Check whether the report is requested as an Excel file
+# Reports are returned as JSON without Excel file by default, and as an Excel file with the parameter export=excel
+#   params: the query parameters of the report
+# Returns: True if export=excel, or False if there is no export parameter
+# Raises: HTTPError 400 if the export parameter is invalid
+########################################################################################################################
+def is_requested(params):
+    export = params.get('export')
+    if export is None or len(str.strip(export)) == 0:
+        return False
+    if str.strip(export) != 'excel':
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST', description='API.INVALID_EXPORT')
+    return True
+
+
+########################################################################################################################
+# Set the Excel file as the response, which is downloaded as <report>-<name>.xlsx, such as metercost-Meter1.xlsx
+# The file name is also set to resp.context.excel_file_name
+#   excel_bytes: bytes of the Excel file returned by excelexporters
+#   report: name of the route of the report, such as metercost
+#   name: name of the space, tenant, meter, etc. of the report
+# Raises: HTTPError 400 if there is no Excel file, which excelexporters return when the report has no data to export
+########################################################################################################################
+def set_response(resp, excel_bytes, report, name):
+    if excel_bytes is None:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST', description='API.NO_DATA_TO_EXPORT')
+    filename = report + '-' + str(name) + '.xlsx'
+    resp.content_type = content_type
+    resp.set_header('Content-Disposition',
+                    'attachment; filename="' + report + '.xlsx"; filename*=UTF-8\'\'' + quote(filename, safe=''))
+    resp.data = excel_bytes
+    resp.context.excel_file_name = filename
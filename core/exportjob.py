@@ -0,0 +1,237 @@
+import concurrent.futures
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import urlencode
+import falcon
+import config
+from core import database
+
+
+########################################################################################################################
+# Queue of jobs to export reports to Excel files
+# Jobs are run by threads of the gunicorn worker which accepted them, at most config.export_max_workers at a time, and
+# the Excel files are saved to tbl_reports_files of myems_reporting_db.
+# The states of the jobs are saved to a SQLite file (config.export_job_sqlite_file) shared by all gunicorn workers of
+# the host, so any worker answers the polling of a job, and a job identical to a job of the same user which is queued or
+# running in any worker is not run again. Jobs are run with the user and privilege of the session which submitted them,
+# and only that user gets them.
+# The worker of queued and running jobs renews their update_timestamp every config.export_job_heartbeat_seconds, so the
+# jobs of a worker which was stopped fail after config.export_job_stale_seconds and do not block identical jobs.
+########################################################################################################################
+executor = concurrent.futures.ThreadPoolExecutor(max_workers=config.export_max_workers)
+
+# uuids of the jobs which are queued or running in this process, and the thread which renews them
+pending_lock = threading.Lock()
+pending_jobs = set()
+heartbeat_thread = None
+
+sqlite_lock = threading.Lock()
+sqlite_initialized = False
+
+
+def connect_sqlite():
+    global sqlite_initialized
+    cnx = sqlite3.connect(config.export_job_sqlite_file, timeout=30)
+    if not sqlite_initialized:
+        with sqlite_lock:
+            cnx.execute(" PRAGMA journal_mode=WAL ")
+            cnx.execute(" CREATE TABLE IF NOT EXISTS tbl_export_jobs "
+                        " (uuid TEXT PRIMARY KEY, key TEXT NOT NULL, report TEXT NOT NULL, status TEXT NOT NULL, "
+                        "  create_timestamp REAL NOT NULL, update_timestamp REAL NOT NULL, "
+                        "  file_id INTEGER, error TEXT, user_id INTEGER) ")
+            # files created before jobs had users, whose jobs are not found by any user
+            if 'user_id' not in [row[1] for row in cnx.execute(" PRAGMA table_info(tbl_export_jobs) ").fetchall()]:
+                cnx.execute(" ALTER TABLE tbl_export_jobs ADD COLUMN user_id INTEGER ")
+            cnx.execute(" CREATE INDEX IF NOT EXISTS idx_export_jobs_key ON tbl_export_jobs (key, status) ")
+            cnx.commit()
+            sqlite_initialized = True
+    return cnx
+
+
+def get_key(report, parameters, user, privilege):
+    return hashlib.sha256((report + '?' + urlencode(sorted(parameters.items())) + '#' + str(user['id']) + ':' +
+                           str(None if privilege is None else privilege['id'])).encode('utf-8')).hexdigest()
+
+
+########################################################################################################################
+# Submit a job, or get the identical job of the same user which is queued or running
+#   report: name of the report, such as spaceenergycategory
+#   parameters: dict of the query parameters of the report
+#   user: the user of the session which submits the job, see req.context.user, who is the only user to get the job
+#   privilege: the privilege of the user, see req.context.privilege
+#   function: called with report, parameters, user and privilege in a thread, returns (file name, bytes of the Excel
+#             file), the job fails if the bytes are None
+# Returns: the uuid of the job
+# Raises: HTTPError 429 if config.export_max_queued_jobs jobs are queued or running in this process
+########################################################################################################################
+def submit(report, parameters, user, privilege, function):
+    key = get_key(report, parameters, user, privilege)
+    job_uuid = str(uuid.uuid4())
+    now = time.time()
+
+    cnx = connect_sqlite()
+    try:
+        # lock the database so that identical jobs submitted to other processes at the same time are not both queued
+        cnx.execute(" BEGIN IMMEDIATE ")
+        row = cnx.execute(" SELECT uuid FROM tbl_export_jobs "
+                          " WHERE key = ? AND status IN ('queued', 'running') "
+                          "       AND update_timestamp >= ? AND create_timestamp >= ? ",
+                          (key, now - config.export_job_stale_seconds,
+                           now - config.export_job_timeout_seconds)).fetchone()
+        if row is not None:
+            cnx.rollback()
+            return row[0]
+
+        with pending_lock:
+            if len(pending_jobs) >= config.export_max_queued_jobs:
+                cnx.rollback()
+                raise falcon.HTTPError(falcon.HTTP_429, title='API.TOO_MANY_REQUESTS',
+                                       description='API.TOO_MANY_EXPORT_JOBS')
+            pending_jobs.add(job_uuid)
+
+        try:
+            cnx.execute(" DELETE FROM tbl_export_jobs WHERE update_timestamp < ? ",
+                        (now - config.export_job_retention_seconds,))
+            cnx.execute(" INSERT INTO tbl_export_jobs "
+                        "    (uuid, key, report, status, create_timestamp, update_timestamp, user_id) "
+                        " VALUES (?, ?, ?, 'queued', ?, ?, ?) ", (job_uuid, key, report, now, now, user['id']))
+            cnx.commit()
+        except Exception:
+            with pending_lock:
+                pending_jobs.discard(job_uuid)
+            raise
+    finally:
+        cnx.close()
+
+    start_heartbeat()
+    executor.submit(run, job_uuid, report, parameters, user, privilege, function)
+    return job_uuid
+
+
+########################################################################################################################
+# Renew update_timestamp of the jobs which are queued or running in this process, until there are none
+########################################################################################################################
+def beat():
+    global heartbeat_thread
+    while True:
+        time.sleep(config.export_job_heartbeat_seconds)
+        with pending_lock:
+            job_uuids = list(pending_jobs)
+            if len(job_uuids) == 0:
+                heartbeat_thread = None
+                return
+        try:
+            cnx = connect_sqlite()
+            try:
+                cnx.execute(" UPDATE tbl_export_jobs SET update_timestamp = ? "
+                            " WHERE status IN ('queued', 'running') "
+                            "       AND uuid IN ( " + ', '.join(['?'] * len(job_uuids)) + " ) ",
+                            [time.time()] + job_uuids)
+                cnx.commit()
+            finally:
+                cnx.close()
+        except Exception as e:
+            print(str(e))
+
+
+def start_heartbeat():
+    global heartbeat_thread
+    with pending_lock:
+        if heartbeat_thread is None:
+            heartbeat_thread = threading.Thread(target=beat, name='export-job-heartbeat', daemon=True)
+            heartbeat_thread.start()
+
+
+def update(job_uuid, status, file_id=None, error=None):
+    cnx = connect_sqlite()
+    try:
+        cnx.execute(" UPDATE tbl_export_jobs SET status = ?, update_timestamp = ?, file_id = ?, error = ? "
+                    " WHERE uuid = ? ", (status, time.time(), file_id, error, job_uuid))
+        cnx.commit()
+    finally:
+        cnx.close()
+
+
+########################################################################################################################
+# Run a job and save the Excel file to tbl_reports_files
+########################################################################################################################
+def run(job_uuid, report, parameters, user, privilege, function):
+    try:
+        update(job_uuid, 'running')
+        try:
+            file_name, file_object = function(report, parameters, user, privilege)
+        except falcon.HTTPError as e:
+            update(job_uuid, 'failed', error=str(e.description))
+            return
+        except Exception as e:
+            print(str(e))
+            update(job_uuid, 'failed', error='API.EXPORT_FAILED')
+            return
+        if file_object is None:
+            update(job_uuid, 'failed', error='API.NO_DATA_TO_EXPORT')
+            return
+
+        cnx_reporting = database.connect(config.myems_reporting_db)
+        cursor_reporting = cnx_reporting.cursor()
+        try:
+            cursor_reporting.execute(" INSERT INTO tbl_reports_files "
+                                     "    (file_name, uuid, create_datetime_utc, file_type, file_size, file_object) "
+                                     " VALUES (%s, %s, %s, %s, %s, %s) ",
+                                     (file_name, job_uuid, datetime.utcnow(), 'xlsx', len(file_object), file_object))
+            file_id = cursor_reporting.lastrowid
+            cnx_reporting.commit()
+        finally:
+            cursor_reporting.close()
+            cnx_reporting.disconnect()
+
+        update(job_uuid, 'finished', file_id=file_id)
+    except Exception as e:
+        print(str(e))
+        try:
+            update(job_uuid, 'failed', error='API.EXPORT_FAILED')
+        except Exception as e:
+            print(str(e))
+    finally:
+        with pending_lock:
+            pending_jobs.discard(job_uuid)
+
+
+########################################################################################################################
+# Get a job
+# Returns: dict of uuid, report, status, create_timestamp, update_timestamp, file_id, error and user_id,
+#          or None if not found
+#          status is one of queued, running, finished and failed, jobs not renewed in config.export_job_stale_seconds,
+#          whose processes were stopped, and jobs not finished in config.export_job_timeout_seconds are failed
+########################################################################################################################
+def get(job_uuid):
+    cnx = connect_sqlite()
+    try:
+        row = cnx.execute(" SELECT uuid, report, status, create_timestamp, update_timestamp, file_id, error, user_id "
+                          " FROM tbl_export_jobs WHERE uuid = ? ", (job_uuid,)).fetchone()
+    finally:
+        cnx.close()
+
+    if row is None:
+        return None
+
+    job = {"uuid": row[0],
+           "report": row[1],
+           "status": row[2],
+           "create_timestamp": row[3],
+           "update_timestamp": row[4],
+           "file_id": row[5],
+           "error": row[6],
+           "user_id": row[7]}
+    if job['status'] in ('queued', 'running'):
+        now = time.time()
+        if job['update_timestamp'] < now - config.export_job_stale_seconds:
+            job['status'] = 'failed'
+            job['error'] = 'API.EXPORT_JOB_ABORTED'
+        elif job['create_timestamp'] < now - config.export_job_timeout_seconds:
+            job['status'] = 'failed'
+            job['error'] = 'API.EXPORT_JOB_TIMEOUT'
+    return job
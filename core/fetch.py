@@ -0,0 +1,93 @@
+import collections
+import concurrent.futures
+import time
+from core import database
+import config
+
+
+########################################################################################################################
+# Threads to run the queries of fetch stages, shared by all requests in the process
+########################################################################################################################
+executor = concurrent.futures.ThreadPoolExecutor(max_workers=config.fetch_max_workers)
+
+
+########################################################################################################################
+# Stage of independent queries of a report, which are run concurrently
+# Every query is a function which gets a cursor of its own pooled connection, so queries to the energy, billing,
+# historical and baseline databases do not wait for each other. The number of concurrent queries to a database is
+# limited by its pool size in config.mysql_pool_sizes.
+#   name: name of the stage, printed with the timings if config.is_fetch_timings_printed
+# Usage:
+#   fetch_stage = fetch.FetchStage('dashboard')
+#   fetch_stage.add('base_input', config.myems_energy_db, query_base_input, space_id)
+#   results = fetch_stage.run()
+#   base_input = results['base_input']
+# Note: the functions must not run fetch stages themselves, and should release the connections of the report which
+#       are not needed any more before run(), as they count against the pool sizes
+########################################################################################################################
+class FetchStage:
+    def __init__(self, name):
+        self.name = name
+        self.queries = collections.OrderedDict()
+        self.timings = collections.OrderedDict()
+
+    ####################################################################################################################
+    # Add a query to the stage
+    #   key: key of the result in the results returned by run()
+    #   db_config: one of the database configs in config.py, such as config.myems_energy_db,
+    #              or None if the function does not need a cursor
+    #   function: called with a cursor of db_config (if not None) and args, returns the result of the query
+    ####################################################################################################################
+    def add(self, key, db_config, function, *args):
+        self.queries[key] = (db_config, function, args)
+
+    ####################################################################################################################
+    # Run all queries of the stage and wait for them to complete
+    # Returns: dict of results by key
+    # Raises: the first exception raised by the queries, after all queries are completed
+    ####################################################################################################################
+    def run(self):
+        start_time = time.perf_counter()
+        futures = collections.OrderedDict()
+        for key, (db_config, function, args) in self.queries.items():
+            futures[key] = executor.submit(run_query, db_config, function, args)
+
+        results = dict()
+        exception = None
+        for key, future in futures.items():
+            try:
+                results[key], self.timings[key] = future.result()
+            except Exception as e:
+                print(self.name + ': ' + key + ' failed: ' + str(e))
+                if exception is None:
+                    exception = e
+
+        self.timings['total'] = time.perf_counter() - start_time
+        if config.is_fetch_timings_printed:
+            print(self.name + ' fetch timings (ms): ' +
+                  ', '.join(key + '=' + str(round(seconds * 1000, 1)) for key, seconds in self.timings.items()))
+
+        if exception is not None:
+            raise exception
+
+        return results
+
+
+########################################################################################################################
+# Run one query with a cursor of its own pooled connection
+# Returns: (result, seconds), seconds includes the time to wait for a pooled connection
+########################################################################################################################
+def run_query(db_config, function, args):
+    start_time = time.perf_counter()
+    if db_config is None:
+        return function(*args), time.perf_counter() - start_time
+
+    cnx = database.connect(db_config)
+    cursor = cnx.cursor()
+    try:
+        result = function(cursor, *args)
+    finally:
+        cursor.close()
+        cnx.close()
+
+    return result, time.perf_counter() - start_time
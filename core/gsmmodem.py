@@ -1,6 +1,6 @@
 import falcon
 import json
-import mysql.connector
+from core import database
 import config
 import base64
 import re
@@ -17,7 +17,7 @@ class GSMModemCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, serial_port, baud_rate "
@@ -62,7 +62,7 @@ class GSMModemCollection:
                                    description='API.INVALID_BAUD_RATE')
         baud_rate = float(new_values['data']['baud_rate'])
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT id "
@@ -102,7 +102,7 @@ class GSMModemItem:
         if not id_.isdigit() or int(id_) <= 0:
             raise falcon.HTTPError(falcon.HTTP_400, '400 Bad Request')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, serial_port, baud_rate "
@@ -126,7 +126,7 @@ class GSMModemItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_GSM_MODEM_ID')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT serial_port "
@@ -175,7 +175,7 @@ class GSMModemItem:
                                    description='API.INVALID_BAUD_RATE')
         baud_rate = float(new_values['data']['baud_rate'])
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT serial_port "
@@ -1,12 +1,13 @@
 import falcon
 import json
-import mysql.connector
+from core import database
+from core import session
 import config
-import uuid
+from core import upload as upload_file
+from core import download
+import mimetypes
 from datetime import datetime, timezone, timedelta
 import os
-import base64
-import sys
 
 
 class KnowledgeFileCollection:
@@ -20,7 +21,7 @@ class KnowledgeFileCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT uuid, display_name "
@@ -35,10 +36,10 @@ class KnowledgeFileCollection:
             for row in rows:
                 user_dict[row['uuid']] = row['display_name']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
-        query = (" SELECT id, file_name, uuid, upload_datetime_utc, upload_user_uuid, file_object"
+        query = (" SELECT id, file_name, uuid, upload_datetime_utc, upload_user_uuid, file_size "
                  " FROM tbl_knowledge_files "
                  " ORDER BY upload_datetime_utc desc ")
         cursor.execute(query)
@@ -52,10 +53,6 @@ class KnowledgeFileCollection:
             if config.utc_offset[0] == '-':
                 timezone_offset = -timezone_offset
             for row in rows:
-                # Base64 encode the bytes
-                base64_encoded_data = base64.b64encode(row['file_object'])
-                # get the Base64 encoded data using human-readable characters.
-                base64_message = base64_encoded_data.decode('utf-8')
                 upload_datetime_local = row['upload_datetime_utc'].replace(tzinfo=None) + \
                     timedelta(minutes=timezone_offset)
                 upload_datetime = row['upload_datetime_utc']
@@ -66,9 +63,7 @@ class KnowledgeFileCollection:
                                "upload_datetime": upload_datetime.timestamp() * 1000,
                                "upload_datetime_local": upload_datetime_local.isoformat(),
                                "user_display_name": user_dict.get(row['upload_user_uuid'], None),
-                               "file_size_bytes": sys.getsizeof(row['file_object']),
-                               "file_bytes_base64": base64_message
-                               }
+                               "file_size_bytes": row['file_size']}
                 result.append(meta_result)
 
         resp.body = json.dumps(result)
@@ -77,95 +72,28 @@ class KnowledgeFileCollection:
     def on_post(req, resp):
         """Handles POST requests"""
 
+        # Verify User Session
+        user_uuid = session.verify(req)['uuid']
+
         try:
             upload = req.get_param('file')
-            # Read upload file as binary
-            raw_blob = upload.file.read()
             # Retrieve filename
             filename = upload.filename
-            file_uuid = str(uuid.uuid4())
-
-            # Define file_path
-            file_path = os.path.join(config.upload_path, file_uuid)
-
-            # Write to a temporary file to prevent incomplete files from
-            # being used.
-            temp_file_path = file_path + '~'
-
-            open(temp_file_path, 'wb').write(raw_blob)
-
-            # Now that we know the file has been fully saved to disk
-            # move it into place.
-            os.rename(temp_file_path, file_path)
+            # Save the upload file to disk in chunks
+            file_uuid, file_hash, file_size = upload_file.save_file(upload)
         except Exception as ex:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.ERROR',
                                    description='API.FAILED_TO_UPLOAD_KNOWLEDGE_FILE')
 
-        # Verify User Session
-        token = req.headers.get('TOKEN')
-        user_uuid = req.headers.get('USER-UUID')
-        if token is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.TOKEN_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
-        if user_uuid is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.USER_UUID_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
-
-        cnx = mysql.connector.connect(**config.myems_user_db)
-        cursor = cnx.cursor()
-
-        query = (" SELECT utc_expires "
-                 " FROM tbl_sessions "
-                 " WHERE user_uuid = %s AND token = %s")
-        cursor.execute(query, (user_uuid, token,))
-        row = cursor.fetchone()
-
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_SESSION_PLEASE_RE_LOGIN')
-        else:
-            utc_expires = row[0]
-            if datetime.utcnow() > utc_expires:
-                if cursor:
-                    cursor.close()
-                if cnx:
-                    cnx.disconnect()
-                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                       description='API.USER_SESSION_TIMEOUT')
-
-        cursor.execute(" SELECT id "
-                       " FROM tbl_users "
-                       " WHERE uuid = %s ",
-                       (user_uuid,))
-        row = cursor.fetchone()
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_USER_PLEASE_RE_LOGIN')
-        else:
-            user_id = row[0]
-
-        cnx = mysql.connector.connect(**config.myems_system_db)
-        cursor = cnx.cursor()
-
-        add_values = (" INSERT INTO tbl_knowledge_files "
-                      " (file_name, uuid, upload_datetime_utc, upload_user_uuid, file_object ) "
-                      " VALUES (%s, %s, %s, %s, %s) ")
-        cursor.execute(add_values, (filename,
-                                    file_uuid,
-                                    datetime.utcnow(),
-                                    user_uuid,
-                                    raw_blob))
-        new_id = cursor.lastrowid
+        cnx = database.connect(config.myems_system_db)
+        # identical files are stored once, see core/upload
+        new_id = upload_file.insert_file(cnx, 'tbl_knowledge_files',
+                                         {'file_name': filename,
+                                          'uuid': file_uuid,
+                                          'upload_datetime_utc': datetime.utcnow(),
+                                          'upload_user_uuid': user_uuid},
+                                         file_uuid, file_hash, file_size)
         cnx.commit()
-        cursor.close()
         cnx.disconnect()
 
         resp.status = falcon.HTTP_201
@@ -187,7 +115,7 @@ class KnowledgeFileItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_KNOWLEDGE_FILE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
         query = (" SELECT uuid, display_name "
@@ -202,7 +130,7 @@ class KnowledgeFileItem:
             for row in rows:
                 user_dict[row[0]] = row[1]
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, file_name, uuid, upload_datetime_utc, upload_user_uuid "
@@ -234,35 +162,23 @@ class KnowledgeFileItem:
                                    title='API.BAD_REQUEST',
                                    description='API.INVALID_KNOWLEDGE_FILE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
-        cursor = cnx.cursor()
+        cnx = database.connect(config.myems_system_db)
 
-        cursor.execute(" SELECT uuid "
-                       " FROM tbl_knowledge_files "
-                       " WHERE id = %s ", (id_,))
-        row = cursor.fetchone()
-        if row is None:
-            cursor.close()
+        try:
+            # the file is removed from disk unless other rows share it
+            is_deleted = upload_file.delete_file(cnx, 'tbl_knowledge_files', id_)
+        except OSError as ex:
             cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_404,
-                                   title='API.NOT_FOUND',
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.ERROR',
                                    description='API.KNOWLEDGE_FILE_NOT_FOUND')
 
-        try:
-            file_uuid = row[0]
-            # Define file_path
-            file_path = os.path.join(config.upload_path, file_uuid)
-
-            # remove the file from disk
-            os.remove(file_path)
-        except Exception as ex:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.ERROR',
+        if not is_deleted:
+            cnx.disconnect()
+            raise falcon.HTTPError(falcon.HTTP_404,
+                                   title='API.NOT_FOUND',
                                    description='API.KNOWLEDGE_FILE_NOT_FOUND')
 
-        cursor.execute(" DELETE FROM tbl_knowledge_files WHERE id = %s ", (id_,))
         cnx.commit()
-
-        cursor.close()
         cnx.disconnect()
 
         resp.status = falcon.HTTP_204
@@ -283,12 +199,14 @@ class KnowledgeFileRestore:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_KNOWLEDGE_FILE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
-        query = (" SELECT uuid, file_object "
-                 " FROM tbl_knowledge_files "
-                 " WHERE id = %s ")
+        # the file is restored for the row storing it, which is the row itself unless it shares the file of another row
+        query = (" SELECT o.id, o.uuid, COALESCE(o.file_size, LENGTH(o.file_object)) "
+                 " FROM tbl_knowledge_files f "
+                 " JOIN tbl_knowledge_files o ON o.id = COALESCE(f.file_object_id, f.id) "
+                 " WHERE f.id = %s ")
         cursor.execute(query, (id_,))
         row = cursor.fetchone()
         cursor.close()
@@ -298,11 +216,9 @@ class KnowledgeFileRestore:
             raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                    description='API.KNOWLEDGE_FILE_NOT_FOUND')
 
-        result = {"uuid": row[0],
-                  "file_object": row[1]}
         try:
-            raw_blob = result["file_object"]
-            file_uuid = result["uuid"]
+            file_uuid = row[1]
+            file_size = row[2] if row[2] is not None else 0
 
             # Define file_path
             file_path = os.path.join(config.upload_path, file_uuid)
@@ -311,7 +227,9 @@ class KnowledgeFileRestore:
             # being used.
             temp_file_path = file_path + '~'
 
-            open(temp_file_path, 'wb').write(raw_blob)
+            with open(temp_file_path, 'wb') as f:
+                for chunk in download.read_blob(config.myems_system_db, 'tbl_knowledge_files', row[0], 0, file_size):
+                    f.write(chunk)
 
             # Now that we know the file has been fully saved to disk
             # move it into place.
@@ -322,3 +240,49 @@ class KnowledgeFileRestore:
         resp.body = 'success'
         resp.status = falcon.HTTP_200
 
+
+class KnowledgeFileDownload:
+    @staticmethod
+    def __init__():
+        pass
+
+    @staticmethod
+    def on_options(req, resp, id_):
+        resp.status = falcon.HTTP_200
+
+    ####################################################################################################################
+    # Download a knowledge file in chunks, with ETag and Range support
+    ####################################################################################################################
+    @staticmethod
+    def on_get(req, resp, id_):
+        if not id_.isdigit() or int(id_) <= 0:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description='API.INVALID_KNOWLEDGE_FILE_ID')
+
+        cnx = database.connect(config.myems_system_db)
+        cursor = cnx.cursor()
+
+        # the file is read from the row storing it, which is the row itself unless it shares the file of another row
+        query = (" SELECT f.id, f.file_name, o.uuid, COALESCE(o.file_size, LENGTH(o.file_object)), o.id "
+                 " FROM tbl_knowledge_files f "
+                 " JOIN tbl_knowledge_files o ON o.id = COALESCE(f.file_object_id, f.id) "
+                 " WHERE f.id = %s ")
+        cursor.execute(query, (id_,))
+        row = cursor.fetchone()
+        cursor.close()
+        cnx.disconnect()
+
+        if row is None:
+            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
+                                   description='API.KNOWLEDGE_FILE_NOT_FOUND')
+
+        file_size = row[3] if row[3] is not None else 0
+        content_type = mimetypes.guess_type(row[1])[0] or 'application/octet-stream'
+        file_path = os.path.join(config.upload_path, row[2])
+        # knowledge files are not modified, so the uuid identifies the content
+        download.set_response(req, resp, row[1], content_type, file_size,
+                              str(row[0]) + '-' + row[2] + '-' + str(file_size),
+                              lambda start, end: download.read_uploaded_file(file_path, file_size,
+                                                                             config.myems_system_db,
+                                                                             'tbl_knowledge_files', row[4],
+                                                                             start, end))
@@ -1,6 +1,7 @@
 import falcon
 import json
-import mysql.connector
+from core import database
+from core import session
 import config
 from datetime import datetime, timedelta, timezone
 
@@ -55,56 +56,11 @@ class NotificationCollection:
                                    description='API.INVALID_END_DATETIME')
 
         # Verify User Session
-        token = req.headers.get('TOKEN')
-        user_uuid = req.headers.get('USER-UUID')
-        if token is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.TOKEN_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
-        if user_uuid is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.USER_UUID_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
+        user_id = session.verify(req)['id']
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
-        query = (" SELECT utc_expires "
-                 " FROM tbl_sessions "
-                 " WHERE user_uuid = %s AND token = %s")
-        cursor.execute(query, (user_uuid, token,))
-        row = cursor.fetchone()
-
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_SESSION_PLEASE_RE_LOGIN')
-        else:
-            utc_expires = row[0]
-            if datetime.utcnow() > utc_expires:
-                if cursor:
-                    cursor.close()
-                if cnx:
-                    cnx.disconnect()
-                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                       description='API.USER_SESSION_TIMEOUT')
-
-        cursor.execute(" SELECT id "
-                       " FROM tbl_users "
-                       " WHERE uuid = %s ",
-                       (user_uuid,))
-        row = cursor.fetchone()
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_USER_PLEASE_RE_LOGIN')
-        else:
-            user_id = row[0]
-
         # get notifications
         if status is None:
             query = (" SELECT id, created_datetime_utc, status, subject, message, url "
@@ -162,56 +118,11 @@ class NotificationItem:
                                    description='API.INVALID_NOTIFICATION_ID')
 
         # Verify User Session
-        token = req.headers.get('TOKEN')
-        user_uuid = req.headers.get('USER-UUID')
-        if token is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.TOKEN_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
-        if user_uuid is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.USER_UUID_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
+        user_id = session.verify(req)['id']
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
-        query = (" SELECT utc_expires "
-                 " FROM tbl_sessions "
-                 " WHERE user_uuid = %s AND token = %s")
-        cursor.execute(query, (user_uuid, token,))
-        row = cursor.fetchone()
-
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_SESSION_PLEASE_RE_LOGIN')
-        else:
-            utc_expires = row[0]
-            if datetime.utcnow() > utc_expires:
-                if cursor:
-                    cursor.close()
-                if cnx:
-                    cnx.disconnect()
-                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                       description='API.USER_SESSION_TIMEOUT')
-
-        cursor.execute(" SELECT id "
-                       " FROM tbl_users "
-                       " WHERE uuid = %s ",
-                       (user_uuid,))
-        row = cursor.fetchone()
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_USER_PLEASE_RE_LOGIN')
-        else:
-            user_id = row[0]
-
         # get notification
         query = (" SELECT id, created_datetime_utc, status, subject, message, url "
                  " FROM tbl_notifications "
@@ -262,56 +173,11 @@ class NotificationItem:
         status = str.strip(new_values['data']['status'])
 
         # Verify User Session
-        token = req.headers.get('TOKEN')
-        user_uuid = req.headers.get('USER-UUID')
-        if token is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.TOKEN_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
-        if user_uuid is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.USER_UUID_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
+        user_id = session.verify(req)['id']
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
-        query = (" SELECT utc_expires "
-                 " FROM tbl_sessions "
-                 " WHERE user_uuid = %s AND token = %s")
-        cursor.execute(query, (user_uuid, token,))
-        row = cursor.fetchone()
-
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_SESSION_PLEASE_RE_LOGIN')
-        else:
-            utc_expires = row[0]
-            if datetime.utcnow() > utc_expires:
-                if cursor:
-                    cursor.close()
-                if cnx:
-                    cnx.disconnect()
-                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                       description='API.USER_SESSION_TIMEOUT')
-
-        cursor.execute(" SELECT id "
-                       " FROM tbl_users "
-                       " WHERE uuid = %s ",
-                       (user_uuid,))
-        row = cursor.fetchone()
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_USER_PLEASE_RE_LOGIN')
-        else:
-            user_id = row[0]
-
         cursor.execute(" SELECT id "
                        " FROM tbl_notifications "
                        " WHERE id = %s AND user_id = %s ", (id_, user_id))
@@ -343,56 +209,11 @@ class NotificationItem:
                                    description='API.INVALID_NOTIFICATION_ID')
 
         # Verify User Session
-        token = req.headers.get('TOKEN')
-        user_uuid = req.headers.get('USER-UUID')
-        if token is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.TOKEN_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
-        if user_uuid is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.USER_UUID_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
+        user_id = session.verify(req)['id']
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
-        query = (" SELECT utc_expires "
-                 " FROM tbl_sessions "
-                 " WHERE user_uuid = %s AND token = %s")
-        cursor.execute(query, (user_uuid, token,))
-        row = cursor.fetchone()
-
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_SESSION_PLEASE_RE_LOGIN')
-        else:
-            utc_expires = row[0]
-            if datetime.utcnow() > utc_expires:
-                if cursor:
-                    cursor.close()
-                if cnx:
-                    cnx.disconnect()
-                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                       description='API.USER_SESSION_TIMEOUT')
-
-        cursor.execute(" SELECT id "
-                       " FROM tbl_users "
-                       " WHERE uuid = %s ",
-                       (user_uuid,))
-        row = cursor.fetchone()
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_USER_PLEASE_RE_LOGIN')
-        else:
-            user_id = row[0]
-
         cursor.execute(" SELECT id "
                        " FROM tbl_notifications "
                        " WHERE id = %s AND user_id = %s ", (id_, user_id))
@@ -1,8 +1,11 @@
 import falcon
 import json
-import mysql.connector
+from core import database
+from core import session
 import config
-import uuid
+from core import upload as upload_file
+from core import download
+import mimetypes
 from datetime import datetime, timezone
 import os
 
@@ -18,12 +21,13 @@ class OfflineMeterFileCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_historical_db)
+        cnx = database.connect(config.myems_historical_db)
         cursor = cnx.cursor()
 
-        query = (" SELECT id, file_name, uuid, upload_datetime_utc, status "
-                 " FROM tbl_offline_meter_files "
-                 " ORDER BY upload_datetime_utc desc ")
+        query = (" SELECT f.id, f.file_name, f.uuid, f.upload_datetime_utc, o.status "
+                 " FROM tbl_offline_meter_files f "
+                 " JOIN tbl_offline_meter_files o ON o.id = COALESCE(f.file_object_id, f.id) "
+                 " ORDER BY f.upload_datetime_utc desc ")
         cursor.execute(query)
         rows = cursor.fetchall()
         cursor.close()
@@ -46,95 +50,31 @@ class OfflineMeterFileCollection:
     @staticmethod
     def on_post(req, resp):
         """Handles POST requests"""
+        # Verify User Session
+        session.verify(req)
+
         try:
             upload = req.get_param('file')
-            # Read upload file as binary
-            raw_blob = upload.file.read()
             # Retrieve filename
             filename = upload.filename
-            file_uuid = str(uuid.uuid4())
-
-            # Define file_path
-            file_path = os.path.join(config.upload_path, file_uuid)
-
-            # Write to a temporary file to prevent incomplete files from
-            # being used.
-            temp_file_path = file_path + '~'
-
-            open(temp_file_path, 'wb').write(raw_blob)
-
-            # Now that we know the file has been fully saved to disk
-            # move it into place.
-            os.rename(temp_file_path, file_path)
+            # Save the upload file to disk in chunks
+            file_uuid, file_hash, file_size = upload_file.save_file(upload)
         except Exception as ex:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.ERROR',
                                    description='API.FAILED_TO_UPLOAD_OFFLINE_METER_FILE')
 
-        # Verify User Session
-        token = req.headers.get('TOKEN')
-        user_uuid = req.headers.get('USER-UUID')
-        if token is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.TOKEN_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
-        if user_uuid is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.USER_UUID_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN')
-
-        cnx = mysql.connector.connect(**config.myems_user_db)
-        cursor = cnx.cursor()
-
-        query = (" SELECT utc_expires "
-                 " FROM tbl_sessions "
-                 " WHERE user_uuid = %s AND token = %s")
-        cursor.execute(query, (user_uuid, token,))
-        row = cursor.fetchone()
-
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_SESSION_PLEASE_RE_LOGIN')
-        else:
-            utc_expires = row[0]
-            if datetime.utcnow() > utc_expires:
-                if cursor:
-                    cursor.close()
-                if cnx:
-                    cnx.disconnect()
-                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                       description='API.USER_SESSION_TIMEOUT')
-
-        cursor.execute(" SELECT id "
-                       " FROM tbl_users "
-                       " WHERE uuid = %s ",
-                       (user_uuid,))
-        row = cursor.fetchone()
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                   description='API.INVALID_USER_PLEASE_RE_LOGIN')
-        else:
-            user_id = row[0]
-
-        cnx = mysql.connector.connect(**config.myems_historical_db)
-        cursor = cnx.cursor()
-
-        add_values = (" INSERT INTO tbl_offline_meter_files "
-                      " (file_name, uuid, upload_datetime_utc, status, file_object ) "
-                      " VALUES (%s, %s, %s, %s, %s) ")
-        cursor.execute(add_values, (filename,
-                                    file_uuid,
-                                    datetime.utcnow(),
-                                    'new',
-                                    raw_blob))
-        new_id = cursor.lastrowid
+        cnx = database.connect(config.myems_historical_db)
+        # identical files are stored and processed once, see core/upload
+        # the status of rows sharing the file of another row is the status of that row, and 'shared' keeps them out of
+        # the new files processed by myems-normalization
+        new_id = upload_file.insert_file(cnx, 'tbl_offline_meter_files',
+                                         {'file_name': filename,
+                                          'uuid': file_uuid,
+                                          'upload_datetime_utc': datetime.utcnow(),
+                                          'status': 'new'},
+                                         file_uuid, file_hash, file_size,
+                                         {'status': 'shared'})
         cnx.commit()
-        cursor.close()
         cnx.disconnect()
 
         resp.status = falcon.HTTP_201
@@ -157,12 +97,13 @@ class OfflineMeterFileItem:
                                    title='API.BAD_REQUEST',
                                    description='API.INVALID_OFFLINE_METER_FILE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_historical_db)
+        cnx = database.connect(config.myems_historical_db)
         cursor = cnx.cursor()
 
-        query = (" SELECT id, file_name, uuid, upload_datetime_utc, status "
-                 " FROM tbl_offline_meter_files "
-                 " WHERE id = %s ")
+        query = (" SELECT f.id, f.file_name, f.uuid, f.upload_datetime_utc, o.status "
+                 " FROM tbl_offline_meter_files f "
+                 " JOIN tbl_offline_meter_files o ON o.id = COALESCE(f.file_object_id, f.id) "
+                 " WHERE f.id = %s ")
         cursor.execute(query, (id_,))
         row = cursor.fetchone()
         cursor.close()
@@ -187,35 +128,70 @@ class OfflineMeterFileItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_OFFLINE_METER_FILE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_historical_db)
-        cursor = cnx.cursor()
+        cnx = database.connect(config.myems_historical_db)
 
-        cursor.execute(" SELECT uuid "
-                       " FROM tbl_offline_meter_files "
-                       " WHERE id = %s ", (id_,))
-        row = cursor.fetchone()
-        if row is None:
-            cursor.close()
+        try:
+            # the file and its status move to another row sharing the file if any, otherwise the file is removed
+            # Note: the energy data imported from the deleted file will not be deleted
+            is_deleted = upload_file.delete_file(cnx, 'tbl_offline_meter_files', id_, ('file_object', 'status'))
+        except OSError as ex:
             cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.ERROR',
                                    description='API.OFFLINE_METER_FILE_NOT_FOUND')
 
-        try:
-            file_uuid = row[0]
-            # Define file_path
-            file_path = os.path.join(config.upload_path, file_uuid)
-
-            # remove the file from disk
-            os.remove(file_path)
-        except Exception as ex:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.ERROR',
+        if not is_deleted:
+            cnx.disconnect()
+            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                    description='API.OFFLINE_METER_FILE_NOT_FOUND')
 
-        # Note: the energy data imported from the deleted file will not be deleted
-        cursor.execute(" DELETE FROM tbl_offline_meter_files WHERE id = %s ", (id_,))
         cnx.commit()
+        cnx.disconnect()
+
+        resp.status = falcon.HTTP_204
+
+
+class OfflineMeterFileDownload:
+    @staticmethod
+    def __init__():
+        pass
+
+    @staticmethod
+    def on_options(req, resp, id_):
+        resp.status = falcon.HTTP_200
 
+    ####################################################################################################################
+    # Download an offline meter file in chunks, with ETag and Range support
+    ####################################################################################################################
+    @staticmethod
+    def on_get(req, resp, id_):
+        if not id_.isdigit() or int(id_) <= 0:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description='API.INVALID_OFFLINE_METER_FILE_ID')
+
+        cnx = database.connect(config.myems_historical_db)
+        cursor = cnx.cursor()
+
+        # the file is read from the row storing it, which is the row itself unless it shares the file of another row
+        query = (" SELECT f.id, f.file_name, o.uuid, COALESCE(o.file_size, LENGTH(o.file_object)), o.id "
+                 " FROM tbl_offline_meter_files f "
+                 " JOIN tbl_offline_meter_files o ON o.id = COALESCE(f.file_object_id, f.id) "
+                 " WHERE f.id = %s ")
+        cursor.execute(query, (id_,))
+        row = cursor.fetchone()
         cursor.close()
         cnx.disconnect()
 
-        resp.status = falcon.HTTP_204
+        if row is None:
+            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
+                                   description='API.OFFLINE_METER_FILE_NOT_FOUND')
+
+        file_size = row[3] if row[3] is not None else 0
+        content_type = mimetypes.guess_type(row[1])[0] or 'application/octet-stream'
+        file_path = os.path.join(config.upload_path, row[2])
+        # offline meter files are not modified, so the uuid identifies the content
+        download.set_response(req, resp, row[1], content_type, file_size,
+                              str(row[0]) + '-' + row[2] + '-' + str(file_size),
+                              lambda start, end: download.read_uploaded_file(file_path, file_size,
+                                                                             config.myems_historical_db,
+                                                                             'tbl_offline_meter_files', row[4],
+                                                                             start, end))
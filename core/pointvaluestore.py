@@ -0,0 +1,211 @@
+import collections
+import threading
+import time
+from datetime import datetime, timedelta
+import config
+from core import database
+from core import utilities
+
+
+########################################################################################################################
+# Store of recent values of points in memory, shared by all threads in the process
+# The values of the last config.point_value_store_window_minutes of every point requested by realtime reports are kept
+# in a buffer per point. A background thread polls myems_historical_db every config.point_value_store_poll_seconds for
+# the new values of all requested points with one query per object type, so the realtime reports of many clients are
+# served from memory instead of querying myems_historical_db on every request.
+# Only the trend tables are polled, so latest values of points which are not recorded as trend are not in the store,
+# use utilities.get_points_latest_values for them.
+# Points which are not requested for config.point_value_store_idle_seconds are removed, and the thread stops when no
+# points are left.
+# Note: every gunicorn worker has its own store and polling thread. Values written to myems_historical_db more than
+#       config.point_value_store_overlap_seconds after their utc_date_time may be missed.
+########################################################################################################################
+class PointBuffer:
+    """Recent values of a point"""
+    def __init__(self, object_type, complete_since):
+        self.object_type = object_type
+        # values since complete_since are all in the buffer
+        self.complete_since = complete_since
+        # list of (utc_date_time, actual_value) ordered by utc_date_time
+        self.values = collections.deque()
+        self.last_requested = time.monotonic()
+
+    def append(self, utc_date_time, actual_value):
+        if len(self.values) == 0 or utc_date_time > self.values[-1][0]:
+            self.values.append((utc_date_time, actual_value))
+
+    def trim(self, earliest_datetime_utc):
+        while len(self.values) > 0 and self.values[0][0] < earliest_datetime_utc:
+            self.values.popleft()
+        self.complete_since = max(self.complete_since, earliest_datetime_utc)
+        if len(self.values) > config.point_value_store_max_values_per_point:
+            while len(self.values) > config.point_value_store_max_values_per_point:
+                self.values.popleft()
+            self.complete_since = max(self.complete_since, self.values[0][0])
+
+
+lock = threading.Lock()
+# PointBuffer by point id
+buffers = dict()
+tailer = None
+# notified and increased after every poll with new values
+updated = threading.Condition(lock)
+version = 0
+
+
+def get_earliest_datetime_utc():
+    return datetime.utcnow() - timedelta(minutes=config.point_value_store_window_minutes)
+
+
+########################################################################################################################
+# Load the values of points from myems_historical_db into the store
+#   point_list: list of points with id and object_type
+#   start_datetime_utc: start datetime in utc of the values to load
+#   is_stored: whether to keep the values in the store
+# Returns: dict of lists of (utc_date_time, actual_value) ordered by utc_date_time by point id
+########################################################################################################################
+def load(point_list, start_datetime_utc, is_stored=True):
+    end_datetime_utc = datetime.utcnow()
+    loaded = dict()
+    cnx_historical = database.connect(config.myems_historical_db)
+    cursor_historical = cnx_historical.cursor()
+    try:
+        for point_id, rows in utilities.get_points_history_values(cursor_historical, point_list,
+                                                                  start_datetime_utc, end_datetime_utc):
+            loaded[point_id] = list(rows)
+    finally:
+        cursor_historical.close()
+        cnx_historical.disconnect()
+
+    if not is_stored:
+        return loaded
+
+    with lock:
+        for point in point_list:
+            buffer = PointBuffer(point['object_type'], start_datetime_utc)
+            for utc_date_time, actual_value in loaded.get(point['id'], ()):
+                buffer.append(utc_date_time, actual_value)
+            # keep the values polled meanwhile
+            previous_buffer = buffers.get(point['id'])
+            if previous_buffer is not None:
+                for utc_date_time, actual_value in previous_buffer.values:
+                    buffer.append(utc_date_time, actual_value)
+            buffer.trim(get_earliest_datetime_utc())
+            buffers[point['id']] = buffer
+    return loaded
+
+
+def poll(since_datetime_utc):
+    with lock:
+        now = time.monotonic()
+        for point_id in [point_id for point_id, buffer in buffers.items()
+                         if now - buffer.last_requested > config.point_value_store_idle_seconds]:
+            del buffers[point_id]
+        point_list = [{"id": point_id, "object_type": buffer.object_type} for point_id, buffer in buffers.items()]
+    if len(point_list) == 0:
+        return False
+
+    polled = dict()
+    cnx_historical = database.connect(config.myems_historical_db)
+    cursor_historical = cnx_historical.cursor()
+    try:
+        for point_id, rows in utilities.get_points_history_values(cursor_historical, point_list,
+                                                                  since_datetime_utc, datetime.utcnow()):
+            polled[point_id] = list(rows)
+    finally:
+        cursor_historical.close()
+        cnx_historical.disconnect()
+
+    global version
+    earliest_datetime_utc = get_earliest_datetime_utc()
+    with lock:
+        is_updated = False
+        for point_id, rows in polled.items():
+            buffer = buffers.get(point_id)
+            if buffer is not None:
+                count = len(buffer.values)
+                for utc_date_time, actual_value in rows:
+                    buffer.append(utc_date_time, actual_value)
+                is_updated = is_updated or len(buffer.values) > count
+                buffer.trim(earliest_datetime_utc)
+        if is_updated:
+            version += 1
+            updated.notify_all()
+    return True
+
+
+def tail():
+    global tailer
+    since_datetime_utc = datetime.utcnow() - timedelta(seconds=config.point_value_store_overlap_seconds)
+    while True:
+        time.sleep(config.point_value_store_poll_seconds)
+        poll_datetime_utc = datetime.utcnow()
+        try:
+            if not poll(since_datetime_utc):
+                with lock:
+                    if len(buffers) == 0:
+                        tailer = None
+                        return
+                continue
+            since_datetime_utc = poll_datetime_utc - timedelta(seconds=config.point_value_store_overlap_seconds)
+        except Exception as e:
+            print(str(e))
+
+
+def start_tailer():
+    global tailer
+    with lock:
+        if tailer is None:
+            tailer = threading.Thread(target=tail, name='point-value-store', daemon=True)
+            tailer.start()
+
+
+########################################################################################################################
+# Get the values of points
+#   point_list: list of points with id and object_type
+#   start_datetime_utc: start datetime in utc, inclusive
+#   end_datetime_utc: end datetime in utc, inclusive
+# Returns: dict of lists of (utc_date_time, actual_value) ordered by utc_date_time by point id
+########################################################################################################################
+def get_values(point_list, start_datetime_utc, end_datetime_utc):
+    point_list = [point for point in point_list if point['object_type'] in utilities.point_value_tables]
+    if start_datetime_utc < get_earliest_datetime_utc():
+        # values older than the store are queried from myems_historical_db
+        loaded = load(point_list, start_datetime_utc, is_stored=False)
+        return {point['id']: [value for value in loaded.get(point['id'], ()) if value[0] <= end_datetime_utc]
+                for point in point_list}
+
+    missing_point_list = list()
+    with lock:
+        now = time.monotonic()
+        for point in point_list:
+            buffer = buffers.get(point['id'])
+            if buffer is None or buffer.complete_since > start_datetime_utc:
+                missing_point_list.append(point)
+            else:
+                buffer.last_requested = now
+
+    if len(missing_point_list) > 0:
+        load(missing_point_list, start_datetime_utc)
+        start_tailer()
+
+    result = dict()
+    with lock:
+        for point in point_list:
+            buffer = buffers.get(point['id'])
+            if buffer is not None:
+                result[point['id']] = [value for value in buffer.values
+                                       if start_datetime_utc <= value[0] <= end_datetime_utc]
+    return result
+
+
+########################################################################################################################
+# Wait until the store polls new values
+#   known_version: the version of the store known by the caller
+#   timeout: the maximum seconds to wait
+# Returns: the current version of the store, which is known_version if no new values are polled before timeout
+########################################################################################################################
+def wait_for_update(known_version, timeout):
+    with updated:
+        updated.wait_for(lambda: version != known_version, timeout)
+        return version
@@ -1,6 +1,8 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
+from core import privilegescope
+from core import session
 import config
 
 
@@ -15,7 +17,7 @@ class PrivilegeCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, name, data "
@@ -59,7 +61,7 @@ class PrivilegeCollection:
                                    description='API.INVALID_PRIVILEGE_DATA')
         data = str.strip(new_values['data']['data'])
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -100,7 +102,7 @@ class PrivilegeItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_PRIVILEGE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
         # check relationship with users
@@ -127,6 +129,8 @@ class PrivilegeItem:
         # TODO: delete associated objects
         cursor.execute(" DELETE FROM tbl_privileges WHERE id = %s ", (id_,))
         cnx.commit()
+        session.invalidate()
+        privilegescope.invalidate(int(id_))
 
         cursor.close()
         cnx.disconnect()
@@ -159,7 +163,7 @@ class PrivilegeItem:
                                    description='API.INVALID_PRIVILEGE_DATA')
         data = str.strip(new_values['data']['data'])
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -185,6 +189,8 @@ class PrivilegeItem:
                       " WHERE id = %s ")
         cursor.execute(update_row, (name, data, id_,))
         cnx.commit()
+        session.invalidate()
+        privilegescope.invalidate(int(id_))
 
         cursor.close()
         cnx.disconnect()
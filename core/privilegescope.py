@@ -0,0 +1,106 @@
+import falcon
+import simplejson as json
+import config
+from core import cache
+from core import spacetree
+
+
+########################################################################################################################
+# Spaces permitted by privileges
+# The data of a privilege is JSON text such as {"spaces": [2, 5]}, which permits the spaces and all their descendants.
+# The permitted spaces of a privilege are parsed and resolved once from the index of spaces, and cached in each gunicorn
+# worker by the id and the data of the privilege and the version of the index for
+# config.privilege_scope_cache_ttl_seconds.
+# The cache is invalidated by changes to privileges in the worker, and is not used after the index of spaces changes.
+########################################################################################################################
+scope_cache = cache.LRUCache(config.privilege_scope_cache_max_size, config.privilege_scope_cache_ttl_seconds)
+
+
+class PrivilegeScope:
+    """Spaces permitted by a privilege"""
+    def __init__(self, root_space_ids, space_ids):
+        # the spaces of the privilege data in order, such as the space of the dashboard
+        self.root_space_ids = root_space_ids
+        # the root spaces and all their descendants
+        self.space_ids = space_ids
+
+    def contains(self, space_id):
+        return space_id in self.space_ids
+
+
+########################################################################################################################
+# Get the spaces permitted by the root spaces, including all their descendants
+# Returns: frozenset of space ids, roots which are not found are not included
+########################################################################################################################
+def get_space_ids(space_tree, root_space_ids):
+    space_ids = set()
+    for space_id in root_space_ids:
+        if space_id not in space_ids:
+            space_ids.update(space_tree.get_descendants(space_id))
+    return frozenset(space_ids)
+
+
+########################################################################################################################
+# Get the spaces permitted by a privilege
+#   privilege_id: id of the privilege, or None for administrators who are permitted all spaces from the root space 1
+#   privilege_data: data of the privilege, JSON text
+# Returns: PrivilegeScope, or None if there are no spaces in the privilege data
+# Raises: ValueError if the privilege data is not valid JSON
+########################################################################################################################
+def get_scope(privilege_id, privilege_data=None):
+    space_tree = spacetree.get_tree()
+    key = (privilege_id, privilege_data, space_tree.version)
+    scope = scope_cache.get(key)
+    if scope is not None:
+        return scope
+
+    if privilege_id is None:
+        root_space_ids = (1, )
+    else:
+        data = json.loads(privilege_data)
+        if not isinstance(data, dict) or not isinstance(data.get('spaces'), list):
+            return None
+        root_space_ids = list()
+        for space_id in data['spaces']:
+            if isinstance(space_id, str) and space_id.strip().isdigit():
+                space_id = int(space_id)
+            if isinstance(space_id, int) and not isinstance(space_id, bool) and space_id not in root_space_ids:
+                root_space_ids.append(space_id)
+        if len(root_space_ids) == 0:
+            return None
+        root_space_ids = tuple(root_space_ids)
+
+    scope = PrivilegeScope(root_space_ids, get_space_ids(space_tree, root_space_ids))
+    scope_cache.set(key, scope)
+    return scope
+
+
+########################################################################################################################
+# Verify that the user of the session of the request is permitted the space
+#   context: req.context, or the context of an export job, with the user and privilege of the session
+# Requests without a valid session and requests of administrators are permitted all spaces
+# Raises: HTTPError 404 if the space is not permitted by the privilege of the user
+########################################################################################################################
+def verify_space(context, space_id):
+    user = getattr(context, 'user', None)
+    if user is None or user['is_admin']:
+        return
+
+    privilege = getattr(context, 'privilege', None)
+    try:
+        scope = None if privilege is None else get_scope(user['privilege_id'], privilege['data'])
+    except ValueError as ex:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.ERROR', description=ex)
+    if scope is None or not scope.contains(space_id):
+        raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
+                               description='API.SPACE_NOT_FOUND_IN_PRIVILEGE')
+
+
+########################################################################################################################
+# Invalidate the cached spaces of a privilege in this gunicorn worker, or all cached spaces if privilege_id is None
+########################################################################################################################
+def invalidate(privilege_id=None):
+    if privilege_id is None:
+        scope_cache.clear()
+    else:
+        scope_cache.delete_if(lambda key: key[0] == privilege_id)
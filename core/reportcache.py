@@ -0,0 +1,233 @@
+import falcon
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+import config
+from core import cache
+
+
+########################################################################################################################
+# Cache of report results
+# Results of GET requests of reports with a reporting period are cached by the path and all parameters of the request,
+# which include the entity id, the period type and the base and reporting periods, and by the user and privilege of the
+# session of the request if any.
+# Results are compressed and kept in an LRU cache of each gunicorn worker, and optionally in a SQLite file shared by all
+# workers of the host (config.report_cache_sqlite_file).
+# Results of periods ending before config.report_cache_settled_minutes ago are cached for
+# config.report_cache_historical_ttl_seconds, the others for config.report_cache_recent_ttl_seconds.
+# Cached results are cleared on changes of the spaces, meters, tariffs, cost centers, privileges and the other entities
+# of reports through this API, see invalidating_path_prefixes. The worker handling the change touches
+# config.report_cache_generation_file, and every worker clears its memory cache on its next request when the
+# modification time of the file, the generation of the caches, differs from the one its memory cache was filled in.
+########################################################################################################################
+memory_cache = cache.LRUCache(config.report_cache_max_size, config.report_cache_recent_ttl_seconds)
+
+# paths of the resources whose changes affect the results of reports, the cached results are cleared on every
+# successful POST, PUT or DELETE request of these paths
+invalidating_path_prefixes = ('/combinedequipments', '/costcenters', '/distributioncircuits', '/distributionsystems',
+                              '/energycategories', '/energyflowdiagrams', '/energyitems', '/equipments', '/meters',
+                              '/offlinemeters', '/points', '/privileges', '/sensors', '/shopfloors', '/spaces',
+                              '/stores', '/storetypes', '/tariffs', '/tenants', '/tenanttypes', '/virtualmeters')
+
+sqlite_lock = threading.Lock()
+sqlite_initialized = False
+
+# generation of the caches which the results in memory_cache belong to
+memory_cache_generation = None
+generation_lock = threading.Lock()
+
+
+########################################################################################################################
+# Get the key of the request
+# The key includes the id and the privilege of the user of the session verified by core/session, so users with
+# different privileges never share results
+########################################################################################################################
+def get_key(req):
+    params = sorted((key, str(value)) for key, value in req.params.items())
+    user = getattr(req.context, 'user', None)
+    user_scope = '' if user is None else str(user['id']) + ':' + str(user['privilege_id'])
+    return hashlib.sha256((req.path + '?' + urlencode(params) + '#' + user_scope).encode('utf-8')).hexdigest()
+
+
+########################################################################################################################
+# Get time to live of the result of the request
+# Returns: seconds, or None if the request is not cacheable
+########################################################################################################################
+def get_ttl(req):
+    if req.method != 'GET' or not req.path.startswith('/reports/'):
+        return None
+
+    end_datetimes = list()
+    for name in ('reportingperiodenddatetime', 'baseperiodenddatetime'):
+        value = req.params.get(name)
+        if value is None or len(str.strip(value)) == 0:
+            if name == 'reportingperiodenddatetime':
+                # reports without reporting period, such as realtime reports, are not cached
+                return None
+            continue
+        try:
+            end_datetimes.append(datetime.strptime(str.strip(value), '%Y-%m-%dT%H:%M:%S'))
+        except ValueError:
+            return None
+
+    timezone_offset = int(config.utc_offset[1:3]) * 60 + int(config.utc_offset[4:6])
+    if config.utc_offset[0] == '-':
+        timezone_offset = -timezone_offset
+    settled_datetime_local = datetime.utcnow() + timedelta(minutes=timezone_offset) - \
+        timedelta(minutes=config.report_cache_settled_minutes)
+
+    if max(end_datetimes) <= settled_datetime_local:
+        return config.report_cache_historical_ttl_seconds
+    return config.report_cache_recent_ttl_seconds
+
+
+def connect_sqlite():
+    global sqlite_initialized
+    cnx = sqlite3.connect(config.report_cache_sqlite_file, timeout=5)
+    if not sqlite_initialized:
+        with sqlite_lock:
+            cnx.execute(" PRAGMA journal_mode=WAL ")
+            cnx.execute(" CREATE TABLE IF NOT EXISTS tbl_report_cache "
+                        " (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL) ")
+            cnx.commit()
+            sqlite_initialized = True
+    return cnx
+
+
+def get_sqlite(key):
+    cnx = None
+    try:
+        cnx = connect_sqlite()
+        row = cnx.execute(" SELECT value, expires FROM tbl_report_cache WHERE key = ? ", (key,)).fetchone()
+        if row is not None and row[1] > time.time():
+            return row[0], row[1] - time.time()
+    except Exception as e:
+        print(str(e))
+    finally:
+        if cnx:
+            cnx.close()
+    return None, None
+
+
+def set_sqlite(key, value, ttl):
+    cnx = None
+    try:
+        cnx = connect_sqlite()
+        now = time.time()
+        cnx.execute(" DELETE FROM tbl_report_cache WHERE expires < ? ", (now,))
+        cnx.execute(" REPLACE INTO tbl_report_cache (key, value, expires) VALUES (?, ?, ?) ", (key, value, now + ttl))
+        cnx.commit()
+    except Exception as e:
+        print(str(e))
+    finally:
+        if cnx:
+            cnx.close()
+
+
+########################################################################################################################
+# Clear the memory cache if the caches were cleared by any worker since it was filled
+# Returns: the current generation of the caches
+########################################################################################################################
+def check_generation():
+    global memory_cache_generation
+    generation = cache.get_generation(config.report_cache_generation_file)
+    if generation != memory_cache_generation:
+        with generation_lock:
+            if generation != memory_cache_generation:
+                memory_cache.clear()
+                memory_cache_generation = generation
+    return generation
+
+
+########################################################################################################################
+# Get the cached result of the key
+# Returns: the response body, or None if not cached
+########################################################################################################################
+def get(key):
+    value = memory_cache.get(key)
+    if value is None and config.report_cache_sqlite_file is not None:
+        value, ttl = get_sqlite(key)
+        if value is not None:
+            memory_cache.set(key, value, ttl)
+    if value is None:
+        return None
+    return zlib.decompress(value).decode('utf-8')
+
+
+########################################################################################################################
+# Cache the result of the key
+#   body: the response body
+#   ttl: time to live in seconds
+#   generation: generation of the caches when the result was computed, the result is not cached if the caches were
+#               cleared since then
+########################################################################################################################
+def store(key, body, ttl, generation):
+    if check_generation() != generation:
+        return
+    value = zlib.compress(body.encode('utf-8'))
+    memory_cache.set(key, value, ttl)
+    if config.report_cache_sqlite_file is not None:
+        set_sqlite(key, value, ttl)
+
+
+########################################################################################################################
+# Clear the cached results of all workers
+########################################################################################################################
+def clear():
+    cache.next_generation(config.report_cache_generation_file)
+    check_generation()
+    memory_cache.clear()
+    if config.report_cache_sqlite_file is not None:
+        cnx = None
+        try:
+            cnx = connect_sqlite()
+            cnx.execute(" DELETE FROM tbl_report_cache ")
+            cnx.commit()
+        except Exception as e:
+            print(str(e))
+        finally:
+            if cnx:
+                cnx.close()
+
+
+########################################################################################################################
+# Middleware to serve the results of reports from the cache
+# The X-Report-Cache response header is HIT if the result is served from the cache, or MISS if the result is cached
+########################################################################################################################
+class ReportCacheMiddleware:
+    def process_request(self, req, resp):
+        req.context.report_cache_key = None
+        if not config.is_report_cache_enabled:
+            return
+
+        ttl = get_ttl(req)
+        if ttl is None:
+            return
+
+        key = get_key(req)
+        generation = check_generation()
+        body = get(key)
+        if body is not None:
+            resp.body = body
+            resp.set_header('X-Report-Cache', 'HIT')
+            resp.complete = True
+        else:
+            req.context.report_cache_key = key
+            req.context.report_cache_ttl = ttl
+            req.context.report_cache_generation = generation
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        if config.is_report_cache_enabled and req_succeeded and req.method in ('POST', 'PUT', 'DELETE') and \
+                req.path.startswith(invalidating_path_prefixes):
+            clear()
+            return
+
+        key = getattr(req.context, 'report_cache_key', None)
+        if key is None or not req_succeeded or resp.status != falcon.HTTP_200 or not isinstance(resp.body, str):
+            return
+        store(key, resp.body, req.context.report_cache_ttl, req.context.report_cache_generation)
+        resp.set_header('X-Report-Cache', 'MISS')
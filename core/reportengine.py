@@ -0,0 +1,748 @@
+import falcon
+import simplejson as json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import config
+from core import database
+from core import excelexport
+from core import downsampling
+from core import fetch
+from core import spacetree
+from core import utilities
+
+
+########################################################################################################################
+# Entity descriptors of reports
+# Reports of spaces, equipments, combined equipments, tenants, stores and shopfloors share the same procedures and
+# only differ in the names of tables, columns and parameters, which are derived from the descriptor:
+#   name: name of the entity, used in tbl_<name>s, tbl_<name>_input_category_hourly, <name>_id
+#         and as the key of the entity in the result
+#   id_parameter: name of the request parameter of the entity id
+#   error_name: used in the descriptions of errors, such as API.INVALID_<error_name>_ID
+#   has_area: whether the entity has area, reports include values per unit area if True
+#   has_sensors: whether points of the sensors of the entity are included in the parameters
+#   points_table: table of the points of the entity, tbl_<name>s_points or tbl_<name>s_parameters
+#   has_child_spaces: whether reports include energy of child spaces
+# Only the energy category reports (*energycategory) are computed by the engine so far. The cost, energy item, load,
+# statistics, saving, efficiency, income and output reports of the same entities still have their own handlers, and
+# are to be moved onto the step functions one report kind at a time, each compared with its baseline output as
+# tests/test_reportengine.py does for the energy category reports.
+########################################################################################################################
+entities = {
+    'space': {'name': 'space',
+              'id_parameter': 'spaceid',
+              'error_name': 'SPACE',
+              'has_area': True,
+              'has_sensors': True,
+              'points_table': 'tbl_spaces_points',
+              'has_child_spaces': True},
+    'equipment': {'name': 'equipment',
+                  'id_parameter': 'equipmentid',
+                  'error_name': 'EQUIPMENT',
+                  'has_area': False,
+                  'has_sensors': False,
+                  'points_table': 'tbl_equipments_parameters',
+                  'has_child_spaces': False},
+    'combined_equipment': {'name': 'combined_equipment',
+                           'id_parameter': 'combinedequipmentid',
+                           'error_name': 'COMBINED_EQUIPMENT',
+                           'has_area': False,
+                           'has_sensors': False,
+                           'points_table': 'tbl_combined_equipments_parameters',
+                           'has_child_spaces': False},
+    'tenant': {'name': 'tenant',
+               'id_parameter': 'tenantid',
+               'error_name': 'TENANT',
+               'has_area': True,
+               'has_sensors': True,
+               'points_table': 'tbl_tenants_points',
+               'has_child_spaces': False},
+    'store': {'name': 'store',
+              'id_parameter': 'storeid',
+              'error_name': 'STORE',
+              'has_area': True,
+              'has_sensors': True,
+              'points_table': 'tbl_stores_points',
+              'has_child_spaces': False},
+    'shopfloor': {'name': 'shopfloor',
+                  'id_parameter': 'shopfloorid',
+                  'error_name': 'SHOPFLOOR',
+                  'has_area': True,
+                  'has_sensors': True,
+                  'points_table': 'tbl_shopfloors_points',
+                  'has_child_spaces': False},
+}
+
+
+########################################################################################################################
+# Get and validate the parameters of reports with base period and reporting period
+# Returns: dict of entity_id, period_type, timezone_offset, base and reporting period datetimes in local and utc,
+#          max_points and downsample_method
+########################################################################################################################
+def get_parameters(params, entity):
+    entity_id = params.get(entity['id_parameter'])
+    period_type = params.get('periodtype')
+    base_start_datetime_local = params.get('baseperiodstartdatetime')
+    base_end_datetime_local = params.get('baseperiodenddatetime')
+    reporting_start_datetime_local = params.get('reportingperiodstartdatetime')
+    reporting_end_datetime_local = params.get('reportingperiodenddatetime')
+
+    if entity_id is None:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                               description='API.INVALID_' + entity['error_name'] + '_ID')
+    else:
+        entity_id = str.strip(entity_id)
+        if not entity_id.isdigit() or int(entity_id) <= 0:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description='API.INVALID_' + entity['error_name'] + '_ID')
+
+    if period_type is None:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST', description='API.INVALID_PERIOD_TYPE')
+    else:
+        period_type = str.strip(period_type)
+        if period_type not in ['hourly', 'daily', 'monthly', 'yearly']:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST', description='API.INVALID_PERIOD_TYPE')
+
+    timezone_offset = int(config.utc_offset[1:3]) * 60 + int(config.utc_offset[4:6])
+    if config.utc_offset[0] == '-':
+        timezone_offset = -timezone_offset
+
+    base_start_datetime_utc = None
+    if base_start_datetime_local is not None and len(str.strip(base_start_datetime_local)) > 0:
+        base_start_datetime_local = str.strip(base_start_datetime_local)
+        try:
+            base_start_datetime_utc = datetime.strptime(base_start_datetime_local,
+                                                        '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc) - \
+                timedelta(minutes=timezone_offset)
+        except ValueError:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description="API.INVALID_BASE_PERIOD_START_DATETIME")
+
+    base_end_datetime_utc = None
+    if base_end_datetime_local is not None and len(str.strip(base_end_datetime_local)) > 0:
+        base_end_datetime_local = str.strip(base_end_datetime_local)
+        try:
+            base_end_datetime_utc = datetime.strptime(base_end_datetime_local,
+                                                      '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc) - \
+                timedelta(minutes=timezone_offset)
+        except ValueError:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description="API.INVALID_BASE_PERIOD_END_DATETIME")
+
+    if base_start_datetime_utc is not None and base_end_datetime_utc is not None and \
+            base_start_datetime_utc >= base_end_datetime_utc:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                               description='API.INVALID_BASE_PERIOD_END_DATETIME')
+
+    if reporting_start_datetime_local is None:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                               description="API.INVALID_REPORTING_PERIOD_START_DATETIME")
+    else:
+        reporting_start_datetime_local = str.strip(reporting_start_datetime_local)
+        try:
+            reporting_start_datetime_utc = datetime.strptime(reporting_start_datetime_local,
+                                                             '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc) - \
+                timedelta(minutes=timezone_offset)
+        except ValueError:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description="API.INVALID_REPORTING_PERIOD_START_DATETIME")
+
+    if reporting_end_datetime_local is None:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                               description="API.INVALID_REPORTING_PERIOD_END_DATETIME")
+    else:
+        reporting_end_datetime_local = str.strip(reporting_end_datetime_local)
+        try:
+            reporting_end_datetime_utc = datetime.strptime(reporting_end_datetime_local,
+                                                           '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc) - \
+                timedelta(minutes=timezone_offset)
+        except ValueError:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description="API.INVALID_REPORTING_PERIOD_END_DATETIME")
+
+    if reporting_start_datetime_utc >= reporting_end_datetime_utc:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                               description='API.INVALID_REPORTING_PERIOD_END_DATETIME')
+
+    max_points, downsample_method = downsampling.get_parameters(params)
+
+    return {'entity_id': entity_id,
+            'period_type': period_type,
+            'timezone_offset': timezone_offset,
+            'base_start_datetime_utc': base_start_datetime_utc,
+            'base_end_datetime_utc': base_end_datetime_utc,
+            'reporting_start_datetime_local': reporting_start_datetime_local,
+            'reporting_end_datetime_local': reporting_end_datetime_local,
+            'reporting_start_datetime_utc': reporting_start_datetime_utc,
+            'reporting_end_datetime_utc': reporting_end_datetime_utc,
+            'max_points': max_points,
+            'downsample_method': downsample_method}
+
+
+########################################################################################################################
+# Get the entity with id, name, cost_center_id and area (if the entity has area)
+# Raises: falcon.HTTPError if the entity is not found
+########################################################################################################################
+def get_entity(cursor_system, entity, entity_id):
+    if entity['has_area']:
+        cursor_system.execute(" SELECT id, name, area, cost_center_id "
+                              " FROM tbl_" + entity['name'] + "s "
+                              " WHERE id = %s ", (entity_id,))
+    else:
+        cursor_system.execute(" SELECT id, name, cost_center_id "
+                              " FROM tbl_" + entity['name'] + "s "
+                              " WHERE id = %s ", (entity_id,))
+    row_entity = cursor_system.fetchone()
+    if row_entity is None:
+        raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
+                               description='API.' + entity['error_name'] + '_NOT_FOUND')
+
+    result = dict()
+    result['id'] = row_entity[0]
+    result['name'] = row_entity[1]
+    if entity['has_area']:
+        result['area'] = row_entity[2]
+        result['cost_center_id'] = row_entity[3]
+    else:
+        result['cost_center_id'] = row_entity[2]
+    return result
+
+
+########################################################################################################################
+# Get the energy categories of the entity in the base period and the reporting period
+# Returns: (energy_category_set, energy_category_dict), energy_category_dict has name, unit_of_measure, kgce and kgco2e
+# Raises: falcon.HTTPError if there is no energy category
+########################################################################################################################
+def get_energy_categories(cursor_system, cursor_energy, entity, entity_id, parameters):
+    energy_category_set = set()
+    for start_datetime_utc, end_datetime_utc in ((parameters['base_start_datetime_utc'],
+                                                  parameters['base_end_datetime_utc']),
+                                                 (parameters['reporting_start_datetime_utc'],
+                                                  parameters['reporting_end_datetime_utc'])):
+        cursor_energy.execute(" SELECT DISTINCT(energy_category_id) "
+                              " FROM tbl_" + entity['name'] + "_input_category_hourly "
+                              " WHERE " + entity['name'] + "_id = %s "
+                              "     AND start_datetime_utc >= %s "
+                              "     AND start_datetime_utc < %s ",
+                              (entity_id, start_datetime_utc, end_datetime_utc))
+        rows_energy_categories = cursor_energy.fetchall()
+        if rows_energy_categories is not None and len(rows_energy_categories) > 0:
+            for row_energy_category in rows_energy_categories:
+                energy_category_set.add(row_energy_category[0])
+
+    cursor_system.execute(" SELECT id, name, unit_of_measure, kgce, kgco2e "
+                          " FROM tbl_energy_categories "
+                          " ORDER BY id ", )
+    rows_energy_categories = cursor_system.fetchall()
+    if rows_energy_categories is None or len(rows_energy_categories) == 0:
+        raise falcon.HTTPError(falcon.HTTP_404,
+                               title='API.NOT_FOUND',
+                               description='API.ENERGY_CATEGORY_NOT_FOUND')
+    energy_category_dict = dict()
+    for row_energy_category in rows_energy_categories:
+        if row_energy_category[0] in energy_category_set:
+            energy_category_dict[row_energy_category[0]] = {"name": row_energy_category[1],
+                                                            "unit_of_measure": row_energy_category[2],
+                                                            "kgce": row_energy_category[3],
+                                                            "kgco2e": row_energy_category[4]}
+
+    return energy_category_set, energy_category_dict
+
+
+########################################################################################################################
+# Get the points of the sensors of the entity (if the entity has sensors) and the points of the entity
+# Returns: list of points with id, name, units and object_type
+########################################################################################################################
+def get_points(cursor_system, entity, entity_id):
+    name = entity['name']
+    queries = list()
+    if entity['has_sensors']:
+        queries.append(" SELECT p.id, p.name, p.units, p.object_type "
+                       " FROM tbl_" + name + "s e, tbl_sensors s, tbl_" + name + "s_sensors es, "
+                       "      tbl_points p, tbl_sensors_points sp "
+                       " WHERE e.id = %s AND e.id = es." + name + "_id AND es.sensor_id = s.id "
+                       "       AND s.id = sp.sensor_id AND sp.point_id = p.id "
+                       " ORDER BY p.id ")
+    if entity['points_table'].endswith('_parameters'):
+        queries.append(" SELECT p.id, p.name, p.units, p.object_type "
+                       " FROM tbl_" + name + "s e, " + entity['points_table'] + " ep, tbl_points p "
+                       " WHERE e.id = %s AND e.id = ep." + name + "_id AND ep.parameter_type = 'point' "
+                       "       AND ep.point_id = p.id "
+                       " ORDER BY p.id ")
+    else:
+        queries.append(" SELECT p.id, p.name, p.units, p.object_type "
+                       " FROM tbl_" + name + "s e, " + entity['points_table'] + " ep, tbl_points p "
+                       " WHERE e.id = %s AND e.id = ep." + name + "_id AND ep.point_id = p.id "
+                       " ORDER BY p.id ")
+
+    point_list = list()
+    for query in queries:
+        cursor_system.execute(query, (entity_id,))
+        rows_points = cursor_system.fetchall()
+        if rows_points is not None and len(rows_points) > 0:
+            for row in rows_points:
+                point_list.append({"id": row[0], "name": row[1], "units": row[2], "object_type": row[3]})
+    return point_list
+
+
+########################################################################################################################
+# Get the child spaces of the space
+# Returns: list of child spaces with id and name
+########################################################################################################################
+def get_child_spaces(cursor_system, space_id):
+    return spacetree.get_tree((space_id, ), cursor_system).get_children(space_id)
+
+
+########################################################################################################################
+# Get hourly energy input of the entity in one energy category
+# Returns: list of (start_datetime_utc, actual_value) ordered by start_datetime_utc
+########################################################################################################################
+def get_hourly_input(cursor_energy, entity, entity_id, energy_category_id, start_datetime_utc, end_datetime_utc):
+    cursor_energy.execute(" SELECT start_datetime_utc, actual_value "
+                          " FROM tbl_" + entity['name'] + "_input_category_hourly "
+                          " WHERE " + entity['name'] + "_id = %s "
+                          "     AND energy_category_id = %s "
+                          "     AND start_datetime_utc >= %s "
+                          "     AND start_datetime_utc < %s "
+                          " ORDER BY start_datetime_utc ",
+                          (entity_id,
+                           energy_category_id,
+                           start_datetime_utc,
+                           end_datetime_utc))
+    return cursor_energy.fetchall()
+
+
+########################################################################################################################
+# Aggregate hourly data by period
+# Returns: (timestamps, values), timestamps are formatted in local time by period type, None values are 0
+########################################################################################################################
+def get_periodic_values(rows_hourly, start_datetime_utc, end_datetime_utc, period_type, timezone_offset):
+    timestamps = list()
+    values = list()
+    rows_periodically = utilities.aggregate_hourly_data_by_period(rows_hourly,
+                                                                  start_datetime_utc,
+                                                                  end_datetime_utc,
+                                                                  period_type)
+    for row_periodically in rows_periodically:
+        current_datetime_local = row_periodically[0].replace(tzinfo=timezone.utc) + \
+                                 timedelta(minutes=timezone_offset)
+        if period_type == 'hourly':
+            current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
+        elif period_type == 'daily':
+            current_datetime = current_datetime_local.strftime('%Y-%m-%d')
+        elif period_type == 'monthly':
+            current_datetime = current_datetime_local.strftime('%Y-%m')
+        elif period_type == 'yearly':
+            current_datetime = current_datetime_local.strftime('%Y')
+
+        timestamps.append(current_datetime)
+        values.append(Decimal(0.0) if row_periodically[1] is None else row_periodically[1])
+    return timestamps, values
+
+
+########################################################################################################################
+# Get energy input of the entity in the base period by energy category
+# Returns: dict of timestamps, values, subtotal, subtotal_in_kgce and subtotal_in_kgco2e by energy category
+########################################################################################################################
+def get_base_period_input(cursor_energy, entity, entity_record, energy_category_set, energy_category_dict,
+                          parameters):
+    base = dict()
+    if energy_category_set is not None and len(energy_category_set) > 0:
+        for energy_category_id in energy_category_set:
+            kgce = energy_category_dict[energy_category_id]['kgce']
+            kgco2e = energy_category_dict[energy_category_id]['kgco2e']
+
+            base[energy_category_id] = dict()
+            base[energy_category_id]['subtotal'] = Decimal(0.0)
+            base[energy_category_id]['subtotal_in_kgce'] = Decimal(0.0)
+            base[energy_category_id]['subtotal_in_kgco2e'] = Decimal(0.0)
+
+            rows_hourly = get_hourly_input(cursor_energy,
+                                           entity,
+                                           entity_record['id'],
+                                           energy_category_id,
+                                           parameters['base_start_datetime_utc'],
+                                           parameters['base_end_datetime_utc'])
+            timestamps, values = get_periodic_values(rows_hourly,
+                                                     parameters['base_start_datetime_utc'],
+                                                     parameters['base_end_datetime_utc'],
+                                                     parameters['period_type'],
+                                                     parameters['timezone_offset'])
+            base[energy_category_id]['timestamps'] = timestamps
+            base[energy_category_id]['values'] = values
+            for actual_value in values:
+                base[energy_category_id]['subtotal'] += actual_value
+                base[energy_category_id]['subtotal_in_kgce'] += actual_value * kgce
+                base[energy_category_id]['subtotal_in_kgco2e'] += actual_value * kgco2e
+    return base
+
+
+########################################################################################################################
+# Get energy input of the entity in the reporting period by energy category
+# Returns: dict of timestamps, values, subtotal, subtotal_in_kgce, subtotal_in_kgco2e, toppeak, onpeak, midpeak and
+#          offpeak by energy category
+########################################################################################################################
+def get_reporting_period_input(cursor_energy, entity, entity_record, energy_category_set, energy_category_dict,
+                               parameters):
+    reporting = dict()
+    if energy_category_set is not None and len(energy_category_set) > 0:
+        for energy_category_id in energy_category_set:
+            kgce = energy_category_dict[energy_category_id]['kgce']
+            kgco2e = energy_category_dict[energy_category_id]['kgco2e']
+
+            reporting[energy_category_id] = dict()
+            reporting[energy_category_id]['subtotal'] = Decimal(0.0)
+            reporting[energy_category_id]['subtotal_in_kgce'] = Decimal(0.0)
+            reporting[energy_category_id]['subtotal_in_kgco2e'] = Decimal(0.0)
+            reporting[energy_category_id]['toppeak'] = Decimal(0.0)
+            reporting[energy_category_id]['onpeak'] = Decimal(0.0)
+            reporting[energy_category_id]['midpeak'] = Decimal(0.0)
+            reporting[energy_category_id]['offpeak'] = Decimal(0.0)
+
+            rows_hourly = get_hourly_input(cursor_energy,
+                                           entity,
+                                           entity_record['id'],
+                                           energy_category_id,
+                                           parameters['reporting_start_datetime_utc'],
+                                           parameters['reporting_end_datetime_utc'])
+            timestamps, values = get_periodic_values(rows_hourly,
+                                                     parameters['reporting_start_datetime_utc'],
+                                                     parameters['reporting_end_datetime_utc'],
+                                                     parameters['period_type'],
+                                                     parameters['timezone_offset'])
+            reporting[energy_category_id]['timestamps'] = timestamps
+            reporting[energy_category_id]['values'] = values
+            for actual_value in values:
+                reporting[energy_category_id]['subtotal'] += actual_value
+                reporting[energy_category_id]['subtotal_in_kgce'] += actual_value * kgce
+                reporting[energy_category_id]['subtotal_in_kgco2e'] += actual_value * kgco2e
+
+            energy_category_tariff_dict = utilities.get_energy_category_peak_types(
+                entity_record['cost_center_id'],
+                energy_category_id,
+                parameters['reporting_start_datetime_utc'],
+                parameters['reporting_end_datetime_utc'])
+            for row in rows_hourly:
+                peak_type = energy_category_tariff_dict.get(row[0], None)
+                if peak_type in ('toppeak', 'onpeak', 'midpeak', 'offpeak'):
+                    reporting[energy_category_id][peak_type] += row[1]
+    return reporting
+
+
+########################################################################################################################
+# Get tariffs of the entity in the reporting period by energy category
+# Returns: parameters data with names, timestamps and values
+########################################################################################################################
+def get_tariffs(entity_record, energy_category_set, energy_category_dict, parameters):
+    parameters_data = dict()
+    parameters_data['names'] = list()
+    parameters_data['timestamps'] = list()
+    parameters_data['values'] = list()
+    if energy_category_set is not None and len(energy_category_set) > 0:
+        for energy_category_id in energy_category_set:
+            energy_category_tariff_dict = utilities.get_energy_category_tariffs(
+                entity_record['cost_center_id'],
+                energy_category_id,
+                parameters['reporting_start_datetime_utc'],
+                parameters['reporting_end_datetime_utc'])
+            tariff_timestamp_list = list()
+            tariff_value_list = list()
+            for k, v in energy_category_tariff_dict.items():
+                # convert k from utc to local
+                k = k + timedelta(minutes=parameters['timezone_offset'])
+                tariff_timestamp_list.append(k.isoformat()[0:19])
+                tariff_value_list.append(v)
+
+            parameters_data['names'].append('TARIFF-' + energy_category_dict[energy_category_id]['name'])
+            parameters_data['timestamps'].append(tariff_timestamp_list)
+            parameters_data['values'].append(tariff_value_list)
+    return parameters_data
+
+
+########################################################################################################################
+# Get values of points in the reporting period, downsampled if max_points is in parameters
+# Returns: dict of (timestamps, values) by point id
+########################################################################################################################
+def get_points_values(cursor_historical, point_list, parameters):
+    point_values_dict = dict()
+    for point_id, rows in utilities.get_points_history_values(cursor_historical,
+                                                              point_list,
+                                                              parameters['reporting_start_datetime_utc'],
+                                                              parameters['reporting_end_datetime_utc']):
+        point_timestamps = list()
+        point_values = list()
+        for row in downsampling.downsample(rows,
+                                           parameters['reporting_start_datetime_utc'],
+                                           parameters['reporting_end_datetime_utc'],
+                                           parameters['max_points'],
+                                           parameters['downsample_method']):
+            current_datetime_local = row[0] + timedelta(minutes=parameters['timezone_offset'])
+            point_timestamps.append(current_datetime_local.isoformat()[0:19])
+            point_values.append(row[1])
+        point_values_dict[point_id] = (point_timestamps, point_values)
+    return point_values_dict
+
+
+########################################################################################################################
+# Get energy input of child spaces in the reporting period by energy category
+# Returns: dict of child_space_names, subtotals, subtotals_in_kgce and subtotals_in_kgco2e by energy category
+########################################################################################################################
+def get_child_spaces_input(cursor_energy, child_space_list, energy_category_set, energy_category_dict, parameters):
+    child_space_data = dict()
+    if energy_category_set is not None and len(energy_category_set) > 0:
+        child_space_subtotals = utilities.get_child_spaces_subtotals(cursor_energy,
+                                                                     'tbl_space_input_category_hourly',
+                                                                     'energy_category_id',
+                                                                     child_space_list,
+                                                                     energy_category_set,
+                                                                     parameters['reporting_start_datetime_utc'],
+                                                                     parameters['reporting_end_datetime_utc'])
+        for energy_category_id in energy_category_set:
+            child_space_data[energy_category_id] = dict()
+            child_space_data[energy_category_id]['child_space_names'] = list()
+            child_space_data[energy_category_id]['subtotals'] = list()
+            child_space_data[energy_category_id]['subtotals_in_kgce'] = list()
+            child_space_data[energy_category_id]['subtotals_in_kgco2e'] = list()
+            kgce = energy_category_dict[energy_category_id]['kgce']
+            kgco2e = energy_category_dict[energy_category_id]['kgco2e']
+            for child_space in child_space_list:
+                child_space_data[energy_category_id]['child_space_names'].append(child_space['name'])
+                subtotal = child_space_subtotals.get((child_space['id'], energy_category_id), Decimal(0.0))
+                child_space_data[energy_category_id]['subtotals'].append(subtotal)
+                child_space_data[energy_category_id]['subtotals_in_kgce'].append(subtotal * kgce)
+                child_space_data[energy_category_id]['subtotals_in_kgco2e'].append(subtotal * kgco2e)
+    return child_space_data
+
+
+########################################################################################################################
+# Energy category report of the entity
+# PROCEDURES
+# Step 1: valid parameters
+# Step 2: query the entity
+# Step 3: query energy categories
+# Step 4: query associated sensors and points
+# Step 5: query child spaces
+# Step 6: query base period and reporting period energy input, tariffs, points data and child spaces energy input
+# Step 7: construct the report
+# Step 8: set the report as JSON or Excel file to the response
+#   params: the query parameters with the entity id, periodtype, baseperiodstartdatetime, baseperiodenddatetime,
+#           reportingperiodstartdatetime, reportingperiodenddatetime and optional maxpoints, downsample and export
+#   resp: the response
+#   entity: one of entities
+#   exporter: optional, function to export the result to Excel file, which enables the parameter export=excel
+########################################################################################################################
+def get_energy_category_report(params, resp, entity, exporter=None):
+    ####################################################################################################################
+    # Step 1: valid parameters
+    ####################################################################################################################
+    is_excel_export = exporter is not None and excelexport.is_requested(params)
+    parameters = get_parameters(params, entity)
+
+    cnx_system = database.connect(config.myems_system_db)
+    cursor_system = cnx_system.cursor()
+
+    cnx_energy = database.connect(config.myems_energy_db)
+    cursor_energy = cnx_energy.cursor()
+    try:
+        ################################################################################################################
+        # Step 2: query the entity
+        ################################################################################################################
+        entity_record = get_entity(cursor_system, entity, parameters['entity_id'])
+
+        ################################################################################################################
+        # Step 3: query energy categories
+        ################################################################################################################
+        energy_category_set, energy_category_dict = get_energy_categories(cursor_system,
+                                                                          cursor_energy,
+                                                                          entity,
+                                                                          entity_record['id'],
+                                                                          parameters)
+
+        ################################################################################################################
+        # Step 4: query associated sensors and points
+        ################################################################################################################
+        point_list = get_points(cursor_system, entity, entity_record['id'])
+
+        ################################################################################################################
+        # Step 5: query child spaces
+        ################################################################################################################
+        child_space_list = get_child_spaces(cursor_system, entity_record['id']) \
+            if entity['has_child_spaces'] else list()
+    finally:
+        # release the connections before running the queries, as every query gets a pooled connection of its own
+        cursor_system.close()
+        cnx_system.disconnect()
+
+        cursor_energy.close()
+        cnx_energy.disconnect()
+
+    ####################################################################################################################
+    # Step 6: query base period and reporting period energy input, tariffs, points data and child spaces energy input
+    ####################################################################################################################
+    fetch_stage = fetch.FetchStage(entity['name'] + ' energy category')
+    fetch_stage.add('base', config.myems_energy_db, get_base_period_input,
+                    entity, entity_record, energy_category_set, energy_category_dict, parameters)
+    fetch_stage.add('reporting', config.myems_energy_db, get_reporting_period_input,
+                    entity, entity_record, energy_category_set, energy_category_dict, parameters)
+    fetch_stage.add('parameters_data', None, get_tariffs,
+                    entity_record, energy_category_set, energy_category_dict, parameters)
+    fetch_stage.add('point_values_dict', config.myems_historical_db, get_points_values,
+                    point_list, parameters)
+    if entity['has_child_spaces']:
+        fetch_stage.add('child_space_data', config.myems_energy_db, get_child_spaces_input,
+                        child_space_list, energy_category_set, energy_category_dict, parameters)
+    results = fetch_stage.run()
+    base = results['base']
+    reporting = results['reporting']
+    parameters_data = results['parameters_data']
+
+    for point in point_list:
+        point_timestamps, point_values = results['point_values_dict'].get(point['id'], (list(), list()))
+        parameters_data['names'].append(point['name'] + ' (' + point['units'] + ')')
+        parameters_data['timestamps'].append(point_timestamps)
+        parameters_data['values'].append(point_values)
+
+    ####################################################################################################################
+    # Step 7: construct the report
+    ####################################################################################################################
+    result = dict()
+
+    result[entity['name']] = dict()
+    result[entity['name']]['name'] = entity_record['name']
+    if entity['has_area']:
+        result[entity['name']]['area'] = entity_record['area']
+
+    result['base_period'] = dict()
+    result['base_period']['names'] = list()
+    result['base_period']['units'] = list()
+    result['base_period']['timestamps'] = list()
+    result['base_period']['values'] = list()
+    result['base_period']['subtotals'] = list()
+    result['base_period']['subtotals_in_kgce'] = list()
+    result['base_period']['subtotals_in_kgco2e'] = list()
+    result['base_period']['total_in_kgce'] = Decimal(0.0)
+    result['base_period']['total_in_kgco2e'] = Decimal(0.0)
+    if energy_category_set is not None and len(energy_category_set) > 0:
+        for energy_category_id in energy_category_set:
+            result['base_period']['names'].append(energy_category_dict[energy_category_id]['name'])
+            result['base_period']['units'].append(energy_category_dict[energy_category_id]['unit_of_measure'])
+            result['base_period']['timestamps'].append(base[energy_category_id]['timestamps'])
+            result['base_period']['values'].append(base[energy_category_id]['values'])
+            result['base_period']['subtotals'].append(base[energy_category_id]['subtotal'])
+            result['base_period']['subtotals_in_kgce'].append(base[energy_category_id]['subtotal_in_kgce'])
+            result['base_period']['subtotals_in_kgco2e'].append(base[energy_category_id]['subtotal_in_kgco2e'])
+            result['base_period']['total_in_kgce'] += base[energy_category_id]['subtotal_in_kgce']
+            result['base_period']['total_in_kgco2e'] += base[energy_category_id]['subtotal_in_kgco2e']
+
+    result['reporting_period'] = dict()
+    result['reporting_period']['names'] = list()
+    result['reporting_period']['energy_category_ids'] = list()
+    result['reporting_period']['units'] = list()
+    result['reporting_period']['timestamps'] = list()
+    result['reporting_period']['values'] = list()
+    result['reporting_period']['subtotals'] = list()
+    result['reporting_period']['subtotals_in_kgce'] = list()
+    result['reporting_period']['subtotals_in_kgco2e'] = list()
+    if entity['has_area']:
+        result['reporting_period']['subtotals_per_unit_area'] = list()
+    result['reporting_period']['toppeaks'] = list()
+    result['reporting_period']['onpeaks'] = list()
+    result['reporting_period']['midpeaks'] = list()
+    result['reporting_period']['offpeaks'] = list()
+    result['reporting_period']['increment_rates'] = list()
+    result['reporting_period']['total_in_kgce'] = Decimal(0.0)
+    result['reporting_period']['total_in_kgco2e'] = Decimal(0.0)
+    result['reporting_period']['increment_rate_in_kgce'] = Decimal(0.0)
+    result['reporting_period']['increment_rate_in_kgco2e'] = Decimal(0.0)
+
+    if energy_category_set is not None and len(energy_category_set) > 0:
+        for energy_category_id in energy_category_set:
+            result['reporting_period']['names'].append(energy_category_dict[energy_category_id]['name'])
+            result['reporting_period']['energy_category_ids'].append(energy_category_id)
+            result['reporting_period']['units'].append(energy_category_dict[energy_category_id]['unit_of_measure'])
+            result['reporting_period']['timestamps'].append(reporting[energy_category_id]['timestamps'])
+            result['reporting_period']['values'].append(reporting[energy_category_id]['values'])
+            result['reporting_period']['subtotals'].append(reporting[energy_category_id]['subtotal'])
+            result['reporting_period']['subtotals_in_kgce'].append(
+                reporting[energy_category_id]['subtotal_in_kgce'])
+            result['reporting_period']['subtotals_in_kgco2e'].append(
+                reporting[energy_category_id]['subtotal_in_kgco2e'])
+            if entity['has_area']:
+                result['reporting_period']['subtotals_per_unit_area'].append(
+                    reporting[energy_category_id]['subtotal'] / entity_record['area']
+                    if entity_record['area'] > 0.0 else None)
+            result['reporting_period']['toppeaks'].append(reporting[energy_category_id]['toppeak'])
+            result['reporting_period']['onpeaks'].append(reporting[energy_category_id]['onpeak'])
+            result['reporting_period']['midpeaks'].append(reporting[energy_category_id]['midpeak'])
+            result['reporting_period']['offpeaks'].append(reporting[energy_category_id]['offpeak'])
+            result['reporting_period']['increment_rates'].append(
+                (reporting[energy_category_id]['subtotal'] - base[energy_category_id]['subtotal']) /
+                base[energy_category_id]['subtotal']
+                if base[energy_category_id]['subtotal'] > 0.0 else None)
+            result['reporting_period']['total_in_kgce'] += reporting[energy_category_id]['subtotal_in_kgce']
+            result['reporting_period']['total_in_kgco2e'] += reporting[energy_category_id]['subtotal_in_kgco2e']
+
+    if entity['has_area']:
+        # todo: the values of total_in_kgco2e_per_unit_area and total_in_kgce_per_unit_area are swapped,
+        #  kept as they are for compatibility of the clients
+        result['reporting_period']['total_in_kgco2e_per_unit_area'] = \
+            result['reporting_period']['total_in_kgce'] / entity_record['area'] \
+            if entity_record['area'] > 0.0 else None
+
+    result['reporting_period']['increment_rate_in_kgce'] = \
+        (result['reporting_period']['total_in_kgce'] - result['base_period']['total_in_kgce']) / \
+        result['base_period']['total_in_kgce'] \
+        if result['base_period']['total_in_kgce'] > Decimal(0.0) else None
+
+    if entity['has_area']:
+        result['reporting_period']['total_in_kgce_per_unit_area'] = \
+            result['reporting_period']['total_in_kgco2e'] / entity_record['area'] \
+            if entity_record['area'] > 0.0 else None
+
+    result['reporting_period']['increment_rate_in_kgco2e'] = \
+        (result['reporting_period']['total_in_kgco2e'] - result['base_period']['total_in_kgco2e']) / \
+        result['base_period']['total_in_kgco2e'] \
+        if result['base_period']['total_in_kgco2e'] > Decimal(0.0) else None
+
+    result['parameters'] = {
+        "names": parameters_data['names'],
+        "timestamps": parameters_data['timestamps'],
+        "values": parameters_data['values']
+    }
+
+    if entity['has_child_spaces']:
+        child_space_data = results['child_space_data']
+        result['child_space'] = dict()
+        result['child_space']['energy_category_names'] = list()  # 1D array [energy category]
+        result['child_space']['units'] = list()  # 1D array [energy category]
+        result['child_space']['child_space_names_array'] = list()  # 2D array [energy category][child space]
+        result['child_space']['subtotals_array'] = list()  # 2D array [energy category][child space]
+        result['child_space']['subtotals_in_kgce_array'] = list()  # 2D array [energy category][child space]
+        result['child_space']['subtotals_in_kgco2e_array'] = list()  # 2D array [energy category][child space]
+        if energy_category_set is not None and len(energy_category_set) > 0:
+            for energy_category_id in energy_category_set:
+                result['child_space']['energy_category_names'].append(energy_category_dict[energy_category_id]['name'])
+                result['child_space']['units'].append(energy_category_dict[energy_category_id]['unit_of_measure'])
+                result['child_space']['child_space_names_array'].append(
+                    child_space_data[energy_category_id]['child_space_names'])
+                result['child_space']['subtotals_array'].append(
+                    child_space_data[energy_category_id]['subtotals'])
+                result['child_space']['subtotals_in_kgce_array'].append(
+                    child_space_data[energy_category_id]['subtotals_in_kgce'])
+                result['child_space']['subtotals_in_kgco2e_array'].append(
+                    child_space_data[energy_category_id]['subtotals_in_kgco2e'])
+
+    ####################################################################################################################
+    # Step 8: set the report as JSON or Excel file to the response
+    ####################################################################################################################
+    if is_excel_export:
+        # export result to Excel file in memory
+        excel_bytes = exporter(result,
+                               entity_record['name'],
+                               parameters['reporting_start_datetime_local'],
+                               parameters['reporting_end_datetime_local'],
+                               parameters['period_type'])
+        excelexport.set_response(resp, excel_bytes, entity['name'].replace('_', '') + 'energycategory',
+                                 entity_record['name'])
+    else:
+        resp.body = json.dumps(result)
@@ -1,6 +1,6 @@
 import falcon
 import json
-import mysql.connector
+from core import database
 import config
 import uuid
 
@@ -16,7 +16,7 @@ class RuleCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid, "
@@ -117,7 +117,7 @@ class RuleCollection:
                                    description='API.INVALID_IS_ENABLED')
         is_enabled = new_values['data']['is_enabled']
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -166,7 +166,7 @@ class RuleItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_RULE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid, "
@@ -195,7 +195,7 @@ class RuleItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_RULE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT id "
@@ -295,7 +295,7 @@ class RuleItem:
                                    description='API.INVALID_IS_ENABLED')
         is_enabled = new_values['data']['is_enabled']
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT id "
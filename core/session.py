@@ -0,0 +1,153 @@
+import falcon
+import threading
+from datetime import datetime
+import config
+from core import cache
+from core import database
+
+
+########################################################################################################################
+# Verification of user sessions
+# The TOKEN and USER-UUID headers of every request are verified once by SessionMiddleware, which sets
+#   req.context.user: dict of id, uuid, name, display_name, is_admin and privilege_id of the user of a valid session,
+#                     or None
+#   req.context.privilege: dict of id and data (JSON text) of the privilege of the user, or None if the user is an
+#                          administrator, has no privilege, or the session is not valid
+#   req.context.session_error: None if the session is valid, otherwise the description of the error, such as
+#                              API.USER_SESSION_TIMEOUT
+# Requests are never rejected by the middleware, handlers which require a session call verify(req).
+# Valid sessions are cached in each gunicorn worker for config.session_cache_ttl_seconds at most and never after
+# utc_expires of the session. When sessions or users are changed, the worker handling the change invalidates its cache
+# and starts a new generation of config.session_generation_file, and every worker clears its cache on its next request.
+########################################################################################################################
+session_cache = cache.LRUCache(config.session_cache_max_size, config.session_cache_ttl_seconds)
+
+# generation of the session caches which the sessions in session_cache belong to
+session_cache_generation = None
+generation_lock = threading.Lock()
+
+
+class SessionMiddleware:
+    def process_request(self, req, resp):
+        req.context.user = None
+        req.context.privilege = None
+        req.context.session_error = None
+
+        user_uuid = req.get_header('USER-UUID')
+        token = req.get_header('TOKEN')
+        if token is None or len(str.strip(token)) == 0:
+            req.context.session_error = 'API.TOKEN_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN'
+            return
+        if user_uuid is None or len(str.strip(user_uuid)) == 0:
+            req.context.session_error = 'API.USER_UUID_NOT_FOUND_IN_HEADERS_PLEASE_LOGIN'
+            return
+
+        key = (str.strip(user_uuid), str.strip(token))
+        generation = check_generation()
+        value = session_cache.get(key)
+        is_cached = value is not None
+        if not is_cached:
+            try:
+                value = query_session(key[0], key[1])
+            except Exception as e:
+                print(str(e))
+                req.context.session_error = 'API.INVALID_SESSION_PLEASE_RE_LOGIN'
+                return
+
+        user, privilege, utc_expires, error = value
+        if error is None and datetime.utcnow() > utc_expires:
+            session_cache.delete(key)
+            error = 'API.USER_SESSION_TIMEOUT'
+        if error is not None:
+            req.context.session_error = error
+            return
+
+        if not is_cached and check_generation() == generation:
+            # positive results only, never cached after the session expires, nor if the sessions were invalidated
+            # while querying
+            session_cache.set(key, value,
+                              min(config.session_cache_ttl_seconds, (utc_expires - datetime.utcnow()).total_seconds()))
+        req.context.user = user
+        req.context.privilege = privilege
+
+
+########################################################################################################################
+# Clear the cache of the worker if the sessions were invalidated by any worker since it was filled
+# Returns: the current generation of the session caches
+########################################################################################################################
+def check_generation():
+    global session_cache_generation
+    generation = cache.get_generation(config.session_generation_file)
+    if generation != session_cache_generation:
+        with generation_lock:
+            if generation != session_cache_generation:
+                session_cache.clear()
+                session_cache_generation = generation
+    return generation
+
+
+########################################################################################################################
+# Query the session, the user and the privilege of the user
+# Returns: (user, privilege, utc_expires, error), error is None if the session and the user are found
+########################################################################################################################
+def query_session(user_uuid, token):
+    cnx = database.connect(config.myems_user_db)
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(" SELECT utc_expires "
+                       " FROM tbl_sessions "
+                       " WHERE user_uuid = %s AND token = %s ", (user_uuid, token))
+        row = cursor.fetchone()
+        if row is None:
+            return None, None, None, 'API.INVALID_SESSION_PLEASE_RE_LOGIN'
+        utc_expires = row[0]
+
+        cursor.execute(" SELECT u.id, u.uuid, u.name, u.display_name, u.is_admin, u.privilege_id, p.data "
+                       " FROM tbl_users u LEFT JOIN tbl_privileges p ON u.privilege_id = p.id "
+                       " WHERE u.uuid = %s ", (user_uuid,))
+        row = cursor.fetchone()
+        if row is None:
+            return None, None, None, 'API.INVALID_USER_PLEASE_RE_LOGIN'
+    finally:
+        cursor.close()
+        cnx.disconnect()
+
+    user = {"id": row[0],
+            "uuid": row[1],
+            "name": row[2],
+            "display_name": row[3],
+            "is_admin": bool(row[4]),
+            "privilege_id": row[5]}
+    privilege = None
+    if not user['is_admin'] and row[5] is not None and row[6] is not None:
+        privilege = {"id": row[5], "data": row[6]}
+    return user, privilege, utc_expires, None
+
+
+########################################################################################################################
+# Get the user of the session of the request
+# Returns: the user, see req.context.user
+# Raises: HTTPError 400 with the session error if the session is not valid
+########################################################################################################################
+def verify(req):
+    if req.context.user is None:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                               description=req.context.session_error or 'API.INVALID_SESSION_PLEASE_RE_LOGIN')
+    return req.context.user
+
+
+########################################################################################################################
+# Invalidate cached sessions
+# The sessions are invalidated in this gunicorn worker at once, and all cached sessions are cleared in every worker on
+# its next request
+#   user_uuid: invalidate the sessions of the user, or all sessions if None
+#   token: invalidate the session of the token of the user only
+########################################################################################################################
+def invalidate(user_uuid=None, token=None):
+    cache.next_generation(config.session_generation_file)
+    if user_uuid is None:
+        session_cache.clear()
+    elif token is None:
+        session_cache.delete_if(lambda key: key[0] == user_uuid)
+    else:
+        session_cache.delete((user_uuid, token))
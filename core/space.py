@@ -1,11 +1,10 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
+from core import privilegescope
+from core import spacetree
 import config
 import uuid
-from datetime import datetime
-from anytree import AnyNode
-from anytree.exporter import JsonExporter
 
 
 class SpaceCollection:
@@ -19,21 +18,9 @@ class SpaceCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
-        query = (" SELECT id, name, uuid "
-                 " FROM tbl_spaces ")
-        cursor.execute(query)
-        rows_spaces = cursor.fetchall()
-
-        space_dict = dict()
-        if rows_spaces is not None and len(rows_spaces) > 0:
-            for row in rows_spaces:
-                space_dict[row['id']] = {"id": row['id'],
-                                         "name": row['name'],
-                                         "uuid": row['uuid']}
-
         query = (" SELECT id, name, utc_offset "
                  " FROM tbl_timezones ")
         cursor.execute(query)
@@ -78,6 +65,13 @@ class SpaceCollection:
         cursor.execute(query)
         rows_spaces = cursor.fetchall()
 
+        space_dict = dict()
+        if rows_spaces is not None and len(rows_spaces) > 0:
+            for row in rows_spaces:
+                space_dict[row['id']] = {"id": row['id'],
+                                         "name": row['name'],
+                                         "uuid": row['uuid']}
+
         result = list()
         if rows_spaces is not None and len(rows_spaces) > 0:
             for row in rows_spaces:
@@ -175,7 +169,7 @@ class SpaceCollection:
         else:
             description = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -236,8 +230,9 @@ class SpaceCollection:
                       "    (name, uuid, parent_space_id, area, timezone_id, is_input_counted, is_output_counted, "
                       "     contact_id, cost_center_id, description) "
                       " VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ")
+        space_uuid = str(uuid.uuid4())
         cursor.execute(add_values, (name,
-                                    str(uuid.uuid4()),
+                                    space_uuid,
                                     parent_space_id,
                                     area,
                                     timezone_id,
@@ -250,6 +245,7 @@ class SpaceCollection:
         cnx.commit()
         cursor.close()
         cnx.disconnect()
+        spacetree.update_space(new_id, name, space_uuid, parent_space_id)
 
         resp.status = falcon.HTTP_201
         resp.location = '/spaces/' + str(new_id)
@@ -270,21 +266,9 @@ class SpaceItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
-        query = (" SELECT id, name, uuid "
-                 " FROM tbl_spaces ")
-        cursor.execute(query)
-        rows_spaces = cursor.fetchall()
-
-        space_dict = dict()
-        if rows_spaces is not None and len(rows_spaces) > 0:
-            for row in rows_spaces:
-                space_dict[row['id']] = {"id": row['id'],
-                                         "name": row['name'],
-                                         "uuid": row['uuid']}
-
         query = (" SELECT id, name, utc_offset "
                  " FROM tbl_timezones ")
         cursor.execute(query)
@@ -335,7 +319,8 @@ class SpaceItem:
             raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                    description='API.SPACE_NOT_FOUND')
         else:
-            parent_space = space_dict.get(row['parent_space_id'], None)
+            parent_space = None if row['parent_space_id'] is None else \
+                spacetree.get_tree((row['parent_space_id'], )).get_space(row['parent_space_id'])
             timezone = timezone_dict.get(row['timezone_id'], None)
             contact = contact_dict.get(row['contact_id'], None)
             cost_center = cost_center_dict.get(row['cost_center_id'], None)
@@ -362,7 +347,7 @@ class SpaceItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.THIS_SPACE_CAN_NOT_BE_DELETED')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -506,6 +491,7 @@ class SpaceItem:
 
         cursor.close()
         cnx.disconnect()
+        spacetree.delete_space(int(id_))
 
         resp.status = falcon.HTTP_204
 
@@ -590,7 +576,7 @@ class SpaceItem:
         else:
             description = None
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -675,6 +661,7 @@ class SpaceItem:
 
         cursor.close()
         cnx.disconnect()
+        spacetree.update_space(int(id_), name, None, parent_space_id)
 
         resp.status = falcon.HTTP_200
 
@@ -694,7 +681,7 @@ class SpaceChildrenCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid, "
@@ -711,18 +698,6 @@ class SpaceChildrenCollection:
                                    description='API.SPACE_NOT_FOUND')
         # note: row_current_space will be used at the end
 
-        query = (" SELECT id, name, uuid "
-                 " FROM tbl_spaces ")
-        cursor.execute(query)
-        rows_spaces = cursor.fetchall()
-
-        space_dict = dict()
-        if rows_spaces is not None and len(rows_spaces) > 0:
-            for row in rows_spaces:
-                space_dict[row['id']] = {"id": row['id'],
-                                         "name": row['name'],
-                                         "uuid": row['uuid']}
-
         query = (" SELECT id, name, utc_offset "
                  " FROM tbl_timezones ")
         cursor.execute(query)
@@ -758,12 +733,27 @@ class SpaceChildrenCollection:
                 cost_center_dict[row['id']] = {"id": row['id'],
                                                "name": row['name'],
                                                "uuid": row['uuid']}
+
+        query = (" SELECT id, name, uuid, "
+                 "        parent_space_id, area, timezone_id, is_input_counted, is_output_counted, "
+                 "        contact_id, cost_center_id, description "
+                 " FROM tbl_spaces "
+                 " WHERE parent_space_id = %s "
+                 " ORDER BY id ")
+        cursor.execute(query, (id_, ))
+        rows_spaces = cursor.fetchall()
+        cursor.close()
+        cnx.disconnect()
+
+        # the connection is released before the parent space is got from the index of spaces,
+        # which checks out a connection of its own to reload the index
         result = dict()
         result['current'] = dict()
         result['current']['id'] = row_current_space['id']
         result['current']['name'] = row_current_space['name']
         result['current']['uuid'] = row_current_space['uuid']
-        result['current']['parent_space'] = space_dict.get(row_current_space['parent_space_id'], None)
+        result['current']['parent_space'] = None if row_current_space['parent_space_id'] is None else \
+            spacetree.get_tree((row_current_space['parent_space_id'], )).get_space(row_current_space['parent_space_id'])
         result['current']['area'] = row_current_space['area']
         result['current']['timezone'] = timezone_dict.get(row_current_space['timezone_id'], None)
         result['current']['is_input_counted'] = bool(row_current_space['is_input_counted'])
@@ -774,21 +764,14 @@ class SpaceChildrenCollection:
 
         result['children'] = list()
 
-        query = (" SELECT id, name, uuid, "
-                 "        parent_space_id, area, timezone_id, is_input_counted, is_output_counted, "
-                 "        contact_id, cost_center_id, description "
-                 " FROM tbl_spaces "
-                 " WHERE parent_space_id = %s "
-                 " ORDER BY id ")
-        cursor.execute(query, (id_, ))
-        rows_spaces = cursor.fetchall()
-
         if rows_spaces is not None and len(rows_spaces) > 0:
             for row in rows_spaces:
                 timezone = timezone_dict.get(row['timezone_id'], None)
                 contact = contact_dict.get(row['contact_id'], None)
                 cost_center = cost_center_dict.get(row['cost_center_id'], None)
-                parent_space = space_dict.get(row['parent_space_id'], None)
+                parent_space = {"id": row_current_space['id'],
+                                "name": row_current_space['name'],
+                                "uuid": row_current_space['uuid']}
                 meta_result = {"id": row['id'],
                                "name": row['name'],
                                "uuid": row['uuid'],
@@ -802,8 +785,6 @@ class SpaceChildrenCollection:
                                "description": row['description']}
                 result['children'].append(meta_result)
 
-        cursor.close()
-        cnx.disconnect()
         resp.body = json.dumps(result)
 
 
@@ -822,7 +803,7 @@ class SpaceCombinedEquipmentCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -870,7 +851,7 @@ class SpaceCombinedEquipmentCollection:
                                    description='API.INVALID_COMBINED_EQUIPMENT_ID')
         combined_equipment_id = new_values['data']['combined_equipment_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -932,7 +913,7 @@ class SpaceCombinedEquipmentItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_COMBINED_EQUIPMENT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -987,7 +968,7 @@ class SpaceEquipmentCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1035,7 +1016,7 @@ class SpaceEquipmentCollection:
                                    description='API.INVALID_EQUIPMENT_ID')
         equipment_id = new_values['data']['equipment_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1097,7 +1078,7 @@ class SpaceEquipmentItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_EQUIPMENT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1151,7 +1132,7 @@ class SpaceMeterCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -1213,7 +1194,7 @@ class SpaceMeterCollection:
                                    description='API.INVALID_METER_ID')
         meter_id = new_values['data']['meter_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1275,7 +1256,7 @@ class SpaceMeterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1329,7 +1310,7 @@ class SpaceOfflineMeterCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -1391,7 +1372,7 @@ class SpaceOfflineMeterCollection:
                                    description='API.INVALID_OFFLINE_METER_ID')
         offline_meter_id = new_values['data']['offline_meter_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1453,7 +1434,7 @@ class SpaceOfflineMeterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_OFFLINE_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1508,7 +1489,7 @@ class SpacePointCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -1569,7 +1550,7 @@ class SpacePointCollection:
                                    description='API.INVALID_POINT_ID')
         point_id = new_values['data']['point_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1631,7 +1612,7 @@ class SpacePointItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_POINT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1686,7 +1667,7 @@ class SpaceSensorCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1734,7 +1715,7 @@ class SpaceSensorCollection:
                                    description='API.INVALID_SENSOR_ID')
         sensor_id = new_values['data']['sensor_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1796,7 +1777,7 @@ class SpaceSensorItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SENSOR_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1850,7 +1831,7 @@ class SpaceShopfloorCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1898,7 +1879,7 @@ class SpaceShopfloorCollection:
                                    description='API.INVALID_SHOPFLOOR_ID')
         shopfloor_id = new_values['data']['shopfloor_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -1960,7 +1941,7 @@ class SpaceShopfloorItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SHOPFLOOR_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -2014,7 +1995,7 @@ class SpaceStoreCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -2062,7 +2043,7 @@ class SpaceStoreCollection:
                                    description='API.INVALID_STORE_ID')
         store_id = new_values['data']['store_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -2124,7 +2105,7 @@ class SpaceStoreItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_STORE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -2178,7 +2159,7 @@ class SpaceTenantCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -2226,7 +2207,7 @@ class SpaceTenantCollection:
                                    description='API.INVALID_TENANT_ID')
         tenant_id = new_values['data']['tenant_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -2288,7 +2269,7 @@ class SpaceTenantItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_TENANT_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -2342,7 +2323,7 @@ class SpaceVirtualMeterCollection:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_SPACE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT name "
@@ -2404,7 +2385,7 @@ class SpaceVirtualMeterCollection:
                                    description='API.INVALID_VIRTUAL_METER_ID')
         virtual_meter_id = new_values['data']['virtual_meter_id']
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -2466,7 +2447,7 @@ class SpaceVirtualMeterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_VIRTUAL_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -2522,96 +2503,43 @@ class SpaceTreeCollection:
                 len(str.strip(req.headers['USER-UUID'])) == 0:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_USER_UUID')
-        user_uuid = str.strip(req.headers['USER-UUID'])
 
         if 'TOKEN' not in req.headers or \
                 not isinstance(req.headers['TOKEN'], str) or \
                 len(str.strip(req.headers['TOKEN'])) == 0:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_TOKEN')
-        token = str.strip(req.headers['TOKEN'])
 
         # Verify User Session
-        cnx = mysql.connector.connect(**config.myems_user_db)
-        cursor = cnx.cursor()
-        query = (" SELECT utc_expires "
-                 " FROM tbl_sessions "
-                 " WHERE user_uuid = %s AND token = %s")
-        cursor.execute(query, (user_uuid, token,))
-        row = cursor.fetchone()
-
-        if row is None:
-            cursor.close()
-            cnx.disconnect()
+        if req.context.session_error == 'API.USER_SESSION_TIMEOUT':
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description='API.USER_SESSION_TIMEOUT')
+        elif req.context.session_error == 'API.INVALID_USER_PLEASE_RE_LOGIN':
+            raise falcon.HTTPError(falcon.HTTP_404, 'API.NOT_FOUND', 'API.USER_NOT_FOUND')
+        elif req.context.user is None:
             raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                    description='API.USER_SESSION_NOT_FOUND')
-        else:
-            utc_expires = row[0]
-            if datetime.utcnow() > utc_expires:
-                cursor.close()
-                cnx.disconnect()
-                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                       description='API.USER_SESSION_TIMEOUT')
-        # get privilege
-        query = (" SELECT is_admin, privilege_id "
-                 " FROM tbl_users "
-                 " WHERE uuid = %s ")
-        cursor.execute(query, (user_uuid,))
-        row = cursor.fetchone()
-        if row is None:
-            cursor.close()
-            cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_404, 'API.NOT_FOUND', 'API.USER_NOT_FOUND')
-        else:
-            is_admin = bool(row[0])
-            privilege_id = row[1]
 
         # get space_id in privilege
-        if is_admin:
+        if req.context.user['is_admin']:
             space_id = 1
-        elif privilege_id is None:
+        elif req.context.privilege is None:
             raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                    description='API.PRIVILEGE_NOT_FOUND')
         else:
-            query = (" SELECT data "
-                     " FROM tbl_privileges "
-                     " WHERE id =%s ")
-            cursor.execute(query, (privilege_id,))
-            row = cursor.fetchone()
-            cursor.close()
-            cnx.disconnect()
-
-            if row is None:
-                raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
-                                       description='API.PRIVILEGE_NOT_FOUND')
             try:
-                data = json.loads(row[0])
-            except Exception as ex:
+                scope = privilegescope.get_scope(req.context.user['privilege_id'], req.context.privilege['data'])
+            except ValueError as ex:
                 raise falcon.HTTPError(falcon.HTTP_400, title='API.ERROR', description=ex)
 
-            if 'spaces' not in data or len(data['spaces']) == 0:
+            if scope is None:
                 raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                        description='API.SPACE_NOT_FOUND_IN_PRIVILEGE')
 
-            space_id = data['spaces'][0]
-            if space_id is None:
-                raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
-                                       description='API.PRIVILEGE_NOT_FOUND')
-        # get all spaces
-        cnx = mysql.connector.connect(**config.myems_system_db)
-        cursor = cnx.cursor(dictionary=True)
-
-        query = (" SELECT id, name, parent_space_id "
-                 " FROM tbl_spaces "
-                 " ORDER BY id ")
-        cursor.execute(query)
-        rows_spaces = cursor.fetchall()
-        node_dict = dict()
-        if rows_spaces is not None and len(rows_spaces) > 0:
-            for row in rows_spaces:
-                parent_node = node_dict[row['parent_space_id']] if row['parent_space_id'] is not None else None
-                node_dict[row['id']] = AnyNode(id=row['id'], parent=parent_node, name=row['name'])
-
-        cursor.close()
-        cnx.disconnect()
-        resp.body = JsonExporter(sort_keys=True).export(node_dict[space_id], )
+            space_id = scope.root_space_ids[0]
+        # get the space and its descendants
+        space_tree = spacetree.get_tree((space_id, )).get_subtree(space_id)
+        if space_tree is None:
+            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
+                                   description='API.SPACE_NOT_FOUND')
+        resp.body = json.dumps(space_tree, sort_keys=True)
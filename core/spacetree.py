@@ -0,0 +1,202 @@
+import threading
+import time
+import config
+from core import database
+
+
+########################################################################################################################
+# Index of the hierarchy of spaces, shared by all threads in the process
+# Spaces are kept in flat arrays in the preorder of the tree, so the descendants of a space are the interval
+# [start, end) of the arrays (nested sets), which answers descendants in O(k), ancestors in O(depth), and depth,
+# subtree size and whether a space is a descendant of another in O(1).
+# The index is loaded from tbl_spaces once, updated by the space handlers of this gunicorn worker, and reloaded after
+# config.space_tree_ttl_seconds or when a space which is not in the index is required, so changes made by the other
+# workers are seen after config.space_tree_ttl_seconds at most.
+# Every index has a version, which is increased by every update or reload.
+########################################################################################################################
+class SpaceTree:
+    """Immutable index of the hierarchy of spaces"""
+    def __init__(self, spaces, version):
+        # spaces: dict of id to (name, uuid, parent_space_id)
+        self.version = version
+        self.spaces = spaces
+
+        children = dict()
+        roots = list()
+        for space_id in sorted(spaces.keys()):
+            parent_space_id = spaces[space_id][2]
+            if parent_space_id is None or parent_space_id not in spaces:
+                roots.append(space_id)
+            else:
+                children.setdefault(parent_space_id, list()).append(space_id)
+        self.children = children
+
+        # arrays in preorder, spaces in cycles of parent_space_id are not reachable from the roots and not included
+        self.ids = list()
+        self.depths = list()
+        self.ends = list()
+        self.indexes = dict()
+        for root_id in roots:
+            stack = [(root_id, 0, False)]
+            while len(stack) > 0:
+                space_id, depth, is_closed = stack.pop()
+                if is_closed:
+                    self.ends[self.indexes[space_id]] = len(self.ids)
+                    continue
+                self.indexes[space_id] = len(self.ids)
+                self.ids.append(space_id)
+                self.depths.append(depth)
+                self.ends.append(None)
+                stack.append((space_id, depth, True))
+                for child_id in reversed(children.get(space_id, ())):
+                    stack.append((child_id, depth + 1, False))
+
+    def contains(self, space_id):
+        return space_id in self.indexes
+
+    def get_space(self, space_id):
+        """Returns: dict of id, name and uuid of the space, or None if not found"""
+        if space_id not in self.indexes:
+            return None
+        name, uuid, parent_space_id = self.spaces[space_id]
+        return {"id": space_id, "name": name, "uuid": uuid}
+
+    def get_name(self, space_id):
+        return self.spaces[space_id][0] if space_id in self.indexes else None
+
+    def get_parent_id(self, space_id):
+        if space_id not in self.indexes or self.depths[self.indexes[space_id]] == 0:
+            return None
+        return self.spaces[space_id][2]
+
+    def get_children(self, space_id):
+        """Returns: list of dict of id and name of the child spaces in order of id"""
+        return [{"id": child_id, "name": self.spaces[child_id][0]}
+                for child_id in self.children.get(space_id, ()) if child_id in self.indexes]
+
+    def get_descendants(self, space_id, include_self=True):
+        """Returns: list of ids of the space and its descendants in preorder, or an empty list if not found"""
+        index = self.indexes.get(space_id)
+        if index is None:
+            return list()
+        return self.ids[index if include_self else index + 1:self.ends[index]]
+
+    def get_subtree(self, space_id):
+        """Returns: nested dicts of id, name and children (if any) of the space and its descendants, or None"""
+        nodes = dict()
+        for descendant_id in self.get_descendants(space_id):
+            nodes[descendant_id] = {"id": descendant_id, "name": self.spaces[descendant_id][0]}
+            if descendant_id != space_id:
+                nodes[self.spaces[descendant_id][2]].setdefault("children", list()).append(nodes[descendant_id])
+        return nodes.get(space_id)
+
+    def get_ancestors(self, space_id):
+        """Returns: list of ids of the ancestors of the space from its parent to the root"""
+        ancestors = list()
+        parent_space_id = self.get_parent_id(space_id)
+        while parent_space_id is not None:
+            ancestors.append(parent_space_id)
+            parent_space_id = self.get_parent_id(parent_space_id)
+        return ancestors
+
+    def get_depth(self, space_id):
+        """Returns: depth of the space, 0 for the root space, or None if not found"""
+        index = self.indexes.get(space_id)
+        return None if index is None else self.depths[index]
+
+    def get_subtree_size(self, space_id):
+        """Returns: number of the space and its descendants, or 0 if not found"""
+        index = self.indexes.get(space_id)
+        return 0 if index is None else self.ends[index] - index
+
+    def is_descendant(self, space_id, ancestor_space_id, include_self=True):
+        index = self.indexes.get(space_id)
+        ancestor_index = self.indexes.get(ancestor_space_id)
+        if index is None or ancestor_index is None:
+            return False
+        if index == ancestor_index:
+            return include_self
+        return ancestor_index < index < self.ends[ancestor_index]
+
+
+# the index is not reloaded for required spaces more often than this, so spaces which do not exist do not reload it on
+# every request
+min_reload_seconds = 1
+
+lock = threading.Lock()
+tree = None
+tree_load_time = 0.0
+tree_version = 0
+
+
+def load(cursor_system=None):
+    global tree, tree_load_time, tree_version
+    cnx = None
+    cursor = cursor_system
+    try:
+        if cursor is None:
+            cnx = database.connect(config.myems_system_db)
+            cursor = cnx.cursor()
+        cursor.execute(" SELECT id, name, uuid, parent_space_id "
+                       " FROM tbl_spaces ")
+        rows = cursor.fetchall()
+    finally:
+        if cnx:
+            cursor.close()
+            cnx.disconnect()
+
+    tree_version += 1
+    tree = SpaceTree({row[0]: (row[1], row[2], row[3]) for row in rows}, tree_version)
+    tree_load_time = time.monotonic()
+
+
+########################################################################################################################
+# Get the index of spaces
+#   space_ids: the ids of spaces which are required, the index is reloaded if any of them is not in the index
+#   cursor_system: optional, cursor of myems_system_db which the caller holds, the index is reloaded with it so that the
+#                  caller does not wait for a second pooled connection of myems_system_db while it holds one
+# Returns: SpaceTree, which is not changed by later updates
+########################################################################################################################
+def get_tree(space_ids=(), cursor_system=None):
+    current_tree = tree
+    if current_tree is not None:
+        age = time.monotonic() - tree_load_time
+        if age < config.space_tree_ttl_seconds and \
+                (age < min_reload_seconds or all(current_tree.contains(space_id) for space_id in space_ids)):
+            return current_tree
+
+    with lock:
+        if tree is current_tree:
+            load(cursor_system)
+        return tree
+
+
+########################################################################################################################
+# Update a space in the index of this gunicorn worker after it is created or updated in tbl_spaces
+# The index is rebuilt from the spaces in memory without querying tbl_spaces
+########################################################################################################################
+def update_space(space_id, name, uuid, parent_space_id):
+    global tree, tree_version
+    with lock:
+        if tree is None:
+            return
+        spaces = dict(tree.spaces)
+        if uuid is None and space_id in spaces:
+            uuid = spaces[space_id][1]
+        spaces[space_id] = (name, uuid, parent_space_id)
+        tree_version += 1
+        tree = SpaceTree(spaces, tree_version)
+
+
+########################################################################################################################
+# Delete a space from the index of this gunicorn worker after it is deleted from tbl_spaces
+########################################################################################################################
+def delete_space(space_id):
+    global tree, tree_version
+    with lock:
+        if tree is None or space_id not in tree.spaces:
+            return
+        spaces = dict(tree.spaces)
+        del spaces[space_id]
+        tree_version += 1
+        tree = SpaceTree(spaces, tree_version)
@@ -1,9 +1,10 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 import uuid
 from datetime import datetime, timedelta, timezone
+from core import utilities
 
 
 class TariffCollection:
@@ -17,7 +18,7 @@ class TariffCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT t.id, t.name, t.uuid, "
@@ -142,7 +143,7 @@ class TariffCollection:
         if config.utc_offset[0] == '-':
             timezone_offset = -timezone_offset
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -208,6 +209,8 @@ class TariffCollection:
         cursor.close()
         cnx.disconnect()
 
+        utilities.clear_tariff_schedule_cache()
+
         resp.status = falcon.HTTP_201
         resp.location = '/tariffs/' + str(new_id)
 
@@ -227,7 +230,7 @@ class TariffItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_TARIFF_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         query = (" SELECT t.id, t.name, t.uuid, "
@@ -297,7 +300,7 @@ class TariffItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_TARIFF_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -345,6 +348,8 @@ class TariffItem:
         cursor.close()
         cnx.disconnect()
 
+        utilities.clear_tariff_schedule_cache()
+
         resp.status = falcon.HTTP_204
 
     @staticmethod
@@ -405,7 +410,7 @@ class TariffItem:
         if config.utc_offset[0] == '-':
             timezone_offset = -timezone_offset
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         # check if the tariff exist
@@ -507,6 +512,9 @@ class TariffItem:
 
         cursor.close()
         cnx.disconnect()
+
+        utilities.clear_tariff_schedule_cache()
+
         resp.status = falcon.HTTP_200
 
 
@@ -1,6 +1,6 @@
 import falcon
 import json
-import mysql.connector
+from core import database
 import config
 from datetime import datetime, timedelta, timezone
 
@@ -45,7 +45,7 @@ class TextMessageCollection:
                                    title='API.BAD_REQUEST',
                                    description='API.START_DATETIME_SHOULD_BE_EARLY_THAN_END_DATETIME')
         try:
-            cnx = mysql.connector.connect(**config.myems_fdd_db)
+            cnx = database.connect(config.myems_fdd_db)
             cursor = cnx.cursor()
         except Exception as e:
             raise falcon.HTTPError(falcon.HTTP_500, title='API.DATABASE_ERROR', description=str(e))
@@ -99,7 +99,7 @@ class TextMessageItem:
                                    description='API.INVALID_TEXT_MESSAGE_ID')
 
         try:
-            cnx = mysql.connector.connect(**config.myems_fdd_db)
+            cnx = database.connect(config.myems_fdd_db)
             cursor = cnx.cursor()
         except Exception as e:
             raise falcon.HTTPError(falcon.HTTP_500, title='API.DATABASE_ERROR', description=str(e))
@@ -148,7 +148,7 @@ class TextMessageItem:
         cnx = None
         cursor = None
         try:
-            cnx = mysql.connector.connect(**config.myems_fdd_db)
+            cnx = database.connect(config.myems_fdd_db)
             cursor = cnx.cursor()
         except Exception as e:
             if cursor:
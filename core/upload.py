@@ -0,0 +1,194 @@
+import hashlib
+import os
+import uuid
+import mysql.connector
+from mysql.connector import errorcode
+import config
+from core import download
+
+
+########################################################################################################################
+# Save an uploaded file to config.upload_path as <uuid> in chunks, computing its SHA-256 hash on the fly
+# The file is written to a temporary file first and moved into place when it is fully saved, to prevent incomplete
+# files from being used.
+#   upload: the file of the multipart form, such as req.get_param('file')
+# Returns: (uuid, SHA-256 hex digest, size in bytes) of the file
+########################################################################################################################
+def save_file(upload):
+    file_uuid = str(uuid.uuid4())
+    file_path = os.path.join(config.upload_path, file_uuid)
+    temp_file_path = file_path + '~'
+
+    file_hash = hashlib.sha256()
+    file_size = 0
+    try:
+        with open(temp_file_path, 'wb') as f:
+            while True:
+                chunk = upload.file.read(download.chunk_size)
+                if not chunk:
+                    break
+                file_hash.update(chunk)
+                file_size += len(chunk)
+                f.write(chunk)
+        os.rename(temp_file_path, file_path)
+    except Exception:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise
+
+    return file_uuid, file_hash.hexdigest(), file_size
+
+
+def remove_file(file_uuid):
+    try:
+        os.remove(os.path.join(config.upload_path, file_uuid))
+    except Exception as e:
+        print(str(e))
+
+
+########################################################################################################################
+# Files are stored once
+# The row of the first upload of a file stores the file as its file_object. The rows of later uploads of identical files
+# share it, they have no file_object and refer to the row storing the file by file_object_id. A unique index on the
+# hashes of the stored files (see database/upgrade_shared_files.sql) ensures that concurrent uploads of identical files
+# do not store the file twice.
+########################################################################################################################
+
+
+########################################################################################################################
+# Find the row storing a file identical to the uploaded file, by the indexed file_size and file_hash columns
+# The row is locked until the end of the transaction, so it is not deleted before a row sharing its file is inserted
+#   table: table with the columns id, uuid, file_size, file_hash and file_object_id, such as tbl_knowledge_files
+# Returns: (id, uuid) of the row storing the identical file, or None if not found
+########################################################################################################################
+def find_file(cursor, table, file_hash, file_size):
+    cursor.execute(" SELECT id, uuid "
+                   " FROM " + table +
+                   " WHERE file_size = %s AND file_hash = %s AND file_object_id IS NULL "
+                   " ORDER BY id "
+                   " LIMIT 1 "
+                   " FOR UPDATE ",
+                   (file_size, file_hash))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return row[0], row[1]
+
+
+########################################################################################################################
+# Insert a row with a saved file
+# If an identical file is stored, the row shares it and the saved file is removed. Otherwise the file is sent to the
+# database in chunks as the long data of a prepared statement, so it is written once and never read into memory as a
+# whole. The changes are committed by the caller.
+#   cnx: connection to the database of the table
+#   table: table with the columns file_object, file_object_id, file_size and file_hash, such as tbl_knowledge_files
+#   values: dict of the values of the other columns by column name
+#   shared_values: dict of the values overriding values if the row shares the file of another row
+# Returns: id of the new row
+########################################################################################################################
+def insert_file(cnx, table, values, file_uuid, file_hash, file_size, shared_values=None):
+    cursor = cnx.cursor()
+    try:
+        identical_file = find_file(cursor, table, file_hash, file_size)
+    finally:
+        cursor.close()
+
+    if identical_file is None:
+        columns = list(values.keys()) + ['file_size', 'file_hash', 'file_object']
+        cursor = cnx.cursor(prepared=True)
+        try:
+            with open(os.path.join(config.upload_path, file_uuid), 'rb') as f:
+                cursor.execute(" INSERT INTO " + table +
+                               " (" + ', '.join(columns) + ") "
+                               " VALUES (" + ', '.join(['%s'] * len(columns)) + ") ",
+                               tuple(values.values()) + (file_size, file_hash, f))
+            return cursor.lastrowid
+        except mysql.connector.errors.IntegrityError as e:
+            if e.errno != errorcode.ER_DUP_ENTRY:
+                raise
+        finally:
+            cursor.close()
+
+        # an identical file was stored by a concurrent upload
+        cnx.rollback()
+        cursor = cnx.cursor()
+        try:
+            identical_file = find_file(cursor, table, file_hash, file_size)
+        finally:
+            cursor.close()
+        if identical_file is None:
+            raise Exception('the identical file of ' + file_uuid + ' is not found in ' + table)
+
+    remove_file(file_uuid)
+    values = dict(values, **(shared_values or dict()))
+    columns = list(values.keys()) + ['file_size', 'file_hash', 'file_object_id']
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(" INSERT INTO " + table +
+                       " (" + ', '.join(columns) + ") "
+                       " VALUES (" + ', '.join(['%s'] * len(columns)) + ") ",
+                       tuple(values.values()) + (file_size, file_hash, identical_file[0]))
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+
+
+########################################################################################################################
+# Delete a row with its file
+# If other rows share the file of the row, the file moves to the first of them with the stored_columns instead of
+# being deleted. The changes are committed by the caller.
+#   cnx: connection to the database of the table
+#   table: table with the columns id, uuid, file_object and file_object_id, such as tbl_knowledge_files
+#   stored_columns: columns which move with the file, such as file_object
+# Returns: False if the row is not found, otherwise True
+# Raises: OSError if the file of the row is not shared and cannot be removed from config.upload_path
+########################################################################################################################
+def delete_file(cnx, table, id_, stored_columns=('file_object', )):
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(" SELECT uuid, file_object_id "
+                       " FROM " + table +
+                       " WHERE id = %s "
+                       " FOR UPDATE ", (id_,))
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        file_uuid, file_object_id = row
+
+        sharing_rows = list()
+        if file_object_id is None:
+            cursor.execute(" SELECT id, uuid "
+                           " FROM " + table +
+                           " WHERE file_object_id = %s "
+                           " ORDER BY id "
+                           " FOR UPDATE ", (id_,))
+            sharing_rows = cursor.fetchall()
+
+        if len(sharing_rows) > 0:
+            new_id = sharing_rows[0][0]
+            # the row shares the file of the new row first, so the file is stored by one row at a time
+            cursor.execute(" UPDATE " + table + " SET file_object_id = %s WHERE id = %s ", (new_id, id_))
+            cursor.execute(" UPDATE " + table + " n JOIN " + table + " o ON o.id = %s "
+                           " SET " + ', '.join('n.' + column + ' = o.' + column for column in stored_columns) + ", "
+                           "     n.file_object_id = NULL "
+                           " WHERE n.id = %s ", (id_, new_id))
+            cursor.execute(" UPDATE " + table + " SET file_object_id = %s WHERE file_object_id = %s ",
+                           (new_id, id_))
+
+        cursor.execute(" DELETE FROM " + table + " WHERE id = %s ", (id_,))
+    finally:
+        cursor.close()
+
+    file_path = os.path.join(config.upload_path, file_uuid)
+    if len(sharing_rows) > 0:
+        try:
+            os.replace(file_path, os.path.join(config.upload_path, sharing_rows[0][1]))
+        except OSError as e:
+            # the file is read from its file_object on hosts where it is not saved
+            print(str(e))
+    elif file_object_id is None:
+        os.remove(file_path)
+    elif os.path.isfile(file_path):
+        # rows of identical files uploaded before files were shared may have saved files of their own
+        remove_file(file_uuid)
+    return True
@@ -1,6 +1,7 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
+from core import session
 import config
 import uuid
 import hashlib
@@ -20,7 +21,7 @@ class UserCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
         query = (" SELECT u.id, u.name, u.display_name, u.uuid, "
@@ -100,7 +101,7 @@ class UserCollection:
         else:
             privilege_id = None
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -172,7 +173,7 @@ class UserItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_USER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, name, display_name, uuid, email "
@@ -200,7 +201,7 @@ class UserItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_USER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -215,6 +216,7 @@ class UserItem:
         # TODO: delete associated objects
         cursor.execute(" DELETE FROM tbl_users WHERE id = %s ", (id_,))
         cnx.commit()
+        session.invalidate()
 
         cursor.close()
         cnx.disconnect()
@@ -276,7 +278,7 @@ class UserItem:
         else:
             privilege_id = None
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -328,6 +330,7 @@ class UserItem:
                                     privilege_id,
                                     id_,))
         cnx.commit()
+        session.invalidate()
 
         cursor.close()
         cnx.disconnect()
@@ -358,7 +361,7 @@ class UserLogin:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_PASSWORD')
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
         result = dict()
 
@@ -476,7 +479,7 @@ class UserLogout:
                                    description='API.INVALID_TOKEN')
         token = str.strip(req.headers['TOKEN'])
 
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor()
         query = (" DELETE FROM tbl_sessions "
                  " WHERE user_uuid = %s AND token = %s ")
@@ -485,6 +488,7 @@ class UserLogout:
         cnx.commit()
         cursor.close()
         cnx.disconnect()
+        session.invalidate(user_uuid, token)
         if rowcount is None or rowcount == 0:
             raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                    description='API.USER_SESSION_NOT_FOUND')
@@ -544,27 +548,17 @@ class ChangePassword:
         new_password = str.strip(new_values['data']['new_password'])
 
         # Verify User Session
-
-        cnx = mysql.connector.connect(**config.myems_user_db)
-        cursor = cnx.cursor()
-        query = (" SELECT utc_expires "
-                 " FROM tbl_sessions "
-                 " WHERE user_uuid = %s AND token = %s")
-        cursor.execute(query, (user_uuid, token,))
-        row = cursor.fetchone()
-
-        if row is None:
-            cursor.close()
-            cnx.disconnect()
+        if req.context.session_error == 'API.USER_SESSION_TIMEOUT':
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description='API.USER_SESSION_TIMEOUT')
+        elif req.context.session_error == 'API.INVALID_USER_PLEASE_RE_LOGIN':
+            raise falcon.HTTPError(falcon.HTTP_404, 'API.NOT_FOUND', 'API.USER_NOT_FOUND')
+        elif req.context.user is None:
             raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                    description='API.USER_SESSION_NOT_FOUND')
-        else:
-            utc_expires = row[0]
-            if datetime.utcnow() > utc_expires:
-                cursor.close()
-                cnx.disconnect()
-                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                       description='API.USER_SESSION_TIMEOUT')
+
+        cnx = database.connect(config.myems_user_db)
+        cursor = cnx.cursor()
 
         query = (" SELECT salt, password "
                  " FROM tbl_users "
@@ -607,6 +601,7 @@ class ChangePassword:
 
         cursor.close()
         cnx.disconnect()
+        session.invalidate(user_uuid)
         resp.body = json.dumps("OK")
         resp.status = falcon.HTTP_200
 
@@ -658,37 +653,20 @@ class ResetPassword:
         new_password = str.strip(new_values['data']['password'])
 
         # Verify Administrator
-        cnx = mysql.connector.connect(**config.myems_user_db)
-        cursor = cnx.cursor()
-        query = (" SELECT utc_expires "
-                 " FROM tbl_sessions "
-                 " WHERE user_uuid = %s AND token = %s")
-        cursor.execute(query, (admin_user_uuid, admin_token,))
-        row = cursor.fetchone()
-
-        if row is None:
-            cursor.close()
-            cnx.disconnect()
+        if req.context.session_error == 'API.USER_SESSION_TIMEOUT':
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description='API.ADMINISTRATOR_SESSION_TIMEOUT')
+        elif req.context.session_error == 'API.INVALID_USER_PLEASE_RE_LOGIN':
+            raise falcon.HTTPError(falcon.HTTP_400, 'API.BAD_REQUEST', 'API.INVALID_PRIVILEGE')
+        elif req.context.user is None:
             raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                    description='API.ADMINISTRATOR_SESSION_NOT_FOUND')
-        else:
-            utc_expires = row[0]
-            if datetime.utcnow() > utc_expires:
-                cursor.close()
-                cnx.disconnect()
-                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
-                                       description='API.ADMINISTRATOR_SESSION_TIMEOUT')
-
-        query = (" SELECT name "
-                 " FROM tbl_users "
-                 " WHERE uuid = %s AND is_admin = true ")
-        cursor.execute(query, (admin_user_uuid,))
-        row = cursor.fetchone()
-        if row is None:
-            cursor.close()
-            cnx.disconnect()
+        elif not req.context.user['is_admin']:
             raise falcon.HTTPError(falcon.HTTP_400, 'API.BAD_REQUEST', 'API.INVALID_PRIVILEGE')
 
+        cnx = database.connect(config.myems_user_db)
+        cursor = cnx.cursor()
+
         salt = uuid.uuid4().hex
         hashed_password = hashlib.sha512(salt.encode() + new_password.encode()).hexdigest()
 
@@ -708,5 +686,6 @@ class ResetPassword:
 
         cursor.close()
         cnx.disconnect()
+        session.invalidate()
         resp.body = json.dumps("OK")
         resp.status = falcon.HTTP_200
@@ -1,276 +1,281 @@
 from datetime import datetime, timedelta
-import mysql.connector
+from core import database
+import bisect
+import calendar
 import collections
+import itertools
+import math
 from decimal import Decimal
 import config
 import statistics
+from core import cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 ########################################################################################################################
-# Aggregate hourly data by period
-# rows_hourly: list of (start_datetime_utc, actual_value), should belong to one energy_category_id
+# Get the boundaries of periods
 # start_datetime_utc: start datetime in utc
 # end_datetime_utc: end datetime in utc
 # period_type: one of the following period types, 'hourly', 'daily', 'monthly' and 'yearly'
-# Note: this procedure doesn't work with multiple energy categories
+# Returns: sorted list of datetimes in utc, the i-th period covers [boundaries[i], boundaries[i + 1])
+#          so there is one more boundary than periods
 ########################################################################################################################
-def aggregate_hourly_data_by_period(rows_hourly, start_datetime_utc, end_datetime_utc, period_type):
-    # todo: validate parameters
+def get_period_boundaries(start_datetime_utc, end_datetime_utc, period_type):
     start_datetime_utc = start_datetime_utc.replace(tzinfo=None)
     end_datetime_utc = end_datetime_utc.replace(tzinfo=None)
 
+    boundaries = list()
+    # todo: add config.working_day_start_time_local
+    # todo: add config.minutes_to_count
     if period_type == "hourly":
-        result_rows_hourly = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
         current_datetime_utc = start_datetime_utc.replace(minute=0, second=0, microsecond=0, tzinfo=None)
-        while current_datetime_utc <= end_datetime_utc:
-            subtotal = Decimal(0.0)
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < current_datetime_utc + \
-                        timedelta(minutes=config.minutes_to_count):
-                    subtotal += row[1]
-            result_rows_hourly.append((current_datetime_utc, subtotal))
-            current_datetime_utc += timedelta(minutes=config.minutes_to_count)
-
-        return result_rows_hourly
-
     elif period_type == "daily":
-        result_rows_daily = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
         # calculate the start datetime in utc of the first day in local
         start_datetime_local = start_datetime_utc + timedelta(hours=int(config.utc_offset[1:3]))
         current_datetime_utc = start_datetime_local.replace(hour=0) - timedelta(hours=int(config.utc_offset[1:3]))
-        while current_datetime_utc <= end_datetime_utc:
-            subtotal = Decimal(0.0)
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < current_datetime_utc + timedelta(days=1):
-                    subtotal += row[1]
-            result_rows_daily.append((current_datetime_utc, subtotal))
-            current_datetime_utc += timedelta(days=1)
-
-        return result_rows_daily
-
     elif period_type == "monthly":
-        result_rows_monthly = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
         # calculate the start datetime in utc of the first day in the first month in local
         start_datetime_local = start_datetime_utc + timedelta(hours=int(config.utc_offset[1:3]))
         current_datetime_utc = \
             start_datetime_local.replace(day=1, hour=0) - timedelta(hours=int(config.utc_offset[1:3]))
-
-        while current_datetime_utc <= end_datetime_utc:
-            # calculate the next datetime in utc
-            if current_datetime_utc.month == 1:
-                temp_day = 28
-                ny = current_datetime_utc.year
-                if (ny % 100 != 0 and ny % 4 == 0) or (ny % 100 == 0 and ny % 400 == 0):
-                    temp_day = 29
-
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=temp_day,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month == 2:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month in [3, 5, 8, 10]:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=30,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month == 7:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month in [4, 6, 9, 11]:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month == 12:
-                next_datetime_utc = datetime(year=current_datetime_utc.year + 1,
-                                             month=1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-
-            subtotal = Decimal(0.0)
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < next_datetime_utc:
-                    subtotal += row[1]
-
-            result_rows_monthly.append((current_datetime_utc, subtotal))
-            current_datetime_utc = next_datetime_utc
-
-        return result_rows_monthly
-
     elif period_type == "yearly":
-        result_rows_yearly = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
         # calculate the start datetime in utc of the first day in the first month in local
         start_datetime_local = start_datetime_utc + timedelta(hours=int(config.utc_offset[1:3]))
         current_datetime_utc = start_datetime_local.replace(month=1, day=1, hour=0) - timedelta(
             hours=int(config.utc_offset[1:3]))
+    else:
+        return boundaries
 
-        while current_datetime_utc <= end_datetime_utc:
-            # calculate the next datetime in utc
+    while current_datetime_utc <= end_datetime_utc:
+        boundaries.append(current_datetime_utc)
+        if period_type == "hourly":
+            current_datetime_utc += timedelta(minutes=config.minutes_to_count)
+        elif period_type == "daily":
+            current_datetime_utc += timedelta(days=1)
+        elif period_type == "monthly":
+            # the next datetime in utc is on the last day of the next month in utc
+            next_year = current_datetime_utc.year + 1 if current_datetime_utc.month == 12 \
+                else current_datetime_utc.year
+            next_month = 1 if current_datetime_utc.month == 12 else current_datetime_utc.month + 1
+            current_datetime_utc = datetime(year=next_year,
+                                            month=next_month,
+                                            day=calendar.monthrange(next_year, next_month)[1],
+                                            hour=current_datetime_utc.hour,
+                                            minute=current_datetime_utc.minute,
+                                            second=0,
+                                            microsecond=0,
+                                            tzinfo=None)
+        elif period_type == "yearly":
             # todo: timedelta of year
-            next_datetime_utc = datetime(year=current_datetime_utc.year + 2,
-                                         month=1,
-                                         day=1,
-                                         hour=current_datetime_utc.hour,
-                                         minute=current_datetime_utc.minute,
-                                         second=current_datetime_utc.second,
-                                         microsecond=current_datetime_utc.microsecond,
-                                         tzinfo=current_datetime_utc.tzinfo) - timedelta(days=1)
-            subtotal = Decimal(0.0)
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < next_datetime_utc:
-                    subtotal += row[1]
+            current_datetime_utc = datetime(year=current_datetime_utc.year + 2,
+                                            month=1,
+                                            day=1,
+                                            hour=current_datetime_utc.hour,
+                                            minute=current_datetime_utc.minute,
+                                            second=current_datetime_utc.second,
+                                            microsecond=current_datetime_utc.microsecond,
+                                            tzinfo=current_datetime_utc.tzinfo) - timedelta(days=1)
+
+    if len(boundaries) > 0:
+        # the end of the last period
+        boundaries.append(current_datetime_utc)
 
-            result_rows_yearly.append((current_datetime_utc, subtotal))
-            current_datetime_utc = next_datetime_utc
-        return result_rows_yearly
+    return boundaries
 
 
 ########################################################################################################################
-# Get tariffs by energy category
+# Aggregate hourly data by period
+# rows_hourly: list of (start_datetime_utc, actual_value), should belong to one energy_category_id
+# start_datetime_utc: start datetime in utc
+# end_datetime_utc: end datetime in utc
+# period_type: one of the following period types, 'hourly', 'daily', 'monthly' and 'yearly'
+# Note: this procedure doesn't work with multiple energy categories
+# Note: rows are assigned to periods in one pass with binary search on the period boundaries,
+#       so rows_hourly needn't be sorted
 ########################################################################################################################
-def get_energy_category_tariffs(cost_center_id, energy_category_id, start_datetime_utc, end_datetime_utc):
+def aggregate_hourly_data_by_period(rows_hourly, start_datetime_utc, end_datetime_utc, period_type):
     # todo: validate parameters
-    if cost_center_id is None:
-        return dict()
+    boundaries = get_period_boundaries(start_datetime_utc, end_datetime_utc, period_type)
+    if len(boundaries) == 0:
+        return list()
 
-    start_datetime_utc = start_datetime_utc.replace(tzinfo=None)
-    end_datetime_utc = end_datetime_utc.replace(tzinfo=None)
+    period_count = len(boundaries) - 1
+    subtotals = [Decimal(0.0)] * period_count
+    for row in rows_hourly:
+        index = bisect.bisect_right(boundaries, row[0]) - 1
+        if 0 <= index < period_count:
+            subtotals[index] += row[1]
+
+    return list(zip(boundaries[:-1], subtotals))
 
-    # get timezone offset in minutes, this value will be returned to client
+
+########################################################################################################################
+# Get the lookup table of time of use rates by minute of day
+# rates: list of rates with start_time_of_day and end_time_of_day in local time, ordered by start_time_of_day
+# key: the value of rate to look up, 'price' or 'peak_type'
+# Returns: list of 1440 values, the value of the first rate covering the minute or None if no rate covers it
+########################################################################################################################
+def get_minute_of_day_table(rates, key):
+    minute_of_day_table = [None] * 1440
+    for rate in rates:
+        # the minutes in [start_time_of_day, end_time_of_day)
+        start_minute = max(0, math.ceil(rate['start_time_of_day'].total_seconds() / 60))
+        end_minute = min(1440, math.ceil(rate['end_time_of_day'].total_seconds() / 60))
+        for minute in range(start_minute, end_minute):
+            if minute_of_day_table[minute] is None:
+                minute_of_day_table[minute] = rate[key]
+
+    return minute_of_day_table
+
+
+########################################################################################################################
+# Expand tariffs to time slots in the window
+# tariff_dict: tariffs ordered by valid_from_datetime_utc,
+#              with valid_from_datetime_utc, valid_through_datetime_utc and minute of day tables
+# start_datetime_utc: start datetime in utc of the window
+# end_datetime_utc: end datetime in utc of the window, inclusive
+# key: the minute of day table to look up, 'price' or 'peak_type'
+# Returns: dict of time slot start datetime in utc to the value of the rate, later tariffs override earlier ones
+# Note: time slots start from valid_from_datetime_utc in steps of config.minutes_to_count,
+#       only the time slots in both the validity of tariff and the window are expanded
+########################################################################################################################
+def expand_tariffs_in_window(tariff_dict, start_datetime_utc, end_datetime_utc, key):
+    # get timezone offset in minutes
     timezone_offset = int(config.utc_offset[1:3]) * 60 + int(config.utc_offset[4:6])
     if config.utc_offset[0] == '-':
         timezone_offset = -timezone_offset
 
+    result = dict()
+    time_slot = timedelta(minutes=config.minutes_to_count)
+    for tariff_value in tariff_dict.values():
+        valid_from_datetime_utc = tariff_value['valid_from_datetime_utc']
+        valid_through_datetime_utc = tariff_value['valid_through_datetime_utc']
+        minute_of_day_table = tariff_value['minute_of_day_tables'][key]
+
+        # start from the first time slot in the window
+        current_datetime_utc = valid_from_datetime_utc
+        if current_datetime_utc < start_datetime_utc:
+            current_datetime_utc -= ((valid_from_datetime_utc - start_datetime_utc) // time_slot) * time_slot
+
+        while current_datetime_utc < valid_through_datetime_utc and current_datetime_utc <= end_datetime_utc:
+            current_datetime_local = current_datetime_utc + timedelta(minutes=timezone_offset)
+            value = minute_of_day_table[current_datetime_local.hour * 60 + current_datetime_local.minute]
+            if value is not None:
+                result[current_datetime_utc] = value
+
+            # start from the next time slot
+            current_datetime_utc += time_slot
+
+    return result
+
+
+########################################################################################################################
+# Get the compiled tariff schedule by cost center and energy category
+#   cursor_system: optional, cursor of myems_system_db which the caller holds, so that the caller does not wait for a
+#                  second pooled connection of myems_system_db while it holds one
+# Returns: dict of tariffs ordered by valid_from_datetime_utc,
+#          with minute of day tables of price and peak_type
+# Raises: the errors of the queries, such as mysql.connector.errors.PoolError, so that the report fails with an error
+#         instead of reporting without tariffs
+# Note: schedules are cached in the process, call clear_tariff_schedule_cache after tariffs changed
+########################################################################################################################
+tariff_schedule_cache = cache.LRUCache(config.tariff_schedule_cache_max_size,
+                                       config.tariff_schedule_cache_ttl_seconds)
+
+
+def get_energy_category_tariff_schedule(cost_center_id, energy_category_id, cursor_system=None):
+    tariff_dict = tariff_schedule_cache.get((cost_center_id, energy_category_id))
+    if tariff_dict is not None:
+        return tariff_dict
+
     tariff_dict = collections.OrderedDict()
 
     cnx = None
-    cursor = None
+    cursor = cursor_system
     try:
-        cnx = mysql.connector.connect(**config.myems_system_db)
-        cursor = cnx.cursor()
+        if cursor is None:
+            cnx = database.connect(config.myems_system_db)
+            cursor = cnx.cursor()
         query_tariffs = (" SELECT t.id, t.valid_from_datetime_utc, t.valid_through_datetime_utc "
                          " FROM tbl_tariffs t, tbl_cost_centers_tariffs cct "
                          " WHERE t.energy_category_id = %s AND "
                          "       t.id = cct.tariff_id AND "
-                         "       cct.cost_center_id = %s AND "
-                         "       t.valid_through_datetime_utc >= %s AND "
-                         "       t.valid_from_datetime_utc <= %s "
+                         "       cct.cost_center_id = %s "
                          " ORDER BY t.valid_from_datetime_utc ")
-        cursor.execute(query_tariffs, (energy_category_id, cost_center_id, start_datetime_utc, end_datetime_utc,))
+        cursor.execute(query_tariffs, (energy_category_id, cost_center_id,))
         rows_tariffs = cursor.fetchall()
-    except Exception as e:
-        print(str(e))
-        if cnx:
-            cnx.disconnect()
-        if cursor:
-            cursor.close()
-        return dict()
 
-    if rows_tariffs is None or len(rows_tariffs) == 0:
-        if cursor:
-            cursor.close()
+        for row in rows_tariffs:
+            tariff_dict[row[0]] = {'valid_from_datetime_utc': row[1],
+                                   'valid_through_datetime_utc': row[2],
+                                   'rates': list()}
+
+        if len(tariff_dict) > 0:
+            query_timeofuse_tariffs = (" SELECT tariff_id, start_time_of_day, end_time_of_day, price, peak_type "
+                                       " FROM tbl_tariffs_timeofuses "
+                                       " WHERE tariff_id IN ( " + ', '.join(map(str, tariff_dict.keys())) + ")"
+                                       " ORDER BY tariff_id, start_time_of_day ")
+            cursor.execute(query_timeofuse_tariffs, )
+            rows_timeofuse_tariffs = cursor.fetchall()
+
+            for row in rows_timeofuse_tariffs:
+                tariff_dict[row[0]]['rates'].append({'start_time_of_day': row[1],
+                                                     'end_time_of_day': row[2],
+                                                     'price': row[3],
+                                                     'peak_type': row[4]})
+    finally:
         if cnx:
+            cursor.close()
             cnx.disconnect()
-        return dict()
 
-    for row in rows_tariffs:
-        tariff_dict[row[0]] = {'valid_from_datetime_utc': row[1],
-                               'valid_through_datetime_utc': row[2],
-                               'rates': list()}
+    for tariff_value in tariff_dict.values():
+        tariff_value['minute_of_day_tables'] = {'price': get_minute_of_day_table(tariff_value['rates'], 'price'),
+                                                'peak_type': get_minute_of_day_table(tariff_value['rates'],
+                                                                                     'peak_type')}
 
-    try:
-        query_timeofuse_tariffs = (" SELECT tariff_id, start_time_of_day, end_time_of_day, price "
-                                   " FROM tbl_tariffs_timeofuses "
-                                   " WHERE tariff_id IN ( " + ', '.join(map(str, tariff_dict.keys())) + ")"
-                                   " ORDER BY tariff_id, start_time_of_day ")
-        cursor.execute(query_timeofuse_tariffs, )
-        rows_timeofuse_tariffs = cursor.fetchall()
-    except Exception as e:
-        print(str(e))
-        if cnx:
-            cnx.disconnect()
-        if cursor:
-            cursor.close()
-        return dict()
+    tariff_schedule_cache.set((cost_center_id, energy_category_id), tariff_dict)
+    return tariff_dict
 
-    if cursor:
-        cursor.close()
-    if cnx:
-        cnx.disconnect()
 
-    if rows_timeofuse_tariffs is None or len(rows_timeofuse_tariffs) == 0:
-        return dict()
+########################################################################################################################
+# Clear the cached tariff schedules
+# Note: only the cache of the current process is cleared, other processes refresh on expiration
+########################################################################################################################
+def clear_tariff_schedule_cache():
+    tariff_schedule_cache.clear()
 
-    for row in rows_timeofuse_tariffs:
-        tariff_dict[row[0]]['rates'].append({'start_time_of_day': row[1],
-                                             'end_time_of_day': row[2],
-                                             'price': row[3]})
 
-    result = dict()
-    for tariff_id, tariff_value in tariff_dict.items():
-        current_datetime_utc = tariff_value['valid_from_datetime_utc']
-        while current_datetime_utc < tariff_value['valid_through_datetime_utc']:
-            for rate in tariff_value['rates']:
-                current_datetime_local = current_datetime_utc + timedelta(minutes=timezone_offset)
-                seconds_since_midnight = (current_datetime_local -
-                                          current_datetime_local.replace(hour=0,
-                                                                         second=0,
-                                                                         microsecond=0,
-                                                                         tzinfo=None)).total_seconds()
-                if rate['start_time_of_day'].total_seconds() <= \
-                        seconds_since_midnight < rate['end_time_of_day'].total_seconds():
-                    result[current_datetime_utc] = rate['price']
-                    break
+########################################################################################################################
+# Get tariffs by energy category
+#   cursor_system: optional, cursor of myems_system_db which the caller holds
+########################################################################################################################
+def get_energy_category_tariffs(cost_center_id, energy_category_id, start_datetime_utc, end_datetime_utc,
+                                cursor_system=None):
+    # todo: validate parameters
+    if cost_center_id is None:
+        return dict()
 
-            # start from the next time slot
-            current_datetime_utc += timedelta(minutes=config.minutes_to_count)
+    start_datetime_utc = start_datetime_utc.replace(tzinfo=None)
+    end_datetime_utc = end_datetime_utc.replace(tzinfo=None)
+
+    tariff_dict = get_energy_category_tariff_schedule(cost_center_id, energy_category_id, cursor_system)
+    if len(tariff_dict) == 0:
+        return dict()
 
-    return {k: v for k, v in result.items() if start_datetime_utc <= k <= end_datetime_utc}
+    return expand_tariffs_in_window(tariff_dict, start_datetime_utc, end_datetime_utc, 'price')
 
 
 ########################################################################################################################
 # Get peak types of tariff by energy category
 # peak types: toppeak, onpeak, midpeak, offpeak
+#   cursor_system: optional, cursor of myems_system_db which the caller holds
 ########################################################################################################################
-def get_energy_category_peak_types(cost_center_id, energy_category_id, start_datetime_utc, end_datetime_utc):
+def get_energy_category_peak_types(cost_center_id, energy_category_id, start_datetime_utc, end_datetime_utc,
+                                   cursor_system=None):
     # todo: validate parameters
     if cost_center_id is None:
         return dict()
@@ -278,339 +283,287 @@ def get_energy_category_peak_types(cost_center_id, energy_category_id, start_dat
     start_datetime_utc = start_datetime_utc.replace(tzinfo=None)
     end_datetime_utc = end_datetime_utc.replace(tzinfo=None)
 
-    # get timezone offset in minutes, this value will be returned to client
-    timezone_offset = int(config.utc_offset[1:3]) * 60 + int(config.utc_offset[4:6])
-    if config.utc_offset[0] == '-':
-        timezone_offset = -timezone_offset
-
-    tariff_dict = collections.OrderedDict()
-
-    cnx = None
-    cursor = None
-    try:
-        cnx = mysql.connector.connect(**config.myems_system_db)
-        cursor = cnx.cursor()
-        query_tariffs = (" SELECT t.id, t.valid_from_datetime_utc, t.valid_through_datetime_utc "
-                         " FROM tbl_tariffs t, tbl_cost_centers_tariffs cct "
-                         " WHERE t.energy_category_id = %s AND "
-                         "       t.id = cct.tariff_id AND "
-                         "       cct.cost_center_id = %s AND "
-                         "       t.valid_through_datetime_utc >= %s AND "
-                         "       t.valid_from_datetime_utc <= %s "
-                         " ORDER BY t.valid_from_datetime_utc ")
-        cursor.execute(query_tariffs, (energy_category_id, cost_center_id, start_datetime_utc, end_datetime_utc,))
-        rows_tariffs = cursor.fetchall()
-    except Exception as e:
-        print(str(e))
-        if cnx:
-            cnx.disconnect()
-        if cursor:
-            cursor.close()
+    tariff_dict = get_energy_category_tariff_schedule(cost_center_id, energy_category_id, cursor_system)
+    if len(tariff_dict) == 0:
         return dict()
 
-    if rows_tariffs is None or len(rows_tariffs) == 0:
-        if cursor:
-            cursor.close()
-        if cnx:
-            cnx.disconnect()
-        return dict()
+    return expand_tariffs_in_window(tariff_dict, start_datetime_utc, end_datetime_utc, 'peak_type')
 
-    for row in rows_tariffs:
-        tariff_dict[row[0]] = {'valid_from_datetime_utc': row[1],
-                               'valid_through_datetime_utc': row[2],
-                               'rates': list()}
 
-    try:
-        query_timeofuse_tariffs = (" SELECT tariff_id, start_time_of_day, end_time_of_day, peak_type "
-                                   " FROM tbl_tariffs_timeofuses "
-                                   " WHERE tariff_id IN ( " + ', '.join(map(str, tariff_dict.keys())) + ")"
-                                   " ORDER BY tariff_id, start_time_of_day ")
-        cursor.execute(query_timeofuse_tariffs, )
-        rows_timeofuse_tariffs = cursor.fetchall()
-    except Exception as e:
-        print(str(e))
-        if cnx:
-            cnx.disconnect()
-        if cursor:
-            cursor.close()
-        return dict()
-
-    if cursor:
-        cursor.close()
-    if cnx:
-        cnx.disconnect()
-
-    if rows_timeofuse_tariffs is None or len(rows_timeofuse_tariffs) == 0:
-        return dict()
+########################################################################################################################
+# Tables of point values by object type
+########################################################################################################################
+point_value_tables = collections.OrderedDict([('ANALOG_VALUE', 'tbl_analog_value'),
+                                              ('ENERGY_VALUE', 'tbl_energy_value'),
+                                              ('DIGITAL_VALUE', 'tbl_digital_value')])
 
-    for row in rows_timeofuse_tariffs:
-        tariff_dict[row[0]]['rates'].append({'start_time_of_day': row[1],
-                                             'end_time_of_day': row[2],
-                                             'peak_type': row[3]})
 
-    result = dict()
-    for tariff_id, tariff_value in tariff_dict.items():
-        current_datetime_utc = tariff_value['valid_from_datetime_utc']
-        while current_datetime_utc < tariff_value['valid_through_datetime_utc']:
-            for rate in tariff_value['rates']:
-                current_datetime_local = current_datetime_utc + timedelta(minutes=timezone_offset)
-                seconds_since_midnight = (current_datetime_local -
-                                          current_datetime_local.replace(hour=0,
-                                                                         second=0,
-                                                                         microsecond=0,
-                                                                         tzinfo=None)).total_seconds()
-                if rate['start_time_of_day'].total_seconds() <= \
-                        seconds_since_midnight < rate['end_time_of_day'].total_seconds():
-                    result[current_datetime_utc] = rate['peak_type']
-                    break
+########################################################################################################################
+# Fetch rows of the executed query from the cursor in chunks
+########################################################################################################################
+def fetch_rows(cursor, chunk_size=1000):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if rows is None or len(rows) == 0:
+            break
+        for row in rows:
+            yield row
 
-            # start from the next time slot
-            current_datetime_utc += timedelta(minutes=config.minutes_to_count)
 
-    return {k: v for k, v in result.items() if start_datetime_utc <= k <= end_datetime_utc}
+########################################################################################################################
+# Get history values of points with one query per object type
+#   cursor_historical: cursor of myems_historical_db
+#   point_list: list of points with id and object_type
+#   start_datetime_utc: start datetime in utc, inclusive
+#   end_datetime_utc: end datetime in utc, inclusive
+# Returns: generator of (point_id, rows) grouped per point,
+#          rows is an iterator of (utc_date_time, actual_value) ordered by utc_date_time
+# Note: rows of a point must be consumed before getting the next point, as they are streamed from the cursor
+########################################################################################################################
+def get_points_history_values(cursor_historical, point_list, start_datetime_utc, end_datetime_utc):
+    point_ids_dict = collections.OrderedDict()
+    for point in point_list:
+        if point['object_type'] in point_value_tables:
+            point_ids_dict.setdefault(point['object_type'], collections.OrderedDict())[point['id']] = None
+
+    for object_type, point_ids in point_ids_dict.items():
+        query = (" SELECT point_id, utc_date_time, actual_value "
+                 " FROM " + point_value_tables[object_type] +
+                 " WHERE point_id IN ( " + ', '.join(map(str, point_ids.keys())) + " ) "
+                 "       AND utc_date_time BETWEEN %s AND %s "
+                 " ORDER BY point_id, utc_date_time ")
+        cursor_historical.execute(query, (start_datetime_utc, end_datetime_utc))
+
+        rows = fetch_rows(cursor_historical)
+        try:
+            for point_id, point_rows in itertools.groupby(rows, key=lambda row: row[0]):
+                yield point_id, ((row[1], row[2]) for row in point_rows)
+        finally:
+            # read out the rest rows if the caller stopped early, so that the cursor can be used again
+            for _ in rows:
+                pass
 
 
 ########################################################################################################################
-# Averaging calculator of hourly data by period
-#   rows_hourly: list of (start_datetime_utc, actual_value), should belong to one energy_category_id
-#   start_datetime_utc: start datetime in utc
-#   end_datetime_utc: end datetime in utc
-#   period_type: one of the following period types, 'hourly', 'daily', 'monthly' and 'yearly'
-# Returns: periodically data of average and maximum
-# Note: this procedure doesn't work with multiple energy categories
+# Get the latest values of points with one query per object type
+# The latest values are cached in the process by point for config.latest_value_cache_ttl_seconds, so repeated polls of
+# realtime reports are served without querying myems_historical_db.
+#   point_list: list of points with id and object_type
+#   start_datetime_utc: the earliest utc_date_time of valid values, older values are timed out
+# Returns: dict of actual values by point id, missing if no valid value
 ########################################################################################################################
-def averaging_hourly_data_by_period(rows_hourly, start_datetime_utc, end_datetime_utc, period_type):
-    # todo: validate parameters
+point_latest_value_tables = collections.OrderedDict([('ANALOG_VALUE', 'tbl_analog_value_latest'),
+                                                     ('ENERGY_VALUE', 'tbl_energy_value_latest'),
+                                                     ('DIGITAL_VALUE', 'tbl_digital_value_latest')])
+latest_value_cache = cache.LRUCache(config.latest_value_cache_max_size, config.latest_value_cache_ttl_seconds)
+
+
+def get_points_latest_values(point_list, start_datetime_utc):
+    # (utc_date_time, actual_value) by point id, or None if the point has no latest value
+    latest_dict = dict()
+    point_ids_dict = collections.OrderedDict()
+    for point in point_list:
+        if point['object_type'] not in point_latest_value_tables or point['id'] in latest_dict:
+            continue
+        latest = latest_value_cache.get(point['id'], False)
+        if latest is False:
+            point_ids_dict.setdefault(point['object_type'], collections.OrderedDict())[point['id']] = None
+        else:
+            latest_dict[point['id']] = latest
+
+    if len(point_ids_dict) > 0:
+        cnx_historical = database.connect(config.myems_historical_db)
+        cursor_historical = cnx_historical.cursor()
+        try:
+            for object_type, point_ids in point_ids_dict.items():
+                query = (" SELECT point_id, utc_date_time, actual_value "
+                         " FROM " + point_latest_value_tables[object_type] +
+                         " WHERE point_id IN ( " + ', '.join(map(str, point_ids.keys())) + " ) ")
+                cursor_historical.execute(query)
+                rows = cursor_historical.fetchall()
+                for point_id in point_ids.keys():
+                    latest_dict[point_id] = None
+                if rows is not None and len(rows) > 0:
+                    for row in rows:
+                        latest_dict[row[0]] = (row[1], row[2])
+                for point_id in point_ids.keys():
+                    latest_value_cache.set(point_id, latest_dict[point_id])
+        finally:
+            cursor_historical.close()
+            cnx_historical.disconnect()
+
     start_datetime_utc = start_datetime_utc.replace(tzinfo=None)
-    end_datetime_utc = end_datetime_utc.replace(tzinfo=None)
+    return {point_id: latest[1] for point_id, latest in latest_dict.items()
+            if latest is not None and latest[0] > start_datetime_utc}
 
-    if period_type == "hourly":
-        result_rows_hourly = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
-        total = Decimal(0.0)
-        maximum = None
-        counter = 0
-        current_datetime_utc = start_datetime_utc.replace(minute=0, second=0, microsecond=0, tzinfo=None)
-        while current_datetime_utc <= end_datetime_utc:
-            sub_total = Decimal(0.0)
-            sub_maximum = None
-            sub_counter = 0
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < current_datetime_utc + \
-                        timedelta(minutes=config.minutes_to_count):
-                    sub_total += row[1]
-                    if sub_maximum is None:
-                        sub_maximum = row[1]
-                    elif sub_maximum < row[1]:
-                        sub_maximum = row[1]
-                    sub_counter += 1
-
-            sub_average = (sub_total / sub_counter) if sub_counter > 0 else None
-            result_rows_hourly.append((current_datetime_utc, sub_average, sub_maximum))
-
-            total += sub_total
-            counter += sub_counter
-            if sub_maximum is None:
-                pass
-            elif maximum is None:
-                maximum = sub_maximum
-            elif maximum < sub_maximum:
-                maximum = sub_maximum
 
-            current_datetime_utc += timedelta(minutes=config.minutes_to_count)
+########################################################################################################################
+# Get subtotals of hourly data of child spaces with one query
+#   cursor: cursor of the database of the table, such as myems_energy_db, myems_billing_db or the baseline databases
+#   table: hourly table of spaces, such as tbl_space_input_category_hourly or tbl_space_input_item_hourly
+#   key_column: energy_category_id or energy_item_id
+#   child_space_list: list of child spaces with id
+#   key_set: set of energy category ids or energy item ids
+#   start_datetime_utc: start datetime in utc, inclusive
+#   end_datetime_utc: end datetime in utc, exclusive
+# Returns: dict of subtotals by (space_id, key), missing if no data
+########################################################################################################################
+def get_child_spaces_subtotals(cursor, table, key_column, child_space_list, key_set,
+                               start_datetime_utc, end_datetime_utc):
+    subtotals = dict()
+    if child_space_list is None or len(child_space_list) == 0 or key_set is None or len(key_set) == 0:
+        return subtotals
+
+    query = (" SELECT space_id, " + key_column + ", SUM(actual_value) "
+             " FROM " + table +
+             " WHERE space_id IN ( " + ', '.join(str(child_space['id']) for child_space in child_space_list) + " ) "
+             "     AND " + key_column + " IN ( " + ', '.join(map(str, key_set)) + " ) "
+             "     AND start_datetime_utc >= %s "
+             "     AND start_datetime_utc < %s "
+             " GROUP BY space_id, " + key_column)
+    cursor.execute(query, (start_datetime_utc, end_datetime_utc))
+    rows = cursor.fetchall()
+    if rows is not None and len(rows) > 0:
+        for row in rows:
+            if row[2] is not None:
+                subtotals[(row[0], row[1])] = row[2]
+
+    return subtotals
 
-        average = total / counter if counter > 0 else None
-        return result_rows_hourly, average, maximum
 
-    elif period_type == "daily":
-        result_rows_daily = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
-        total = Decimal(0.0)
-        maximum = None
-        counter = 0
-        # calculate the start datetime in utc of the first day in local
-        start_datetime_local = start_datetime_utc + timedelta(hours=int(config.utc_offset[1:3]))
-        current_datetime_utc = start_datetime_local.replace(hour=0) - timedelta(hours=int(config.utc_offset[1:3]))
-        while current_datetime_utc <= end_datetime_utc:
-            sub_total = Decimal(0.0)
-            sub_maximum = None
-            sub_counter = 0
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < current_datetime_utc + timedelta(days=1):
-                    sub_total += row[1]
-                    if sub_maximum is None:
-                        sub_maximum = row[1]
-                    elif sub_maximum < row[1]:
-                        sub_maximum = row[1]
-                    sub_counter += 1
-
-            sub_average = (sub_total / sub_counter) if sub_counter > 0 else None
-            result_rows_daily.append((current_datetime_utc, sub_average, sub_maximum))
-            total += sub_total
-            counter += sub_counter
-            if sub_maximum is None:
-                pass
-            elif maximum is None:
-                maximum = sub_maximum
-            elif maximum < sub_maximum:
-                maximum = sub_maximum
-            current_datetime_utc += timedelta(days=1)
+########################################################################################################################
+# Get subtotals, counters and maximums of hourly data by period
+#   rows_hourly: list of (start_datetime_utc, actual_value), should belong to one energy_category_id
+#   boundaries: period boundaries returned by get_period_boundaries
+# Returns: lists of subtotal, counter and maximum of every period, maximum is None if no data in the period
+# Note: rows are assigned to periods in one pass with binary search on the period boundaries
+########################################################################################################################
+def get_period_subtotals(rows_hourly, boundaries):
+    period_count = len(boundaries) - 1 if len(boundaries) > 0 else 0
+    subtotals = [Decimal(0.0)] * period_count
+    counters = [0] * period_count
+    maximums = [None] * period_count
+    for row in rows_hourly:
+        index = bisect.bisect_right(boundaries, row[0]) - 1
+        if 0 <= index < period_count:
+            subtotals[index] += row[1]
+            counters[index] += 1
+            if maximums[index] is None or maximums[index] < row[1]:
+                maximums[index] = row[1]
+
+    return subtotals, counters, maximums
 
-        average = total / counter if counter > 0 else None
-        return result_rows_daily, average, maximum
 
-    elif period_type == "monthly":
-        result_rows_monthly = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
-        total = Decimal(0.0)
-        maximum = None
-        counter = 0
-        # calculate the start datetime in utc of the first day in the first month in local
-        start_datetime_local = start_datetime_utc + timedelta(hours=int(config.utc_offset[1:3]))
-        current_datetime_utc = \
-            start_datetime_local.replace(day=1, hour=0) - timedelta(hours=int(config.utc_offset[1:3]))
+########################################################################################################################
+# Get subtotals, counters and maximums of hourly data by period with NumPy
+#   rows_hourly: list of (start_datetime_utc, actual_value), should belong to one energy_category_id
+#   boundaries: period boundaries returned by get_period_boundaries
+# Returns: the same as get_period_subtotals, or None if the data can't be calculated exactly with NumPy
+# Note: NumPy only buckets the values, which are scaled to exact int64 by their decimal places, so subtotals are exact
+#       Decimals with the decimal places of the values in their periods, and maximums are the values of the rows,
+#       the same as get_period_subtotals
+########################################################################################################################
+def get_period_subtotals_numpy(rows_hourly, boundaries):
+    period_count = len(boundaries) - 1 if len(boundaries) > 0 else 0
+    subtotals = [Decimal(0.0)] * period_count
+    counters = [0] * period_count
+    maximums = [None] * period_count
+    if period_count == 0 or len(rows_hourly) == 0:
+        return subtotals, counters, maximums
+
+    if not all(row[1].is_finite() for row in rows_hourly):
+        return None
+    # decimal places of the values, the sum of Decimal(0.0) and the values has the most of them
+    value_places = np.array([max(-row[1].as_tuple().exponent, 0) for row in rows_hourly], dtype=np.int64)
+    places = int(value_places.max())
+    # scaled values and their sums must be exactly representable
+    scaled_values = [int(row[1].scaleb(places)) for row in rows_hourly]
+    if sum(abs(value) for value in scaled_values) >= 2 ** 63:
+        return None
+    scaled_values = np.array(scaled_values, dtype=np.int64)
+
+    timestamps = np.array([row[0] for row in rows_hourly], dtype='datetime64[us]')
+    indexes = np.searchsorted(np.array(boundaries, dtype='datetime64[us]'), timestamps, side='right') - 1
+    positions = np.flatnonzero((indexes >= 0) & (indexes < period_count))
+    if len(positions) == 0:
+        return subtotals, counters, maximums
+
+    # rows of the same period are kept in their order, so the first of equal maximums is the maximum
+    positions = positions[np.argsort(indexes[positions], kind='stable')]
+    indexes = indexes[positions]
+    scaled_values = scaled_values[positions]
+    value_places = value_places[positions]
+    group_starts = np.concatenate(([0], np.flatnonzero(np.diff(indexes)) + 1))
+    group_indexes = indexes[group_starts]
+    group_subtotals = np.add.reduceat(scaled_values, group_starts)
+    group_counters = np.diff(np.append(group_starts, len(indexes)))
+    group_places = np.maximum.reduceat(value_places, group_starts)
+    group_maximums = np.maximum.reduceat(scaled_values, group_starts)
+    is_maximum = scaled_values == np.repeat(group_maximums, group_counters)
+    group_maximum_positions = positions[np.minimum.reduceat(np.where(is_maximum, np.arange(len(positions)),
+                                                                     len(positions)), group_starts)]
+
+    for index, subtotal, counter, subtotal_places, maximum_position in zip(group_indexes.tolist(),
+                                                                           group_subtotals.tolist(),
+                                                                           group_counters.tolist(),
+                                                                           group_places.tolist(),
+                                                                           group_maximum_positions.tolist()):
+        subtotals[index] = Decimal(subtotal).scaleb(-places).quantize(Decimal(1).scaleb(-subtotal_places))
+        counters[index] = counter
+        maximums[index] = rows_hourly[maximum_position][1]
+
+    return subtotals, counters, maximums
 
-        while current_datetime_utc <= end_datetime_utc:
-            # calculate the next datetime in utc
-            if current_datetime_utc.month == 1:
-                temp_day = 28
-                ny = current_datetime_utc.year
-                if (ny % 100 != 0 and ny % 4 == 0) or (ny % 100 == 0 and ny % 400 == 0):
-                    temp_day = 29
-
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=temp_day,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month == 2:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month in [3, 5, 8, 10]:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=30,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month == 7:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month in [4, 6, 9, 11]:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month == 12:
-                next_datetime_utc = datetime(year=current_datetime_utc.year + 1,
-                                             month=1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-
-            sub_total = Decimal(0.0)
-            sub_maximum = None
-            sub_counter = 0
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < next_datetime_utc:
-                    sub_total += row[1]
-                    if sub_maximum is None:
-                        sub_maximum = row[1]
-                    elif sub_maximum < row[1]:
-                        sub_maximum = row[1]
-                    sub_counter += 1
-
-            sub_average = (sub_total / sub_counter) if sub_counter > 0 else None
-            result_rows_monthly.append((current_datetime_utc, sub_average, sub_maximum))
-            total += sub_total
-            counter += sub_counter
-            if sub_maximum is None:
-                pass
-            elif maximum is None:
-                maximum = sub_maximum
-            elif maximum < sub_maximum:
-                maximum = sub_maximum
-            current_datetime_utc = next_datetime_utc
 
-        average = total / counter if counter > 0 else None
-        return result_rows_monthly, average, maximum
+########################################################################################################################
+# Get subtotals, counters and maximums of hourly data by period with NumPy if enabled and installed,
+# otherwise with the exact Decimal calculation
+########################################################################################################################
+def get_period_subtotals_by_config(rows_hourly, boundaries):
+    if np is not None and config.is_numpy_enabled:
+        result = get_period_subtotals_numpy(rows_hourly, boundaries)
+        if result is not None:
+            return result
 
-    elif period_type == "yearly":
-        result_rows_yearly = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
-        total = Decimal(0.0)
-        maximum = None
-        counter = 0
-        # calculate the start datetime in utc of the first day in the first month in local
-        start_datetime_local = start_datetime_utc + timedelta(hours=int(config.utc_offset[1:3]))
-        current_datetime_utc = start_datetime_local.replace(month=1, day=1, hour=0) - timedelta(
-            hours=int(config.utc_offset[1:3]))
+    return get_period_subtotals(rows_hourly, boundaries)
 
-        while current_datetime_utc <= end_datetime_utc:
-            # calculate the next datetime in utc
-            # todo: timedelta of year
-            next_datetime_utc = datetime(year=current_datetime_utc.year + 2,
-                                         month=1,
-                                         day=1,
-                                         hour=current_datetime_utc.hour,
-                                         minute=current_datetime_utc.minute,
-                                         second=current_datetime_utc.second,
-                                         microsecond=current_datetime_utc.microsecond,
-                                         tzinfo=current_datetime_utc.tzinfo) - timedelta(days=1)
-            sub_total = Decimal(0.0)
-            sub_maximum = None
-            sub_counter = 0
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < next_datetime_utc:
-                    sub_total += row[1]
-                    if sub_maximum is None:
-                        sub_maximum = row[1]
-                    elif sub_maximum < row[1]:
-                        sub_maximum = row[1]
-                    sub_counter += 1
-
-            sub_average = (sub_total / sub_counter) if sub_counter > 0 else None
-            result_rows_yearly.append((current_datetime_utc, sub_average, sub_maximum))
-            total += sub_total
-            counter += sub_counter
-            if sub_maximum is None:
-                pass
-            elif maximum is None:
-                maximum = sub_maximum
-            elif maximum < sub_maximum:
-                maximum = sub_maximum
-            current_datetime_utc = next_datetime_utc
 
-        average = total / counter if counter > 0 else None
-        return result_rows_yearly, average, maximum
+########################################################################################################################
+# Averaging calculator of hourly data by period
+#   rows_hourly: list of (start_datetime_utc, actual_value), should belong to one energy_category_id
+#   start_datetime_utc: start datetime in utc
+#   end_datetime_utc: end datetime in utc
+#   period_type: one of the following period types, 'hourly', 'daily', 'monthly' and 'yearly'
+# Returns: periodically data of average and maximum
+# Note: this procedure doesn't work with multiple energy categories
+########################################################################################################################
+def averaging_hourly_data_by_period(rows_hourly, start_datetime_utc, end_datetime_utc, period_type):
+    # todo: validate parameters
+    boundaries = get_period_boundaries(start_datetime_utc, end_datetime_utc, period_type)
+    sub_totals, sub_counters, sub_maximums = get_period_subtotals_by_config(rows_hourly, boundaries)
+
+    result_rows_periodically = list()
+    total = Decimal(0.0)
+    maximum = None
+    counter = 0
+    for current_datetime_utc, sub_total, sub_counter, sub_maximum in zip(boundaries,
+                                                                         sub_totals,
+                                                                         sub_counters,
+                                                                         sub_maximums):
+        sub_average = (sub_total / sub_counter) if sub_counter > 0 else None
+        result_rows_periodically.append((current_datetime_utc, sub_average, sub_maximum))
+
+        total += sub_total
+        counter += sub_counter
+        if sub_maximum is None:
+            pass
+        elif maximum is None:
+            maximum = sub_maximum
+        elif maximum < sub_maximum:
+            maximum = sub_maximum
+
+    average = total / counter if counter > 0 else None
+    return result_rows_periodically, average, maximum
 
 
 ########################################################################################################################
@@ -621,257 +574,25 @@ def averaging_hourly_data_by_period(rows_hourly, start_datetime_utc, end_datetim
 #   period_type: one of the following period types, 'hourly', 'daily', 'monthly' and 'yearly'
 # Returns: periodically data of values and statistics of mean, median, minimum, maximum, stdev and variance
 # Note: this procedure doesn't work with multiple energy categories
+# Note: mean, median, stdev and variance are always calculated with exact Decimals, NumPy only buckets the values
 ########################################################################################################################
 def statistics_hourly_data_by_period(rows_hourly, start_datetime_utc, end_datetime_utc, period_type):
     # todo: validate parameters
-    start_datetime_utc = start_datetime_utc.replace(tzinfo=None)
-    end_datetime_utc = end_datetime_utc.replace(tzinfo=None)
-
-    if period_type == "hourly":
-        result_rows_hourly = list()
-        sample_data = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
-        counter = 0
-        mean = None
-        median = None
-        minimum = None
-        maximum = None
-        stdev = None
-        variance = None
-        current_datetime_utc = start_datetime_utc.replace(minute=0, second=0, microsecond=0, tzinfo=None)
-        while current_datetime_utc <= end_datetime_utc:
-            sub_total = Decimal(0.0)
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < current_datetime_utc + \
-                        timedelta(minutes=config.minutes_to_count):
-                    sub_total += row[1]
-
-            result_rows_hourly.append((current_datetime_utc, sub_total))
-            sample_data.append(sub_total)
-
-            counter += 1
-            if minimum is None:
-                minimum = sub_total
-            elif minimum > sub_total:
-                minimum = sub_total
-
-            if maximum is None:
-                maximum = sub_total
-            elif maximum < sub_total:
-                maximum = sub_total
-
-            current_datetime_utc += timedelta(minutes=config.minutes_to_count)
-
-        if len(sample_data) > 1:
-            mean = statistics.mean(sample_data)
-            median = statistics.median(sample_data)
-            stdev = statistics.stdev(sample_data)
-            variance = statistics.variance(sample_data)
-
-        return result_rows_hourly, mean, median, minimum, maximum, stdev, variance
-
-    elif period_type == "daily":
-        result_rows_daily = list()
-        sample_data = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
-        counter = 0
-        mean = None
-        median = None
-        minimum = None
-        maximum = None
-        stdev = None
-        variance = None
-        # calculate the start datetime in utc of the first day in local
-        start_datetime_local = start_datetime_utc + timedelta(hours=int(config.utc_offset[1:3]))
-        current_datetime_utc = start_datetime_local.replace(hour=0) - timedelta(hours=int(config.utc_offset[1:3]))
-        while current_datetime_utc <= end_datetime_utc:
-            sub_total = Decimal(0.0)
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < current_datetime_utc + timedelta(days=1):
-                    sub_total += row[1]
-
-            result_rows_daily.append((current_datetime_utc, sub_total))
-            sample_data.append(sub_total)
-
-            counter += 1
-            if minimum is None:
-                minimum = sub_total
-            elif minimum > sub_total:
-                minimum = sub_total
-
-            if maximum is None:
-                maximum = sub_total
-            elif maximum < sub_total:
-                maximum = sub_total
-            current_datetime_utc += timedelta(days=1)
-
-        if len(sample_data) > 1:
-            mean = statistics.mean(sample_data)
-            median = statistics.median(sample_data)
-            stdev = statistics.stdev(sample_data)
-            variance = statistics.variance(sample_data)
-
-        return result_rows_daily, mean, median, minimum, maximum, stdev, variance
-
-    elif period_type == "monthly":
-        result_rows_monthly = list()
-        sample_data = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
-        counter = 0
-        mean = None
-        median = None
-        minimum = None
-        maximum = None
-        stdev = None
-        variance = None
-        # calculate the start datetime in utc of the first day in the first month in local
-        start_datetime_local = start_datetime_utc + timedelta(hours=int(config.utc_offset[1:3]))
-        current_datetime_utc = \
-            start_datetime_local.replace(day=1, hour=0) - timedelta(hours=int(config.utc_offset[1:3]))
-
-        while current_datetime_utc <= end_datetime_utc:
-            # calculate the next datetime in utc
-            if current_datetime_utc.month == 1:
-                temp_day = 28
-                ny = current_datetime_utc.year
-                if (ny % 100 != 0 and ny % 4 == 0) or (ny % 100 == 0 and ny % 400 == 0):
-                    temp_day = 29
-
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=temp_day,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month == 2:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month in [3, 5, 8, 10]:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=30,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month == 7:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month in [4, 6, 9, 11]:
-                next_datetime_utc = datetime(year=current_datetime_utc.year,
-                                             month=current_datetime_utc.month + 1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-            elif current_datetime_utc.month == 12:
-                next_datetime_utc = datetime(year=current_datetime_utc.year + 1,
-                                             month=1,
-                                             day=31,
-                                             hour=current_datetime_utc.hour,
-                                             minute=current_datetime_utc.minute,
-                                             second=0,
-                                             microsecond=0,
-                                             tzinfo=None)
-
-            sub_total = Decimal(0.0)
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < next_datetime_utc:
-                    sub_total += row[1]
-
-            result_rows_monthly.append((current_datetime_utc, sub_total))
-            sample_data.append(sub_total)
-
-            counter += 1
-            if minimum is None:
-                minimum = sub_total
-            elif minimum > sub_total:
-                minimum = sub_total
-
-            if maximum is None:
-                maximum = sub_total
-            elif maximum < sub_total:
-                maximum = sub_total
-            current_datetime_utc = next_datetime_utc
-
-        if len(sample_data) > 1:
-            mean = statistics.mean(sample_data)
-            median = statistics.median(sample_data)
-            stdev = statistics.stdev(sample_data)
-            variance = statistics.variance(sample_data)
-
-        return result_rows_monthly, mean, median, minimum, maximum, stdev, variance
-
-    elif period_type == "yearly":
-        result_rows_yearly = list()
-        sample_data = list()
-        # todo: add config.working_day_start_time_local
-        # todo: add config.minutes_to_count
-        mean = None
-        median = None
-        minimum = None
-        maximum = None
-        stdev = None
-        variance = None
-        # calculate the start datetime in utc of the first day in the first month in local
-        start_datetime_local = start_datetime_utc + timedelta(hours=int(config.utc_offset[1:3]))
-        current_datetime_utc = start_datetime_local.replace(month=1, day=1, hour=0) - timedelta(
-            hours=int(config.utc_offset[1:3]))
-
-        while current_datetime_utc <= end_datetime_utc:
-            # calculate the next datetime in utc
-            # todo: timedelta of year
-            next_datetime_utc = datetime(year=current_datetime_utc.year + 2,
-                                         month=1,
-                                         day=1,
-                                         hour=current_datetime_utc.hour,
-                                         minute=current_datetime_utc.minute,
-                                         second=current_datetime_utc.second,
-                                         microsecond=current_datetime_utc.microsecond,
-                                         tzinfo=current_datetime_utc.tzinfo) - timedelta(days=1)
-            sub_total = Decimal(0.0)
-            for row in rows_hourly:
-                if current_datetime_utc <= row[0] < next_datetime_utc:
-                    sub_total += row[1]
-
-            result_rows_yearly.append((current_datetime_utc, sub_total))
-            sample_data.append(sub_total)
-
-            if minimum is None:
-                minimum = sub_total
-            elif minimum > sub_total:
-                minimum = sub_total
-            if maximum is None:
-                maximum = sub_total
-            elif maximum < sub_total:
-                maximum = sub_total
-
-            current_datetime_utc = next_datetime_utc
-
-        if len(sample_data) > 1:
-            mean = statistics.mean(sample_data)
-            median = statistics.median(sample_data)
-            stdev = statistics.stdev(sample_data)
-            variance = statistics.variance(sample_data)
-
-        return result_rows_yearly, mean, median, minimum, maximum, stdev, variance
+    boundaries = get_period_boundaries(start_datetime_utc, end_datetime_utc, period_type)
+    sample_data, _, _ = get_period_subtotals_by_config(rows_hourly, boundaries)
+
+    result_rows_periodically = list(zip(boundaries, sample_data))
+    mean = None
+    median = None
+    minimum = min(sample_data) if len(sample_data) > 0 else None
+    maximum = max(sample_data) if len(sample_data) > 0 else None
+    stdev = None
+    variance = None
+
+    if len(sample_data) > 1:
+        mean = statistics.mean(sample_data)
+        median = statistics.median(sample_data)
+        stdev = statistics.stdev(sample_data)
+        variance = statistics.variance(sample_data)
+
+    return result_rows_periodically, mean, median, minimum, maximum, stdev, variance
@@ -1,6 +1,6 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 import uuid
 
@@ -16,7 +16,7 @@ class VirtualMeterCollection:
 
     @staticmethod
     def on_get(req, resp):
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid "
@@ -62,6 +62,8 @@ class VirtualMeterCollection:
         cursor.execute(query)
         rows_virtual_meters = cursor.fetchall()
 
+        expression_dict = get_expressions(cursor)
+
         result = list()
         if rows_virtual_meters is not None and len(rows_virtual_meters) > 0:
             for row in rows_virtual_meters:
@@ -76,67 +78,7 @@ class VirtualMeterCollection:
                                "energy_item": energy_item,
                                "cost_center": cost_center,
                                "description": row['description'],
-                               "expression": {}}
-
-                expression = dict()
-                query_expression = (" SELECT e.id, e.uuid, e.equation "
-                                    " FROM tbl_expressions e "
-                                    " WHERE e.virtual_meter_id = %s ")
-                cursor.execute(query_expression, (row['id'],))
-                row_expression = cursor.fetchone()
-
-                if row_expression is not None:
-                    expression = {'id': row_expression['id'],
-                                  'uuid': row_expression['uuid'],
-                                  'equation': row_expression['equation'],
-                                  'variables': []}
-
-                    query_variables = (" SELECT v.id, v.name, v.meter_type, v.meter_id "
-                                       " FROM tbl_expressions e, tbl_variables v "
-                                       " WHERE e.id = %s AND v.expression_id = e.id "
-                                       " ORDER BY v.name ")
-                    cursor.execute(query_variables, (row_expression['id'],))
-                    rows_variables = cursor.fetchall()
-                    if rows_variables is not None:
-                        for row_variable in rows_variables:
-                            if row_variable['meter_type'].lower() == 'meter':
-                                query_meter = (" SELECT m.name "
-                                               " FROM tbl_meters m "
-                                               " WHERE m.id = %s ")
-                                cursor.execute(query_meter, (row_variable['meter_id'],))
-                                row_meter = cursor.fetchone()
-                                if row_meter is not None:
-                                    expression['variables'].append({'id': row_variable['id'],
-                                                                    'name': row_variable['name'],
-                                                                    'meter_type': row_variable['meter_type'],
-                                                                    'meter_id': row_variable['meter_id'],
-                                                                    'meter_name': row_meter['name']})
-                            elif row_variable['meter_type'].lower() == 'offline_meter':
-                                query_meter = (" SELECT m.name "
-                                               " FROM tbl_offline_meters m "
-                                               " WHERE m.id = %s ")
-                                cursor.execute(query_meter, (row_variable['meter_id'],))
-                                row_meter = cursor.fetchone()
-                                if row_meter is not None:
-                                    expression['variables'].append({'id': row_variable['id'],
-                                                                    'name': row_variable['name'],
-                                                                    'meter_type': row_variable['meter_type'],
-                                                                    'meter_id': row_variable['meter_id'],
-                                                                    'meter_name': row_meter['name']})
-                            elif row_variable['meter_type'].lower() == 'virtual_meter':
-                                query_meter = (" SELECT m.name "
-                                               " FROM tbl_virtual_meters m "
-                                               " WHERE m.id = %s ")
-                                cursor.execute(query_meter, (row_variable['meter_id'],))
-                                row_meter = cursor.fetchone()
-                                if row_meter is not None:
-                                    expression['variables'].append({'id': row_variable['id'],
-                                                                    'name': row_variable['name'],
-                                                                    'meter_type': row_variable['meter_type'],
-                                                                    'meter_id': row_variable['meter_id'],
-                                                                    'meter_name': row_meter['name']})
-
-                meta_result['expression'] = expression
+                               "expression": expression_dict.get(row['id'], dict())}
                 result.append(meta_result)
 
         cursor.close()
@@ -225,7 +167,7 @@ class VirtualMeterCollection:
                 raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                        description='API.INVALID_VARIABLE_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -374,7 +316,7 @@ class VirtualMeterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_VIRTUAL_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, name, uuid "
@@ -420,6 +362,8 @@ class VirtualMeterItem:
         cursor.execute(query, (id_,))
         row = cursor.fetchone()
         if row is None:
+            cursor.close()
+            cnx.disconnect()
             raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                    description='API.VIRTUAL_METER_NOT_FOUND')
         else:
@@ -434,67 +378,7 @@ class VirtualMeterItem:
                            "energy_item": energy_item,
                            "cost_center": cost_center,
                            "description": row['description'],
-                           "expression": {}}
-
-        expression = dict()
-        query_expression = (" SELECT e.id, e.uuid, e.equation "
-                            " FROM tbl_expressions e "
-                            " WHERE e.virtual_meter_id = %s ")
-        cursor.execute(query_expression, (id_,))
-        row_expression = cursor.fetchone()
-
-        if row_expression is not None:
-            expression = {'id': row_expression['id'],
-                          'uuid': row_expression['uuid'],
-                          'equation': row_expression['equation'],
-                          'variables': []}
-
-            query_variables = (" SELECT v.id, v.name, v.meter_type, v.meter_id "
-                               " FROM tbl_expressions e, tbl_variables v "
-                               " WHERE e.id = %s AND v.expression_id = e.id "
-                               " ORDER BY v.name ")
-            cursor.execute(query_variables, (row_expression['id'],))
-            rows_variables = cursor.fetchall()
-            if rows_variables is not None:
-                for row_variable in rows_variables:
-                    if row_variable['meter_type'].lower() == 'meter':
-                        query_meter = (" SELECT m.name "
-                                       " FROM tbl_meters m "
-                                       " WHERE m.id = %s ")
-                        cursor.execute(query_meter, (row_variable['meter_id'],))
-                        row_meter = cursor.fetchone()
-                        if row_meter is not None:
-                            expression['variables'].append({'id': row_variable['id'],
-                                                            'name': row_variable['name'],
-                                                            'meter_type': row_variable['meter_type'],
-                                                            'meter_id': row_variable['meter_id'],
-                                                            'meter_name': row_meter['name']})
-                    elif row_variable['meter_type'].lower() == 'offline_meter':
-                        query_meter = (" SELECT m.name "
-                                       " FROM tbl_offline_meters m "
-                                       " WHERE m.id = %s ")
-                        cursor.execute(query_meter, (row_variable['meter_id'],))
-                        row_meter = cursor.fetchone()
-                        if row_meter is not None:
-                            expression['variables'].append({'id': row_variable['id'],
-                                                            'name': row_variable['name'],
-                                                            'meter_type': row_variable['meter_type'],
-                                                            'meter_id': row_variable['meter_id'],
-                                                            'meter_name': row_meter['name']})
-                    elif row_variable['meter_type'].lower() == 'virtual_meter':
-                        query_meter = (" SELECT m.name "
-                                       " FROM tbl_virtual_meters m "
-                                       " WHERE m.id = %s ")
-                        cursor.execute(query_meter, (row_variable['meter_id'],))
-                        row_meter = cursor.fetchone()
-                        if row_meter is not None:
-                            expression['variables'].append({'id': row_variable['id'],
-                                                            'name': row_variable['name'],
-                                                            'meter_type': row_variable['meter_type'],
-                                                            'meter_id': row_variable['meter_id'],
-                                                            'meter_name': row_meter['name']})
-
-        meta_result['expression'] = expression
+                           "expression": get_expressions(cursor, row['id']).get(row['id'], dict())}
 
         cursor.close()
         cnx.disconnect()
@@ -506,7 +390,7 @@ class VirtualMeterItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_VIRTUAL_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT uuid "
@@ -751,7 +635,7 @@ class VirtualMeterItem:
                 raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                        description='API.INVALID_VARIABLE_METER_ID')
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
+        cnx = database.connect(config.myems_system_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT name "
@@ -891,3 +775,77 @@ class VirtualMeterItem:
 
         resp.status = falcon.HTTP_200
 
+
+########################################################################################################################
+# Get the expressions of virtual meters with their variables and the names of the meters of the variables
+# Expressions, variables and meter names are queried with one query each, and one query per meter type
+#   cursor: dictionary cursor of myems_system_db
+#   virtual_meter_id: id of the virtual meter, or None for all virtual meters
+# Returns: dict of expressions by virtual meter id, missing if the virtual meter has no expression
+#          variables whose meters are not found are not included
+########################################################################################################################
+def get_expressions(cursor, virtual_meter_id=None):
+    if virtual_meter_id is None:
+        cursor.execute(" SELECT id, uuid, equation, virtual_meter_id "
+                       " FROM tbl_expressions "
+                       " ORDER BY id ")
+    else:
+        cursor.execute(" SELECT id, uuid, equation, virtual_meter_id "
+                       " FROM tbl_expressions "
+                       " WHERE virtual_meter_id = %s "
+                       " ORDER BY id ", (virtual_meter_id,))
+    rows_expressions = cursor.fetchall()
+
+    expression_dict = dict()
+    expression_id_dict = dict()
+    if rows_expressions is not None and len(rows_expressions) > 0:
+        for row in rows_expressions:
+            if row['virtual_meter_id'] not in expression_dict:
+                expression = {'id': row['id'],
+                              'uuid': row['uuid'],
+                              'equation': row['equation'],
+                              'variables': []}
+                expression_dict[row['virtual_meter_id']] = expression
+                expression_id_dict[row['id']] = expression
+    if len(expression_id_dict) == 0:
+        return expression_dict
+
+    if virtual_meter_id is None:
+        cursor.execute(" SELECT id, name, meter_type, meter_id, expression_id "
+                       " FROM tbl_variables "
+                       " ORDER BY name ")
+    else:
+        cursor.execute(" SELECT id, name, meter_type, meter_id, expression_id "
+                       " FROM tbl_variables "
+                       " WHERE expression_id IN ( " + ', '.join(map(str, expression_id_dict.keys())) + " ) "
+                       " ORDER BY name ")
+    rows_variables = cursor.fetchall()
+    rows_variables = [row for row in rows_variables or ()
+                      if row['expression_id'] in expression_id_dict and
+                      row['meter_type'].lower() in ('meter', 'offline_meter', 'virtual_meter')]
+
+    meter_name_dict = dict()
+    for meter_type, table in (('meter', 'tbl_meters'),
+                              ('offline_meter', 'tbl_offline_meters'),
+                              ('virtual_meter', 'tbl_virtual_meters')):
+        meter_id_set = {row['meter_id'] for row in rows_variables
+                        if row['meter_type'].lower() == meter_type and row['meter_id'] is not None}
+        if len(meter_id_set) == 0:
+            continue
+        cursor.execute(" SELECT id, name "
+                       " FROM " + table +
+                       " WHERE id IN ( " + ', '.join(map(str, meter_id_set)) + " ) ")
+        rows_meters = cursor.fetchall()
+        if rows_meters is not None and len(rows_meters) > 0:
+            for row in rows_meters:
+                meter_name_dict[(meter_type, row['id'])] = row['name']
+
+    for row in rows_variables:
+        meter_name = meter_name_dict.get((row['meter_type'].lower(), row['meter_id']))
+        if meter_name is not None:
+            expression_id_dict[row['expression_id']]['variables'].append({'id': row['id'],
+                                                                          'name': row['name'],
+                                                                          'meter_type': row['meter_type'],
+                                                                          'meter_id': row['meter_id'],
+                                                                          'meter_name': meter_name})
+    return expression_dict
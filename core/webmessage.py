@@ -1,6 +1,6 @@
 import falcon
 import json
-import mysql.connector
+from core import database
 import config
 from datetime import datetime, timedelta, timezone
 
@@ -45,7 +45,7 @@ class WebMessageCollection:
                                    title='API.BAD_REQUEST',
                                    description='API.START_DATETIME_SHOULD_BE_EARLY_THAN_END_DATETIME')
         # get user dict
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, display_name "
@@ -64,7 +64,7 @@ class WebMessageCollection:
                 user_dict[row['id']] = row['display_name']
 
         # get web messages
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, user_id, subject, message, "
@@ -109,7 +109,7 @@ class WebMessageStatusNewCollection:
     def on_get(req, resp):
 
         # get user dict
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, display_name "
@@ -128,7 +128,7 @@ class WebMessageStatusNewCollection:
                 user_dict[row['id']] = row['display_name']
 
         # get new web messages
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, user_id, subject, message, "
@@ -176,7 +176,7 @@ class WebMessageItem:
                                    description='API.INVALID_WEB_MESSAGE_ID')
 
         # get user dict
-        cnx = mysql.connector.connect(**config.myems_user_db)
+        cnx = database.connect(config.myems_user_db)
         cursor = cnx.cursor(dictionary=True)
 
         query = (" SELECT id, display_name "
@@ -195,7 +195,7 @@ class WebMessageItem:
                 user_dict[row['id']] = row['display_name']
 
         # get web message
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, user_id, subject, message, "
@@ -254,7 +254,7 @@ class WebMessageItem:
                                    description='API.INVALID_REPLY')
         reply = str.strip(new_values['data']['reply'])
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT user_id "
@@ -285,7 +285,7 @@ class WebMessageItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_WEB_MESSAGE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT id "
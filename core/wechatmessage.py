@@ -1,6 +1,6 @@
 import falcon
 import json
-import mysql.connector
+from core import database
 import config
 from datetime import datetime, timedelta, timezone
 
@@ -42,7 +42,7 @@ class WechatMessageCollection(object):
                                    title='API.BAD_REQUEST',
                                    description='API.START_DATETIME_SHOULD_BE_EARLY_THAN_END_DATETIME')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, recipient_name, recipient_openid, message_template_id, "
@@ -90,7 +90,7 @@ class WechatMessageItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_WECHAT_MESSAGE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         query = (" SELECT id, recipient_name, recipient_openid, message_template_id, "
@@ -128,7 +128,7 @@ class WechatMessageItem:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_WECHAT_MESSAGE_ID')
 
-        cnx = mysql.connector.connect(**config.myems_fdd_db)
+        cnx = database.connect(config.myems_fdd_db)
         cursor = cnx.cursor()
 
         cursor.execute(" SELECT id "
@@ -0,0 +1,55 @@
+-- ---------------------------------------------------------------------------------------------------------------------
+-- Upgrade the databases of MyEMS for the stored sizes and hashes of files
+-- Listings of files select the stored sizes instead of LENGTH(file_object), which reads every BLOB, and uploads are
+-- deduplicated by the indexed sizes and SHA-256 hashes instead of hashing every stored BLOB.
+-- Run once with: mysql -u root -p < database/upgrade_file_columns.sql
+-- ---------------------------------------------------------------------------------------------------------------------
+
+-- ---------------------------------------------------------------------------------------------------------------------
+-- Knowledge files
+-- ---------------------------------------------------------------------------------------------------------------------
+USE `myems_system_db`;
+
+ALTER TABLE `tbl_knowledge_files`
+    ADD COLUMN `file_size` BIGINT NULL,
+    ADD COLUMN `file_hash` CHAR(64) NULL,
+    ADD INDEX `tbl_knowledge_files_index_file` (`file_size`, `file_hash`);
+
+UPDATE `tbl_knowledge_files`
+SET `file_size` = LENGTH(`file_object`), `file_hash` = SHA2(`file_object`, 256)
+WHERE `file_size` IS NULL;
+
+CREATE TRIGGER `tbl_knowledge_files_file_size` BEFORE INSERT ON `tbl_knowledge_files`
+FOR EACH ROW SET NEW.`file_size` = COALESCE(NEW.`file_size`, LENGTH(NEW.`file_object`));
+
+-- ---------------------------------------------------------------------------------------------------------------------
+-- Offline meter files
+-- ---------------------------------------------------------------------------------------------------------------------
+USE `myems_historical_db`;
+
+ALTER TABLE `tbl_offline_meter_files`
+    ADD COLUMN `file_size` BIGINT NULL,
+    ADD COLUMN `file_hash` CHAR(64) NULL,
+    ADD INDEX `tbl_offline_meter_files_index_file` (`file_size`, `file_hash`);
+
+UPDATE `tbl_offline_meter_files`
+SET `file_size` = LENGTH(`file_object`), `file_hash` = SHA2(`file_object`, 256)
+WHERE `file_size` IS NULL;
+
+CREATE TRIGGER `tbl_offline_meter_files_file_size` BEFORE INSERT ON `tbl_offline_meter_files`
+FOR EACH ROW SET NEW.`file_size` = COALESCE(NEW.`file_size`, LENGTH(NEW.`file_object`));
+
+-- ---------------------------------------------------------------------------------------------------------------------
+-- Files of advanced reports, also written by myems-reporting
+-- ---------------------------------------------------------------------------------------------------------------------
+USE `myems_reporting_db`;
+
+ALTER TABLE `tbl_reports_files`
+    ADD COLUMN `file_size` BIGINT NULL;
+
+UPDATE `tbl_reports_files`
+SET `file_size` = LENGTH(`file_object`)
+WHERE `file_size` IS NULL;
+
+CREATE TRIGGER `tbl_reports_files_file_size` BEFORE INSERT ON `tbl_reports_files`
+FOR EACH ROW SET NEW.`file_size` = COALESCE(NEW.`file_size`, LENGTH(NEW.`file_object`));
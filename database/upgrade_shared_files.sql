@@ -0,0 +1,49 @@
+-- ---------------------------------------------------------------------------------------------------------------------
+-- Upgrade the databases of MyEMS for files stored once
+-- The row of the first upload of a file stores the file, the rows of later uploads of identical files refer to it by
+-- file_object_id instead of storing the file again. The unique index on the hashes of the stored files keeps concurrent
+-- uploads of identical files from storing the file twice.
+-- Run once after database/upgrade_file_columns.sql with: mysql -u root -p < database/upgrade_shared_files.sql
+-- ---------------------------------------------------------------------------------------------------------------------
+
+-- ---------------------------------------------------------------------------------------------------------------------
+-- Knowledge files
+-- ---------------------------------------------------------------------------------------------------------------------
+USE `myems_system_db`;
+
+ALTER TABLE `tbl_knowledge_files`
+    MODIFY COLUMN `file_object` LONGBLOB NULL,
+    ADD COLUMN `file_object_id` BIGINT NULL,
+    ADD INDEX `tbl_knowledge_files_index_file_object_id` (`file_object_id`);
+
+-- identical files uploaded before share the file of the first of them
+UPDATE `tbl_knowledge_files` f
+JOIN (SELECT `file_hash`, MIN(`id`) AS `id` FROM `tbl_knowledge_files` WHERE `file_hash` IS NOT NULL GROUP BY `file_hash`) o
+ON f.`file_hash` = o.`file_hash` AND f.`id` > o.`id`
+SET f.`file_object_id` = o.`id`, f.`file_object` = NULL;
+
+ALTER TABLE `tbl_knowledge_files`
+    ADD COLUMN `stored_file_hash` CHAR(64) AS (IF(`file_object_id` IS NULL, `file_hash`, NULL)) STORED,
+    ADD UNIQUE INDEX `tbl_knowledge_files_unique_stored_file_hash` (`stored_file_hash`);
+
+-- ---------------------------------------------------------------------------------------------------------------------
+-- Offline meter files
+-- Rows sharing the file of another row have the status 'shared', so myems-normalization does not process them
+-- ---------------------------------------------------------------------------------------------------------------------
+USE `myems_historical_db`;
+
+ALTER TABLE `tbl_offline_meter_files`
+    MODIFY COLUMN `file_object` LONGBLOB NULL,
+    ADD COLUMN `file_object_id` BIGINT NULL,
+    ADD INDEX `tbl_offline_meter_files_index_file_object_id` (`file_object_id`);
+
+-- identical files uploaded before share the file of the first of them
+UPDATE `tbl_offline_meter_files` f
+JOIN (SELECT `file_hash`, MIN(`id`) AS `id` FROM `tbl_offline_meter_files` WHERE `file_hash` IS NOT NULL
+      GROUP BY `file_hash`) o
+ON f.`file_hash` = o.`file_hash` AND f.`id` > o.`id`
+SET f.`file_object_id` = o.`id`, f.`file_object` = NULL;
+
+ALTER TABLE `tbl_offline_meter_files`
+    ADD COLUMN `stored_file_hash` CHAR(64) AS (IF(`file_object_id` IS NULL, `file_hash`, NULL)) STORED,
+    ADD UNIQUE INDEX `tbl_offline_meter_files_unique_stored_file_hash` (`stored_file_hash`);
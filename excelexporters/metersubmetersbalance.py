@@ -1,6 +1,4 @@
-import base64
-import uuid
-import os
+import io
 from openpyxl.chart import (
     BarChart,
     Reference,
@@ -15,7 +13,6 @@ from openpyxl.chart.label import DataLabelList
 # PROCEDURES
 # Step 1: Validate the report data
 # Step 2: Generate excelexporters file
-# Step 3: Encode the excelexporters file to Base64
 ####################################################################################################################
 
 def export(result, name, reporting_start_datetime_local, reporting_end_datetime_local, period_type):
@@ -28,30 +25,11 @@ def export(result, name, reporting_start_datetime_local, reporting_end_datetime_
     ####################################################################################################################
     # Step 2: Generate excel file from the report data
     ####################################################################################################################
-    filename = generate_excel(result,
-                              name,
-                              reporting_start_datetime_local,
-                              reporting_end_datetime_local,
-                              period_type)
-    ####################################################################################################################
-    # Step 3: Encode the excel file to Base64
-    ####################################################################################################################
-    try:
-        with open(filename, 'rb') as binary_file:
-            binary_file_data = binary_file.read()
-    except IOError as ex:
-        pass
-
-    # Base64 encode the bytes
-    base64_encoded_data = base64.b64encode(binary_file_data)
-    # get the Base64 encoded data using human-readable characters.
-    base64_message = base64_encoded_data.decode('utf-8')
-    # delete the file from server
-    try:
-        os.remove(filename)
-    except NotImplementedError as ex:
-        pass
-    return base64_message
+    return generate_excel(result,
+                          name,
+                          reporting_start_datetime_local,
+                          reporting_end_datetime_local,
+                          period_type)
 
 
 def generate_excel(report, name, reporting_start_datetime_local, reporting_end_datetime_local, period_type):
@@ -142,10 +120,9 @@ def generate_excel(report, name, reporting_start_datetime_local, reporting_end_d
     if "reporting_period" not in report.keys() or \
             "difference_values" not in report['reporting_period'].keys() or \
             len(report['reporting_period']['difference_values']) == 0:
-        filename = str(uuid.uuid4()) + '.xlsx'
-        wb.save(filename)
-
-        return filename
+        excel_file = io.BytesIO()
+        wb.save(excel_file)
+        return excel_file.getvalue()
     #################################################
 
     has_difference_values_data_flag = True
@@ -283,7 +260,6 @@ def generate_excel(report, name, reporting_start_datetime_local, reporting_end_d
         else:
             pass
 
-    filename = str(uuid.uuid4()) + '.xlsx'
-    wb.save(filename)
-
-    return filename
+    excel_file = io.BytesIO()
+    wb.save(excel_file)
+    return excel_file.getvalue()
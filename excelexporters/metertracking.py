@@ -1,6 +1,4 @@
-import base64
-import uuid
-import os
+import io
 from openpyxl.chart import (
     BarChart,
     Reference,
@@ -15,7 +13,6 @@ from openpyxl.chart.label import DataLabelList
 # PROCEDURES
 # Step 1: Validate the report data
 # Step 2: Generate excelexporters file
-# Step 3: Encode the excelexporters file to Base64
 ####################################################################################################################
 
 def export(result, space_name):
@@ -28,27 +25,8 @@ def export(result, space_name):
     ####################################################################################################################
     # Step 2: Generate excel file from the report data
     ####################################################################################################################
-    filename = generate_excel(result,
-                              space_name)
-    ####################################################################################################################
-    # Step 3: Encode the excel file to Base64
-    ####################################################################################################################
-    try:
-        with open(filename, 'rb') as binary_file:
-            binary_file_data = binary_file.read()
-    except IOError as ex:
-        pass
-
-    # Base64 encode the bytes
-    base64_encoded_data = base64.b64encode(binary_file_data)
-    # get the Base64 encoded data using human-readable characters.
-    base64_message = base64_encoded_data.decode('utf-8')
-    # delete the file from server
-    try:
-        os.remove(filename)
-    except NotImplementedError as ex:
-        pass
-    return base64_message
+    return generate_excel(result,
+                          space_name)
 
 
 def generate_excel(report, space_name):
@@ -56,7 +34,6 @@ def generate_excel(report, space_name):
     wb = Workbook()
     ws = wb.active
 
-    filename = str(uuid.uuid4()) + '.xlsx'
-    wb.save(filename)
-
-    return filename
+    excel_file = io.BytesIO()
+    wb.save(excel_file)
+    return excel_file.getvalue()
@@ -1,21 +1,17 @@
-import base64
-import uuid
-import os
+import io
 from openpyxl.chart import (
         PieChart,
         BarChart,
         Reference,
     )
-from openpyxl.styles import PatternFill, Border, Side, Alignment, Font
 from openpyxl.drawing.image import Image
-from openpyxl import Workbook
 from openpyxl.chart.label import DataLabelList
+from excelexporters import writeonly
 
 ####################################################################################################################
 # PROCEDURES
 # Step 1: Validate the report data
 # Step 2: Generate excel file
-# Step 3: Encode the excel file bytes to Base64
 ####################################################################################################################
 
 
@@ -34,30 +30,11 @@ def export(report,
     ####################################################################################################################
     # Step 2: Generate excel file from the report data
     ####################################################################################################################
-    filename = generate_excel(report,
-                              name,
-                              reporting_start_datetime_local,
-                              reporting_end_datetime_local,
-                              period_type)
-    ####################################################################################################################
-    # Step 3: Encode the excel file to Base64
-    ####################################################################################################################
-    try:
-        with open(filename, 'rb') as binary_file:
-            binary_file_data = binary_file.read()
-    except IOError as ex:
-        pass
-
-    # Base64 encode the bytes
-    base64_encoded_data = base64.b64encode(binary_file_data)
-    # get the Base64 encoded data using human-readable characters.
-    base64_message = base64_encoded_data.decode('utf-8')
-    # delete the file from server
-    try:
-        os.remove(filename)
-    except NotImplementedError as ex:
-        pass
-    return base64_message
+    return generate_excel(report,
+                          name,
+                          reporting_start_datetime_local,
+                          reporting_end_datetime_local,
+                          period_type)
 
 
 def generate_excel(report,
@@ -66,8 +43,9 @@ def generate_excel(report,
                    reporting_end_datetime_local,
                    period_type):
 
-    wb = Workbook()
-    ws = wb.active
+    wb, ws = writeonly.create_workbook()
+    # cells of the rows before the detail table by row number, see writeonly.set_cell
+    rows = dict()
 
     # Row height
     ws.row_dimensions[1].height = 118
@@ -85,84 +63,31 @@ def generate_excel(report,
     for i in range(ord('D'), ord('I')):
         ws.column_dimensions[chr(i)].width = 15.0
 
-    # Font
-    name_font = Font(name='Constantia', size=15, bold=True)
-    title_font = Font(name='宋体', size=15, bold=True)
-    data_font = Font(name='Franklin Gothic Book', size=11)
-
-    table_fill = PatternFill(fill_type='solid', fgColor='1F497D')
-    f_border = Border(left=Side(border_style='medium', color='00000000'),
-                      right=Side(border_style='medium', color='00000000'),
-                      bottom=Side(border_style='medium', color='00000000'),
-                      top=Side(border_style='medium', color='00000000')
-                      )
-    b_border = Border(
-        bottom=Side(border_style='medium', color='00000000'),
-    )
-
-    b_c_alignment = Alignment(vertical='bottom',
-                              horizontal='center',
-                              text_rotation=0,
-                              wrap_text=False,
-                              shrink_to_fit=False,
-                              indent=0)
-    c_c_alignment = Alignment(vertical='center',
-                              horizontal='center',
-                              text_rotation=0,
-                              wrap_text=False,
-                              shrink_to_fit=False,
-                              indent=0)
-    b_r_alignment = Alignment(vertical='bottom',
-                              horizontal='right',
-                              text_rotation=0,
-                              wrap_text=False,
-                              shrink_to_fit=False,
-                              indent=0)
-    c_r_alignment = Alignment(vertical='bottom',
-                              horizontal='center',
-                              text_rotation=0,
-                              wrap_text=False,
-                              shrink_to_fit=False,
-                              indent=0)
     # Img
     img = Image("excelexporters/myems.png")
     # img = Image("myems.png")
     ws.add_image(img, 'B1')
 
     # Title
-    ws['B3'].font = name_font
-    ws['B3'].alignment = b_r_alignment
-    ws['B3'] = 'Name:'
-    ws['C3'].border = b_border
-    ws['C3'].alignment = b_c_alignment
-    ws['C3'].font = name_font
-    ws['C3'] = name
-
-    ws['D3'].font = name_font
-    ws['D3'].alignment = b_r_alignment
-    ws['D3'] = 'Period:'
-    ws['E3'].border = b_border
-    ws['E3'].alignment = b_c_alignment
-    ws['E3'].font = name_font
-    ws['E3'] = period_type
-
-    ws['F3'].font = name_font
-    ws['F3'].alignment = b_r_alignment
-    ws['F3'] = 'Date:'
-    ws.merge_cells("G3:J3")
-    for i in range(ord('G'), ord('J') + 1):
-        ws[chr(i) + '3'].border = b_border
-    ws['G3'].border = b_border
-    ws['G3'].alignment = b_c_alignment
-    ws['G3'].font = name_font
-    ws['G3'] = reporting_start_datetime_local + "__" + reporting_end_datetime_local
+    writeonly.set_cell(ws, rows, 'B3', 'Name:', 'label')
+    writeonly.set_cell(ws, rows, 'C3', name, 'label_value')
+
+    writeonly.set_cell(ws, rows, 'D3', 'Period:', 'label')
+    writeonly.set_cell(ws, rows, 'E3', period_type, 'label_value')
+
+    writeonly.set_cell(ws, rows, 'F3', 'Date:', 'label')
+    ws.merged_cells.add("G3:J3")
+    for i in range(ord('H'), ord('J') + 1):
+        writeonly.set_cell(ws, rows, chr(i) + '3', None, 'bottom_border')
+    writeonly.set_cell(ws, rows, 'G3', reporting_start_datetime_local + "__" + reporting_end_datetime_local,
+                       'label_value')
 
     if "reporting_period" not in report.keys() or \
             "names" not in report['reporting_period'].keys() or len(report['reporting_period']['names']) == 0:
-        filename = str(uuid.uuid4()) + '.xlsx'
-        wb.save(filename)
-
-        return filename
+        writeonly.write_rows(ws, rows)
+        excel_file = io.BytesIO()
+        wb.save(excel_file)
+        return excel_file.getvalue()
 
     #################################################
 
@@ -175,104 +100,51 @@ def generate_excel(report,
         has_energy_data_flag = False
 
     if has_energy_data_flag:
-        ws['B6'].font = title_font
-        ws['B6'] = name+' 报告期消耗'
+        writeonly.set_cell(ws, rows, 'B6', name+' 报告期消耗', 'title')
 
         category = reporting_period_data['names']
         ca_len = len(category)
 
-        ws['B7'].fill = table_fill
-
-        ws['B8'].font = title_font
-        ws['B8'].alignment = c_c_alignment
-        ws['B8'] = '能耗'
-        ws['B8'].border = f_border
-
-        ws['B9'].font = title_font
-        ws['B9'].alignment = c_c_alignment
-        ws['B9'] = '单位面积能耗'
-        ws['B9'].border = f_border
-
-        ws['B10'].font = title_font
-        ws['B10'].alignment = c_c_alignment
-        ws['B10'] = '环比'
-        ws['B10'].border = f_border
+        writeonly.set_cell(ws, rows, 'B7', None, 'fill')
+        writeonly.set_cell(ws, rows, 'B8', '能耗', 'title_data')
+        writeonly.set_cell(ws, rows, 'B9', '单位面积能耗', 'title_data')
+        writeonly.set_cell(ws, rows, 'B10', '环比', 'title_data')
 
         col = 'B'
 
         for i in range(0, ca_len):
             col = chr(ord('C') + i)
-            ws[col + '7'].fill = table_fill
-            ws[col + '7'].font = name_font
-            ws[col + '7'].alignment = c_c_alignment
-            ws[col + '7'] = reporting_period_data['names'][i] + " (" + reporting_period_data['units'][i] + ")"
-            ws[col + '7'].border = f_border
-
-            ws[col + '8'].font = name_font
-            ws[col + '8'].alignment = c_c_alignment
-            ws[col + '8'] = round(reporting_period_data['subtotals'][i], 0)
-            ws[col + '8'].border = f_border
-
-            ws[col + '9'].font = name_font
-            ws[col + '9'].alignment = c_c_alignment
-            ws[col + '9'] = round(reporting_period_data['subtotals_per_unit_area'][i], 2)
-            ws[col + '9'].border = f_border
-
-            ws[col + '10'].font = name_font
-            ws[col + '10'].alignment = c_c_alignment
-            ws[col + '10'] = str(round(reporting_period_data['increment_rates'][i] * 100, 2)) + "%" \
-                if reporting_period_data['increment_rates'][i] is not None else "-"
-            ws[col + '10'].border = f_border
+            writeonly.set_cell(ws, rows, col + '7',
+                               reporting_period_data['names'][i] + " (" + reporting_period_data['units'][i] + ")",
+                               'header')
+            writeonly.set_cell(ws, rows, col + '8', round(reporting_period_data['subtotals'][i], 0), 'data')
+            writeonly.set_cell(ws, rows, col + '9',
+                               round(reporting_period_data['subtotals_per_unit_area'][i], 2), 'data')
+            writeonly.set_cell(ws, rows, col + '10',
+                               str(round(reporting_period_data['increment_rates'][i] * 100, 2)) + "%"
+                               if reporting_period_data['increment_rates'][i] is not None else "-", 'data')
 
         # TCE TCO2E
         end_col = col
         # TCE
         tce_col = chr(ord(end_col) + 1)
-        ws[tce_col + '7'].fill = table_fill
-        ws[tce_col + '7'].font = name_font
-        ws[tce_col + '7'].alignment = c_c_alignment
-        ws[tce_col + '7'] = "TCE"
-        ws[tce_col + '7'].border = f_border
-
-        ws[tce_col + '8'].font = name_font
-        ws[tce_col + '8'].alignment = c_c_alignment
-        ws[tce_col + '8'] = round(reporting_period_data['total_in_kgce'], 0)
-        ws[tce_col + '8'].border = f_border
-
-        ws[tce_col + '9'].font = name_font
-        ws[tce_col + '9'].alignment = c_c_alignment
-        ws[tce_col + '9'] = round(reporting_period_data['total_in_kgce_per_unit_area'], 2)
-        ws[tce_col + '9'].border = f_border
-
-        ws[tce_col + '10'].font = name_font
-        ws[tce_col + '10'].alignment = c_c_alignment
-        ws[tce_col + '10'] = str(round(reporting_period_data['increment_rate_in_kgce'] * 100, 2)) + "%" \
-            if reporting_period_data['increment_rate_in_kgce'] is not None else "-"
-        ws[tce_col + '10'].border = f_border
+        writeonly.set_cell(ws, rows, tce_col + '7', "TCE", 'header')
+        writeonly.set_cell(ws, rows, tce_col + '8', round(reporting_period_data['total_in_kgce'], 0), 'data')
+        writeonly.set_cell(ws, rows, tce_col + '9',
+                           round(reporting_period_data['total_in_kgce_per_unit_area'], 2), 'data')
+        writeonly.set_cell(ws, rows, tce_col + '10',
+                           str(round(reporting_period_data['increment_rate_in_kgce'] * 100, 2)) + "%"
+                           if reporting_period_data['increment_rate_in_kgce'] is not None else "-", 'data')
 
         # TCO2E
         tco2e_col = chr(ord(end_col) + 2)
-        ws[tco2e_col + '7'].fill = table_fill
-        ws[tco2e_col + '7'].font = name_font
-        ws[tco2e_col + '7'].alignment = c_c_alignment
-        ws[tco2e_col + '7'] = "TCO2E"
-        ws[tco2e_col + '7'].border = f_border
-
-        ws[tco2e_col + '8'].font = name_font
-        ws[tco2e_col + '8'].alignment = c_c_alignment
-        ws[tco2e_col + '8'] = round(reporting_period_data['total_in_kgco2e'], 0)
-        ws[tco2e_col + '8'].border = f_border
-
-        ws[tco2e_col + '9'].font = name_font
-        ws[tco2e_col + '9'].alignment = c_c_alignment
-        ws[tco2e_col + '9'] = round(reporting_period_data['total_in_kgco2e_per_unit_area'], 2)
-        ws[tco2e_col + '9'].border = f_border
-
-        ws[tco2e_col + '10'].font = name_font
-        ws[tco2e_col + '10'].alignment = c_c_alignment
-        ws[tco2e_col + '10'] = str(round(reporting_period_data['increment_rate_in_kgco2e'] * 100, 2)) + "%" \
-            if reporting_period_data['increment_rate_in_kgco2e'] is not None else "-"
-        ws[tco2e_col + '10'].border = f_border
+        writeonly.set_cell(ws, rows, tco2e_col + '7', "TCO2E", 'header')
+        writeonly.set_cell(ws, rows, tco2e_col + '8', round(reporting_period_data['total_in_kgco2e'], 0), 'data')
+        writeonly.set_cell(ws, rows, tco2e_col + '9',
+                           round(reporting_period_data['total_in_kgco2e_per_unit_area'], 2), 'data')
+        writeonly.set_cell(ws, rows, tco2e_col + '10',
+                           str(round(reporting_period_data['increment_rate_in_kgco2e'] * 100, 2)) + "%"
+                           if reporting_period_data['increment_rate_in_kgco2e'] is not None else "-", 'data')
     else:
         for i in range(6, 10 + 1):
             ws.row_dimensions[i].height = 0.1
@@ -286,59 +158,22 @@ def generate_excel(report,
         has_ele_peak_flag = False
 
     if has_ele_peak_flag:
-        ws['B12'].font = title_font
-        ws['B12'] = name+' 分时电耗'
-
-        ws['B13'].fill = table_fill
-        ws['B13'].font = name_font
-        ws['B13'].alignment = c_c_alignment
-        ws['B13'].border = f_border
-
-        ws['C13'].fill = table_fill
-        ws['C13'].font = name_font
-        ws['C13'].alignment = c_c_alignment
-        ws['C13'].border = f_border
-        ws['C13'] = '分时电耗'
-
-        ws['B14'].font = title_font
-        ws['B14'].alignment = c_c_alignment
-        ws['B14'] = '尖'
-        ws['B14'].border = f_border
-
-        ws['C14'].font = title_font
-        ws['C14'].alignment = c_c_alignment
-        ws['C14'].border = f_border
-        ws['C14'] = round(reporting_period_data['toppeaks'][0], 0)
-
-        ws['B15'].font = title_font
-        ws['B15'].alignment = c_c_alignment
-        ws['B15'] = '峰'
-        ws['B15'].border = f_border
-
-        ws['C15'].font = title_font
-        ws['C15'].alignment = c_c_alignment
-        ws['C15'].border = f_border
-        ws['C15'] = round(reporting_period_data['onpeaks'][0], 0)
-
-        ws['B16'].font = title_font
-        ws['B16'].alignment = c_c_alignment
-        ws['B16'] = '平'
-        ws['B16'].border = f_border
-
-        ws['C16'].font = title_font
-        ws['C16'].alignment = c_c_alignment
-        ws['C16'].border = f_border
-        ws['C16'] = round(reporting_period_data['midpeaks'][0], 0)
-
-        ws['B17'].font = title_font
-        ws['B17'].alignment = c_c_alignment
-        ws['B17'] = '谷'
-        ws['B17'].border = f_border
-
-        ws['C17'].font = title_font
-        ws['C17'].alignment = c_c_alignment
-        ws['C17'].border = f_border
-        ws['C17'] = round(reporting_period_data['offpeaks'][0], 0)
+        writeonly.set_cell(ws, rows, 'B12', name+' 分时电耗', 'title')
+
+        writeonly.set_cell(ws, rows, 'B13', None, 'header')
+        writeonly.set_cell(ws, rows, 'C13', '分时电耗', 'header')
+
+        writeonly.set_cell(ws, rows, 'B14', '尖', 'title_data')
+        writeonly.set_cell(ws, rows, 'C14', round(reporting_period_data['toppeaks'][0], 0), 'title_data')
+
+        writeonly.set_cell(ws, rows, 'B15', '峰', 'title_data')
+        writeonly.set_cell(ws, rows, 'C15', round(reporting_period_data['onpeaks'][0], 0), 'title_data')
+
+        writeonly.set_cell(ws, rows, 'B16', '平', 'title_data')
+        writeonly.set_cell(ws, rows, 'C16', round(reporting_period_data['midpeaks'][0], 0), 'title_data')
+
+        writeonly.set_cell(ws, rows, 'B17', '谷', 'title_data')
+        writeonly.set_cell(ws, rows, 'C17', round(reporting_period_data['offpeaks'][0], 0), 'title_data')
 
         pie = PieChart()
         labels = Reference(ws, min_col=2, min_row=14, max_row=17)
@@ -369,37 +204,23 @@ def generate_excel(report,
         has_kgce_data_flag = False
 
     if has_kgce_data_flag:
-        ws['B' + str(current_row_number)].font = title_font
-        ws['B' + str(current_row_number)] = name + ' 吨标准煤 (TCE) 占比'
+        writeonly.set_cell(ws, rows, 'B' + str(current_row_number), name + ' 吨标准煤 (TCE) 占比', 'title')
 
         current_row_number += 1
         table_start_row_number = current_row_number
 
-        ws['B' + str(current_row_number)].fill = table_fill
-        ws['B' + str(current_row_number)].font = name_font
-        ws['B' + str(current_row_number)].alignment = c_c_alignment
-        ws['B' + str(current_row_number)].border = f_border
-
-        ws['C' + str(current_row_number)].fill = table_fill
-        ws['C' + str(current_row_number)].font = name_font
-        ws['C' + str(current_row_number)].alignment = c_c_alignment
-        ws['C' + str(current_row_number)].border = f_border
-        ws['C' + str(current_row_number)] = '吨标准煤 (TCE) 占比'
+        writeonly.set_cell(ws, rows, 'B' + str(current_row_number), None, 'header')
+        writeonly.set_cell(ws, rows, 'C' + str(current_row_number), '吨标准煤 (TCE) 占比', 'header')
 
         current_row_number += 1
 
         ca_len = len(reporting_period_data['names'])
 
         for i in range(0, ca_len):
-            ws['B' + str(current_row_number)].font = title_font
-            ws['B' + str(current_row_number)].alignment = c_c_alignment
-            ws['B' + str(current_row_number)] = reporting_period_data['names'][i]
-            ws['B' + str(current_row_number)].border = f_border
-
-            ws['C' + str(current_row_number)].font = title_font
-            ws['C' + str(current_row_number)].alignment = c_c_alignment
-            ws['C' + str(current_row_number)].border = f_border
-            ws['C' + str(current_row_number)] = round(reporting_period_data['subtotals_in_kgce'][i], 3)
+            writeonly.set_cell(ws, rows, 'B' + str(current_row_number), reporting_period_data['names'][i],
+                               'title_data')
+            writeonly.set_cell(ws, rows, 'C' + str(current_row_number),
+                               round(reporting_period_data['subtotals_in_kgce'][i], 3), 'title_data')
 
             current_row_number += 1
 
@@ -439,37 +260,23 @@ def generate_excel(report,
         has_kgco2e_data_flag = False
 
     if has_kgco2e_data_flag:
-        ws['B' + str(current_row_number)].font = title_font
-        ws['B' + str(current_row_number)] = name + ' 吨二氧化碳排放 (TCO2E) 占比'
+        writeonly.set_cell(ws, rows, 'B' + str(current_row_number), name + ' 吨二氧化碳排放 (TCO2E) 占比', 'title')
 
         current_row_number += 1
         table_start_row_number = current_row_number
 
-        ws['B' + str(current_row_number)].fill = table_fill
-        ws['B' + str(current_row_number)].font = name_font
-        ws['B' + str(current_row_number)].alignment = c_c_alignment
-        ws['B' + str(current_row_number)].border = f_border
-
-        ws['C' + str(current_row_number)].fill = table_fill
-        ws['C' + str(current_row_number)].font = name_font
-        ws['C' + str(current_row_number)].alignment = c_c_alignment
-        ws['C' + str(current_row_number)].border = f_border
-        ws['C' + str(current_row_number)] = '吨二氧化碳排放 (TCO2E) 占比'
+        writeonly.set_cell(ws, rows, 'B' + str(current_row_number), None, 'header')
+        writeonly.set_cell(ws, rows, 'C' + str(current_row_number), '吨二氧化碳排放 (TCO2E) 占比', 'header')
 
         current_row_number += 1
 
         ca_len = len(reporting_period_data['names'])
 
         for i in range(0, ca_len):
-            ws['B' + str(current_row_number)].font = title_font
-            ws['B' + str(current_row_number)].alignment = c_c_alignment
-            ws['B' + str(current_row_number)] = reporting_period_data['names'][i]
-            ws['B' + str(current_row_number)].border = f_border
-
-            ws['C' + str(current_row_number)].font = title_font
-            ws['C' + str(current_row_number)].alignment = c_c_alignment
-            ws['C' + str(current_row_number)].border = f_border
-            ws['C' + str(current_row_number)] = round(reporting_period_data['subtotals_in_kgco2e'][i], 3)
+            writeonly.set_cell(ws, rows, 'B' + str(current_row_number), reporting_period_data['names'][i],
+                               'title_data')
+            writeonly.set_cell(ws, rows, 'C' + str(current_row_number),
+                               round(reporting_period_data['subtotals_in_kgco2e'][i], 3), 'title_data')
             current_row_number += 1
 
         table_end_row_number = current_row_number - 1
@@ -509,13 +316,14 @@ def generate_excel(report,
             len(reporting_period_data['timestamps']) == 0:
         has_detail_data_flag = False
 
+    table_start_row_number = None
+    table_rows = None
     if has_detail_data_flag:
         reporting_period_data = report['reporting_period']
         times = reporting_period_data['timestamps']
         ca_len = len(report['reporting_period']['names'])
 
-        ws['B' + str(current_row_number)].font = title_font
-        ws['B' + str(current_row_number)] = name+' 详细数据'
+        writeonly.set_cell(ws, rows, 'B' + str(current_row_number), name+' 详细数据', 'title')
 
         table_start_row_number = (current_row_number + 1) + ca_len * 5
         current_row_number = table_start_row_number
@@ -527,55 +335,17 @@ def generate_excel(report,
             has_data = True
 
         if has_data:
-
-            ws['B' + str(current_row_number)].fill = table_fill
-            ws['B' + str(current_row_number)].font = title_font
-            ws['B' + str(current_row_number)].border = f_border
-            ws['B' + str(current_row_number)].alignment = c_c_alignment
-            ws['B' + str(current_row_number)] = '日期时间'
+            writeonly.set_cell(ws, rows, 'B' + str(current_row_number), '日期时间', 'title_header')
 
             for i in range(0, ca_len):
                 col = chr(ord('C') + i)
+                writeonly.set_cell(ws, rows, col + str(current_row_number),
+                                   reporting_period_data['names'][i] + " (" + reporting_period_data['units'][i] + ")",
+                                   'title_header')
 
-                ws[col + str(current_row_number)].fill = table_fill
-                ws[col + str(current_row_number)].font = title_font
-                ws[col + str(current_row_number)].alignment = c_c_alignment
-                ws[col + str(current_row_number)] = reporting_period_data['names'][i] + \
-                    " (" + reporting_period_data['units'][i] + ")"
-                ws[col + str(current_row_number)].border = f_border
-
-            current_row_number += 1
-
-            for i in range(0, len(time)):
-                ws['B' + str(current_row_number)].font = title_font
-                ws['B' + str(current_row_number)].alignment = c_c_alignment
-                ws['B' + str(current_row_number)] = time[i]
-                ws['B' + str(current_row_number)].border = f_border
-
-                for j in range(0, ca_len):
-                    col = chr(ord('C') + j)
-
-                    ws[col + str(current_row_number)].font = title_font
-                    ws[col + str(current_row_number)].alignment = c_c_alignment
-                    ws[col + str(current_row_number)] = round(reporting_period_data['values'][j][i], 0)
-                    ws[col + str(current_row_number)].border = f_border
-
-                current_row_number += 1
-
-            table_end_row_number = current_row_number - 1
-
-            ws['B' + str(current_row_number)].font = title_font
-            ws['B' + str(current_row_number)].alignment = c_c_alignment
-            ws['B' + str(current_row_number)] = '小计'
-            ws['B' + str(current_row_number)].border = f_border
+            table_end_row_number = table_start_row_number + len(time)
 
             for i in range(0, ca_len):
-                col = chr(ord('C') + i)
-                ws[col + str(current_row_number)].font = title_font
-                ws[col + str(current_row_number)].alignment = c_c_alignment
-                ws[col + str(current_row_number)] = round(reporting_period_data['subtotals'][i], 0)
-                ws[col + str(current_row_number)].border = f_border
-
                 # bar
                 bar = BarChart()
                 labels = Reference(ws, min_col=2, min_row=table_start_row_number + 1, max_row=table_end_row_number)
@@ -591,14 +361,34 @@ def generate_excel(report,
                 chart_cell = chart_col + str(table_start_draw_flag + 5 * i)
                 ws.add_chart(bar, chart_cell)
 
-            current_row_number += 1
+            table_rows = generate_detail_rows(ws, reporting_period_data)
 
     else:
         for i in range(40, 69 + 1):
             current_row_number = 70
             ws.row_dimensions[i].height = 0.1
 
-    filename = str(uuid.uuid4()) + '.xlsx'
-    wb.save(filename)
-
-    return filename
+    writeonly.write_rows(ws, rows, table_start_row_number + 1 if table_rows is not None else None, table_rows)
+    excel_file = io.BytesIO()
+    wb.save(excel_file)
+    return excel_file.getvalue()
+
+
+########################################################################################################################
+# Generate the rows of the detail table: timestamps in column B and the values of energy categories from column C,
+# followed by the row of subtotals
+########################################################################################################################
+def generate_detail_rows(ws, reporting_period_data):
+    time = reporting_period_data['timestamps'][0]
+    names = reporting_period_data['names']
+    values = reporting_period_data['values']
+    for i in range(0, len(time)):
+        cells = [('B', time[i], 'title_data')]
+        for j in range(0, len(names)):
+            cells.append((chr(ord('C') + j), round(values[j][i], 0), 'title_data'))
+        yield writeonly.get_row(ws, cells)
+
+    cells = [('B', '小计', 'title_data')]
+    for i in range(0, len(names)):
+        cells.append((chr(ord('C') + i), round(reporting_period_data['subtotals'][i], 0), 'title_data'))
+    yield writeonly.get_row(ws, cells)
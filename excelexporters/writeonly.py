@@ -0,0 +1,154 @@
+import weakref
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill, Border, Side, Alignment, Font
+from openpyxl.utils import column_index_from_string, coordinate_to_tuple
+
+
+####################################################################################################################
+# Write-only workbooks for exporters
+# Cells are not kept in the workbook but written to the file row by row, so the memory is bounded by the fixed part
+# of the sheet, regardless of how many rows the tables of the reporting period have.
+# Cells are WriteOnlyCell styled by the named styles registered in the workbook, and the cells of table rows are styled
+# once per column, see get_row.
+# Usage:
+#   wb, ws = writeonly.create_workbook()
+#   rows = dict()
+#   writeonly.set_cell(ws, rows, 'B3', 'Name:', 'label')
+#   writeonly.write_rows(ws, rows, table_start_row, table_rows_generator)
+#   wb.save(excel_file)
+# Note: the row heights, column widths, merged cells, images and charts must be set before write_rows
+####################################################################################################################
+
+default_font = Font(name='Calibri', size=11)
+name_font = Font(name='Constantia', size=15, bold=True)
+title_font = Font(name='宋体', size=15, bold=True)
+table_fill = PatternFill(fill_type='solid', fgColor='1F497D')
+f_border = Border(left=Side(border_style='medium', color='00000000'),
+                  right=Side(border_style='medium', color='00000000'),
+                  bottom=Side(border_style='medium', color='00000000'),
+                  top=Side(border_style='medium', color='00000000'))
+b_border = Border(bottom=Side(border_style='medium', color='00000000'))
+b_c_alignment = Alignment(vertical='bottom', horizontal='center', text_rotation=0, wrap_text=False,
+                          shrink_to_fit=False, indent=0)
+c_c_alignment = Alignment(vertical='center', horizontal='center', text_rotation=0, wrap_text=False,
+                          shrink_to_fit=False, indent=0)
+b_r_alignment = Alignment(vertical='bottom', horizontal='right', text_rotation=0, wrap_text=False,
+                          shrink_to_fit=False, indent=0)
+
+# named styles registered in every workbook, by their names without the 'myems ' prefix
+named_styles = {
+    # 'Name:', 'Period:' and 'Date:' labels of the header
+    'label': {'font': name_font, 'alignment': b_r_alignment},
+    # values of the labels of the header
+    'label_value': {'font': name_font, 'alignment': b_c_alignment, 'border': b_border},
+    'bottom_border': {'font': default_font, 'border': b_border},
+    # titles of sections
+    'title': {'font': title_font},
+    # empty cells of table titles
+    'fill': {'font': default_font, 'fill': table_fill},
+    'fill_border': {'font': default_font, 'fill': table_fill, 'border': f_border},
+    'fill_border_center': {'font': default_font, 'fill': table_fill, 'border': f_border, 'alignment': c_c_alignment},
+    # table titles
+    'header': {'fill': table_fill, 'font': name_font, 'alignment': c_c_alignment, 'border': f_border},
+    'title_header': {'fill': table_fill, 'font': title_font, 'alignment': c_c_alignment, 'border': f_border},
+    # table data
+    'data': {'font': name_font, 'alignment': c_c_alignment, 'border': f_border},
+    'title_data': {'font': title_font, 'alignment': c_c_alignment, 'border': f_border},
+}
+
+# cells of table rows by worksheet, by column index and style, see get_row
+row_cells = weakref.WeakKeyDictionary()
+
+
+########################################################################################################################
+# Create a write-only workbook with the named styles and a worksheet
+# Returns: (workbook, worksheet)
+########################################################################################################################
+def create_workbook():
+    wb = Workbook(write_only=True)
+    for name, attributes in named_styles.items():
+        wb.add_named_style(NamedStyle(name='myems ' + name, **attributes))
+    ws = wb.create_sheet()
+    row_cells[ws] = dict()
+    return wb, ws
+
+
+########################################################################################################################
+# Create a cell
+#   style: one of named_styles, or None for the default style
+########################################################################################################################
+def create_cell(ws, value=None, style=None):
+    cell = WriteOnlyCell(ws, value)
+    if style is not None:
+        cell.style = 'myems ' + style
+    return cell
+
+
+########################################################################################################################
+# Set the cell of the coordinate in rows, which replaces the cell set before at the same coordinate
+#   rows: dict of row number to dict of column index to cell
+#   coordinate: such as 'B3'
+########################################################################################################################
+def set_cell(ws, rows, coordinate, value=None, style=None):
+    row, column = coordinate_to_tuple(coordinate)
+    rows.setdefault(row, dict())[column] = create_cell(ws, value, style)
+
+
+########################################################################################################################
+# Get the cells of a table row by column letter
+# The cells of a column and style are created and styled once per worksheet and reused for every row with the new
+# value, so each row must be written by write_rows before the next row is got
+#   cells: list of (column letter, value, style)
+# Returns: dict of column index to cell
+########################################################################################################################
+def get_row(ws, cells):
+    row = dict()
+    for column, value, style in cells:
+        column_index = column_index_from_string(column)
+        cell = row_cells[ws].get((column_index, style))
+        if cell is None:
+            cell = create_cell(ws, None, style)
+            row_cells[ws][(column_index, style)] = cell
+        cell.value = value
+        row[column_index] = cell
+    return row
+
+
+########################################################################################################################
+# Write all rows to the worksheet in order
+#   rows: dict of row number to dict of column index to cell, see set_cell
+#   table_start_row: the row number of the first row of table_rows
+#   table_rows: optional, iterable of dict of column index to cell, such as a generator of get_row, which is consumed
+#               while it is written. The cells of table_rows replace the cells of rows at the same coordinates.
+########################################################################################################################
+def write_rows(ws, rows, table_start_row=None, table_rows=None):
+    last_row = max(list(rows.keys()) + list(ws.row_dimensions.keys()) + [0])
+    if table_rows is None:
+        table_start_row = last_row + 1
+        table_rows = ()
+
+    row_number = 1
+    while row_number < table_start_row:
+        append_row(ws, rows.get(row_number))
+        row_number += 1
+
+    for table_row in table_rows:
+        cells = rows.get(row_number)
+        if cells is not None:
+            cells = dict(cells)
+            cells.update(table_row)
+            table_row = cells
+        append_row(ws, table_row)
+        row_number += 1
+
+    while row_number <= last_row:
+        append_row(ws, rows.get(row_number))
+        row_number += 1
+
+
+def append_row(ws, cells):
+    if not cells:
+        ws.append([])
+    else:
+        ws.append([cells.get(column) for column in range(1, max(cells.keys()) + 1)])
@@ -1,10 +1,11 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 from datetime import datetime, timedelta, timezone
 import base64
-import sys
+import mimetypes
 import config
+from core import download
 
 
 class AdvancedReportCollection:
@@ -19,8 +20,9 @@ class AdvancedReportCollection:
     ####################################################################################################################
     # PROCEDURES
     # Step 1: valid parameters
-    # Step 2: query advanced reports
+    # Step 2: query advanced reports without the files
     # Step 3: construct the result
+    # Note: download the files with /reports/advancedreports/{id}/file
     ####################################################################################################################
     @staticmethod
     def on_get(req, resp):
@@ -66,13 +68,13 @@ class AdvancedReportCollection:
                                    description='API.INVALID_REPORTING_PERIOD_END_DATETIME')
 
         ################################################################################################################
-        # Step 2: query advanced reports
+        # Step 2: query advanced reports without the files
         ################################################################################################################
 
-        cnx_reporting = mysql.connector.connect(**config.myems_reporting_db)
+        cnx_reporting = database.connect(config.myems_reporting_db)
         cursor_reporting = cnx_reporting.cursor(dictionary=True)
 
-        query = (" SELECT id, file_name, uuid, create_datetime_utc, file_type, file_object "
+        query = (" SELECT id, file_name, uuid, create_datetime_utc, file_type, file_size "
                  " FROM tbl_reports_files "
                  " WHERE create_datetime_utc >= %s AND create_datetime_utc < %s "
                  " ORDER BY create_datetime_utc desc ")
@@ -89,10 +91,6 @@ class AdvancedReportCollection:
         result = list()
         if rows is not None and len(rows) > 0:
             for row in rows:
-                # Base64 encode the bytes
-                base64_encoded_data = base64.b64encode(row['file_object'])
-                # get the Base64 encoded data using human-readable characters.
-                base64_message = base64_encoded_data.decode('utf-8')
                 create_datetime_local = row['create_datetime_utc'].replace(tzinfo=None) + \
                     timedelta(minutes=timezone_offset)
                 meta_result = {"id": row['id'],
@@ -100,8 +98,7 @@ class AdvancedReportCollection:
                                "uuid": row['uuid'],
                                "create_datetime_local": create_datetime_local.isoformat(),
                                "file_type": row['file_type'],
-                               "file_size_bytes": sys.getsizeof(row['file_object']),
-                               "file_bytes_base64": base64_message}
+                               "file_size_bytes": row['file_size']}
                 result.append(meta_result)
 
         resp.body = json.dumps(result)
@@ -123,7 +120,7 @@ class AdvancedReportItem:
                                    title='API.BAD_REQUEST',
                                    description='API.INVALID_ADVANCED_REPORT_ID')
 
-        cnx_reporting = mysql.connector.connect(**config.myems_reporting_db)
+        cnx_reporting = database.connect(config.myems_reporting_db)
         cursor_reporting = cnx_reporting.cursor(dictionary=True)
 
         query = (" SELECT id, file_name, uuid, create_datetime_utc, file_type, file_object "
@@ -162,7 +159,7 @@ class AdvancedReportItem:
                                    title='API.BAD_REQUEST',
                                    description='API.INVALID_ADVANCED_REPORT_ID')
 
-        cnx_reporting = mysql.connector.connect(**config.myems_reporting_db)
+        cnx_reporting = database.connect(config.myems_reporting_db)
         cursor_reporting = cnx_reporting.cursor(dictionary=True)
 
         cursor_reporting.execute(" SELECT id "
@@ -185,3 +182,56 @@ class AdvancedReportItem:
             cnx_reporting.disconnect()
 
         resp.status = falcon.HTTP_204
+
+
+class AdvancedReportFile:
+    @staticmethod
+    def __init__():
+        pass
+
+    @staticmethod
+    def on_options(req, resp, id_):
+        resp.status = falcon.HTTP_200
+
+    ####################################################################################################################
+    # Download the file of an advanced report in chunks, with ETag and Range support
+    ####################################################################################################################
+    @staticmethod
+    def on_get(req, resp, id_):
+        if not id_.isdigit() or int(id_) <= 0:
+            raise falcon.HTTPError(falcon.HTTP_400,
+                                   title='API.BAD_REQUEST',
+                                   description='API.INVALID_ADVANCED_REPORT_ID')
+
+        cnx_reporting = database.connect(config.myems_reporting_db)
+        cursor_reporting = cnx_reporting.cursor(dictionary=True)
+
+        query = (" SELECT id, file_name, uuid, file_type, COALESCE(file_size, LENGTH(file_object)) AS file_size "
+                 " FROM tbl_reports_files "
+                 " WHERE id = %s ")
+        cursor_reporting.execute(query, (id_,))
+        row = cursor_reporting.fetchone()
+        if cursor_reporting:
+            cursor_reporting.close()
+        if cnx_reporting:
+            cnx_reporting.disconnect()
+
+        if row is None:
+            raise falcon.HTTPError(falcon.HTTP_404,
+                                   title='API.NOT_FOUND',
+                                   description='API.ADVANCED_REPORT_NOT_FOUND')
+
+        content_type = mimetypes.guess_type('file.' + str(row['file_type']))[0] or 'application/octet-stream'
+        file_size = row['file_size'] if row['file_size'] is not None else 0
+        # files of advanced reports are not modified, so the uuid identifies the content
+        etag = str(row['id']) + '-' + str(row['uuid']) + '-' + str(file_size)
+
+        download.set_response(req, resp, row['file_name'], content_type, file_size, etag,
+                              lambda start, end: read_file_object(row['id'], start, end))
+
+
+########################################################################################################################
+# Read the file of an advanced report from offset start (included) to offset end (excluded) in chunks
+########################################################################################################################
+def read_file_object(id_, start, end):
+    return download.read_blob(config.myems_reporting_db, 'tbl_reports_files', id_, start, end)
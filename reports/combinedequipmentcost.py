@@ -1,9 +1,10 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 from datetime import datetime, timedelta, timezone
 from core import utilities
+from core import downsampling
 from decimal import Decimal
 
 
@@ -120,16 +121,18 @@ class Reporting:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_REPORTING_PERIOD_END_DATETIME')
 
+        max_points, downsample_method = downsampling.get_parameters(req.params)
+
         ################################################################################################################
         # Step 2: query the combined equipment
         ################################################################################################################
-        cnx_system = mysql.connector.connect(**config.myems_system_db)
+        cnx_system = database.connect(config.myems_system_db)
         cursor_system = cnx_system.cursor()
 
-        cnx_billing = mysql.connector.connect(**config.myems_billing_db)
+        cnx_billing = database.connect(config.myems_billing_db)
         cursor_billing = cnx_billing.cursor()
 
-        cnx_historical = mysql.connector.connect(**config.myems_historical_db)
+        cnx_historical = database.connect(config.myems_historical_db)
         cursor_historical = cnx_historical.cursor()
 
         cursor_system.execute(" SELECT id, name, cost_center_id "
@@ -335,7 +338,8 @@ class Reporting:
                     utilities.get_energy_category_peak_types(combined_equipment['cost_center_id'],
                                                              energy_category_id,
                                                              reporting_start_datetime_utc,
-                                                             reporting_end_datetime_utc)
+                                                             reporting_end_datetime_utc,
+                                                             cursor_system)
                 for row in rows_combined_equipment_hourly:
                     peak_type = energy_category_tariff_dict.get(row[0], None)
                     if peak_type == 'toppeak':
@@ -360,7 +364,8 @@ class Reporting:
                     utilities.get_energy_category_tariffs(combined_equipment['cost_center_id'],
                                                           energy_category_id,
                                                           reporting_start_datetime_utc,
-                                                          reporting_end_datetime_utc)
+                                                          reporting_end_datetime_utc,
+                                                          cursor_system)
                 tariff_timestamp_list = list()
                 tariff_value_list = list()
                 for k, v in energy_category_tariff_dict.items():
@@ -376,64 +381,25 @@ class Reporting:
         ################################################################################################################
         # Step 8: query associated points data
         ################################################################################################################
-        for point in point_list:
-            point_values = []
-            point_timestamps = []
-            if point['object_type'] == 'ANALOG_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_analog_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s "
-                         " ORDER BY utc_date_time ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-
-            elif point['object_type'] == 'ENERGY_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_energy_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s "
-                         " ORDER BY utc_date_time ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-            elif point['object_type'] == 'DIGITAL_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_digital_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
+        point_values_dict = dict()
+        for point_id, rows in utilities.get_points_history_values(cursor_historical,
+                                                                  point_list,
+                                                                  reporting_start_datetime_utc,
+                                                                  reporting_end_datetime_utc):
+            point_timestamps = list()
+            point_values = list()
+            for row in downsampling.downsample(rows,
+                                               reporting_start_datetime_utc,
+                                               reporting_end_datetime_utc,
+                                               max_points,
+                                               downsample_method):
+                current_datetime_local = row[0] + timedelta(minutes=timezone_offset)
+                point_timestamps.append(current_datetime_local.isoformat()[0:19])
+                point_values.append(row[1])
+            point_values_dict[point_id] = (point_timestamps, point_values)
 
+        for point in point_list:
+            point_timestamps, point_values = point_values_dict.get(point['id'], (list(), list()))
             parameters_data['names'].append(point['name'] + ' (' + point['units'] + ')')
             parameters_data['timestamps'].append(point_timestamps)
             parameters_data['values'].append(point_values)
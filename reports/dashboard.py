@@ -1,9 +1,13 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 from datetime import datetime, timedelta, timezone
 from core import utilities
+from core import downsampling
+from core import fetch
+from core import privilegescope
+from core import spacetree
 from decimal import Decimal
 
 
@@ -32,7 +36,8 @@ class Reporting:
     # Step 12: query associated sensors and points data
     # Step 13: query child spaces energy input
     # Step 14: query child spaces energy cost
-    # Step 15: construct the report
+    # Step 15: run queries concurrently
+    # Step 16: construct the report
     ####################################################################################################################
     @staticmethod
     def on_get(req, resp):
@@ -122,61 +127,47 @@ class Reporting:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_REPORTING_PERIOD_END_DATETIME')
 
+        max_points, downsample_method = downsampling.get_parameters(req.params)
+
         ################################################################################################################
         # Step 2: query the space
         ################################################################################################################
 
-        cnx_user = mysql.connector.connect(**config.myems_user_db)
-        cursor_user = cnx_user.cursor()
+        if req.context.user is not None and req.context.user['uuid'] == user_uuid:
+            # the user of the session, whose privilege is resolved by the session middleware
+            user = req.context.user
+            privilege_data = None if req.context.privilege is None else req.context.privilege['data']
+        else:
+            cnx_user = database.connect(config.myems_user_db)
+            cursor_user = cnx_user.cursor()
 
-        cursor_user.execute(" SELECT id, is_admin, privilege_id "
-                            " FROM tbl_users "
-                            " WHERE uuid = %s ", (user_uuid,))
-        row_user = cursor_user.fetchone()
-        if row_user is None:
+            cursor_user.execute(" SELECT u.id, u.is_admin, u.privilege_id, p.data "
+                                " FROM tbl_users u LEFT JOIN tbl_privileges p ON u.privilege_id = p.id "
+                                " WHERE u.uuid = %s ", (user_uuid,))
+            row_user = cursor_user.fetchone()
             if cursor_user:
                 cursor_user.close()
             if cnx_user:
                 cnx_user.disconnect()
 
-            raise falcon.HTTPError(falcon.HTTP_404, 'API.NOT_FOUND', 'API.USER_NOT_FOUND')
+            if row_user is None:
+                raise falcon.HTTPError(falcon.HTTP_404, 'API.NOT_FOUND', 'API.USER_NOT_FOUND')
+
+            user = {'id': row_user[0], 'is_admin': row_user[1], 'privilege_id': row_user[2]}
+            privilege_data = row_user[3]
 
-        user = {'id': row_user[0], 'is_admin': row_user[1], 'privilege_id': row_user[2]}
         if user['is_admin']:
             # todo: make sure the space id is always 1 for admin
             space_id = 1
         else:
-            cursor_user.execute(" SELECT data "
-                                " FROM tbl_privileges "
-                                " WHERE id = %s ", (user['privilege_id'],))
-            row_privilege = cursor_user.fetchone()
-            if row_privilege is None:
-                if cursor_user:
-                    cursor_user.close()
-                if cnx_user:
-                    cnx_user.disconnect()
-
-                raise falcon.HTTPError(falcon.HTTP_404, 'API.NOT_FOUND', 'API.USER_PRIVILEGE_NOT_FOUND')
-
-            privilege_data = json.loads(row_privilege[0])
-            if 'spaces' not in privilege_data.keys() \
-                    or privilege_data['spaces'] is None \
-                    or len(privilege_data['spaces']) == 0:
-                if cursor_user:
-                    cursor_user.close()
-                if cnx_user:
-                    cnx_user.disconnect()
-
+            scope = None if privilege_data is None else \
+                privilegescope.get_scope(user['privilege_id'], privilege_data)
+            if scope is None:
                 raise falcon.HTTPError(falcon.HTTP_404, 'API.NOT_FOUND', 'API.USER_PRIVILEGE_NOT_FOUND')
-            # todo: how to deal with multiple spaces in privilege data
-            space_id = privilege_data['spaces'][0]
-
-        if cursor_user:
-            cursor_user.close()
-        if cnx_user:
-            cnx_user.disconnect()
+            # the dashboard is of the first space in privilege data
+            space_id = scope.root_space_ids[0]
 
-        cnx_system = mysql.connector.connect(**config.myems_system_db)
+        cnx_system = database.connect(config.myems_system_db)
         cursor_system = cnx_system.cursor()
 
         cursor_system.execute(" SELECT id, name, area, cost_center_id "
@@ -200,10 +191,10 @@ class Reporting:
         ################################################################################################################
         # Step 3: query energy categories
         ################################################################################################################
-        cnx_energy = mysql.connector.connect(**config.myems_energy_db)
+        cnx_energy = database.connect(config.myems_energy_db)
         cursor_energy = cnx_energy.cursor()
 
-        cnx_billing = mysql.connector.connect(**config.myems_billing_db)
+        cnx_billing = database.connect(config.myems_billing_db)
         cursor_billing = cnx_billing.cursor()
 
         energy_category_set = set()
@@ -293,409 +284,374 @@ class Reporting:
         ################################################################################################################
         # Step 6: query child spaces
         ################################################################################################################
-        child_space_list = list()
-        cursor_system.execute(" SELECT id, name  "
-                              " FROM tbl_spaces "
-                              " WHERE parent_space_id = %s "
-                              " ORDER BY id ", (space['id'], ))
-        rows_child_spaces = cursor_system.fetchall()
-        if rows_child_spaces is not None and len(rows_child_spaces) > 0:
-            for row in rows_child_spaces:
-                child_space_list.append({"id": row[0], "name": row[1]})
+        child_space_list = spacetree.get_tree((space['id'], ), cursor_system).get_children(space['id'])
 
         ################################################################################################################
         # Step 7: query base period energy input
         ################################################################################################################
-        base_input = dict()
-        if energy_category_set is not None and len(energy_category_set) > 0:
-            for energy_category_id in energy_category_set:
-                kgce = energy_category_dict[energy_category_id]['kgce']
-                kgco2e = energy_category_dict[energy_category_id]['kgco2e']
-
-                base_input[energy_category_id] = dict()
-                base_input[energy_category_id]['timestamps'] = list()
-                base_input[energy_category_id]['values'] = list()
-                base_input[energy_category_id]['subtotal'] = Decimal(0.0)
-                base_input[energy_category_id]['subtotal_in_kgce'] = Decimal(0.0)
-                base_input[energy_category_id]['subtotal_in_kgco2e'] = Decimal(0.0)
-
-                cursor_energy.execute(" SELECT start_datetime_utc, actual_value "
-                                      " FROM tbl_space_input_category_hourly "
-                                      " WHERE space_id = %s "
-                                      "     AND energy_category_id = %s "
-                                      "     AND start_datetime_utc >= %s "
-                                      "     AND start_datetime_utc < %s "
-                                      " ORDER BY start_datetime_utc ",
-                                      (space['id'],
-                                       energy_category_id,
-                                       base_start_datetime_utc,
-                                       base_end_datetime_utc))
-                rows_space_hourly = cursor_energy.fetchall()
-
-                rows_space_periodically = utilities.aggregate_hourly_data_by_period(rows_space_hourly,
-                                                                                    base_start_datetime_utc,
-                                                                                    base_end_datetime_utc,
-                                                                                    period_type)
-                for row_space_periodically in rows_space_periodically:
-                    current_datetime_local = row_space_periodically[0].replace(tzinfo=timezone.utc) + \
-                                             timedelta(minutes=timezone_offset)
-                    if period_type == 'hourly':
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                    elif period_type == 'daily':
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%d')
-                    elif period_type == 'monthly':
-                        current_datetime = current_datetime_local.strftime('%Y-%m')
-                    elif period_type == 'yearly':
-                        current_datetime = current_datetime_local.strftime('%Y')
-
-                    actual_value = Decimal(0.0) if row_space_periodically[1] is None else row_space_periodically[1]
-                    base_input[energy_category_id]['timestamps'].append(current_datetime)
-                    base_input[energy_category_id]['values'].append(actual_value)
-                    base_input[energy_category_id]['subtotal'] += actual_value
-                    base_input[energy_category_id]['subtotal_in_kgce'] += actual_value * kgce
-                    base_input[energy_category_id]['subtotal_in_kgco2e'] += actual_value * kgco2e
+        fetch_stage = fetch.FetchStage('dashboard')
+
+        def query_base_input(cursor_energy):
+            base_input = dict()
+            if energy_category_set is not None and len(energy_category_set) > 0:
+                for energy_category_id in energy_category_set:
+                    kgce = energy_category_dict[energy_category_id]['kgce']
+                    kgco2e = energy_category_dict[energy_category_id]['kgco2e']
+
+                    base_input[energy_category_id] = dict()
+                    base_input[energy_category_id]['timestamps'] = list()
+                    base_input[energy_category_id]['values'] = list()
+                    base_input[energy_category_id]['subtotal'] = Decimal(0.0)
+                    base_input[energy_category_id]['subtotal_in_kgce'] = Decimal(0.0)
+                    base_input[energy_category_id]['subtotal_in_kgco2e'] = Decimal(0.0)
+
+                    cursor_energy.execute(" SELECT start_datetime_utc, actual_value "
+                                          " FROM tbl_space_input_category_hourly "
+                                          " WHERE space_id = %s "
+                                          "     AND energy_category_id = %s "
+                                          "     AND start_datetime_utc >= %s "
+                                          "     AND start_datetime_utc < %s "
+                                          " ORDER BY start_datetime_utc ",
+                                          (space['id'],
+                                           energy_category_id,
+                                           base_start_datetime_utc,
+                                           base_end_datetime_utc))
+                    rows_space_hourly = cursor_energy.fetchall()
+
+                    rows_space_periodically = utilities.aggregate_hourly_data_by_period(rows_space_hourly,
+                                                                                        base_start_datetime_utc,
+                                                                                        base_end_datetime_utc,
+                                                                                        period_type)
+                    for row_space_periodically in rows_space_periodically:
+                        current_datetime_local = row_space_periodically[0].replace(tzinfo=timezone.utc) + \
+                                                 timedelta(minutes=timezone_offset)
+                        if period_type == 'hourly':
+                            current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
+                        elif period_type == 'daily':
+                            current_datetime = current_datetime_local.strftime('%Y-%m-%d')
+                        elif period_type == 'monthly':
+                            current_datetime = current_datetime_local.strftime('%Y-%m')
+                        elif period_type == 'yearly':
+                            current_datetime = current_datetime_local.strftime('%Y')
+
+                        actual_value = Decimal(0.0) if row_space_periodically[1] is None else row_space_periodically[1]
+                        base_input[energy_category_id]['timestamps'].append(current_datetime)
+                        base_input[energy_category_id]['values'].append(actual_value)
+                        base_input[energy_category_id]['subtotal'] += actual_value
+                        base_input[energy_category_id]['subtotal_in_kgce'] += actual_value * kgce
+                        base_input[energy_category_id]['subtotal_in_kgco2e'] += actual_value * kgco2e
+            return base_input
+
+        fetch_stage.add('base_input', config.myems_energy_db, query_base_input)
 
         ################################################################################################################
         # Step 8: query base period energy cost
         ################################################################################################################
-        base_cost = dict()
-        if energy_category_set is not None and len(energy_category_set) > 0:
-            for energy_category_id in energy_category_set:
-                base_cost[energy_category_id] = dict()
-                base_cost[energy_category_id]['timestamps'] = list()
-                base_cost[energy_category_id]['values'] = list()
-                base_cost[energy_category_id]['subtotal'] = Decimal(0.0)
-
-                cursor_billing.execute(" SELECT start_datetime_utc, actual_value "
-                                       " FROM tbl_space_input_category_hourly "
-                                       " WHERE space_id = %s "
-                                       "     AND energy_category_id = %s "
-                                       "     AND start_datetime_utc >= %s "
-                                       "     AND start_datetime_utc < %s "
-                                       " ORDER BY start_datetime_utc ",
-                                       (space['id'],
-                                        energy_category_id,
-                                        base_start_datetime_utc,
-                                        base_end_datetime_utc))
-                rows_space_hourly = cursor_billing.fetchall()
-
-                rows_space_periodically = utilities.aggregate_hourly_data_by_period(rows_space_hourly,
-                                                                                    base_start_datetime_utc,
-                                                                                    base_end_datetime_utc,
-                                                                                    period_type)
-                for row_space_periodically in rows_space_periodically:
-                    current_datetime_local = row_space_periodically[0].replace(tzinfo=timezone.utc) + \
-                                             timedelta(minutes=timezone_offset)
-                    if period_type == 'hourly':
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                    elif period_type == 'daily':
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%d')
-                    elif period_type == 'monthly':
-                        current_datetime = current_datetime_local.strftime('%Y-%m')
-                    elif period_type == 'yearly':
-                        current_datetime = current_datetime_local.strftime('%Y')
-
-                    actual_value = Decimal(0.0) if row_space_periodically[1] is None else row_space_periodically[1]
-                    base_cost[energy_category_id]['timestamps'].append(current_datetime)
-                    base_cost[energy_category_id]['values'].append(actual_value)
-                    base_cost[energy_category_id]['subtotal'] += actual_value
-
-        ################################################################################################################
-        # Step 9: query reporting period energy input
-        ################################################################################################################
-        reporting_input = dict()
-        if energy_category_set is not None and len(energy_category_set) > 0:
-            for energy_category_id in energy_category_set:
-                kgce = energy_category_dict[energy_category_id]['kgce']
-                kgco2e = energy_category_dict[energy_category_id]['kgco2e']
-
-                reporting_input[energy_category_id] = dict()
-                reporting_input[energy_category_id]['timestamps'] = list()
-                reporting_input[energy_category_id]['values'] = list()
-                reporting_input[energy_category_id]['subtotal'] = Decimal(0.0)
-                reporting_input[energy_category_id]['subtotal_in_kgce'] = Decimal(0.0)
-                reporting_input[energy_category_id]['subtotal_in_kgco2e'] = Decimal(0.0)
-                reporting_input[energy_category_id]['toppeak'] = Decimal(0.0)
-                reporting_input[energy_category_id]['onpeak'] = Decimal(0.0)
-                reporting_input[energy_category_id]['midpeak'] = Decimal(0.0)
-                reporting_input[energy_category_id]['offpeak'] = Decimal(0.0)
-
-                cursor_energy.execute(" SELECT start_datetime_utc, actual_value "
-                                      " FROM tbl_space_input_category_hourly "
-                                      " WHERE space_id = %s "
-                                      "     AND energy_category_id = %s "
-                                      "     AND start_datetime_utc >= %s "
-                                      "     AND start_datetime_utc < %s "
-                                      " ORDER BY start_datetime_utc ",
-                                      (space['id'],
-                                       energy_category_id,
-                                       reporting_start_datetime_utc,
-                                       reporting_end_datetime_utc))
-                rows_space_hourly = cursor_energy.fetchall()
-
-                rows_space_periodically = utilities.aggregate_hourly_data_by_period(rows_space_hourly,
-                                                                                    reporting_start_datetime_utc,
-                                                                                    reporting_end_datetime_utc,
-                                                                                    period_type)
-                for row_space_periodically in rows_space_periodically:
-                    current_datetime_local = row_space_periodically[0].replace(tzinfo=timezone.utc) + \
-                                             timedelta(minutes=timezone_offset)
-                    if period_type == 'hourly':
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                    elif period_type == 'daily':
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%d')
-                    elif period_type == 'monthly':
-                        current_datetime = current_datetime_local.strftime('%Y-%m')
-                    elif period_type == 'yearly':
-                        current_datetime = current_datetime_local.strftime('%Y')
-
-                    actual_value = Decimal(0.0) if row_space_periodically[1] is None else row_space_periodically[1]
-                    reporting_input[energy_category_id]['timestamps'].append(current_datetime)
-                    reporting_input[energy_category_id]['values'].append(actual_value)
-                    reporting_input[energy_category_id]['subtotal'] += actual_value
-                    reporting_input[energy_category_id]['subtotal_in_kgce'] += actual_value * kgce
-                    reporting_input[energy_category_id]['subtotal_in_kgco2e'] += actual_value * kgco2e
-
-                energy_category_tariff_dict = utilities.get_energy_category_peak_types(space['cost_center_id'],
-                                                                                       energy_category_id,
-                                                                                       reporting_start_datetime_utc,
-                                                                                       reporting_end_datetime_utc)
-                for row in rows_space_hourly:
-                    peak_type = energy_category_tariff_dict.get(row[0], None)
-                    if peak_type == 'toppeak':
-                        reporting_input[energy_category_id]['toppeak'] += row[1]
-                    elif peak_type == 'onpeak':
-                        reporting_input[energy_category_id]['onpeak'] += row[1]
-                    elif peak_type == 'midpeak':
-                        reporting_input[energy_category_id]['midpeak'] += row[1]
-                    elif peak_type == 'offpeak':
-                        reporting_input[energy_category_id]['offpeak'] += row[1]
-
-        ################################################################################################################
-        # Step 10: query reporting period energy cost
-        ################################################################################################################
-        reporting_cost = dict()
-        if energy_category_set is not None and len(energy_category_set) > 0:
-            for energy_category_id in energy_category_set:
-
-                reporting_cost[energy_category_id] = dict()
-                reporting_cost[energy_category_id]['timestamps'] = list()
-                reporting_cost[energy_category_id]['values'] = list()
-                reporting_cost[energy_category_id]['subtotal'] = Decimal(0.0)
-                reporting_cost[energy_category_id]['toppeak'] = Decimal(0.0)
-                reporting_cost[energy_category_id]['onpeak'] = Decimal(0.0)
-                reporting_cost[energy_category_id]['midpeak'] = Decimal(0.0)
-                reporting_cost[energy_category_id]['offpeak'] = Decimal(0.0)
-
-                cursor_billing.execute(" SELECT start_datetime_utc, actual_value "
-                                       " FROM tbl_space_input_category_hourly "
-                                       " WHERE space_id = %s "
-                                       "     AND energy_category_id = %s "
-                                       "     AND start_datetime_utc >= %s "
-                                       "     AND start_datetime_utc < %s "
-                                       " ORDER BY start_datetime_utc ",
-                                       (space['id'],
-                                        energy_category_id,
-                                        reporting_start_datetime_utc,
-                                        reporting_end_datetime_utc))
-                rows_space_hourly = cursor_billing.fetchall()
-
-                rows_space_periodically = utilities.aggregate_hourly_data_by_period(rows_space_hourly,
-                                                                                    reporting_start_datetime_utc,
-                                                                                    reporting_end_datetime_utc,
-                                                                                    period_type)
-                for row_space_periodically in rows_space_periodically:
-                    current_datetime_local = row_space_periodically[0].replace(tzinfo=timezone.utc) + \
-                                             timedelta(minutes=timezone_offset)
-                    if period_type == 'hourly':
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                    elif period_type == 'daily':
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%d')
-                    elif period_type == 'monthly':
-                        current_datetime = current_datetime_local.strftime('%Y-%m')
-                    elif period_type == 'yearly':
-                        current_datetime = current_datetime_local.strftime('%Y')
-
-                    actual_value = Decimal(0.0) if row_space_periodically[1] is None else row_space_periodically[1]
-                    reporting_cost[energy_category_id]['timestamps'].append(current_datetime)
-                    reporting_cost[energy_category_id]['values'].append(actual_value)
-                    reporting_cost[energy_category_id]['subtotal'] += actual_value
-
-                energy_category_tariff_dict = utilities.get_energy_category_peak_types(space['cost_center_id'],
-                                                                                       energy_category_id,
-                                                                                       reporting_start_datetime_utc,
-                                                                                       reporting_end_datetime_utc)
-                for row in rows_space_hourly:
-                    peak_type = energy_category_tariff_dict.get(row[0], None)
-                    if peak_type == 'toppeak':
-                        reporting_cost[energy_category_id]['toppeak'] += row[1]
-                    elif peak_type == 'onpeak':
-                        reporting_cost[energy_category_id]['onpeak'] += row[1]
-                    elif peak_type == 'midpeak':
-                        reporting_cost[energy_category_id]['midpeak'] += row[1]
-                    elif peak_type == 'offpeak':
-                        reporting_cost[energy_category_id]['offpeak'] += row[1]
-        ################################################################################################################
-        # Step 11: query tariff data
-        ################################################################################################################
-        parameters_data = dict()
-        parameters_data['names'] = list()
-        parameters_data['timestamps'] = list()
-        parameters_data['values'] = list()
-        if energy_category_set is not None and len(energy_category_set) > 0:
-            for energy_category_id in energy_category_set:
-                energy_category_tariff_dict = utilities.get_energy_category_tariffs(space['cost_center_id'],
-                                                                                    energy_category_id,
-                                                                                    reporting_start_datetime_utc,
-                                                                                    reporting_end_datetime_utc)
-                tariff_timestamp_list = list()
-                tariff_value_list = list()
-                for k, v in energy_category_tariff_dict.items():
-                    # convert k from utc to local
-                    k = k + timedelta(minutes=timezone_offset)
-                    tariff_timestamp_list.append(k.isoformat()[0:19][0:19])
-                    tariff_value_list.append(v)
-
-                parameters_data['names'].append('TARIFF-' + energy_category_dict[energy_category_id]['name'])
-                parameters_data['timestamps'].append(tariff_timestamp_list)
-                parameters_data['values'].append(tariff_value_list)
-
-        ################################################################################################################
-        # Step 12: query associated sensors and points data
-        ################################################################################################################
-
-        cnx_historical = mysql.connector.connect(**config.myems_historical_db)
-        cursor_historical = cnx_historical.cursor()
-
-        for point in point_list:
-            point_values = []
-            point_timestamps = []
-            if point['object_type'] == 'ANALOG_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_analog_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s "
-                         " ORDER BY utc_date_time ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-
-            elif point['object_type'] == 'ENERGY_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_energy_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s "
-                         " ORDER BY utc_date_time ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-            elif point['object_type'] == 'DIGITAL_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_digital_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
+        def query_base_cost(cursor_billing):
+            base_cost = dict()
+            if energy_category_set is not None and len(energy_category_set) > 0:
+                for energy_category_id in energy_category_set:
+                    base_cost[energy_category_id] = dict()
+                    base_cost[energy_category_id]['timestamps'] = list()
+                    base_cost[energy_category_id]['values'] = list()
+                    base_cost[energy_category_id]['subtotal'] = Decimal(0.0)
+
+                    cursor_billing.execute(" SELECT start_datetime_utc, actual_value "
+                                           " FROM tbl_space_input_category_hourly "
+                                           " WHERE space_id = %s "
+                                           "     AND energy_category_id = %s "
+                                           "     AND start_datetime_utc >= %s "
+                                           "     AND start_datetime_utc < %s "
+                                           " ORDER BY start_datetime_utc ",
+                                           (space['id'],
+                                            energy_category_id,
+                                            base_start_datetime_utc,
+                                            base_end_datetime_utc))
+                    rows_space_hourly = cursor_billing.fetchall()
+
+                    rows_space_periodically = utilities.aggregate_hourly_data_by_period(rows_space_hourly,
+                                                                                        base_start_datetime_utc,
+                                                                                        base_end_datetime_utc,
+                                                                                        period_type)
+                    for row_space_periodically in rows_space_periodically:
+                        current_datetime_local = row_space_periodically[0].replace(tzinfo=timezone.utc) + \
                                                  timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-
-            parameters_data['names'].append(point['name'] + ' (' + point['units'] + ')')
-            parameters_data['timestamps'].append(point_timestamps)
-            parameters_data['values'].append(point_values)
+                        if period_type == 'hourly':
+                            current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
+                        elif period_type == 'daily':
+                            current_datetime = current_datetime_local.strftime('%Y-%m-%d')
+                        elif period_type == 'monthly':
+                            current_datetime = current_datetime_local.strftime('%Y-%m')
+                        elif period_type == 'yearly':
+                            current_datetime = current_datetime_local.strftime('%Y')
+
+                        actual_value = Decimal(0.0) if row_space_periodically[1] is None else row_space_periodically[1]
+                        base_cost[energy_category_id]['timestamps'].append(current_datetime)
+                        base_cost[energy_category_id]['values'].append(actual_value)
+                        base_cost[energy_category_id]['subtotal'] += actual_value
+            return base_cost
+
+        fetch_stage.add('base_cost', config.myems_billing_db, query_base_cost)
 
         ################################################################################################################
-        # Step 13: query child spaces energy input
+        # Step 9: query reporting period energy input
         ################################################################################################################
-        child_space_input = dict()
-
-        if energy_category_set is not None and len(energy_category_set) > 0:
-            for energy_category_id in energy_category_set:
-                child_space_input[energy_category_id] = dict()
-                child_space_input[energy_category_id]['child_space_names'] = list()
-                child_space_input[energy_category_id]['subtotals'] = list()
-                child_space_input[energy_category_id]['subtotals_in_kgce'] = list()
-                child_space_input[energy_category_id]['subtotals_in_kgco2e'] = list()
-                kgce = energy_category_dict[energy_category_id]['kgce']
-                kgco2e = energy_category_dict[energy_category_id]['kgco2e']
-                for child_space in child_space_list:
-                    child_space_input[energy_category_id]['child_space_names'].append(child_space['name'])
-
-                    cursor_energy.execute(" SELECT SUM(actual_value) "
+        def query_reporting_input(cursor_energy):
+            reporting_input = dict()
+            if energy_category_set is not None and len(energy_category_set) > 0:
+                for energy_category_id in energy_category_set:
+                    kgce = energy_category_dict[energy_category_id]['kgce']
+                    kgco2e = energy_category_dict[energy_category_id]['kgco2e']
+
+                    reporting_input[energy_category_id] = dict()
+                    reporting_input[energy_category_id]['timestamps'] = list()
+                    reporting_input[energy_category_id]['values'] = list()
+                    reporting_input[energy_category_id]['subtotal'] = Decimal(0.0)
+                    reporting_input[energy_category_id]['subtotal_in_kgce'] = Decimal(0.0)
+                    reporting_input[energy_category_id]['subtotal_in_kgco2e'] = Decimal(0.0)
+                    reporting_input[energy_category_id]['toppeak'] = Decimal(0.0)
+                    reporting_input[energy_category_id]['onpeak'] = Decimal(0.0)
+                    reporting_input[energy_category_id]['midpeak'] = Decimal(0.0)
+                    reporting_input[energy_category_id]['offpeak'] = Decimal(0.0)
+
+                    cursor_energy.execute(" SELECT start_datetime_utc, actual_value "
                                           " FROM tbl_space_input_category_hourly "
                                           " WHERE space_id = %s "
                                           "     AND energy_category_id = %s "
                                           "     AND start_datetime_utc >= %s "
                                           "     AND start_datetime_utc < %s "
                                           " ORDER BY start_datetime_utc ",
-                                          (child_space['id'],
+                                          (space['id'],
                                            energy_category_id,
                                            reporting_start_datetime_utc,
                                            reporting_end_datetime_utc))
-                    row_subtotal = cursor_energy.fetchone()
-
-                    subtotal = Decimal(0.0) if (row_subtotal is None or row_subtotal[0] is None) else row_subtotal[0]
-                    child_space_input[energy_category_id]['subtotals'].append(subtotal)
-                    child_space_input[energy_category_id]['subtotals_in_kgce'].append(subtotal * kgce)
-                    child_space_input[energy_category_id]['subtotals_in_kgco2e'].append(subtotal * kgco2e)
+                    rows_space_hourly = cursor_energy.fetchall()
+
+                    rows_space_periodically = utilities.aggregate_hourly_data_by_period(rows_space_hourly,
+                                                                                        reporting_start_datetime_utc,
+                                                                                        reporting_end_datetime_utc,
+                                                                                        period_type)
+                    for row_space_periodically in rows_space_periodically:
+                        current_datetime_local = row_space_periodically[0].replace(tzinfo=timezone.utc) + \
+                                                 timedelta(minutes=timezone_offset)
+                        if period_type == 'hourly':
+                            current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
+                        elif period_type == 'daily':
+                            current_datetime = current_datetime_local.strftime('%Y-%m-%d')
+                        elif period_type == 'monthly':
+                            current_datetime = current_datetime_local.strftime('%Y-%m')
+                        elif period_type == 'yearly':
+                            current_datetime = current_datetime_local.strftime('%Y')
+
+                        actual_value = Decimal(0.0) if row_space_periodically[1] is None else row_space_periodically[1]
+                        reporting_input[energy_category_id]['timestamps'].append(current_datetime)
+                        reporting_input[energy_category_id]['values'].append(actual_value)
+                        reporting_input[energy_category_id]['subtotal'] += actual_value
+                        reporting_input[energy_category_id]['subtotal_in_kgce'] += actual_value * kgce
+                        reporting_input[energy_category_id]['subtotal_in_kgco2e'] += actual_value * kgco2e
+
+                    energy_category_tariff_dict = utilities.get_energy_category_peak_types(space['cost_center_id'],
+                                                                                           energy_category_id,
+                                                                                           reporting_start_datetime_utc,
+                                                                                           reporting_end_datetime_utc)
+                    for row in rows_space_hourly:
+                        peak_type = energy_category_tariff_dict.get(row[0], None)
+                        if peak_type == 'toppeak':
+                            reporting_input[energy_category_id]['toppeak'] += row[1]
+                        elif peak_type == 'onpeak':
+                            reporting_input[energy_category_id]['onpeak'] += row[1]
+                        elif peak_type == 'midpeak':
+                            reporting_input[energy_category_id]['midpeak'] += row[1]
+                        elif peak_type == 'offpeak':
+                            reporting_input[energy_category_id]['offpeak'] += row[1]
+            return reporting_input
+
+        fetch_stage.add('reporting_input', config.myems_energy_db, query_reporting_input)
 
         ################################################################################################################
-        # Step 14: query child spaces energy cost
+        # Step 10: query reporting period energy cost
         ################################################################################################################
-        child_space_cost = dict()
-
-        if energy_category_set is not None and len(energy_category_set) > 0:
-            for energy_category_id in energy_category_set:
-                child_space_cost[energy_category_id] = dict()
-                child_space_cost[energy_category_id]['child_space_names'] = list()
-                child_space_cost[energy_category_id]['subtotals'] = list()
-                for child_space in child_space_list:
-                    child_space_cost[energy_category_id]['child_space_names'].append(child_space['name'])
-
-                    cursor_billing.execute(" SELECT SUM(actual_value) "
+        def query_reporting_cost(cursor_billing):
+            reporting_cost = dict()
+            if energy_category_set is not None and len(energy_category_set) > 0:
+                for energy_category_id in energy_category_set:
+
+                    reporting_cost[energy_category_id] = dict()
+                    reporting_cost[energy_category_id]['timestamps'] = list()
+                    reporting_cost[energy_category_id]['values'] = list()
+                    reporting_cost[energy_category_id]['subtotal'] = Decimal(0.0)
+                    reporting_cost[energy_category_id]['toppeak'] = Decimal(0.0)
+                    reporting_cost[energy_category_id]['onpeak'] = Decimal(0.0)
+                    reporting_cost[energy_category_id]['midpeak'] = Decimal(0.0)
+                    reporting_cost[energy_category_id]['offpeak'] = Decimal(0.0)
+
+                    cursor_billing.execute(" SELECT start_datetime_utc, actual_value "
                                            " FROM tbl_space_input_category_hourly "
                                            " WHERE space_id = %s "
                                            "     AND energy_category_id = %s "
                                            "     AND start_datetime_utc >= %s "
                                            "     AND start_datetime_utc < %s "
                                            " ORDER BY start_datetime_utc ",
-                                           (child_space['id'],
+                                           (space['id'],
                                             energy_category_id,
                                             reporting_start_datetime_utc,
                                             reporting_end_datetime_utc))
-                    row_subtotal = cursor_billing.fetchone()
+                    rows_space_hourly = cursor_billing.fetchall()
+
+                    rows_space_periodically = utilities.aggregate_hourly_data_by_period(rows_space_hourly,
+                                                                                        reporting_start_datetime_utc,
+                                                                                        reporting_end_datetime_utc,
+                                                                                        period_type)
+                    for row_space_periodically in rows_space_periodically:
+                        current_datetime_local = row_space_periodically[0].replace(tzinfo=timezone.utc) + \
+                                                 timedelta(minutes=timezone_offset)
+                        if period_type == 'hourly':
+                            current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
+                        elif period_type == 'daily':
+                            current_datetime = current_datetime_local.strftime('%Y-%m-%d')
+                        elif period_type == 'monthly':
+                            current_datetime = current_datetime_local.strftime('%Y-%m')
+                        elif period_type == 'yearly':
+                            current_datetime = current_datetime_local.strftime('%Y')
+
+                        actual_value = Decimal(0.0) if row_space_periodically[1] is None else row_space_periodically[1]
+                        reporting_cost[energy_category_id]['timestamps'].append(current_datetime)
+                        reporting_cost[energy_category_id]['values'].append(actual_value)
+                        reporting_cost[energy_category_id]['subtotal'] += actual_value
+
+                    energy_category_tariff_dict = utilities.get_energy_category_peak_types(space['cost_center_id'],
+                                                                                           energy_category_id,
+                                                                                           reporting_start_datetime_utc,
+                                                                                           reporting_end_datetime_utc)
+                    for row in rows_space_hourly:
+                        peak_type = energy_category_tariff_dict.get(row[0], None)
+                        if peak_type == 'toppeak':
+                            reporting_cost[energy_category_id]['toppeak'] += row[1]
+                        elif peak_type == 'onpeak':
+                            reporting_cost[energy_category_id]['onpeak'] += row[1]
+                        elif peak_type == 'midpeak':
+                            reporting_cost[energy_category_id]['midpeak'] += row[1]
+                        elif peak_type == 'offpeak':
+                            reporting_cost[energy_category_id]['offpeak'] += row[1]
+            return reporting_cost
+
+        fetch_stage.add('reporting_cost', config.myems_billing_db, query_reporting_cost)
+
+        ################################################################################################################
+        # Step 11: query tariff data
+        ################################################################################################################
+        def query_tariffs():
+            parameters_data = dict()
+            parameters_data['names'] = list()
+            parameters_data['timestamps'] = list()
+            parameters_data['values'] = list()
+            if energy_category_set is not None and len(energy_category_set) > 0:
+                for energy_category_id in energy_category_set:
+                    energy_category_tariff_dict = utilities.get_energy_category_tariffs(space['cost_center_id'],
+                                                                                        energy_category_id,
+                                                                                        reporting_start_datetime_utc,
+                                                                                        reporting_end_datetime_utc)
+                    tariff_timestamp_list = list()
+                    tariff_value_list = list()
+                    for k, v in energy_category_tariff_dict.items():
+                        # convert k from utc to local
+                        k = k + timedelta(minutes=timezone_offset)
+                        tariff_timestamp_list.append(k.isoformat()[0:19][0:19])
+                        tariff_value_list.append(v)
+
+                    parameters_data['names'].append('TARIFF-' + energy_category_dict[energy_category_id]['name'])
+                    parameters_data['timestamps'].append(tariff_timestamp_list)
+                    parameters_data['values'].append(tariff_value_list)
+            return parameters_data
+
+        fetch_stage.add('parameters_data', None, query_tariffs)
 
-                    subtotal = Decimal(0.0) if (row_subtotal is None or row_subtotal[0] is None) else row_subtotal[0]
-                    child_space_cost[energy_category_id]['subtotals'].append(subtotal)
+        ################################################################################################################
+        # Step 12: query associated sensors and points data
+        ################################################################################################################
+        def query_points_values(cursor_historical):
+            point_values_dict = dict()
+            for point_id, rows in utilities.get_points_history_values(cursor_historical,
+                                                                      point_list,
+                                                                      reporting_start_datetime_utc,
+                                                                      reporting_end_datetime_utc):
+                point_timestamps = list()
+                point_values = list()
+                for row in downsampling.downsample(rows,
+                                                   reporting_start_datetime_utc,
+                                                   reporting_end_datetime_utc,
+                                                   max_points,
+                                                   downsample_method):
+                    current_datetime_local = row[0] + timedelta(minutes=timezone_offset)
+                    point_timestamps.append(current_datetime_local.isoformat()[0:19])
+                    point_values.append(row[1])
+                point_values_dict[point_id] = (point_timestamps, point_values)
+            return point_values_dict
+
+        fetch_stage.add('point_values_dict', config.myems_historical_db, query_points_values)
 
         ################################################################################################################
-        # Step 15: construct the report
+        # Step 13: query child spaces energy input
+        ################################################################################################################
+        def query_child_space_input(cursor_energy):
+            child_space_input = dict()
+
+            if energy_category_set is not None and len(energy_category_set) > 0:
+                child_space_subtotals = utilities.get_child_spaces_subtotals(cursor_energy,
+                                                                             'tbl_space_input_category_hourly',
+                                                                             'energy_category_id',
+                                                                             child_space_list,
+                                                                             energy_category_set,
+                                                                             reporting_start_datetime_utc,
+                                                                             reporting_end_datetime_utc)
+                for energy_category_id in energy_category_set:
+                    child_space_input[energy_category_id] = dict()
+                    child_space_input[energy_category_id]['child_space_names'] = list()
+                    child_space_input[energy_category_id]['subtotals'] = list()
+                    child_space_input[energy_category_id]['subtotals_in_kgce'] = list()
+                    child_space_input[energy_category_id]['subtotals_in_kgco2e'] = list()
+                    kgce = energy_category_dict[energy_category_id]['kgce']
+                    kgco2e = energy_category_dict[energy_category_id]['kgco2e']
+                    for child_space in child_space_list:
+                        child_space_input[energy_category_id]['child_space_names'].append(child_space['name'])
+                        subtotal = child_space_subtotals.get((child_space['id'], energy_category_id), Decimal(0.0))
+                        child_space_input[energy_category_id]['subtotals'].append(subtotal)
+                        child_space_input[energy_category_id]['subtotals_in_kgce'].append(subtotal * kgce)
+                        child_space_input[energy_category_id]['subtotals_in_kgco2e'].append(subtotal * kgco2e)
+            return child_space_input
+
+        fetch_stage.add('child_space_input', config.myems_energy_db, query_child_space_input)
+
         ################################################################################################################
+        # Step 14: query child spaces energy cost
+        ################################################################################################################
+        def query_child_space_cost(cursor_billing):
+            child_space_cost = dict()
+
+            if energy_category_set is not None and len(energy_category_set) > 0:
+                child_space_subtotals = utilities.get_child_spaces_subtotals(cursor_billing,
+                                                                             'tbl_space_input_category_hourly',
+                                                                             'energy_category_id',
+                                                                             child_space_list,
+                                                                             energy_category_set,
+                                                                             reporting_start_datetime_utc,
+                                                                             reporting_end_datetime_utc)
+                for energy_category_id in energy_category_set:
+                    child_space_cost[energy_category_id] = dict()
+                    child_space_cost[energy_category_id]['child_space_names'] = list()
+                    child_space_cost[energy_category_id]['subtotals'] = list()
+                    for child_space in child_space_list:
+                        child_space_cost[energy_category_id]['child_space_names'].append(child_space['name'])
+                        subtotal = child_space_subtotals.get((child_space['id'], energy_category_id), Decimal(0.0))
+                        child_space_cost[energy_category_id]['subtotals'].append(subtotal)
+            return child_space_cost
+
+        fetch_stage.add('child_space_cost', config.myems_billing_db, query_child_space_cost)
+
+        ################################################################################################################
+        # Step 15: run queries concurrently
+        ################################################################################################################
+        # release the connections before running the queries, as every query gets a pooled connection of its own
         if cursor_system:
             cursor_system.close()
         if cnx_system:
@@ -711,11 +667,25 @@ class Reporting:
         if cnx_billing:
             cnx_billing.disconnect()
 
-        if cursor_historical:
-            cursor_historical.close()
-        if cnx_historical:
-            cnx_historical.disconnect()
+        results = fetch_stage.run()
+        base_input = results['base_input']
+        base_cost = results['base_cost']
+        reporting_input = results['reporting_input']
+        reporting_cost = results['reporting_cost']
+        parameters_data = results['parameters_data']
+        point_values_dict = results['point_values_dict']
+        child_space_input = results['child_space_input']
+        child_space_cost = results['child_space_cost']
 
+        for point in point_list:
+            point_timestamps, point_values = point_values_dict.get(point['id'], (list(), list()))
+            parameters_data['names'].append(point['name'] + ' (' + point['units'] + ')')
+            parameters_data['timestamps'].append(point_timestamps)
+            parameters_data['values'].append(point_values)
+
+        ################################################################################################################
+        # Step 16: construct the report
+        ################################################################################################################
         result = dict()
 
         result['space'] = dict()
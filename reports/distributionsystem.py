@@ -1,6 +1,7 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
+from core import utilities
 import config
 from datetime import datetime, timedelta, timezone
 
@@ -46,7 +47,7 @@ class Reporting:
         ################################################################################################################
         # Step 2: Step 2: query the distribution system
         ################################################################################################################
-        cnx_system = mysql.connector.connect(**config.myems_system_db)
+        cnx_system = database.connect(config.myems_system_db)
         cursor_system = cnx_system.cursor(dictionary=True)
 
         cursor_system.execute(" SELECT name "
@@ -83,75 +84,39 @@ class Reporting:
         ################################################################################################################
         # Step 4: query circuits' associated points
         ################################################################################################################
-        for x in range(len(circuit_list)):
-            query = (" SELECT p.id, p.name, p.object_type, p.units "
-                     " FROM tbl_points p, tbl_distribution_circuits_points dcp, tbl_distribution_circuits dc "
-                     " WHERE dcp.distribution_circuit_id = %s AND p.id = dcp.point_id "
-                     "       AND dcp.distribution_circuit_id = dc.id "
-                     " ORDER BY p.name ")
-            cursor_system.execute(query, (circuit_list[x]['id'],))
-            rows = cursor_system.fetchall()
+        circuit_dict = {circuit['id']: circuit for circuit in circuit_list}
+        point_list = list()
+        query = (" SELECT dcp.distribution_circuit_id, p.id, p.name, p.object_type, p.units "
+                 " FROM tbl_points p, tbl_distribution_circuits_points dcp, tbl_distribution_circuits dc "
+                 " WHERE dc.distribution_system_id = %s AND dcp.distribution_circuit_id = dc.id "
+                 "       AND p.id = dcp.point_id "
+                 " ORDER BY p.name ")
+        cursor_system.execute(query, (distribution_system_id,))
+        rows = cursor_system.fetchall()
+
+        if rows is not None and len(rows) > 0:
+            for row in rows:
+                circuit = circuit_dict.get(row['distribution_circuit_id'])
+                if circuit is None:
+                    continue
+                point = {"id": row['id'],
+                         "name": row['name'],
+                         "object_type": row['object_type'],
+                         "units": row['units'],
+                         "value": None}
+                circuit['points'].append(point)
+                point_list.append(point)
 
-            if rows is not None and len(rows) > 0:
-                for row in rows:
-                    circuit_list[x]['points'].append({"id": row['id'],
-                                                      "name": row['name'],
-                                                      "object_type": row['object_type'],
-                                                      "units": row['units'],
-                                                      "value": None})
         if cursor_system:
             cursor_system.close()
         if cnx_system:
             cnx_system.disconnect()
         ################################################################################################################
-        # Step 5: query points' data
+        # Step 5: query points' latest values
         ################################################################################################################
-        cnx_historical = mysql.connector.connect(**config.myems_historical_db)
-        cursor_historical = cnx_historical.cursor()
-
-        for x in range(len(circuit_list)):
-            for y in range(len(circuit_list[x]['points'])):
-                if circuit_list[x]['points'][y]['object_type'] == 'ANALOG_VALUE':
-
-                    query = (" SELECT actual_value "
-                             " FROM tbl_analog_value_latest "
-                             " WHERE point_id = %s "
-                             "       AND utc_date_time > %s ")
-                    cursor_historical.execute(query, (circuit_list[x]['points'][y]['id'],
-                                                      reporting_start_datetime_utc))
-                    row = cursor_historical.fetchone()
-
-                    if row is not None:
-                        circuit_list[x]['points'][y]['value'] = row[0]
-
-                elif circuit_list[x]['points'][y]['object_type'] == 'ENERGY_VALUE':
-                    query = (" SELECT actual_value "
-                             " FROM tbl_energy_value_latest "
-                             " WHERE point_id = %s "
-                             "       AND utc_date_time > %s ")
-                    cursor_historical.execute(query, (circuit_list[x]['points'][y]['id'],
-                                                      reporting_start_datetime_utc))
-                    row = cursor_historical.fetchone()
-
-                    if row is not None:
-                        circuit_list[x]['points'][y]['value'] = row[0]
-
-                elif circuit_list[x]['points'][y]['object_type'] == 'DIGITAL_VALUE':
-                    query = (" SELECT actual_value "
-                             " FROM tbl_digital_value_latest "
-                             " WHERE point_id = %s "
-                             "       AND utc_date_time > %s ")
-                    cursor_historical.execute(query, (circuit_list[x]['points'][y]['id'],
-                                                      reporting_start_datetime_utc))
-                    row = cursor_historical.fetchone()
-
-                    if row is not None:
-                        circuit_list[x]['points'][y]['value'] = row[0]
-
-        if cursor_historical:
-            cursor_historical.close()
-        if cnx_historical:
-            cnx_historical.disconnect()
+        latest_value_dict = utilities.get_points_latest_values(point_list, reporting_start_datetime_utc)
+        for point in point_list:
+            point['value'] = latest_value_dict.get(point['id'])
 
         ################################################################################################################
         # Step 6: construct the report
@@ -1,6 +1,7 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
+from core import energyflowtopology
 from datetime import datetime, timedelta, timezone
 from core import utilities
 from decimal import Decimal
@@ -19,13 +20,12 @@ class Reporting:
     ####################################################################################################################
     # PROCEDURES
     # Step 1: valid parameters
-    # Step 2: query the energy flor diagram
-    # Step 3: query nodes
-    # Step 4: query links
-    # Step 5: query reporting period meter energy input
-    # Step 6: query reporting period offline meter energy input
-    # Step 7: query reporting period virtual energy input
-    # Step 8: construct the report
+    # Step 2: query the energy flow diagram, its nodes and links
+    # Step 3: query reporting period meter energy input
+    # Step 4: query reporting period offline meter energy input
+    # Step 5: query reporting period virtual energy input
+    # Step 6: calculate the inflow, outflow and loss of nodes
+    # Step 7: construct the report
     ####################################################################################################################
     @staticmethod
     def on_get(req, resp):
@@ -82,185 +82,69 @@ class Reporting:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_REPORTING_PERIOD_END_DATETIME')
         ################################################################################################################
-        # Step 2: query the energy flow diagram
+        # Step 2: query the energy flow diagram, its nodes and links
         ################################################################################################################
-
-        cnx_system = mysql.connector.connect(**config.myems_system_db)
-        cursor_system = cnx_system.cursor(dictionary=True)
-
-        query = (" SELECT name, uuid "
-                 " FROM tbl_energy_flow_diagrams "
-                 " WHERE id = %s ")
-        cursor_system.execute(query, (energy_flow_diagram_id,))
-        row = cursor_system.fetchone()
-
-        if row is None:
-            if cursor_system:
-                cursor_system.close()
-            if cnx_system:
-                cnx_system.disconnect()
+        topology = energyflowtopology.get_topology(int(energy_flow_diagram_id))
+        if topology is None:
             raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
                                    description='API.ENERGY_FLOW_DIAGRAM_NOT_FOUND')
-        else:
-            energy_flow_diagram_name = row['name']
-            energy_flow_diagram_uuid = row['uuid']
-
-        ################################################################################################################
-        # Step 3: query nodes
-        ################################################################################################################
-
-        query = (" SELECT id, energy_flow_diagram_id, name "
-                 " FROM tbl_energy_flow_diagrams_nodes")
-        cursor_system.execute(query)
-        rows_nodes = cursor_system.fetchall()
-
-        node_dict = dict()
-        node_list_dict = dict()
-        if rows_nodes is not None and len(rows_nodes) > 0:
-            for row in rows_nodes:
-                node_dict[row['id']] = row['name']
-                if node_list_dict.get(row['energy_flow_diagram_id']) is None:
-                    node_list_dict[row['energy_flow_diagram_id']] = list()
-                node_list_dict[row['energy_flow_diagram_id']].append({"id": row['id'], "name": row['name']})
 
         ################################################################################################################
-        # Step 4: query links
+        # Step 3: query reporting period meter energy input
+        # Step 4: query reporting period offline meter energy input
+        # Step 5: query reporting period virtual energy input
+        # with one grouped query for all meters of each type
         ################################################################################################################
-        query = (" SELECT id, name, uuid "
-                 " FROM tbl_meters ")
-        cursor_system.execute(query)
-        rows_meters = cursor_system.fetchall()
-
-        meter_dict = dict()
-        if rows_meters is not None and len(rows_meters) > 0:
-            for row in rows_meters:
-                meter_dict[row['uuid']] = {"type": 'meter',
-                                           "id": row['id'],
-                                           "name": row['name'],
-                                           "uuid": row['uuid']}
-
-        query = (" SELECT id, name, uuid "
-                 " FROM tbl_offline_meters ")
-        cursor_system.execute(query)
-        rows_offline_meters = cursor_system.fetchall()
-
-        offline_meter_dict = dict()
-        if rows_offline_meters is not None and len(rows_offline_meters) > 0:
-            for row in rows_offline_meters:
-                offline_meter_dict[row['uuid']] = {"type": 'offline_meter',
-                                                   "id": row['id'],
-                                                   "name": row['name'],
-                                                   "uuid": row['uuid']}
-
-        query = (" SELECT id, name, uuid "
-                 " FROM tbl_virtual_meters ")
-        cursor_system.execute(query)
-        rows_virtual_meters = cursor_system.fetchall()
-
-        virtual_meter_dict = dict()
-        if rows_virtual_meters is not None and len(rows_virtual_meters) > 0:
-            for row in rows_virtual_meters:
-                virtual_meter_dict[row['uuid']] = {"type": 'virtual_meter',
-                                                   "id": row['id'],
-                                                   "name": row['name'],
-                                                   "uuid": row['uuid']}
-
-        query = (" SELECT id, energy_flow_diagram_id, source_node_id, target_node_id, meter_uuid "
-                 " FROM tbl_energy_flow_diagrams_links")
-        cursor_system.execute(query)
-        rows_links = cursor_system.fetchall()
-
-        link_list_dict = dict()
-        if rows_links is not None and len(rows_links) > 0:
-            for row in rows_links:
-                # find meter by uuid
-                meter = meter_dict.get(row['meter_uuid'], None)
-                if meter is None:
-                    meter = virtual_meter_dict.get(row['meter_uuid'], None)
-                if meter is None:
-                    meter = offline_meter_dict.get(row['meter_uuid'], None)
-
-                if link_list_dict.get(row['energy_flow_diagram_id']) is None:
-                    link_list_dict[row['energy_flow_diagram_id']] = list()
-                link_list_dict[row['energy_flow_diagram_id']].append({"id": row['id'],
-                                                                      "source_node": {
-                                                                          "id": row['source_node_id'],
-                                                                          "name": node_dict.get(row['source_node_id'])},
-                                                                      "target_node": {
-                                                                          "id": row['target_node_id'],
-                                                                          "name": node_dict.get(row['target_node_id'])},
-                                                                      "meter": meter,
-                                                                      "value": None})
-
-        meta_result = {"id": energy_flow_diagram_id,
-                       "name": energy_flow_diagram_name,
-                       "uuid": energy_flow_diagram_uuid,
-                       "nodes": node_list_dict.get(int(energy_flow_diagram_id), None),
-                       "links": link_list_dict.get(int(energy_flow_diagram_id), None),
-                       }
-        print(meta_result)
-        if cursor_system:
-            cursor_system.close()
-        if cnx_system:
-            cnx_system.disconnect()
+        meter_id_set_dict = {'meter': set(), 'offline_meter': set(), 'virtual_meter': set()}
+        for meter in topology.link_meters:
+            if meter is not None:
+                meter_id_set_dict[meter['type']].add(meter['id'])
+
+        value_dict = dict()
+        if any(len(meter_id_set) > 0 for meter_id_set in meter_id_set_dict.values()):
+            cnx_energy = database.connect(config.myems_energy_db)
+            cursor_energy = cnx_energy.cursor()
+            try:
+                for meter_type, table in (('meter', 'tbl_meter_hourly'),
+                                          ('offline_meter', 'tbl_offline_meter_hourly'),
+                                          ('virtual_meter', 'tbl_virtual_meter_hourly')):
+                    if len(meter_id_set_dict[meter_type]) == 0:
+                        continue
+                    query = (" SELECT meter_id, SUM(actual_value) "
+                             " FROM " + table +
+                             " WHERE meter_id IN ( " + ', '.join(map(str, meter_id_set_dict[meter_type])) + " ) "
+                             " AND start_datetime_utc >= %s "
+                             " AND start_datetime_utc < %s "
+                             " GROUP BY meter_id ")
+                    cursor_energy.execute(query, (reporting_start_datetime_utc, reporting_end_datetime_utc))
+                    rows = cursor_energy.fetchall()
+                    if rows is not None and len(rows) > 0:
+                        for row in rows:
+                            value_dict[(meter_type, row[0])] = row[1]
+            finally:
+                cursor_energy.close()
+                cnx_energy.disconnect()
+
+        link_values = [None if meter is None else value_dict.get((meter['type'], meter['id']), None)
+                       for meter in topology.link_meters]
 
         ################################################################################################################
-        # Step 5: query reporting period meter energy input
+        # Step 6: calculate the inflow, outflow and loss of nodes
         ################################################################################################################
-        cnx_energy = mysql.connector.connect(**config.myems_energy_db)
-        cursor_energy = cnx_energy.cursor()
-        for x in range(len(meta_result['links'])):
-            if meta_result['links'][x] is None or meta_result['links'][x]['meter'] is None:
-                continue
-            if meta_result['links'][x]['meter']['type'] == 'meter':
-                query = (" SELECT SUM(actual_value) "
-                         " FROM tbl_meter_hourly "
-                         " WHERE meter_id = %s "
-                         " AND start_datetime_utc >= %s "
-                         " AND start_datetime_utc < %s ")
-                cursor_energy.execute(query, (meta_result['links'][x]['meter']['id'],
-                                              reporting_start_datetime_utc,
-                                              reporting_end_datetime_utc))
-                row = cursor_energy.fetchone()
-                if row is not None:
-                    meta_result['links'][x]['value'] = row[0]
-            elif meta_result['links'][x]['meter']['type'] == 'offline_meter':
-                query = (" SELECT SUM(actual_value) "
-                         " FROM tbl_offline_meter_hourly "
-                         " WHERE meter_id = %s "
-                         " AND start_datetime_utc >= %s "
-                         " AND start_datetime_utc < %s ")
-                cursor_energy.execute(query, (meta_result['links'][x]['meter']['id'],
-                                              reporting_start_datetime_utc,
-                                              reporting_end_datetime_utc))
-                row = cursor_energy.fetchone()
-                if row is not None:
-                    meta_result['links'][x]['value'] = row[0]
-            elif meta_result['links'][x]['meter']['type'] == 'virtual_meter':
-                query = (" SELECT SUM(actual_value) "
-                         " FROM tbl_virtual_meter_hourly "
-                         " WHERE meter_id = %s "
-                         " AND start_datetime_utc >= %s "
-                         " AND start_datetime_utc < %s ")
-                cursor_energy.execute(query, (meta_result['links'][x]['meter']['id'],
-                                              reporting_start_datetime_utc,
-                                              reporting_end_datetime_utc))
-                row = cursor_energy.fetchone()
-                if row is not None:
-                    meta_result['links'][x]['value'] = row[0]
+        inflows, outflows, losses = topology.get_balance(link_values)
 
         ################################################################################################################
-        # Step 8: construct the report
+        # Step 7: construct the report
         ################################################################################################################
-
         result = {'nodes': list(),
                   'links': list()}
-        if meta_result['nodes'] is not None and len(meta_result['nodes']) > 0:
-            for node in meta_result['nodes']:
-                result['nodes'].append({'name': node['name']})
-        if meta_result['links'] is not None and len(meta_result['links']) > 0:
-            for link in meta_result['links']:
-                result['links'].append({'source': link['source_node']['name'],
-                                        'target': link['target_node']['name'],
-                                        'value': link['value']})
+        for index in topology.order:
+            result['nodes'].append({'name': topology.node_names[index],
+                                    'inflow': inflows[index],
+                                    'outflow': outflows[index],
+                                    'loss': losses[index]})
+        for index in range(len(topology.link_ids)):
+            result['links'].append({'source': topology.get_node_name(topology.link_sources[index]),
+                                    'target': topology.get_node_name(topology.link_targets[index]),
+                                    'value': link_values[index]})
         resp.body = json.dumps(result)
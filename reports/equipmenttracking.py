@@ -1,8 +1,9 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
-from anytree import Node, AnyNode, LevelOrderIter
+from core import spacetree
+from core import privilegescope
 
 
 class Reporting:
@@ -17,7 +18,7 @@ class Reporting:
     ####################################################################################################################
     # PROCEDURES
     # Step 1: valid parameters
-    # Step 2: build a space tree
+    # Step 2: get the space and its descendants from the index of spaces, and verify the privilege of the user
     # Step 3: query all equipments in the space tree
     # Step 4: construct the report
     ####################################################################################################################
@@ -38,43 +39,25 @@ class Reporting:
             else:
                 space_id = int(space_id)
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
-        cursor = cnx.cursor(dictionary=True)
-
-        cursor.execute(" SELECT name "
-                       " FROM tbl_spaces "
-                       " WHERE id = %s ", (space_id,))
-        if cursor.fetchone() is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
-                                   description='API.SPACE_NOT_FOUND')
-
         ################################################################################################################
-        # Step 2: build a space tree
+        # Step 2: get the space and its descendants from the index of spaces, and verify the privilege of the user
         ################################################################################################################
-
-        query = (" SELECT id, name, parent_space_id "
-                 " FROM tbl_spaces "
-                 " ORDER BY id ")
-        cursor.execute(query)
-        rows_spaces = cursor.fetchall()
-        node_dict = dict()
-        if rows_spaces is not None and len(rows_spaces) > 0:
-            for row in rows_spaces:
-                parent_node = node_dict[row['parent_space_id']] if row['parent_space_id'] is not None else None
-                node_dict[row['id']] = AnyNode(id=row['id'], parent=parent_node, name=row['name'])
+        space_tree = spacetree.get_tree((space_id, ))
+        if not space_tree.contains(space_id):
+            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
+                                   description='API.SPACE_NOT_FOUND')
+        privilegescope.verify_space(req.context, space_id)
 
         ################################################################################################################
         # Step 3: query all equipments in the space tree
         ################################################################################################################
         equipment_list = list()
         space_dict = dict()
+        for descendant_id in space_tree.get_descendants(space_id):
+            space_dict[descendant_id] = space_tree.get_name(descendant_id)
 
-        for node in LevelOrderIter(node_dict[space_id]):
-            space_dict[node.id] = node.name
+        cnx = database.connect(config.myems_system_db)
+        cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT e.id, e.name AS equipment_name, s.name AS space_name, "
                        "        cc.name AS cost_center_name, e.description "
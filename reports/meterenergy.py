@@ -1,10 +1,12 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 from datetime import datetime, timedelta, timezone
 from core import utilities
+from core import downsampling
 from decimal import Decimal
+from core import excelexport
 import excelexporters.meterenergy
 
 
@@ -17,6 +19,11 @@ class Reporting:
     def on_options(req, resp):
         resp.status = falcon.HTTP_200
 
+    @staticmethod
+    def on_get(req, resp):
+        print(req.params)
+        Reporting.get_report(req.params, req.context, resp)
+
     ####################################################################################################################
     # PROCEDURES
     # Step 1: valid parameters
@@ -27,16 +34,19 @@ class Reporting:
     # Step 6: query tariff data
     # Step 7: query associated points data
     # Step 8: construct the report
+    #   params: the query parameters of the report
+    #   context: req.context, or the context of an export job, with the user and privilege of the session
+    #   resp: the response, the report is set as JSON, or as an Excel file with the parameter export=excel
     ####################################################################################################################
     @staticmethod
-    def on_get(req, resp):
-        print(req.params)
-        meter_id = req.params.get('meterid')
-        period_type = req.params.get('periodtype')
-        base_period_start_datetime = req.params.get('baseperiodstartdatetime')
-        base_period_end_datetime = req.params.get('baseperiodenddatetime')
-        reporting_period_start_datetime_local = req.params.get('reportingperiodstartdatetime')
-        reporting_period_end_datetime_local = req.params.get('reportingperiodenddatetime')
+    def get_report(params, context, resp):
+        is_excel_export = excelexport.is_requested(params)
+        meter_id = params.get('meterid')
+        period_type = params.get('periodtype')
+        base_period_start_datetime = params.get('baseperiodstartdatetime')
+        base_period_end_datetime = params.get('baseperiodenddatetime')
+        reporting_period_start_datetime_local = params.get('reportingperiodstartdatetime')
+        reporting_period_end_datetime_local = params.get('reportingperiodenddatetime')
 
         ################################################################################################################
         # Step 1: valid parameters
@@ -118,16 +128,18 @@ class Reporting:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_REPORTING_PERIOD_END_DATETIME')
 
+        max_points, downsample_method = downsampling.get_parameters(params)
+
         ################################################################################################################
         # Step 2: query the meter and energy category
         ################################################################################################################
-        cnx_system = mysql.connector.connect(**config.myems_system_db)
+        cnx_system = database.connect(config.myems_system_db)
         cursor_system = cnx_system.cursor()
 
-        cnx_energy = mysql.connector.connect(**config.myems_energy_db)
+        cnx_energy = database.connect(config.myems_energy_db)
         cursor_energy = cnx_energy.cursor()
 
-        cnx_historical = mysql.connector.connect(**config.myems_historical_db)
+        cnx_historical = database.connect(config.myems_historical_db)
         cursor_historical = cnx_historical.cursor()
 
         cursor_system.execute(" SELECT m.id, m.name, m.cost_center_id, m.energy_category_id, "
@@ -178,7 +190,7 @@ class Reporting:
         ################################################################################################################
         # Step 4: query base period energy consumption
         ################################################################################################################
-        cnx_energy = mysql.connector.connect(**config.myems_energy_db)
+        cnx_energy = database.connect(config.myems_energy_db)
         cursor_energy = cnx_energy.cursor()
         query = (" SELECT start_datetime_utc, actual_value "
                  " FROM tbl_meter_hourly "
@@ -273,7 +285,8 @@ class Reporting:
         tariff_dict = utilities.get_energy_category_tariffs(meter['cost_center_id'],
                                                             meter['energy_category_id'],
                                                             reporting_start_datetime_utc,
-                                                            reporting_end_datetime_utc)
+                                                            reporting_end_datetime_utc,
+                                                            cursor_system)
         print(tariff_dict)
         tariff_timestamp_list = list()
         tariff_value_list = list()
@@ -290,64 +303,25 @@ class Reporting:
         ################################################################################################################
         # Step 7: query associated points data
         ################################################################################################################
-        for point in point_list:
-            point_values = []
-            point_timestamps = []
-            if point['object_type'] == 'ANALOG_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_analog_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s "
-                         " ORDER BY utc_date_time ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-
-            elif point['object_type'] == 'ENERGY_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_energy_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s "
-                         " ORDER BY utc_date_time ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-            elif point['object_type'] == 'DIGITAL_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_digital_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
+        point_values_dict = dict()
+        for point_id, rows in utilities.get_points_history_values(cursor_historical,
+                                                                  point_list,
+                                                                  reporting_start_datetime_utc,
+                                                                  reporting_end_datetime_utc):
+            point_timestamps = list()
+            point_values = list()
+            for row in downsampling.downsample(rows,
+                                               reporting_start_datetime_utc,
+                                               reporting_end_datetime_utc,
+                                               max_points,
+                                               downsample_method):
+                current_datetime_local = row[0] + timedelta(minutes=timezone_offset)
+                point_timestamps.append(current_datetime_local.isoformat()[0:19])
+                point_values.append(row[1])
+            point_values_dict[point_id] = (point_timestamps, point_values)
 
+        for point in point_list:
+            point_timestamps, point_values = point_values_dict.get(point['id'], (list(), list()))
             parameters_data['names'].append(point['name'] + ' (' + point['units'] + ')')
             parameters_data['timestamps'].append(point_timestamps)
             parameters_data['values'].append(point_values)
@@ -401,12 +375,13 @@ class Reporting:
                 "values": parameters_data['values']
             },
         }
-        # export result to Excel file and then encode the file to base64 string
-        result['excel_bytes_base64'] = \
-            excelexporters.meterenergy.export(result,
-                                              meter['name'],
-                                              reporting_period_start_datetime_local,
-                                              reporting_period_end_datetime_local,
-                                              period_type)
-
-        resp.body = json.dumps(result)
+        if is_excel_export:
+            # export result to Excel file in memory
+            excel_bytes = excelexporters.meterenergy.export(result,
+                                                            meter['name'],
+                                                            reporting_period_start_datetime_local,
+                                                            reporting_period_end_datetime_local,
+                                                            period_type)
+            excelexport.set_response(resp, excel_bytes, 'meterenergy', meter['name'])
+        else:
+            resp.body = json.dumps(result)
@@ -1,6 +1,10 @@
 import falcon
 import simplejson as json
-import mysql.connector
+import threading
+import time
+from core import database
+from core import pointvaluestore
+from core import utilities
 import config
 from datetime import datetime, timedelta, timezone
 
@@ -17,189 +21,273 @@ class Reporting:
     ####################################################################################################################
     # PROCEDURES
     # Step 1: valid parameters
-    # Step 2: query the meter and energy category
-    # Step 3: query associated points
-    # Step 4: query reporting period points trends
-    # Step 5: query tariff data
-    # Step 6: construct the report
+    # Step 2: query the meter, energy category and associated points
+    # Step 3: query associated points data
+    # Step 4: construct the report
     ####################################################################################################################
     @staticmethod
     def on_get(req, resp):
         print(req.params)
-        meter_id = req.params.get('meterid')
-
         ################################################################################################################
         # Step 1: valid parameters
         ################################################################################################################
-        if meter_id is None:
-            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST', description='API.INVALID_METER_ID')
-        else:
-            meter_id = str.strip(meter_id)
-            if not meter_id.isdigit() or int(meter_id) <= 0:
-                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST', description='API.INVALID_METER_ID')
-
-        timezone_offset = int(config.utc_offset[1:3]) * 60 + int(config.utc_offset[4:6])
-        if config.utc_offset[0] == '-':
-            timezone_offset = -timezone_offset
+        meter_id = get_meter_id(req)
+        timezone_offset = get_timezone_offset()
 
         reporting_end_datetime_utc = datetime.utcnow()
         reporting_start_datetime_utc = reporting_end_datetime_utc - timedelta(minutes=60)
-        ################################################################################################################
-        # Step 2: query the meter and energy category
-        ################################################################################################################
-        cnx_system = mysql.connector.connect(**config.myems_system_db)
-        cursor_system = cnx_system.cursor()
-
-        cnx_historical = mysql.connector.connect(**config.myems_historical_db)
-        cursor_historical = cnx_historical.cursor()
-
-        cursor_system.execute(" SELECT m.id, m.name, m.cost_center_id, m.energy_category_id, "
-                              "        ec.name, ec.unit_of_measure "
-                              " FROM tbl_meters m, tbl_energy_categories ec "
-                              " WHERE m.id = %s AND m.energy_category_id = ec.id ", (meter_id,))
-        row_meter = cursor_system.fetchone()
-        if row_meter is None:
-            if cursor_system:
-                cursor_system.close()
-            if cnx_system:
-                cnx_system.disconnect()
-
-            if cursor_historical:
-                cursor_historical.close()
-            if cnx_historical:
-                cnx_historical.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND', description='API.METER_NOT_FOUND')
-
-        meter = dict()
-        meter['id'] = row_meter[0]
-        meter['name'] = row_meter[1]
-        meter['cost_center_id'] = row_meter[2]
-        meter['energy_category_id'] = row_meter[3]
-        meter['energy_category_name'] = row_meter[4]
-        meter['unit_of_measure'] = row_meter[5]
 
         ################################################################################################################
-        # Step 3: query associated points
+        # Step 2: query the meter, energy category and associated points
         ################################################################################################################
-        point_list = list()
-        cursor_system.execute(" SELECT p.id, p.name, p.units, p.object_type  "
-                              " FROM tbl_meters m, tbl_meters_points mp, tbl_points p "
-                              " WHERE m.id = %s AND m.id = mp.meter_id AND mp.point_id = p.id "
-                              " ORDER BY p.id ", (meter['id'],))
-        rows_points = cursor_system.fetchall()
-        if rows_points is not None and len(rows_points) > 0:
-            for row in rows_points:
-                point_list.append({"id": row[0], "name": row[1], "units": row[2], "object_type": row[3]})
+        meter, point_list = get_meter(meter_id)
 
         ################################################################################################################
-        # Step 7: query associated points data
+        # Step 3: query associated points data
         ################################################################################################################
-        energy_value_data = dict()
-        energy_value_data['name'] = None
-        energy_value_data['timestamps'] = list()
-        energy_value_data['values'] = list()
-
-        parameters_data = dict()
-        parameters_data['names'] = list()
-        parameters_data['timestamps'] = list()
-        parameters_data['values'] = list()
-
-        for point in point_list:
-            point_values = []
-            point_timestamps = []
-            if point['object_type'] == 'ANALOG_VALUE':
-
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_analog_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s "
-                         " ORDER BY utc_date_time ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-
-                parameters_data['names'].append(point['name'] + ' (' + point['units'] + ')')
-                parameters_data['timestamps'].append(point_timestamps)
-                parameters_data['values'].append(point_values)
-            elif point['object_type'] == 'ENERGY_VALUE':
-                energy_value_data['name'] = point['name']
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_energy_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s "
-                         " ORDER BY utc_date_time ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        energy_value_data['timestamps'].append(current_datetime)
-                        energy_value_data['values'].append(row[1])
-
-            elif point['object_type'] == 'DIGITAL_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_digital_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-
-                parameters_data['names'].append(point['name'] + ' (' + point['units'] + ')')
-                parameters_data['timestamps'].append(point_timestamps)
-                parameters_data['values'].append(point_values)
+        if config.is_point_value_store_enabled:
+            point_values_dict = pointvaluestore.get_values(point_list,
+                                                           reporting_start_datetime_utc,
+                                                           reporting_end_datetime_utc)
+        else:
+            point_values_dict = dict()
+            cnx_historical = database.connect(config.myems_historical_db)
+            cursor_historical = cnx_historical.cursor()
+            try:
+                for point_id, rows in utilities.get_points_history_values(cursor_historical, point_list,
+                                                                          reporting_start_datetime_utc,
+                                                                          reporting_end_datetime_utc):
+                    point_values_dict[point_id] = list(rows)
+            finally:
+                cursor_historical.close()
+                cnx_historical.disconnect()
 
         ################################################################################################################
-        # Step 6: construct the report
+        # Step 4: construct the report
         ################################################################################################################
+        result = get_report(meter, point_list, point_values_dict, timezone_offset)
+
+        resp.body = json.dumps(result)
+
+
+########################################################################################################################
+# Stream of meter realtime data as Server-Sent Events
+# The stream sends the report of the last 60 minutes as a 'window' event first, then the values polled by
+# core/pointvaluestore since the last event as 'values' events in the same format as the report, so all clients of a
+# meter in a gunicorn worker share the same polling of myems_historical_db.
+# The stream is closed after config.meter_realtime_stream_max_seconds, and EventSource clients reconnect automatically.
+# Every open stream holds a thread of the gunicorn worker, so at most config.meter_realtime_stream_max_count streams are
+# open in each worker, and requests above the limit are answered with 503 so the other threads still serve the API.
+########################################################################################################################
+stream_lock = threading.Lock()
+stream_count = 0
+
+
+class ReportingStream:
+    @staticmethod
+    def __init__():
+        pass
+
+    @staticmethod
+    def on_options(req, resp):
+        resp.status = falcon.HTTP_200
+
+    @staticmethod
+    def on_get(req, resp):
+        print(req.params)
+        meter_id = get_meter_id(req)
+        meter, point_list = get_meter(meter_id)
+
+        resp.content_type = 'text/event-stream'
+        resp.cache_control = ['no-cache']
+        # disable buffering of the stream by nginx
+        resp.set_header('X-Accel-Buffering', 'no')
+        resp.stream = EventStream(stream_events(meter, point_list, get_timezone_offset()))
+
+
+########################################################################################################################
+# Events of a stream, which counts as open from its creation until it is closed by the WSGI server
+# Raises: HTTPError 503 if config.meter_realtime_stream_max_count streams are open in this process
+########################################################################################################################
+class EventStream:
+    def __init__(self, events):
+        global stream_count
+        with stream_lock:
+            if stream_count >= config.meter_realtime_stream_max_count:
+                events.close()
+                raise falcon.HTTPError(falcon.HTTP_503, title='API.SERVICE_UNAVAILABLE',
+                                       description='API.TOO_MANY_STREAMS',
+                                       headers={'Retry-After': str(config.meter_realtime_stream_keepalive_seconds)})
+            stream_count += 1
+        self.events = events
+        self.is_open = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.events)
+
+    def close(self):
+        global stream_count
+        self.events.close()
+        with stream_lock:
+            if self.is_open:
+                self.is_open = False
+                stream_count -= 1
+
+
+def stream_events(meter, point_list, timezone_offset):
+    stream_end = time.monotonic() + config.meter_realtime_stream_max_seconds
+    known_version = pointvaluestore.version
+
+    reporting_end_datetime_utc = datetime.utcnow()
+    point_values_dict = pointvaluestore.get_values(point_list,
+                                                   reporting_end_datetime_utc - timedelta(minutes=60),
+                                                   reporting_end_datetime_utc)
+    last_datetime_dict = {point_id: values[-1][0] for point_id, values in point_values_dict.items() if len(values) > 0}
+    yield get_event('window', get_report(meter, point_list, point_values_dict, timezone_offset))
+
+    while time.monotonic() < stream_end:
+        version = pointvaluestore.wait_for_update(known_version,
+                                                  min(config.meter_realtime_stream_keepalive_seconds,
+                                                      max(stream_end - time.monotonic(), 0)))
+        # points are also requested while waiting, so they are not removed from the store as idle
+        reporting_end_datetime_utc = datetime.utcnow()
+        point_values_dict = pointvaluestore.get_values(point_list,
+                                                       reporting_end_datetime_utc - timedelta(minutes=60),
+                                                       reporting_end_datetime_utc)
+        if version == known_version:
+            yield b': keepalive\n\n'
+            continue
+        known_version = version
+
+        new_values_dict = dict()
+        for point_id, values in point_values_dict.items():
+            last_datetime = last_datetime_dict.get(point_id)
+            new_values = [value for value in values if last_datetime is None or value[0] > last_datetime]
+            if len(new_values) > 0:
+                new_values_dict[point_id] = new_values
+                last_datetime_dict[point_id] = new_values[-1][0]
+        if len(new_values_dict) > 0:
+            yield get_event('values', get_report(meter, point_list, new_values_dict, timezone_offset))
+
+
+def get_event(event, data):
+    return ('event: ' + event + '\n' + 'data: ' + json.dumps(data) + '\n\n').encode('utf-8')
+
+
+def get_meter_id(req):
+    meter_id = req.params.get('meterid')
+    if meter_id is None:
+        raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST', description='API.INVALID_METER_ID')
+    else:
+        meter_id = str.strip(meter_id)
+        if not meter_id.isdigit() or int(meter_id) <= 0:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST', description='API.INVALID_METER_ID')
+    return meter_id
+
+
+def get_timezone_offset():
+    timezone_offset = int(config.utc_offset[1:3]) * 60 + int(config.utc_offset[4:6])
+    if config.utc_offset[0] == '-':
+        timezone_offset = -timezone_offset
+    return timezone_offset
+
+
+########################################################################################################################
+# Get the meter with its energy category and associated points
+# Returns: (meter, point_list)
+# Raises: HTTPError 404 if the meter is not found
+########################################################################################################################
+def get_meter(meter_id):
+    cnx_system = database.connect(config.myems_system_db)
+    cursor_system = cnx_system.cursor()
+
+    cursor_system.execute(" SELECT m.id, m.name, m.cost_center_id, m.energy_category_id, "
+                          "        ec.name, ec.unit_of_measure "
+                          " FROM tbl_meters m, tbl_energy_categories ec "
+                          " WHERE m.id = %s AND m.energy_category_id = ec.id ", (meter_id,))
+    row_meter = cursor_system.fetchone()
+    if row_meter is None:
         if cursor_system:
             cursor_system.close()
         if cnx_system:
             cnx_system.disconnect()
+        raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND', description='API.METER_NOT_FOUND')
 
-        if cursor_historical:
-            cursor_historical.close()
-        if cnx_historical:
-            cnx_historical.disconnect()
-
-        result = {
-            "meter": {
-                "cost_center_id": meter['cost_center_id'],
-                "energy_category_id": meter['energy_category_id'],
-                "energy_category_name": meter['energy_category_name'],
-                "unit_of_measure": meter['unit_of_measure'],
-            },
-            "energy_value": energy_value_data,
-            "parameters": {
-                "names": parameters_data['names'],
-                "timestamps": parameters_data['timestamps'],
-                "values": parameters_data['values']
-            },
-
-        }
+    meter = dict()
+    meter['id'] = row_meter[0]
+    meter['name'] = row_meter[1]
+    meter['cost_center_id'] = row_meter[2]
+    meter['energy_category_id'] = row_meter[3]
+    meter['energy_category_name'] = row_meter[4]
+    meter['unit_of_measure'] = row_meter[5]
 
-        resp.body = json.dumps(result)
+    point_list = list()
+    cursor_system.execute(" SELECT p.id, p.name, p.units, p.object_type  "
+                          " FROM tbl_meters m, tbl_meters_points mp, tbl_points p "
+                          " WHERE m.id = %s AND m.id = mp.meter_id AND mp.point_id = p.id "
+                          " ORDER BY p.id ", (meter['id'],))
+    rows_points = cursor_system.fetchall()
+    if rows_points is not None and len(rows_points) > 0:
+        for row in rows_points:
+            point_list.append({"id": row[0], "name": row[1], "units": row[2], "object_type": row[3]})
+
+    if cursor_system:
+        cursor_system.close()
+    if cnx_system:
+        cnx_system.disconnect()
+
+    return meter, point_list
+
+
+########################################################################################################################
+# Construct the report of the meter
+#   point_values_dict: dict of lists of (utc_date_time, actual_value) by point id
+########################################################################################################################
+def get_report(meter, point_list, point_values_dict, timezone_offset):
+    energy_value_data = dict()
+    energy_value_data['name'] = None
+    energy_value_data['timestamps'] = list()
+    energy_value_data['values'] = list()
+
+    parameters_data = dict()
+    parameters_data['names'] = list()
+    parameters_data['timestamps'] = list()
+    parameters_data['values'] = list()
+
+    for point in point_list:
+        point_values = []
+        point_timestamps = []
+        for row in point_values_dict.get(point['id'], ()):
+            current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
+                                     timedelta(minutes=timezone_offset)
+            point_timestamps.append(current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S'))
+            point_values.append(row[1])
+
+        if point['object_type'] == 'ENERGY_VALUE':
+            energy_value_data['name'] = point['name']
+            energy_value_data['timestamps'].extend(point_timestamps)
+            energy_value_data['values'].extend(point_values)
+        elif point['object_type'] in ('ANALOG_VALUE', 'DIGITAL_VALUE'):
+            parameters_data['names'].append(point['name'] + ' (' + point['units'] + ')')
+            parameters_data['timestamps'].append(point_timestamps)
+            parameters_data['values'].append(point_values)
+
+    result = {
+        "meter": {
+            "cost_center_id": meter['cost_center_id'],
+            "energy_category_id": meter['energy_category_id'],
+            "energy_category_name": meter['energy_category_name'],
+            "unit_of_measure": meter['unit_of_measure'],
+        },
+        "energy_value": energy_value_data,
+        "parameters": {
+            "names": parameters_data['names'],
+            "timestamps": parameters_data['timestamps'],
+            "values": parameters_data['values']
+        },
+
+    }
+    return result
@@ -1,10 +1,11 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 from datetime import datetime, timedelta, timezone
 from core import utilities
 from decimal import Decimal
+from core import excelexport
 import excelexporters.metersubmetersbalance
 
 
@@ -17,6 +18,11 @@ class Reporting:
     def on_options(req, resp):
         resp.status = falcon.HTTP_200
 
+    @staticmethod
+    def on_get(req, resp):
+        print(req.params)
+        Reporting.get_report(req.params, req.context, resp)
+
     ####################################################################################################################
     # PROCEDURES
     # Step 1: valid parameters
@@ -27,14 +33,17 @@ class Reporting:
     # Step 6: calculate reporting period difference between master meter and submeters
     # Step 7: query submeter values as parameter data
     # Step 8: construct the report
+    #   params: the query parameters of the report
+    #   context: req.context, or the context of an export job, with the user and privilege of the session
+    #   resp: the response, the report is set as JSON, or as an Excel file with the parameter export=excel
     ####################################################################################################################
     @staticmethod
-    def on_get(req, resp):
-        print(req.params)
-        meter_id = req.params.get('meterid')
-        period_type = req.params.get('periodtype')
-        reporting_period_start_datetime_local = req.params.get('reportingperiodstartdatetime')
-        reporting_period_end_datetime_local = req.params.get('reportingperiodenddatetime')
+    def get_report(params, context, resp):
+        is_excel_export = excelexport.is_requested(params)
+        meter_id = params.get('meterid')
+        period_type = params.get('periodtype')
+        reporting_period_start_datetime_local = params.get('reportingperiodstartdatetime')
+        reporting_period_end_datetime_local = params.get('reportingperiodenddatetime')
 
         ################################################################################################################
         # Step 1: valid parameters
@@ -92,10 +101,10 @@ class Reporting:
         ################################################################################################################
         # Step 2: query the meter and energy category
         ################################################################################################################
-        cnx_system = mysql.connector.connect(**config.myems_system_db)
+        cnx_system = database.connect(config.myems_system_db)
         cursor_system = cnx_system.cursor()
 
-        cnx_energy = mysql.connector.connect(**config.myems_energy_db)
+        cnx_energy = database.connect(config.myems_energy_db)
         cursor_energy = cnx_energy.cursor()
 
         cursor_system.execute(" SELECT m.id, m.name, m.cost_center_id, m.energy_category_id, "
@@ -332,11 +341,13 @@ class Reporting:
             },
         }
 
-        # export result to Excel file and then encode the file to base64 string
-        result['excel_bytes_base64'] = excelexporters.metersubmetersbalance.export(result,
-                                              master_meter['name'],
-                                              reporting_period_start_datetime_local,
-                                              reporting_period_end_datetime_local,
-                                              period_type)
-
-        resp.body = json.dumps(result)
+        if is_excel_export:
+            # export result to Excel file in memory
+            excel_bytes = excelexporters.metersubmetersbalance.export(result,
+                                                                      master_meter['name'],
+                                                                      reporting_period_start_datetime_local,
+                                                                      reporting_period_end_datetime_local,
+                                                                      period_type)
+            excelexport.set_response(resp, excel_bytes, 'metersubmetersbalance', master_meter['name'])
+        else:
+            resp.body = json.dumps(result)
@@ -1,8 +1,10 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
-from anytree import Node, AnyNode, LevelOrderIter
+from core import spacetree
+from core import privilegescope
+from core import excelexport
 import excelexporters.metertracking
 
 
@@ -15,17 +17,25 @@ class Reporting:
     def on_options(req, resp):
         resp.status = falcon.HTTP_200
 
+    @staticmethod
+    def on_get(req, resp):
+        print(req.params)
+        Reporting.get_report(req.params, req.context, resp)
+
     ####################################################################################################################
     # PROCEDURES
     # Step 1: valid parameters
-    # Step 2: build a space tree
+    # Step 2: get the space and its descendants from the index of spaces, and verify the privilege of the user
     # Step 3: query all meters in the space tree
     # Step 4: construct the report
+    #   params: the query parameters of the report
+    #   context: req.context, or the context of an export job, with the user and privilege of the session
+    #   resp: the response, the report is set as JSON, or as an Excel file with the parameter export=excel
     ####################################################################################################################
     @staticmethod
-    def on_get(req, resp):
-        print(req.params)
-        space_id = req.params.get('spaceid')
+    def get_report(params, context, resp):
+        is_excel_export = excelexport.is_requested(params)
+        space_id = params.get('spaceid')
 
         ################################################################################################################
         # Step 1: valid parameters
@@ -39,47 +49,26 @@ class Reporting:
             else:
                 space_id = int(space_id)
 
-        cnx = mysql.connector.connect(**config.myems_system_db)
-        cursor = cnx.cursor(dictionary=True)
-
-        cursor.execute(" SELECT name "
-                       " FROM tbl_spaces "
-                       " WHERE id = %s ", (space_id,))
-        row = cursor.fetchone()
-
-        if row is None:
-            if cursor:
-                cursor.close()
-            if cnx:
-                cnx.disconnect()
-            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
-                                   description='API.SPACE_NOT_FOUND')
-        else:
-            space_name = row['name']
-
         ################################################################################################################
-        # Step 2: build a space tree
+        # Step 2: get the space and its descendants from the index of spaces, and verify the privilege of the user
         ################################################################################################################
-
-        query = (" SELECT id, name, parent_space_id "
-                 " FROM tbl_spaces "
-                 " ORDER BY id ")
-        cursor.execute(query)
-        rows_spaces = cursor.fetchall()
-        node_dict = dict()
-        if rows_spaces is not None and len(rows_spaces) > 0:
-            for row in rows_spaces:
-                parent_node = node_dict[row['parent_space_id']] if row['parent_space_id'] is not None else None
-                node_dict[row['id']] = AnyNode(id=row['id'], parent=parent_node, name=row['name'])
+        space_tree = spacetree.get_tree((space_id, ))
+        if not space_tree.contains(space_id):
+            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
+                                   description='API.SPACE_NOT_FOUND')
+        privilegescope.verify_space(context, space_id)
+        space_name = space_tree.get_name(space_id)
 
         ################################################################################################################
         # Step 3: query all meters in the space tree
         ################################################################################################################
         meter_list = list()
         space_dict = dict()
+        for descendant_id in space_tree.get_descendants(space_id):
+            space_dict[descendant_id] = space_tree.get_name(descendant_id)
 
-        for node in LevelOrderIter(node_dict[space_id]):
-            space_dict[node.id] = node.name
+        cnx = database.connect(config.myems_system_db)
+        cursor = cnx.cursor(dictionary=True)
 
         cursor.execute(" SELECT m.id, m.name AS meter_name, s.name AS space_name, "
                        "        cc.name AS cost_center_name, ec.name AS energy_category_name, "
@@ -108,8 +97,10 @@ class Reporting:
         # Step 4: construct the report
         ################################################################################################################
         result = {'meters': meter_list}
-        # export result to Excel file and then encode the file to base64 string
-        result['excel_bytes_base64'] = \
-            excelexporters.metertracking.export(result,
-                                                space_name)
-        resp.body = json.dumps(result)
+        if is_excel_export:
+            # export result to Excel file in memory
+            excel_bytes = excelexporters.metertracking.export(result,
+                                                              space_name)
+            excelexport.set_response(resp, excel_bytes, 'metertracking', space_name)
+        else:
+            resp.body = json.dumps(result)
@@ -0,0 +1,207 @@
+import falcon
+import simplejson as json
+from datetime import datetime, timedelta
+import config
+from core import database
+from core import download
+from core import excelexport
+from core import exportjob
+from core import session
+from reports import advancedreport
+from reports import metercost
+from reports import meterenergy
+from reports import metersubmetersbalance
+from reports import metertracking
+from reports import metertrend
+from reports import offlinemetercost
+from reports import offlinemeterenergy
+from reports import spacecost
+from reports import spaceenergycategory
+from reports import spaceload
+from reports import spacesaving
+from reports import spacestatistics
+from reports import tenantbill
+from reports import tenantcost
+from reports import tenantenergycategory
+from reports import tenantload
+from reports import tenantsaving
+from reports import tenantstatistics
+from reports import virtualmetercost
+from reports import virtualmeterenergy
+
+
+# reports which can be exported to Excel files, by the names of their routes
+exportable_reports = {
+    'metercost': metercost.Reporting,
+    'meterenergy': meterenergy.Reporting,
+    'metersubmetersbalance': metersubmetersbalance.Reporting,
+    'metertracking': metertracking.Reporting,
+    'metertrend': metertrend.Reporting,
+    'offlinemetercost': offlinemetercost.Reporting,
+    'offlinemeterenergy': offlinemeterenergy.Reporting,
+    'spacecost': spacecost.Reporting,
+    'spaceenergycategory': spaceenergycategory.Reporting,
+    'spaceload': spaceload.Reporting,
+    'spacesaving': spacesaving.Reporting,
+    'spacestatistics': spacestatistics.Reporting,
+    'tenantbill': tenantbill.Reporting,
+    'tenantcost': tenantcost.Reporting,
+    'tenantenergycategory': tenantenergycategory.Reporting,
+    'tenantload': tenantload.Reporting,
+    'tenantsaving': tenantsaving.Reporting,
+    'tenantstatistics': tenantstatistics.Reporting,
+    'virtualmetercost': virtualmetercost.Reporting,
+    'virtualmeterenergy': virtualmeterenergy.Reporting,
+}
+
+
+########################################################################################################################
+# Run the report of an export job with the parameter export=excel
+# The report is got by Reporting.get_report of the report with the parameters of the job, and a context with the user
+# and privilege of the session which submitted the job, so the privilege is verified as in GET /reports/<report>
+# Returns: (file name, bytes of the Excel file)
+########################################################################################################################
+def export(report, parameters, user, privilege):
+    context = falcon.Request.context_type()
+    context.user = user
+    context.privilege = privilege
+    resp = falcon.Response()
+    exportable_reports[report].get_report(dict(parameters, export='excel'), context, resp)
+    return resp.context.excel_file_name, resp.data
+
+
+########################################################################################################################
+# Get the job of the user of the session of the request
+# Raises: HTTPError 400 if the session is not valid, HTTPError 404 if the job is not found or of another user
+########################################################################################################################
+def get_job(req, job_uuid):
+    user = session.verify(req)
+    job = exportjob.get(job_uuid)
+    if job is None or job['user_id'] != user['id']:
+        raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
+                               description='API.EXPORT_JOB_NOT_FOUND')
+    return job
+
+
+class ReportExportCollection:
+    @staticmethod
+    def __init__():
+        pass
+
+    @staticmethod
+    def on_options(req, resp):
+        resp.status = falcon.HTTP_200
+
+    ####################################################################################################################
+    # PROCEDURES
+    # Step 1: verify the session and valid parameters
+    # Step 2: submit the export job, or get the identical job of the user which is queued or running
+    # Request: {"data": {"report": "spaceenergycategory", "parameters": {"spaceid": "1", "periodtype": "daily", ...}}}
+    #          parameters are the query parameters of the report
+    # Response: 202 Accepted with the uuid and status of the job, and the location to poll
+    ####################################################################################################################
+    @staticmethod
+    def on_post(req, resp):
+        user = session.verify(req)
+        try:
+            raw_json = req.stream.read().decode('utf-8')
+            new_values = json.loads(raw_json)
+        except Exception as ex:
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.ERROR', description=ex)
+
+        ################################################################################################################
+        # Step 1: verify the session and valid parameters
+        ################################################################################################################
+        if 'data' not in new_values.keys() or not isinstance(new_values['data'], dict) or \
+                'report' not in new_values['data'].keys() or \
+                new_values['data']['report'] not in exportable_reports.keys():
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description='API.INVALID_REPORT')
+        report = new_values['data']['report']
+
+        if 'parameters' not in new_values['data'].keys() or \
+                not isinstance(new_values['data']['parameters'], dict):
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description='API.INVALID_REPORT_PARAMETERS')
+        parameters = dict()
+        for key, value in new_values['data']['parameters'].items():
+            if value is None:
+                continue
+            if not isinstance(value, (str, int)) or isinstance(value, bool):
+                raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                       description='API.INVALID_REPORT_PARAMETERS')
+            parameters[key] = str(value)
+        parameters.pop('export', None)
+
+        ################################################################################################################
+        # Step 2: submit the export job, or get the identical job of the user which is queued or running
+        ################################################################################################################
+        job_uuid = exportjob.submit(report, parameters, user, req.context.privilege, export)
+
+        resp.status = falcon.HTTP_202
+        resp.location = '/reports/exports/' + job_uuid
+        resp.body = json.dumps({"uuid": job_uuid,
+                                "status": get_job(req, job_uuid)['status']})
+
+
+class ReportExportItem:
+    @staticmethod
+    def __init__():
+        pass
+
+    @staticmethod
+    def on_options(req, resp, id_):
+        resp.status = falcon.HTTP_200
+
+    @staticmethod
+    def on_get(req, resp, id_):
+        job = get_job(req, id_)
+
+        timezone_offset = int(config.utc_offset[1:3]) * 60 + int(config.utc_offset[4:6])
+        if config.utc_offset[0] == '-':
+            timezone_offset = -timezone_offset
+
+        result = {"uuid": job['uuid'],
+                  "report": job['report'],
+                  "status": job['status'],
+                  "create_datetime_local": (datetime.utcfromtimestamp(job['create_timestamp']) +
+                                            timedelta(minutes=timezone_offset)).isoformat(timespec='seconds'),
+                  "file_id": job['file_id'],
+                  "error": job['error']}
+        resp.body = json.dumps(result)
+
+
+class ReportExportFile:
+    @staticmethod
+    def __init__():
+        pass
+
+    @staticmethod
+    def on_options(req, resp, id_):
+        resp.status = falcon.HTTP_200
+
+    @staticmethod
+    def on_get(req, resp, id_):
+        job = get_job(req, id_)
+        if job['status'] != 'finished':
+            raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
+                                   description='API.EXPORT_JOB_NOT_FINISHED')
+
+        cnx_reporting = database.connect(config.myems_reporting_db)
+        cursor_reporting = cnx_reporting.cursor()
+
+        cursor_reporting.execute(" SELECT file_name, COALESCE(file_size, LENGTH(file_object)) "
+                                 " FROM tbl_reports_files "
+                                 " WHERE id = %s ", (job['file_id'],))
+        row = cursor_reporting.fetchone()
+        cursor_reporting.close()
+        cnx_reporting.disconnect()
+
+        if row is None:
+            raise falcon.HTTPError(falcon.HTTP_404, title='API.NOT_FOUND',
+                                   description='API.ADVANCED_REPORT_NOT_FOUND')
+
+        file_size = row[1] if row[1] is not None else 0
+        download.set_response(req, resp, row[0], excelexport.content_type, file_size,
+                              str(job['file_id']) + '-' + job['uuid'] + '-' + str(file_size),
+                              lambda start, end: advancedreport.read_file_object(job['file_id'], start, end))
@@ -1,10 +1,13 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 from datetime import datetime, timedelta, timezone
 from core import utilities
+from core import downsampling
 from decimal import Decimal
+from core import excelexport
+from core import spacetree
 import excelexporters.spacecost
 
 
@@ -17,6 +20,11 @@ class Reporting:
     def on_options(req, resp):
         resp.status = falcon.HTTP_200
 
+    @staticmethod
+    def on_get(req, resp):
+        print(req.params)
+        Reporting.get_report(req.params, req.context, resp)
+
     ####################################################################################################################
     # PROCEDURES
     # Step 1: valid parameters
@@ -31,16 +39,19 @@ class Reporting:
     # Step 10: query associated sensors and points data
     # Step 11: query child spaces energy cost
     # Step 12: construct the report
+    #   params: the query parameters of the report
+    #   context: req.context, or the context of an export job, with the user and privilege of the session
+    #   resp: the response, the report is set as JSON, or as an Excel file with the parameter export=excel
     ####################################################################################################################
     @staticmethod
-    def on_get(req, resp):
-        print(req.params)
-        space_id = req.params.get('spaceid')
-        period_type = req.params.get('periodtype')
-        base_start_datetime_local = req.params.get('baseperiodstartdatetime')
-        base_end_datetime_local = req.params.get('baseperiodenddatetime')
-        reporting_start_datetime_local = req.params.get('reportingperiodstartdatetime')
-        reporting_end_datetime_local = req.params.get('reportingperiodenddatetime')
+    def get_report(params, context, resp):
+        is_excel_export = excelexport.is_requested(params)
+        space_id = params.get('spaceid')
+        period_type = params.get('periodtype')
+        base_start_datetime_local = params.get('baseperiodstartdatetime')
+        base_end_datetime_local = params.get('baseperiodenddatetime')
+        reporting_start_datetime_local = params.get('reportingperiodstartdatetime')
+        reporting_end_datetime_local = params.get('reportingperiodenddatetime')
 
         ################################################################################################################
         # Step 1: valid parameters
@@ -120,16 +131,18 @@ class Reporting:
             raise falcon.HTTPError(falcon.HTTP_400, title='API.BAD_REQUEST',
                                    description='API.INVALID_REPORTING_PERIOD_END_DATETIME')
 
+        max_points, downsample_method = downsampling.get_parameters(params)
+
         ################################################################################################################
         # Step 2: query the space
         ################################################################################################################
-        cnx_system = mysql.connector.connect(**config.myems_system_db)
+        cnx_system = database.connect(config.myems_system_db)
         cursor_system = cnx_system.cursor()
 
-        cnx_billing = mysql.connector.connect(**config.myems_billing_db)
+        cnx_billing = database.connect(config.myems_billing_db)
         cursor_billing = cnx_billing.cursor()
 
-        cnx_historical = mysql.connector.connect(**config.myems_historical_db)
+        cnx_historical = database.connect(config.myems_historical_db)
         cursor_historical = cnx_historical.cursor()
 
         cursor_system.execute(" SELECT id, name, area, cost_center_id "
@@ -248,15 +261,7 @@ class Reporting:
         ################################################################################################################
         # Step 6: query child spaces
         ################################################################################################################
-        child_space_list = list()
-        cursor_system.execute(" SELECT id, name  "
-                              " FROM tbl_spaces "
-                              " WHERE parent_space_id = %s "
-                              " ORDER BY id ", (space['id'], ))
-        rows_child_spaces = cursor_system.fetchall()
-        if rows_child_spaces is not None and len(rows_child_spaces) > 0:
-            for row in rows_child_spaces:
-                child_space_list.append({"id": row[0], "name": row[1]})
+        child_space_list = spacetree.get_tree((space['id'], ), cursor_system).get_children(space['id'])
 
         ################################################################################################################
         # Step 7: query base period energy cost
@@ -355,7 +360,8 @@ class Reporting:
                 energy_category_tariff_dict = utilities.get_energy_category_peak_types(space['cost_center_id'],
                                                                                        energy_category_id,
                                                                                        reporting_start_datetime_utc,
-                                                                                       reporting_end_datetime_utc)
+                                                                                       reporting_end_datetime_utc,
+                                                                                       cursor_system)
                 for row in rows_space_hourly:
                     peak_type = energy_category_tariff_dict.get(row[0], None)
                     if peak_type == 'toppeak':
@@ -379,7 +385,8 @@ class Reporting:
                 energy_category_tariff_dict = utilities.get_energy_category_tariffs(space['cost_center_id'],
                                                                                     energy_category_id,
                                                                                     reporting_start_datetime_utc,
-                                                                                    reporting_end_datetime_utc)
+                                                                                    reporting_end_datetime_utc,
+                                                                                    cursor_system)
                 tariff_timestamp_list = list()
                 tariff_value_list = list()
                 for k, v in energy_category_tariff_dict.items():
@@ -395,64 +402,25 @@ class Reporting:
         ################################################################################################################
         # Step 10: query associated sensors and points data
         ################################################################################################################
-        for point in point_list:
-            point_values = []
-            point_timestamps = []
-            if point['object_type'] == 'ANALOG_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_analog_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s "
-                         " ORDER BY utc_date_time ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-
-            elif point['object_type'] == 'ENERGY_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_energy_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s "
-                         " ORDER BY utc_date_time ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
-            elif point['object_type'] == 'DIGITAL_VALUE':
-                query = (" SELECT utc_date_time, actual_value "
-                         " FROM tbl_digital_value "
-                         " WHERE point_id = %s "
-                         "       AND utc_date_time BETWEEN %s AND %s ")
-                cursor_historical.execute(query, (point['id'],
-                                                  reporting_start_datetime_utc,
-                                                  reporting_end_datetime_utc))
-                rows = cursor_historical.fetchall()
-
-                if rows is not None and len(rows) > 0:
-                    for row in rows:
-                        current_datetime_local = row[0].replace(tzinfo=timezone.utc) + \
-                                                 timedelta(minutes=timezone_offset)
-                        current_datetime = current_datetime_local.strftime('%Y-%m-%dT%H:%M:%S')
-                        point_timestamps.append(current_datetime)
-                        point_values.append(row[1])
+        point_values_dict = dict()
+        for point_id, rows in utilities.get_points_history_values(cursor_historical,
+                                                                  point_list,
+                                                                  reporting_start_datetime_utc,
+                                                                  reporting_end_datetime_utc):
+            point_timestamps = list()
+            point_values = list()
+            for row in downsampling.downsample(rows,
+                                               reporting_start_datetime_utc,
+                                               reporting_end_datetime_utc,
+                                               max_points,
+                                               downsample_method):
+                current_datetime_local = row[0] + timedelta(minutes=timezone_offset)
+                point_timestamps.append(current_datetime_local.isoformat()[0:19])
+                point_values.append(row[1])
+            point_values_dict[point_id] = (point_timestamps, point_values)
 
+        for point in point_list:
+            point_timestamps, point_values = point_values_dict.get(point['id'], (list(), list()))
             parameters_data['names'].append(point['name'] + ' (' + point['units'] + ')')
             parameters_data['timestamps'].append(point_timestamps)
             parameters_data['values'].append(point_values)
@@ -463,27 +431,20 @@ class Reporting:
         child_space_data = dict()
 
         if energy_category_set is not None and len(energy_category_set) > 0:
+            child_space_subtotals = utilities.get_child_spaces_subtotals(cursor_billing,
+                                                                         'tbl_space_input_category_hourly',
+                                                                         'energy_category_id',
+                                                                         child_space_list,
+                                                                         energy_category_set,
+                                                                         reporting_start_datetime_utc,
+                                                                         reporting_end_datetime_utc)
             for energy_category_id in energy_category_set:
                 child_space_data[energy_category_id] = dict()
                 child_space_data[energy_category_id]['child_space_names'] = list()
                 child_space_data[energy_category_id]['subtotals'] = list()
                 for child_space in child_space_list:
                     child_space_data[energy_category_id]['child_space_names'].append(child_space['name'])
-
-                    cursor_billing.execute(" SELECT SUM(actual_value) "
-                                           " FROM tbl_space_input_category_hourly "
-                                           " WHERE space_id = %s "
-                                           "     AND energy_category_id = %s "
-                                           "     AND start_datetime_utc >= %s "
-                                           "     AND start_datetime_utc < %s "
-                                           " ORDER BY start_datetime_utc ",
-                                           (child_space['id'],
-                                            energy_category_id,
-                                            reporting_start_datetime_utc,
-                                            reporting_end_datetime_utc))
-                    row_subtotal = cursor_billing.fetchone()
-
-                    subtotal = Decimal(0.0) if (row_subtotal is None or row_subtotal[0] is None) else row_subtotal[0]
+                    subtotal = child_space_subtotals.get((child_space['id'], energy_category_id), Decimal(0.0))
                     child_space_data[energy_category_id]['subtotals'].append(subtotal)
 
         ################################################################################################################
@@ -588,10 +549,13 @@ class Reporting:
                     child_space_data[energy_category_id]['child_space_names'])
                 result['child_space']['subtotals_array'].append(
                     child_space_data[energy_category_id]['subtotals'])
-        # export result to Excel file and then encode the file to base64 string
-        result['excel_bytes_base64'] = excelexporters.spacecost.export(result,
-                                                                       space['name'],
-                                                                       reporting_start_datetime_local,
-                                                                       reporting_end_datetime_local,
-                                                                       period_type)
-        resp.body = json.dumps(result)
+        if is_excel_export:
+            # export result to Excel file in memory
+            excel_bytes = excelexporters.spacecost.export(result,
+                                                          space['name'],
+                                                          reporting_start_datetime_local,
+                                                          reporting_end_datetime_local,
+                                                          period_type)
+            excelexport.set_response(resp, excel_bytes, 'spacecost', space['name'])
+        else:
+            resp.body = json.dumps(result)
@@ -1,10 +1,11 @@
 import falcon
 import simplejson as json
-import mysql.connector
+from core import database
 import config
 from datetime import datetime, timedelta, timezone
 from core import utilities
 from decimal import Decimal
+from core import excelexport
 import excelexporters.tenantbill
 
 
@@ -17,6 +18,11 @@ class Reporting:
     def on_options(req, resp):
         resp.status = falcon.HTTP_200
 
+    @staticmethod
+    def on_get(req, resp):
+        print(req.params)
+        Reporting.get_report(req.params, req.context, resp)
+
     ####################################################################################################################
     # PROCEDURES
     # Step 1: valid parameters
@@ -26,13 +32,16 @@ class Reporting:
     # Step 5: query reporting period energy cost
     # Step 6: query tariff data
     # Step 7: construct the report
+    #   params: the query parameters of the report
+    #   context: req.context, or the context of an export job, with the user and privilege of the session
+    #   resp: the response, the report is set as JSON, or as an Excel file with the parameter export=excel
     ####################################################################################################################
     @staticmethod
-    def on_get(req, resp):
-        print(req.params)
-        tenant_id = req.params.get('tenantid')
-        reporting_start_datetime_local = req.params.get('reportingperiodstartdatetime')
-        reporting_end_datetime_local = req.params.get('reportingperiodenddatetime')
+    def get_report(params, context, resp):
+        is_excel_export = excelexport.is_requested(params)
+        tenant_id = params.get('tenantid')
+        reporting_start_datetime_local = params.get('reportingperiodstartdatetime')
+        reporting_end_datetime_local = params.get('reportingperiodenddatetime')
 
         period_type = 'daily'
 
@@ -83,13 +92,13 @@ class Reporting:
         ################################################################################################################
         # Step 2: query the tenant
         ################################################################################################################
-        cnx_system = mysql.connector.connect(**config.myems_system_db)
+        cnx_system = database.connect(config.myems_system_db)
         cursor_system = cnx_system.cursor()
 
-        cnx_energy = mysql.connector.connect(**config.myems_energy_db)
+        cnx_energy = database.connect(config.myems_energy_db)
         cursor_energy = cnx_energy.cursor()
 
-        cnx_billing = mysql.connector.connect(**config.myems_billing_db)
+        cnx_billing = database.connect(config.myems_billing_db)
         cursor_billing = cnx_billing.cursor()
 
         cursor_system.execute(" SELECT t.id, t.name, t.buildings, t.floors, t.rooms, t.lease_number, "
@@ -277,7 +286,8 @@ class Reporting:
                 energy_category_tariff_dict = utilities.get_energy_category_tariffs(tenant['cost_center_id'],
                                                                                     energy_category_id,
                                                                                     reporting_start_datetime_utc,
-                                                                                    reporting_end_datetime_utc)
+                                                                                    reporting_end_datetime_utc,
+                                                                                    cursor_system)
                 tariff_timestamp_list = list()
                 tariff_value_list = list()
                 for k, v in energy_category_tariff_dict.items():
@@ -343,11 +353,13 @@ class Reporting:
             "values": parameters_data['values']
         }
 
-        # export result to Excel file and then encode the file to base64 string
-        result['excel_bytes_base64'] = excelexporters.tenantbill.export(result,
-                                                                        tenant['name'],
-                                                                        reporting_start_datetime_local,
-                                                                        reporting_end_datetime_local,
-                                                                        period_type)
-
-        resp.body = json.dumps(result)
+        if is_excel_export:
+            # export result to Excel file in memory
+            excel_bytes = excelexporters.tenantbill.export(result,
+                                                           tenant['name'],
+                                                           reporting_start_datetime_local,
+                                                           reporting_end_datetime_local,
+                                                           period_type)
+            excelexport.set_response(resp, excel_bytes, 'tenantbill', tenant['name'])
+        else:
+            resp.body = json.dumps(result)
@@ -0,0 +1,132 @@
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+
+########################################################################################################################
+# Fake MySQL databases with deterministic data for the energy category reports
+# Queries are recognized by their tables and answered with rows computed from the parameters, so the same request gets
+# the same rows whether the report queries hourly values per energy category or sums them per entity.
+#   area: area of the entities, 0 to report without values per unit area
+#   has_tariffs: whether the cost centers of the entities have tariffs
+########################################################################################################################
+area = 100
+has_tariffs = True
+
+
+def get_hourly_values(entity_id, energy_category_id, start_datetime_utc, end_datetime_utc, scale):
+    if start_datetime_utc is None or end_datetime_utc is None:
+        return []
+    start_datetime_utc = start_datetime_utc.replace(tzinfo=None)
+    end_datetime_utc = end_datetime_utc.replace(tzinfo=None)
+    current_datetime_utc = start_datetime_utc.replace(minute=0, second=0)
+    rows = list()
+    while current_datetime_utc < end_datetime_utc:
+        if current_datetime_utc >= start_datetime_utc:
+            rows.append((current_datetime_utc,
+                         Decimal(str((current_datetime_utc.hour + entity_id * 3 + energy_category_id) * scale)) / 10))
+        current_datetime_utc += timedelta(hours=1)
+    return rows
+
+
+def get_ids(query, column):
+    return [int(x) for x in re.search(column + r' IN \( ([^)]*) \)', query).group(1).split(',')]
+
+
+class Cursor:
+    def __init__(self, database):
+        self.database = database
+        self.rows = list()
+
+    def close(self):
+        pass
+
+    def fetchone(self):
+        return self.rows[0] if len(self.rows) > 0 else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, list()
+        return rows
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def execute(self, query, params=()):
+        # costs are 3 times the energy
+        scale = 3 if 'billing' in self.database else 1
+        query = ' '.join(query.split())
+        if query == 'SELECT id, name, uuid, parent_space_id FROM tbl_spaces':
+            self.rows = [(1, 'S', 'uuid-1', None), (2, 'c1', 'uuid-2', 1), (3, 'c2', 'uuid-3', 1)]
+        elif re.search(r'FROM tbl_\w+s WHERE id = %s', query):
+            if params[0] == '404':
+                self.rows = []
+            elif 'area' in query:
+                self.rows = [(int(params[0]), 'S', Decimal(area), 1)]
+            else:
+                self.rows = [(int(params[0]), 'S', 1)]
+        elif 'DISTINCT(energy_category_id)' in query:
+            self.rows = [(1, ), (2, )] if params[1] is not None else []
+        elif 'FROM tbl_energy_categories' in query:
+            self.rows = [(1, 'E', 'kWh', Decimal('0.1'), Decimal('0.2')),
+                         (2, 'W', 't', Decimal('0.3'), Decimal('0.4'))]
+        elif 'tbl_sensors_points' in query:
+            self.rows = [(10, 'p10', 'u', 'ANALOG_VALUE')]
+        elif re.search(r'tbl_\w+s_(points|parameters)', query):
+            self.rows = [(11, 'p11', 'u', 'ENERGY_VALUE')]
+        elif 'WHERE parent_space_id' in query:
+            self.rows = [(2, 'c1'), (3, 'c2')]
+        elif 'SELECT start_datetime_utc, actual_value' in query:
+            self.rows = get_hourly_values(params[0], params[1], params[2], params[3], scale)
+        elif 'GROUP BY space_id' in query:
+            # space 3 has no energy
+            self.rows = [(space_id, energy_category_id,
+                          sum(value for _, value in get_hourly_values(space_id, energy_category_id,
+                                                                      params[0], params[1], scale)))
+                         for space_id in get_ids(query, 'space_id')
+                         for energy_category_id in get_ids(query, 'energy_category_id') if space_id != 3]
+        elif 'SELECT SUM(actual_value)' in query:
+            rows = get_hourly_values(params[0], params[1], params[2], params[3], scale)
+            self.rows = [(sum(value for _, value in rows) if len(rows) > 0 and params[0] != 3 else None, )]
+        elif 'tbl_analog_value' in query or 'tbl_energy_value' in query:
+            # points are queried one by one with the point id as the first parameter, or all at once
+            is_grouped = 'IN (' in query
+            start_datetime_utc = params[0] if is_grouped else params[1]
+            if start_datetime_utc is None:
+                self.rows = []
+                return
+            start_datetime_utc = start_datetime_utc.replace(tzinfo=None)
+            if is_grouped:
+                point_id = 10 if 'analog' in query else 11
+                self.rows = [(point_id, start_datetime_utc + timedelta(minutes=7 * i), Decimal(i)) for i in range(50)]
+            else:
+                self.rows = [(start_datetime_utc + timedelta(minutes=7 * i), Decimal(i)) for i in range(50)]
+        elif 'FROM tbl_tariffs t' in query:
+            self.rows = [(7, datetime(2020, 1, 1), datetime(2030, 1, 1))] if has_tariffs else []
+        elif 'tbl_tariffs_timeofuses' in query:
+            self.rows = [(7, timedelta(hours=0), timedelta(hours=8, seconds=-1), Decimal('0.3'), 'offpeak'),
+                         (7, timedelta(hours=8), timedelta(hours=17, seconds=-1), Decimal('0.9'), 'onpeak'),
+                         (7, timedelta(hours=17), timedelta(hours=21, seconds=-1), Decimal('1.2'), 'toppeak'),
+                         (7, timedelta(hours=21), timedelta(hours=24, seconds=-1), Decimal('0.6'), 'midpeak')]
+            if 'price' not in query:
+                self.rows = [row[:3] + row[4:] for row in self.rows]
+        else:
+            raise Exception('unknown query ' + query)
+
+
+class Connection:
+    def __init__(self, database):
+        self.database = database
+
+    def cursor(self, *args, **kwargs):
+        return Cursor(self.database)
+
+    def close(self):
+        pass
+
+    def disconnect(self):
+        pass
+
+
+def connect(db_config=None, **kwargs):
+    return Connection((db_config or kwargs)['database'])
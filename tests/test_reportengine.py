@@ -0,0 +1,97 @@
+import hashlib
+import importlib
+import os
+import unittest
+from urllib.parse import urlencode
+import falcon
+import falcon.testing
+import simplejson as json
+from core import database
+from core import utilities
+from tests import fakedatabase
+
+
+########################################################################################################################
+# Comparison of the energy category reports computed by core/reportengine with the baseline
+# tests/data/energycategory_reports.json holds the SHA-256 digests of the JSON bodies (or the descriptions of the errors)
+# which the handlers of the six *energycategory reports returned before they were moved onto core/reportengine, for the
+# same requests and the same data of tests/fakedatabase. The excel_bytes_base64 member, which the baseline handlers
+# appended to the JSON before Excel files were only returned with the parameter export=excel, is removed from the
+# baseline bodies.
+# Run from the directory of app.py:
+#   python -m unittest tests.test_reportengine
+########################################################################################################################
+reports = {'spaceenergycategory': 'spaceid',
+           'equipmentenergycategory': 'equipmentid',
+           'combinedequipmentenergycategory': 'combinedequipmentid',
+           'tenantenergycategory': 'tenantid',
+           'storeenergycategory': 'storeid',
+           'shopfloorenergycategory': 'shopfloorid'}
+
+base_parameters = {'periodtype': 'daily',
+                   'baseperiodstartdatetime': '2021-01-01T00:00:00',
+                   'baseperiodenddatetime': '2021-01-05T00:00:00',
+                   'reportingperiodstartdatetime': '2021-02-01T00:00:00',
+                   'reportingperiodenddatetime': '2021-02-03T12:00:00'}
+
+variants = {'daily': {},
+            'hourly': {'periodtype': 'hourly'},
+            'weekly': {'periodtype': 'weekly'},
+            'monthly': {'periodtype': 'monthly'},
+            'yearly': {'periodtype': 'yearly'},
+            'invalid_base_period': {'baseperiodstartdatetime': 'invalid'},
+            'invalid_reporting_period': {'reportingperiodenddatetime': '2021-01-01T00:00:00'},
+            'invalid_id': {'id': 'x'}}
+
+
+########################################################################################################################
+# Get the cases of the comparison
+# Returns: list of (case name, report, parameters, area, has_tariffs)
+########################################################################################################################
+def get_cases():
+    cases = list()
+    for report, id_parameter in reports.items():
+        for area, has_tariffs in ((100, True), (0, False)):
+            for variant_name, variant in variants.items():
+                parameters = dict(base_parameters)
+                parameters[id_parameter] = '1'
+                for key, value in variant.items():
+                    parameters[id_parameter if key == 'id' else key] = value
+                case_name = report + '-' + variant_name + ('-with-area-and-tariffs' if has_tariffs else '')
+                cases.append((case_name, report, parameters, area, has_tariffs))
+    return cases
+
+
+class EnergyCategoryReportTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.connect = database.connect
+        database.connect = fakedatabase.connect
+        with open(os.path.join(os.path.dirname(__file__), 'data', 'energycategory_reports.json')) as f:
+            cls.expected = json.load(f)
+
+    @classmethod
+    def tearDownClass(cls):
+        database.connect = cls.connect
+
+    def test_reports_match_baseline(self):
+        for case_name, report, parameters, area, has_tariffs in get_cases():
+            with self.subTest(case_name):
+                fakedatabase.area = area
+                fakedatabase.has_tariffs = has_tariffs
+                utilities.clear_tariff_schedule_cache()
+
+                req = falcon.Request(falcon.testing.create_environ(path='/reports/' + report,
+                                                                   query_string=urlencode(parameters)))
+                resp = falcon.Response()
+                try:
+                    importlib.import_module('reports.' + report).Reporting.on_get(req, resp)
+                except falcon.HTTPError as e:
+                    self.assertEqual(self.expected[case_name], {'error': e.description})
+                    continue
+                self.assertEqual(self.expected[case_name],
+                                 {'sha256': hashlib.sha256(resp.body.encode('utf-8')).hexdigest()})
+
+
+if __name__ == '__main__':
+    unittest.main()